@@ -4,7 +4,11 @@ from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from .storage import MemoryStorage, SQLCipherStorage, SQLiteStorage
-from .config import STORAGE_CONFIG, SESSION_CONFIG, HSTS_CONFIG
+from .public_payloads import build_public_payloads
+from .assets import init_assets
+from .jobs import init_jobs
+from .pdf_cache import init_pdf_cache
+from .config import STORAGE_CONFIG, SESSION_CONFIG, HSTS_CONFIG, API_DOCS_ENABLED
 
 # Limiter sin límite por defecto; el límite se aplica solo a login/register en routes.py
 limiter = Limiter(key_func=get_remote_address)
@@ -32,6 +36,18 @@ def create_app():
     else:
         app.storage = MemoryStorage()
 
+    # Payloads inmutables de /api/config y /api/messages (serializados una sola vez)
+    app.public_payloads = build_public_payloads(app)
+
+    # Manifiesto de recursos estáticos con huella (url_for('static', ...) añade ?v=<hash>)
+    init_assets(app)
+
+    # Trabajos en segundo plano para operaciones de administración largas (app.jobs)
+    init_jobs(app)
+
+    # Caché por contenido de los PDF del informe (app.pdf_cache)
+    init_pdf_cache(app)
+
     # Rate limiting solo en login/register (3 por minuto por IP); ver decoradores en routes.py
     if os.environ.get("APP_TESTING") != "1":
         limiter.init_app(app)
@@ -49,13 +65,16 @@ def create_app():
 
     # Registrar blueprints
     from .views import views
-    from .api_docs import docs
     from .routes import api
     
     app.register_blueprint(views)
-    app.register_blueprint(docs)
     app.register_blueprint(api)
 
+    # Swagger UI / OpenAPI solo se carga si está habilitado (en producción suele estar desactivado)
+    if API_DOCS_ENABLED:
+        from .api_docs import docs
+        app.register_blueprint(docs)
+
     # Agregar headers de seguridad para prevenir clickjacking y otros ataques
     @app.after_request
     def set_security_headers(response):
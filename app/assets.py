@@ -0,0 +1,106 @@
+"""
+Fingerprinting de recursos estáticos (sin paso de build)
+
+Al crear la aplicación se recorre app/static/ y se calcula un hash del contenido
+de cada fichero (manifiesto de assets). A partir de ahí:
+
+- url_for('static', filename=...) añade automáticamente ?v=<hash>, por lo que
+  las plantillas obtienen URLs con huella sin cambiar su forma de generarlas.
+- Las peticiones cuya huella coincide con el manifiesto se sirven con
+  Cache-Control: public, max-age=31536000, immutable (el navegador no vuelve a
+  pedirlas hasta que cambie el contenido y, con él, la URL).
+- Opcionalmente (ASSETS_PRECOMPRESS=1) se guarda en memoria una versión gzip
+  de los ficheros de texto y se sirve a los clientes que la acepten.
+"""
+import gzip
+import hashlib
+import os
+from typing import Optional
+
+from flask import request
+
+from .config import ASSETS_CONFIG
+
+# Extensiones que merece la pena comprimir (texto); imágenes ya van comprimidas
+_COMPRESSIBLE_EXTENSIONS = {".js", ".css", ".html", ".json", ".svg", ".txt"}
+
+
+class AssetEntry:
+    """Entrada del manifiesto: huella del contenido y cuerpo gzip opcional"""
+
+    def __init__(self, digest: str, gzip_body: Optional[bytes] = None):
+        self.digest = digest
+        self.gzip_body = gzip_body
+
+
+class AssetManifest:
+    """Manifiesto {ruta relativa: AssetEntry} generado al arrancar"""
+
+    def __init__(self, static_folder: Optional[str], precompress: bool = False):
+        self.entries = {}
+        if not static_folder or not os.path.isdir(static_folder):
+            return
+        for root, _dirs, files in os.walk(static_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, static_folder).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    content = f.read()
+                gzip_body = None
+                if precompress and os.path.splitext(name)[1].lower() in _COMPRESSIBLE_EXTENSIONS:
+                    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+                    if len(compressed) < len(content):
+                        gzip_body = compressed
+                self.entries[rel_path] = AssetEntry(
+                    digest=hashlib.sha256(content).hexdigest()[:12],
+                    gzip_body=gzip_body,
+                )
+
+    def version(self, filename: str) -> Optional[str]:
+        """Devuelve la huella del fichero o None si no está en el manifiesto"""
+        entry = self.entries.get(filename)
+        return entry.digest if entry else None
+
+    def get(self, filename: str) -> Optional[AssetEntry]:
+        return self.entries.get(filename)
+
+
+def _accepts_gzip() -> bool:
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def init_assets(app):
+    """Genera el manifiesto y registra los hooks de URL y de caché en la app"""
+    manifest = AssetManifest(app.static_folder, precompress=ASSETS_CONFIG["precompress"])
+    app.asset_manifest = manifest
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        """Añade ?v=<hash> a url_for('static', filename=...)"""
+        if endpoint != "static" or "v" in values:
+            return
+        version = manifest.version(values.get("filename", ""))
+        if version:
+            values["v"] = version
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        """Cache inmutable (y gzip opcional) para URLs con huella vigente"""
+        if request.endpoint != "static" or response.status_code != 200:
+            return response
+        filename = (request.view_args or {}).get("filename", "")
+        entry = manifest.get(filename)
+        if not entry or request.args.get("v") != entry.digest:
+            return response
+
+        response.headers["Cache-Control"] = f"public, max-age={ASSETS_CONFIG['max_age']}, immutable"
+        if entry.gzip_body is not None:
+            response.vary.add("Accept-Encoding")
+            if _accepts_gzip():
+                response.direct_passthrough = False
+                response.set_data(entry.gzip_body)
+                response.headers["Content-Encoding"] = "gzip"
+                response.set_etag(f"{entry.digest}-gz")
+        return response
+
+    return manifest
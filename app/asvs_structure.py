@@ -0,0 +1,157 @@
+"""
+Estructura del OWASP ASVS 4.0.3 precompilada y cacheada en disco
+
+Leer y recorrer el JSON oficial (docs/OWASP Application Security Verification
+Standard 4.0.3-es.json, ~230 KB) en cada ejecución es el primer coste del informe
+ASVS. Este módulo construye una sola vez, a partir de ese JSON:
+
+- hierarchy: {categoría: {name, subcategories: {subcategoría: {name, requirements}}}}
+- requirements: {id de requisito (V5.1.1): metadatos (categoría, subcategoría,
+  descripción, niveles L1/L2/L3, CWE, NIST)}
+- cwe_index: {CWE (int): [ids de requisito]}
+
+y lo guarda con marshal (tipos básicos, sin ejecución de código al cargar) en
+data/cache/asvs_403_structure.marshal (ASVS_STRUCTURE_CACHE). La caché lleva la versión
+del formato y el sha256 del JSON de origen: si cualquiera de los dos cambia, se
+reconstruye. Dentro del mismo proceso el resultado se reutiliza mientras el fichero
+de origen no cambie (tamaño y mtime).
+
+No depende de app/config.py ni de Flask: lo usan scripts/generate_asvs_report.py
+(también dentro del contenedor de DefectDojo) y cualquier endpoint que exponga
+datos del ASVS.
+"""
+import hashlib
+import json
+import marshal
+import os
+import threading
+from pathlib import Path
+
+CACHE_FORMAT_VERSION = 1
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SOURCE_PATH = _PROJECT_ROOT / "docs" / "OWASP Application Security Verification Standard 4.0.3-es.json"
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get("ASVS_STRUCTURE_CACHE", _PROJECT_ROOT / "data" / "cache" / "asvs_403_structure.marshal")
+)
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+class AsvsStructure:
+    """Estructura ASVS ya indexada (datos originales + índices por requisito y CWE)"""
+
+    def __init__(self, data, hierarchy, requirements, cwe_index, source_sha256):
+        self.data = data
+        self.hierarchy = hierarchy
+        self.requirements = requirements
+        self.cwe_index = cwe_index
+        self.source_sha256 = source_sha256
+
+    def requirement(self, req_code):
+        """Metadatos de un requisito (None si no existe)"""
+        return self.requirements.get(req_code)
+
+    def requirements_for_cwe(self, cwe):
+        """Requisitos asociados a un CWE (acepta 1021 o 'CWE-1021')"""
+        if isinstance(cwe, str):
+            cwe = cwe.upper().removeprefix("CWE-")
+            if not cwe.isdigit():
+                return []
+        return self.cwe_index.get(int(cwe), [])
+
+    def _to_payload(self):
+        return {
+            "data": self.data,
+            "hierarchy": self.hierarchy,
+            "requirements": self.requirements,
+            "cwe_index": self.cwe_index,
+        }
+
+
+def build_structure(data, source_sha256=None):
+    """Construye jerarquía e índices a partir del JSON del ASVS ya cargado"""
+    hierarchy = {}
+    requirements = {}
+    cwe_index = {}
+    for category in data.get("Requirements", []):
+        cat_code = category["Shortcode"]
+        subcategories = {}
+        hierarchy[cat_code] = {
+            "name": category.get("Name", category.get("ShortName", "")),
+            "subcategories": subcategories,
+        }
+        for subcat in category.get("Items", []):
+            subcat_code = subcat["Shortcode"]
+            req_codes = []
+            subcategories[subcat_code] = {"name": subcat.get("Name", ""), "requirements": req_codes}
+            for req in subcat.get("Items", []):
+                req_code = req["Shortcode"]
+                req_codes.append(req_code)
+                cwes = [int(cwe) for cwe in req.get("CWE", [])]
+                requirements[req_code] = {
+                    "category": cat_code,
+                    "subcategory": subcat_code,
+                    "description": req.get("Description", ""),
+                    "levels": [level for level in ("L1", "L2", "L3")
+                               if req.get(level, {}).get("Required", False)],
+                    "cwe": cwes,
+                    "nist": list(req.get("NIST", [])),
+                }
+                for cwe in cwes:
+                    cwe_index.setdefault(cwe, []).append(req_code)
+    return AsvsStructure(data, hierarchy, requirements, cwe_index, source_sha256)
+
+
+def _read_cache(cache_path, source_sha256):
+    # marshal.loads sobre el fichero completo: marshal.load(f) lee en trozos pequeños y es ~10x más lento
+    try:
+        with open(cache_path, "rb") as f:
+            version, cached_sha256, payload = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (version, cached_sha256) != (CACHE_FORMAT_VERSION, source_sha256):
+        return None
+    return AsvsStructure(source_sha256=source_sha256, **payload)
+
+
+def _write_cache(cache_path, structure):
+    """Escritura atómica; si el directorio no es escribible se sigue sin caché"""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(marshal.dumps((CACHE_FORMAT_VERSION, structure.source_sha256, structure._to_payload())))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_asvs_structure(source_path=None, cache_path=None):
+    """
+    Devuelve la AsvsStructure del JSON de origen, desde memoria, desde la caché en
+    disco (si coincide el hash) o reconstruyéndola. Lanza OSError/ValueError si el
+    JSON de origen no existe o no es válido.
+    """
+    source_path = str(source_path or DEFAULT_SOURCE_PATH)
+    cache_path = str(cache_path or DEFAULT_CACHE_PATH)
+    stat = os.stat(source_path)
+    memo_key = (source_path, cache_path)
+    with _memo_lock:
+        cached = _memo.get(memo_key)
+        if cached and cached[0] == (stat.st_size, stat.st_mtime_ns):
+            return cached[1]
+
+        with open(source_path, "rb") as f:
+            raw = f.read()
+        source_sha256 = hashlib.sha256(raw).hexdigest()
+        structure = _read_cache(cache_path, source_sha256)
+        if structure is None:
+            structure = build_structure(json.loads(raw), source_sha256)
+            _write_cache(cache_path, structure)
+        _memo[memo_key] = ((stat.st_size, stat.st_mtime_ns), structure)
+        return structure
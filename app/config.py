@@ -129,10 +129,35 @@ _sqlcipher_key = os.environ.get("SQLCIPHER_KEY", "")
 if _storage_backend == "sqlcipher" and not _sqlcipher_key:
     _sqlcipher_key = PASSWORD_PEPPER
 
+# Group commit (solo sqlite/sqlcipher): las altas de peso concurrentes se agrupan
+# en una única transacción cada `group_commit_max_delay_ms` o al llegar a
+# `group_commit_max_batch` entradas. Cada petición espera a su commit durable
+# como mucho `group_commit_timeout_s` segundos.
 STORAGE_CONFIG = {
     "backend": _storage_backend,
     "db_path": _sqlcipher_db_path if _storage_backend == "sqlcipher" else _sqlite_db_path,
     "db_key": _sqlcipher_key,
+    "group_commit": os.environ.get("STORAGE_GROUP_COMMIT", "false").lower() in {"1", "true", "yes"},
+    "group_commit_max_delay_ms": float(os.environ.get("STORAGE_GROUP_COMMIT_MAX_DELAY_MS", "5")),
+    "group_commit_max_batch": int(os.environ.get("STORAGE_GROUP_COMMIT_MAX_BATCH", "64")),
+    "group_commit_timeout_s": float(os.environ.get("STORAGE_GROUP_COMMIT_TIMEOUT_S", "30")),
+}
+
+# Trabajos en segundo plano (ver app/jobs.py)
+# - db_path: SQLite con el estado de los trabajos (en memoria con STORAGE_BACKEND=memory)
+# - artifacts_dir: ficheros generados (dumps, PDFs) que se descargan al terminar
+# - max_workers: trabajos ejecutándose a la vez
+# - retention_hours: horas que se conservan los trabajos terminados y sus ficheros
+# - stale_after_s: segundos sin latido tras los que un trabajo se da por huérfano
+JOBS_CONFIG = {
+    "db_path": os.environ.get(
+        "JOBS_DB_PATH",
+        ":memory:" if _storage_backend == "memory" else os.path.join(os.getcwd(), "data", "jobs.db"),
+    ),
+    "artifacts_dir": os.environ.get("JOBS_ARTIFACTS_DIR", os.path.join(os.getcwd(), "data", "jobs")),
+    "max_workers": int(os.environ.get("JOBS_MAX_WORKERS", "2")),
+    "retention_hours": float(os.environ.get("JOBS_RETENTION_HOURS", "24")),
+    "stale_after_s": int(os.environ.get("JOBS_STALE_AFTER_S", "300")),
 }
 
 # Límites de validación
@@ -147,6 +172,32 @@ VALIDATION_LIMITS = {
     "name_max_length": 100,  # caracteres máximos
 }
 
+# Recursos estáticos con huella (ver app/assets.py)
+# - max_age: segundos de caché para URLs con ?v=<hash> vigente (1 año)
+# - precompress: guarda en memoria una versión gzip de JS/CSS al arrancar
+ASSETS_CONFIG = {
+    "max_age": int(os.environ.get("ASSETS_MAX_AGE", "31536000")),
+    "precompress": os.environ.get("ASSETS_PRECOMPRESS", "false").lower() in {"1", "true", "yes"},
+}
+
+# Caché de PDF del informe de seguridad (ver app/pdf_cache.py)
+# La clave es el hash del Markdown + el hash del script de renderizado.
+# - max_entries: PDF que se conservan; al guardar uno nuevo se borran los más antiguos
+_project_root = Path(__file__).resolve().parent.parent
+PDF_CACHE_CONFIG = {
+    "enabled": os.environ.get("PDF_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"},
+    "cache_dir": os.environ.get("PDF_CACHE_DIR", str(_project_root / "docs" / "informes" / "cache")),
+    "manifest_path": os.environ.get(
+        "PDF_CACHE_MANIFEST", str(_project_root / "docs" / "informes" / "manifest.json")
+    ),
+    "renderer_path": str(_project_root / "app" / "pdf_renderer.py"),
+    "max_entries": int(os.environ.get("PDF_CACHE_MAX_ENTRIES", "5")),
+}
+
+# Renderizado del PDF en el propio proceso (app/pdf_renderer.py) si hay algún motor
+# disponible; con 0 se ejecuta siempre scripts/generate_pdf_report.py como subproceso
+PDF_RENDER_IN_PROCESS = os.environ.get("PDF_RENDER_IN_PROCESS", "1").lower() in {"1", "true", "yes"}
+
 # Configuración del servidor
 SERVER_CONFIG = {
     "port": 5001,
@@ -162,6 +213,9 @@ AVAILABLE_LANGUAGES = ['es']
 # Configuración WSTG Sync
 WSTG_WEBHOOK_KEY = os.environ.get('WSTG_WEBHOOK_KEY', 'change_me_in_production')
 WSTG_SYNC_API_URL = os.environ.get('WSTG_SYNC_API_URL', 'http://localhost:5001/api/wstg/sync')
+# Socket Unix del worker persistente de sincronización (servicio wstg-sync, app/wstg_sync_worker.py).
+# Si no existe o no responde se usa `docker compose exec ... wstg_sync_handler.py`; vacío lo desactiva
+WSTG_SYNC_SOCKET = os.environ.get('WSTG_SYNC_SOCKET', '/app/data/run/wstg_sync.sock')
 
 # Documentación interactiva de la API (Swagger UI + OpenAPI)
 # Recomendación: en producción usar API_DOCS_ENABLED=0
@@ -0,0 +1,558 @@
+"""
+Operaciones de administración sobre DefectDojo (dumps, informe PDF, sincronización WSTG)
+
+Cada operación ejecuta los comandos de Docker Compose / scripts correspondientes y
+devuelve el resultado o lanza OperationError con un mensaje apto para el cliente.
+Las usan tanto los endpoints síncronos de routes.py como los trabajos en segundo
+plano de app/jobs.py (que además reciben el progreso mediante `progress`).
+
+`progress(porcentaje, mensaje)` es opcional en todas las operaciones.
+"""
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_MARKDOWN = os.path.join(PROJECT_ROOT, 'docs', 'INFORME_SEGURIDAD.md')
+MISSING_MARKDOWN_ERROR = "El archivo INFORME_SEGURIDAD.md no existe. Por favor, genera el informe Markdown primero."
+
+
+class OperationError(Exception):
+    """Error de una operación de DefectDojo (el mensaje se devuelve al cliente)"""
+
+
+def _noop_progress(percent, message=None, **details):
+    pass
+
+
+def compose_cmd():
+    """Devuelve el comando de Docker Compose disponible."""
+    if shutil.which("docker"):
+        try:
+            subprocess.run(
+                ["docker", "compose", "version"],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            return ["docker", "compose"]
+        except Exception:
+            pass
+    if shutil.which("docker-compose"):
+        return ["docker-compose"]
+    return ["docker", "compose"]
+
+
+# Exportación en streaming: formatos admitidos -> (extensión, mimetype)
+DUMP_COMPRESSIONS = {
+    "gzip": (".sql.gz", "application/gzip"),
+    "zstd": (".sql.zst", "application/zstd"),
+    "none": (".sql", "application/sql"),
+}
+# Tamaño de cada lectura de la salida de pg_dump: es el máximo que se retiene en memoria
+DUMP_CHUNK_SIZE = 64 * 1024
+# Bloques leídos por adelantado mientras el consumidor procesa el anterior
+DUMP_READ_AHEAD = 4
+# Tiempo máximo de una exportación completa (s)
+DUMP_TIMEOUT = 300
+
+
+def dump_command():
+    """Comando que escribe el dump SQL de DefectDojo por stdout"""
+    return compose_cmd() + ['--profile', 'defectdojo', 'exec', '-T', 'defectdojo-db',
+                            'pg_dump', '-U', 'defectdojo', 'defectdojo']
+
+
+class _IdentityCompressor:
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b""
+
+
+def _make_compressor(compression):
+    if compression == "gzip":
+        # wbits=31: formato gzip (cabecera + CRC), compatible con gunzip y con la importación
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise OperationError("Compresión zstd no disponible (instala zstandard)")
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return _IdentityCompressor()
+
+
+def stream_dump(compression="gzip", tee_path=None, chunk_size=DUMP_CHUNK_SIZE, timeout=None,
+                command=None, progress=None, logger=None):
+    """
+    Devuelve un generador con el dump de DefectDojo comprimido al vuelo.
+
+    La salida de pg_dump se lee en bloques de `chunk_size`, se comprime y se entrega
+    sin acumularla: la memoria usada no depende del tamaño del dump (la tubería del
+    sistema aplica contrapresión si el cliente lee despacio). Con `tee_path` el
+    resultado comprimido también se escribe en disco: en un temporal con nombre
+    único que se publica con un rename atómico solo si pg_dump termina bien, así
+    que dos exportaciones simultáneas no se pisan.
+
+    La salida se lee en un hilo aparte, de modo que `timeout` (DUMP_TIMEOUT por
+    defecto) se cumple aunque pg_dump se quede bloqueado sin escribir nada.
+
+    Lanza OperationError si el formato no es válido. Si pg_dump falla con la
+    respuesta ya en curso, el generador lanza OperationError y el flujo queda
+    truncado (el gzip/zstd incompleto no se puede descomprimir).
+    """
+    if compression not in DUMP_COMPRESSIONS:
+        raise OperationError(f"Compresión no soportada: {compression}. Valores: {', '.join(DUMP_COMPRESSIONS)}")
+    compressor = _make_compressor(compression)
+    return _stream_dump(compressor, tee_path, chunk_size, DUMP_TIMEOUT if timeout is None else timeout,
+                        command or dump_command(), progress or _noop_progress, logger)
+
+
+def _read_chunks(stream, chunk_size, chunks, stop):
+    """Hilo lector: pasa los bloques de `stream` a la cola `chunks` (b"" al terminar)"""
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            while not stop.is_set():
+                try:
+                    chunks.put(chunk, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if not chunk or stop.is_set():
+                return
+    except (OSError, ValueError):
+        # Tubería cerrada: fin del flujo para el consumidor (si sigue esperando)
+        try:
+            chunks.put_nowait(b"")
+        except queue.Full:
+            pass
+
+
+def _stream_dump(compressor, tee_path, chunk_size, timeout, command, progress, logger):
+    deadline = time.monotonic() + timeout
+    # stderr a fichero temporal: una tubería sin leer podría bloquear a pg_dump
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        chunks = queue.Queue(maxsize=DUMP_READ_AHEAD)
+        stop = threading.Event()
+        reader = threading.Thread(target=_read_chunks, args=(process.stdout, chunk_size, chunks, stop),
+                                  name="pg-dump-reader", daemon=True)
+        reader.start()
+        tee_file = None
+        if tee_path:
+            tee_dir = os.path.dirname(tee_path) or "."
+            os.makedirs(tee_dir, exist_ok=True)
+            fd, tee_tmp = tempfile.mkstemp(prefix=f".{os.path.basename(tee_path)}.", suffix=".part",
+                                           dir=tee_dir)
+            tee_file = os.fdopen(fd, "wb")
+        completed = False
+        try:
+            total = 0
+            reported_mb = 0
+            while True:
+                try:
+                    chunk = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise OperationError("Timeout al exportar la base de datos")
+                if not chunk:
+                    break
+                total += len(chunk)
+                data = compressor.compress(chunk)
+                if data:
+                    if tee_file:
+                        tee_file.write(data)
+                    yield data
+                if total // (1024 * 1024) > reported_mb:
+                    reported_mb = total // (1024 * 1024)
+                    progress(50, f"{reported_mb} MB exportados")
+
+            try:
+                returncode = process.wait(timeout=max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                raise OperationError("Timeout al exportar la base de datos")
+            if returncode != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", "replace")
+                if logger:
+                    logger.error(f"Error al exportar dump: {stderr}")
+                raise OperationError("Error al exportar la base de datos")
+
+            data = compressor.flush()
+            if data:
+                if tee_file:
+                    tee_file.write(data)
+                yield data
+            completed = True
+            progress(100, f"Dump exportado ({total // (1024 * 1024)} MB sin comprimir)")
+        finally:
+            # También se ejecuta si el cliente cierra la conexión (GeneratorExit) o hay timeout
+            stop.set()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            reader.join(timeout=5)
+            process.stdout.close()
+            if tee_file:
+                tee_file.close()
+                if completed:
+                    os.replace(tee_tmp, tee_path)
+                elif os.path.exists(tee_tmp):
+                    os.remove(tee_tmp)
+
+
+def write_dump(dest_path, compression="gzip", **kwargs):
+    """Escribe el dump comprimido en `dest_path` en streaming. Devuelve la ruta."""
+    with open(dest_path, "wb") as f:
+        for data in stream_dump(compression, **kwargs):
+            f.write(data)
+    return dest_path
+
+
+def _restart_defectdojo(cmd, logger=None):
+    """Reinicia DefectDojo para aplicar un dump importado (un fallo solo se registra)"""
+    restart_result = subprocess.run(
+        cmd + ['--profile', 'defectdojo', 'restart', 'defectdojo'],
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    if restart_result.returncode != 0 and logger:
+        logger.warning(f"Advertencia al reiniciar DefectDojo: {restart_result.stderr}")
+
+
+IMPORT_SUCCESS = {
+    "message": "Dump importado correctamente. DefectDojo se está reiniciando.",
+    "success": True,
+}
+
+
+# Extensiones aceptadas por la importación en streaming (la compresión se deduce de la extensión)
+IMPORT_EXTENSIONS = (".sql", ".sql.gz", ".sql.zst")
+# Tiempo máximo de una importación completa (s)
+IMPORT_TIMEOUT = 300
+
+
+def import_command():
+    """Comando que carga por stdin un dump SQL en la base de datos de DefectDojo"""
+    return compose_cmd() + ['--profile', 'defectdojo', 'exec', '-T', 'defectdojo-db',
+                            'psql', '-U', 'defectdojo', '-d', 'defectdojo']
+
+
+def _open_decompressed(raw, filename):
+    """Envuelve el fichero binario `raw` con el descompresor que indique la extensión"""
+    if filename.endswith(".gz"):
+        import gzip
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if filename.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise OperationError("Compresión zstd no disponible (instala zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+    return raw
+
+
+def _write_chunks(stream, chunks, stop, state):
+    """Hilo escritor: pasa los bloques de la cola `chunks` a `stream` y lo cierra al recibir b"""""
+    try:
+        while not stop.is_set():
+            try:
+                chunk = chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if not chunk:
+                stream.close()
+                state["closed"] = True
+                return
+            stream.write(chunk)
+    except (OSError, ValueError) as e:
+        # BrokenPipeError: psql cerró su entrada antes de recibir todo el dump
+        state["error"] = e
+
+
+def stream_import(dump_path, chunk_size=DUMP_CHUNK_SIZE, timeout=None, command=None,
+                  restart=True, progress=None, logger=None):
+    """
+    Carga un dump (.sql, .sql.gz o .sql.zst) en DefectDojo en streaming.
+
+    El fichero se descomprime por bloques de `chunk_size` y cada bloque se escribe en
+    el stdin de psql, así que la memoria usada es constante sea cual sea el tamaño
+    del dump. El progreso se informa en bytes leídos del fichero subido
+    (bytes_processed / bytes_total).
+
+    La escritura en psql se hace en un hilo aparte (como la lectura en stream_dump),
+    de modo que `timeout` (IMPORT_TIMEOUT por defecto) se cumple aunque psql deje de
+    leer. Lanza OperationError si psql falla, se supera el timeout o psql cierra su
+    entrada antes de recibir todo el dump (aunque salga con código 0: la importación
+    estaría incompleta).
+    """
+    progress = progress or _noop_progress
+    if not dump_path.endswith(IMPORT_EXTENSIONS):
+        raise OperationError(f"Formato de dump no soportado. Extensiones: {', '.join(IMPORT_EXTENSIONS)}")
+    deadline = time.monotonic() + (IMPORT_TIMEOUT if timeout is None else timeout)
+    bytes_total = os.path.getsize(dump_path)
+
+    def send(chunk):
+        """Entrega un bloque al hilo escritor respetando el timeout; False si ya no escribe"""
+        while writer.is_alive():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise OperationError("Timeout al importar la base de datos")
+            try:
+                chunks.put(chunk, timeout=min(0.1, remaining))
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    with open(dump_path, "rb") as raw, tempfile.TemporaryFile() as stderr_file:
+        source = _open_decompressed(raw, dump_path)
+        # stdout a /dev/null: psql escribe una línea por sentencia y una tubería sin leer lo bloquearía
+        process = subprocess.Popen(command or import_command(), stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=stderr_file)
+        chunks = queue.Queue(maxsize=DUMP_READ_AHEAD)
+        stop = threading.Event()
+        state = {}
+        writer = threading.Thread(target=_write_chunks, args=(process.stdin, chunks, stop, state),
+                                  name="psql-writer", daemon=True)
+        writer.start()
+        try:
+            bytes_decompressed = 0
+            reported_mb = -1
+            while True:
+                if time.monotonic() > deadline:
+                    raise OperationError("Timeout al importar la base de datos")
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                bytes_decompressed += len(chunk)
+                if not send(chunk):
+                    break
+                bytes_processed = raw.tell()
+                if bytes_processed // (1024 * 1024) > reported_mb:
+                    reported_mb = bytes_processed // (1024 * 1024)
+                    progress(
+                        int(80 * bytes_processed / bytes_total) if bytes_total else 0,
+                        f"Importando: {reported_mb} MB de {bytes_total // (1024 * 1024)} MB",
+                        bytes_processed=bytes_processed,
+                        bytes_total=bytes_total,
+                        bytes_decompressed=bytes_decompressed,
+                    )
+            if send(b""):
+                writer.join(timeout=max(0.0, deadline - time.monotonic()))
+                if writer.is_alive():
+                    raise OperationError("Timeout al importar la base de datos")
+            returncode = process.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            raise OperationError("Timeout al importar la base de datos")
+        finally:
+            # Matar psql desbloquea al escritor si sigue esperando en la tubería
+            stop.set()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            writer.join(timeout=5)
+            try:
+                process.stdin.close()
+            except (OSError, ValueError):
+                pass
+
+        if returncode != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode("utf-8", "replace")
+            if logger:
+                logger.error(f"Error al importar dump: {stderr}")
+            raise OperationError(f"Error al importar: {stderr}")
+        if not state.get("closed"):
+            if logger:
+                logger.error(f"psql cerró la entrada antes de terminar el dump: {state.get('error')}")
+            raise OperationError("Importación incompleta: psql dejó de leer el dump antes de terminarlo")
+
+    progress(80, "Dump cargado", bytes_processed=bytes_total, bytes_total=bytes_total,
+             bytes_decompressed=bytes_decompressed)
+    if restart:
+        progress(90, "Reiniciando DefectDojo")
+        _restart_defectdojo(compose_cmd(), logger)
+    progress(100, "Dump importado")
+    return dict(IMPORT_SUCCESS)
+
+
+def render_in_process():
+    """True si el PDF se puede renderizar en este proceso (PDF_RENDER_IN_PROCESS y algún motor)"""
+    from .config import PDF_RENDER_IN_PROCESS
+    if not PDF_RENDER_IN_PROCESS:
+        return False
+    from .pdf_renderer import available_backends
+    return bool(available_backends())
+
+
+def _generate_pdf_in_process(progress, logger=None):
+    """Renderiza el informe en memoria con app/pdf_renderer.py y lo guarda en docs/informes/"""
+    from datetime import datetime
+    from .pdf_renderer import RenderError, render_pdf
+
+    with open(REPORT_MARKDOWN, 'r', encoding='utf-8') as f:
+        md_content = f.read()
+    try:
+        pdf_bytes, backend_name = render_pdf(md_content)
+    except RenderError as e:
+        if logger:
+            logger.error(f"Error al generar PDF: {e}")
+        raise OperationError(f"Error al generar PDF: {e}")
+    if logger:
+        logger.info(f"PDF renderizado en proceso con {backend_name}")
+
+    progress(90, "Guardando el PDF")
+    informes_dir = os.path.join(PROJECT_ROOT, 'docs', 'informes')
+    os.makedirs(informes_dir, exist_ok=True)
+    pdf_path = os.path.join(informes_dir, f"INFORME_SEGURIDAD_{datetime.now().strftime('%Y%m%d')}.pdf")
+    tmp_path = pdf_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, pdf_path)
+    progress(100, "PDF generado")
+    return pdf_path
+
+
+def generate_pdf(progress=None, logger=None):
+    """
+    Genera el PDF del informe ASVS a partir de docs/INFORME_SEGURIDAD.md.
+
+    Si hay un motor de PDF disponible en este proceso se renderiza en memoria
+    (app/pdf_renderer.py) y se devuelve la ruta exacta del PDF. Si no, ejecuta
+    scripts/generate_pdf_report.py y devuelve el PDF más reciente de docs/informes/.
+    Lanza OperationError si falta el Markdown o el script, si el renderizado
+    falla o si no aparece el PDF.
+    """
+    progress = progress or _noop_progress
+
+    # Verificar que el Markdown existe antes de generar el PDF
+    if not os.path.exists(REPORT_MARKDOWN):
+        raise OperationError(MISSING_MARKDOWN_ERROR)
+
+    if render_in_process():
+        return _generate_pdf_in_process(progress, logger)
+
+    generate_pdf_script_path = os.path.join(PROJECT_ROOT, 'scripts', 'generate_pdf_report.py')
+    if not os.path.exists(generate_pdf_script_path):
+        raise OperationError("Script de generación de PDF no encontrado")
+
+    if logger:
+        logger.info("Ejecutando generate_pdf_report.py para generar PDF...")
+    progress(10, "Generando el PDF")
+    try:
+        # Intentar ejecutar desde contenedor de DefectDojo
+        result_pdf = subprocess.run(
+            compose_cmd() + ['--profile', 'defectdojo', 'exec', '-T', 'defectdojo', 'python', '/app/scripts/generate_pdf_report.py'],
+            capture_output=True,
+            text=True,
+            timeout=120,
+            cwd=PROJECT_ROOT
+        )
+    except (FileNotFoundError, subprocess.SubprocessError):
+        # Si docker-compose no está disponible o el contenedor no está corriendo, ejecutar localmente
+        if logger:
+            logger.warning("No se pudo ejecutar desde contenedor, ejecutando localmente...")
+        result_pdf = subprocess.run(
+            ['python3', generate_pdf_script_path],
+            capture_output=True,
+            text=True,
+            timeout=120,
+            cwd=PROJECT_ROOT
+        )
+
+    if result_pdf.returncode != 0:
+        if logger:
+            logger.error(f"Error al generar PDF: {result_pdf.stderr}")
+        raise OperationError(f"Error al generar PDF: {result_pdf.stderr}")
+
+    progress(90, "Localizando el PDF generado")
+    informes_dir = os.path.join(PROJECT_ROOT, 'docs', 'informes')
+    if not os.path.exists(informes_dir):
+        os.makedirs(informes_dir, exist_ok=True)
+
+    pdf_files = [f for f in os.listdir(informes_dir) if f.startswith('INFORME_SEGURIDAD_') and f.endswith('.pdf')]
+    if not pdf_files:
+        raise OperationError("No se encontró el PDF generado")
+
+    # Obtener el PDF más reciente
+    latest_pdf = max(pdf_files, key=lambda f: os.path.getmtime(os.path.join(informes_dir, f)))
+    progress(100, "PDF generado")
+    return os.path.join(informes_dir, latest_pdf)
+
+
+def generate_pdf_cached(cache, progress=None, logger=None):
+    """
+    Devuelve (PdfCacheEntry, origen) usando la caché por contenido de app/pdf_cache.py.
+
+    Solo se ejecuta generate_pdf() si el Markdown o el renderizador han cambiado.
+    """
+    progress = progress or _noop_progress
+    if not os.path.exists(REPORT_MARKDOWN):
+        raise OperationError(MISSING_MARKDOWN_ERROR)
+    entry, origin = cache.get_or_render(
+        REPORT_MARKDOWN, lambda: generate_pdf(progress=progress, logger=logger)
+    )
+    progress(100, "PDF generado" if origin == "miss" else "PDF servido desde la caché")
+    return entry, origin
+
+
+def _sync_wstg_via_worker(data, timeout):
+    """
+    Envía el cambio al worker persistente (app/wstg_sync_worker.py) si está escuchando.
+    Devuelve None si no hay worker; un timeout se traduce a subprocess.TimeoutExpired.
+    """
+    from .config import WSTG_SYNC_SOCKET
+    from .wstg_sync_worker import WorkerError, WorkerUnavailable, call
+    if not WSTG_SYNC_SOCKET or not os.path.exists(WSTG_SYNC_SOCKET):
+        return None
+    try:
+        return call('sync_from_tracker', data, socket_path=WSTG_SYNC_SOCKET, timeout=timeout)
+    except WorkerUnavailable:
+        return None
+    except TimeoutError:
+        raise subprocess.TimeoutExpired('wstg_sync_worker', timeout)
+    except WorkerError as e:
+        raise OperationError(f"Error en la sincronización WSTG: {e}")
+
+
+def sync_wstg_from_tracker(data, timeout=10, progress=None):
+    """
+    Sincroniza un cambio del tracker con DefectDojo.
+
+    Usa el worker persistente del servicio wstg-sync (socket Unix, Django ya
+    inicializado) y, si no está disponible, ejecuta wstg_sync_handler.py en el
+    contenedor de DefectDojo. Devuelve el JSON del sincronizador. Lanza
+    OperationError si el handler falla o su salida no es JSON.
+    """
+    progress = progress or _noop_progress
+    progress(10, "Sincronizando con DefectDojo")
+    result_data = _sync_wstg_via_worker(data, timeout)
+    if result_data is not None:
+        progress(100, "Sincronización completada")
+        return result_data
+    result = subprocess.run(
+        compose_cmd() + ['exec', '-T', 'defectdojo', 'python', '/app/scripts/wstg_sync_handler.py',
+                         'sync_from_tracker', json.dumps(data)],
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+        cwd='/app'  # Asegurar que estamos en el directorio correcto
+    )
+    if result.returncode != 0:
+        raise OperationError(f"Error en la sincronización WSTG: {result.stderr}")
+    try:
+        result_data = json.loads(result.stdout.strip())
+    except json.JSONDecodeError:
+        raise OperationError("Respuesta no válida del sincronizador WSTG")
+    progress(100, "Sincronización completada")
+    return result_data
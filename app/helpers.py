@@ -14,13 +14,10 @@ import logging
 import re
 import hashlib
 import json
-import urllib.error
-import urllib.parse
-import urllib.request
 
 logger = logging.getLogger(__name__)
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+# urllib.request (http.client, ssl, email) y argon2 se importan en el primer uso:
+# no se necesitan para arrancar la aplicación, solo al registrar o iniciar sesión
 from .translations import get_bmi_complete_description
 from .config import (
     AUTH_CONFIG,
@@ -190,6 +187,8 @@ def is_common_password_fallback(password):
 
 
 def _hibp_range_request(prefix):
+    import urllib.request
+
     url = f"{HIBP_API_URL}{prefix}"
     req = urllib.request.Request(url, headers={"User-Agent": "PPS-Segura-App"})
     with urllib.request.urlopen(req, timeout=HIBP_TIMEOUT_SECONDS) as response:
@@ -220,6 +219,8 @@ def is_pwned_password(password):
 
 
 def _get_password_hasher():
+    from argon2 import PasswordHasher
+
     return PasswordHasher(
         time_cost=PASSWORD_HASH_CONFIG["time_cost"],
         memory_cost=PASSWORD_HASH_CONFIG["memory_cost"],
@@ -236,6 +237,8 @@ def hash_password(password):
 
 
 def verify_password(password, password_hash):
+    from argon2.exceptions import VerifyMismatchError
+
     hasher = _get_password_hasher()
     peppered = f"{password}{PASSWORD_PEPPER}"
     try:
@@ -250,6 +253,10 @@ def verify_recaptcha_v3(token, action=None, remote_ip=None):
     Returns:
         tuple[bool, float]: (éxito, score). Si no hay secret configurado, (True, 1.0).
     """
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+
     if not RECAPTCHA_SECRET_KEY or not token:
         if RECAPTCHA_SECRET_KEY and not token:
             logger.warning("reCAPTCHA: token vacío (cliente no envió token o no obtuvo clave de sitio)")
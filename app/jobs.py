@@ -0,0 +1,347 @@
+"""
+Trabajos en segundo plano para operaciones de administración largas
+
+Exportar/importar dumps de DefectDojo, generar el PDF del informe o sincronizar
+WSTG pueden tardar minutos. En lugar de ocupar un worker de gunicorn durante
+toda la operación, los endpoints /api/jobs/... encolan un trabajo y responden
+202 con su id. Los trabajos se ejecutan en un pool de hilos y su estado
+(queued/running/succeeded/failed, progreso, mensaje, artefacto) se persiste en
+SQLite para poder consultarlo con GET /api/jobs/<id>.
+
+Cada proceso renueva cada HEARTBEAT_INTERVAL segundos el latido (heartbeat_at) de
+los trabajos que ejecuta. Un trabajo en cola o en ejecución cuyo latido supera
+`stale_after` segundos quedó huérfano (el proceso que lo ejecutaba murió) y se
+marca como fallido; los de otros workers vivos no se tocan. Los trabajos
+terminados hace más de `retention_hours` se borran junto con su directorio
+data/jobs/<id>/.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .config import JOBS_CONFIG
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+_FINISHED = {STATUS_SUCCEEDED, STATUS_FAILED}
+
+# Cada cuánto renueva un proceso el latido de sus trabajos y hace limpieza (s)
+HEARTBEAT_INTERVAL = 30
+
+
+class JobContext:
+    """Contexto que recibe cada trabajo: progreso y directorio para su artefacto"""
+
+    def __init__(self, store, job_id, artifacts_dir):
+        self._store = store
+        self.job_id = job_id
+        self.artifacts_dir = artifacts_dir
+
+    def progress(self, percent, message=None, **details):
+        """
+        Actualiza el progreso (0-100) y, opcionalmente, el mensaje de estado y
+        detalles numéricos (p. ej. bytes_processed / bytes_total)
+        """
+        fields = {"progress": max(0, min(100, int(percent)))}
+        if message is not None:
+            fields["message"] = message
+        if details:
+            fields["details"] = json.dumps(details)
+        self._store.update(self.job_id, **fields)
+
+    def artifact_path(self, filename):
+        """Ruta (dentro del directorio del trabajo) donde guardar el artefacto"""
+        job_dir = os.path.join(self.artifacts_dir, self.job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        return os.path.join(job_dir, filename)
+
+
+class JobResult:
+    """Resultado de un trabajo: datos JSON y artefacto descargable opcional"""
+
+    def __init__(self, data=None, artifact_path=None, artifact_name=None,
+                 artifact_mimetype="application/octet-stream"):
+        self.data = data or {}
+        self.artifact_path = artifact_path
+        self.artifact_name = artifact_name or (os.path.basename(artifact_path) if artifact_path else None)
+        self.artifact_mimetype = artifact_mimetype
+
+
+class JobStore:
+    """Estado de los trabajos en SQLite (una conexión compartida protegida por lock)"""
+
+    def __init__(self, db_path):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    error TEXT,
+                    result TEXT,
+                    details TEXT,
+                    artifact_path TEXT,
+                    artifact_name TEXT,
+                    artifact_mimetype TEXT,
+                    user_id INTEGER,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    finished_at TEXT,
+                    heartbeat_at TEXT
+                )
+                """
+            )
+            # Migraciones de BD creadas con versiones anteriores
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("details", "heartbeat_at"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+
+    def create(self, kind, user_id=None):
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, progress, message, user_id, created_at, updated_at, "
+                "heartbeat_at) VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?)",
+                (job_id, kind, STATUS_QUEUED, "En cola", user_id, now, now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = datetime.now().isoformat()
+        if fields.get("status") in _FINISHED:
+            fields["finished_at"] = fields["updated_at"]
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["details"] = json.loads(job["details"]) if job["details"] else None
+        return job
+
+    def heartbeat(self, job_ids):
+        """Renueva el latido de trabajos que este proceso tiene en cola o en ejecución"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({placeholders}) AND status IN (?, ?)",
+                (datetime.now().isoformat(), *job_ids, STATUS_QUEUED, STATUS_RUNNING),
+            )
+
+    def fail_stale(self, stale_after):
+        """Marca como fallidos los trabajos sin latido en `stale_after` segundos; devuelve cuántos"""
+        now = datetime.now()
+        cutoff = (now - timedelta(seconds=stale_after)).isoformat()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ? "
+                "WHERE status IN (?, ?) AND COALESCE(heartbeat_at, updated_at) < ?",
+                (STATUS_FAILED, "Trabajo interrumpido: el proceso que lo ejecutaba dejó de responder",
+                 now.isoformat(), now.isoformat(), STATUS_QUEUED, STATUS_RUNNING, cutoff),
+            )
+        return cursor.rowcount
+
+    def delete_finished_before(self, cutoff):
+        """Borra los trabajos terminados antes de `cutoff` (datetime); devuelve sus ids"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (STATUS_SUCCEEDED, STATUS_FAILED, cutoff.isoformat()),
+            ).fetchall()
+            job_ids = [row["id"] for row in rows]
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+        return job_ids
+
+    def exists(self, job_id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is not None
+
+
+class JobManager:
+    """Encola trabajos y los ejecuta en un pool de hilos acotado"""
+
+    def __init__(self, store, artifacts_dir, max_workers=2, logger=None, retention_hours=24,
+                 stale_after=300):
+        self.store = store
+        self.artifacts_dir = artifacts_dir
+        self._max_workers = max(1, int(max_workers))
+        self._retention = timedelta(hours=retention_hours)
+        self._stale_after = max(stale_after, 2 * HEARTBEAT_INTERVAL)
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._logger = logger
+        self._maintenance = None
+        self._stopping = threading.Event()
+
+    def submit(self, kind, func, *args, user_id=None, **kwargs):
+        """
+        Encola `func(ctx, *args, **kwargs)` y devuelve el id del trabajo.
+
+        `func` recibe un JobContext y puede devolver un JobResult (o un dict de datos).
+        """
+        job_id = self.store.create(kind, user_id=user_id)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="job")
+            if self._maintenance is None:
+                self._stopping.clear()
+                self._maintenance = threading.Thread(target=self._maintenance_loop, name="job-maintenance",
+                                                     daemon=True)
+                self._maintenance.start()
+            # Solo se guardan los futuros de trabajos en curso (para wait())
+            self._futures = {jid: f for jid, f in self._futures.items() if not f.done()}
+            self._futures[job_id] = self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def wait(self, job_id, timeout=None):
+        """Espera a que termine un trabajo de este proceso y devuelve su estado"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.store.get(job_id)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._stopping.set()
+            maintenance, self._maintenance = self._maintenance, None
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+        if maintenance is not None and wait:
+            maintenance.join()
+
+    def maintain(self):
+        """
+        Renueva el latido de los trabajos de este proceso, marca como fallidos los
+        huérfanos y borra los terminados fuera del periodo de retención
+        """
+        with self._lock:
+            running = [job_id for job_id, future in self._futures.items() if not future.done()]
+        self.store.heartbeat(running)
+        stale = self.store.fail_stale(self._stale_after)
+        if stale and self._logger:
+            self._logger.warning(f"{stale} trabajo(s) huérfano(s) marcados como fallidos")
+        self.cleanup()
+
+    def cleanup(self, now=None):
+        """Borra los trabajos caducados y los directorios de artefactos sin trabajo; devuelve cuántos"""
+        cutoff = (now or datetime.now()) - self._retention
+        removed = self.store.delete_finished_before(cutoff)
+        for job_id in removed:
+            shutil.rmtree(os.path.join(self.artifacts_dir, job_id), ignore_errors=True)
+        # Directorios de trabajos que ya no existen (p. ej. BD en memoria o borrada)
+        try:
+            entries = list(os.scandir(self.artifacts_dir))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                is_old = entry.is_dir() and datetime.fromtimestamp(entry.stat().st_mtime) < cutoff
+            except OSError:
+                continue
+            if is_old and not self.store.exists(entry.name):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed.append(entry.name)
+        return len(removed)
+
+    def _maintenance_loop(self):
+        while not self._stopping.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.maintain()
+            except Exception as e:
+                if self._logger:
+                    self._logger.error(f"Error en el mantenimiento de trabajos: {e}")
+
+    def _run(self, job_id, func, args, kwargs):
+        ctx = JobContext(self.store, job_id, self.artifacts_dir)
+        self.store.update(job_id, status=STATUS_RUNNING, message="En ejecución")
+        try:
+            result = func(ctx, *args, **kwargs)
+        except Exception as e:
+            if self._logger:
+                self._logger.error(f"Error en el trabajo {job_id}: {e}")
+            self.store.update(job_id, status=STATUS_FAILED, error=str(e) or e.__class__.__name__)
+            # Un artefacto a medias no se puede descargar
+            shutil.rmtree(os.path.join(self.artifacts_dir, job_id), ignore_errors=True)
+        else:
+            if not isinstance(result, JobResult):
+                result = JobResult(data=result)
+            self.store.update(
+                job_id,
+                status=STATUS_SUCCEEDED,
+                progress=100,
+                message="Completado",
+                result=json.dumps(result.data),
+                artifact_path=result.artifact_path,
+                artifact_name=result.artifact_name,
+                artifact_mimetype=result.artifact_mimetype if result.artifact_path else None,
+            )
+
+
+def serialize_job(job, download_url=None):
+    """Representación pública de un trabajo (sin rutas del servidor)"""
+    data = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "message": job["message"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job["finished_at"],
+    }
+    if job["status"] == STATUS_FAILED:
+        data["error"] = job["error"]
+    if job["details"]:
+        data["details"] = job["details"]
+    if job["result"]:
+        data["result"] = job["result"]
+    if job["status"] == STATUS_SUCCEEDED and job["artifact_path"] and download_url:
+        data["download_url"] = download_url
+    return data
+
+
+def init_jobs(app):
+    """Crea el gestor de trabajos de la app (app.jobs)"""
+    store = JobStore(JOBS_CONFIG["db_path"])
+    app.jobs = JobManager(
+        store,
+        artifacts_dir=JOBS_CONFIG["artifacts_dir"],
+        max_workers=JOBS_CONFIG["max_workers"],
+        logger=app.logger,
+        retention_hours=JOBS_CONFIG["retention_hours"],
+        stale_after=JOBS_CONFIG["stale_after_s"],
+    )
+    # Huérfanos de un reinicio y artefactos caducados; después, cada HEARTBEAT_INTERVAL
+    app.jobs.maintain()
+    return app.jobs
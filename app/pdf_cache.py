@@ -0,0 +1,190 @@
+"""
+Caché direccionada por contenido de los PDF del informe de seguridad
+
+La clave de cada PDF es el sha256 del Markdown de origen (docs/INFORME_SEGURIDAD.md)
+junto con la versión del renderizador (hash de app/pdf_renderer.py). Si
+ninguno de los dos cambia, el PDF ya generado se sirve directamente, con la clave
+como ETag, sin volver a ejecutar markdown2pdf/weasyprint/reportlab/pandoc.
+
+- Los PDF se copian a docs/informes/cache/<clave>.pdf y el manifiesto
+  (docs/informes/manifest.json) asocia cada clave con su fichero y su nombre de
+  descarga (INFORME_SEGURIDAD_YYYYMMDD.pdf).
+- Las peticiones concurrentes con la misma clave se agrupan: solo una ejecuta el
+  renderizado y las demás esperan su resultado.
+- Solo se conservan los `max_entries` PDF más recientes: cada edición del Markdown
+  o cambio del renderizador crea una clave nueva, y al guardarla se borran del
+  manifiesto y del disco las entradas más antiguas.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+from .config import PDF_CACHE_CONFIG
+
+
+class PdfCacheEntry:
+    """PDF cacheado: ruta en disco, nombre de descarga y clave (ETag)"""
+
+    def __init__(self, key, path, download_name, created_at):
+        self.key = key
+        self.path = path
+        self.download_name = download_name
+        self.created_at = created_at
+
+    @property
+    def etag(self):
+        return self.key[:32]
+
+
+class PdfReportCache:
+    """Caché de PDF por hash (Markdown + renderizador) con agrupación de renderizados"""
+
+    def __init__(self, cache_dir, manifest_path, renderer_path, max_entries=5):
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+        self.renderer_path = renderer_path
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._renderer_version = None
+        self._manifest = self._load_manifest()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evicted = 0
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def renderer_version(self):
+        """Hash del script de renderizado (cambia la clave si cambia el renderizador)"""
+        try:
+            mtime = os.path.getmtime(self.renderer_path)
+        except OSError:
+            return "sin-renderizador"
+        if self._renderer_version is None or self._renderer_version[0] != mtime:
+            with open(self.renderer_path, "rb") as f:
+                self._renderer_version = (mtime, hashlib.sha256(f.read()).hexdigest())
+        return self._renderer_version[1]
+
+    def cache_key(self, markdown_path):
+        digest = hashlib.sha256()
+        digest.update(self.renderer_version().encode("ascii"))
+        digest.update(b"\0")
+        with open(markdown_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def lookup(self, key):
+        """Devuelve la entrada cacheada si su fichero sigue en disco"""
+        with self._lock:
+            data = self._manifest.get(key)
+        if not data:
+            return None
+        path = os.path.join(self.cache_dir, data["filename"])
+        if not os.path.isfile(path):
+            return None
+        return PdfCacheEntry(key, path, data["download_name"], data["created_at"])
+
+    def get_or_render(self, markdown_path, render):
+        """
+        Devuelve (entrada, origen) para el Markdown actual.
+
+        origen es "hit" (ya estaba), "coalesced" (otra petición lo estaba generando)
+        o "miss" (se ha ejecutado `render()`, que debe devolver la ruta del PDF nuevo).
+        """
+        key = self.cache_key(markdown_path)
+        entry = self.lookup(key)
+        if entry:
+            self.hits += 1
+            return entry, "hit"
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self.coalesced += 1
+            return future.result(), "coalesced"
+
+        self.misses += 1
+        try:
+            entry = self._store(key, render())
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(entry)
+            return entry, "miss"
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _store(self, key, rendered_path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        filename = f"{key}.pdf"
+        target = os.path.join(self.cache_dir, filename)
+        tmp_target = target + ".tmp"
+        shutil.copyfile(rendered_path, tmp_target)
+        os.replace(tmp_target, target)
+        entry = PdfCacheEntry(key, target, os.path.basename(rendered_path), datetime.now().isoformat())
+        with self._lock:
+            self._manifest[key] = {
+                "filename": filename,
+                "download_name": entry.download_name,
+                "created_at": entry.created_at,
+            }
+            evicted = self._evict_locked(keep=key)
+            self._save_manifest()
+        for filename in evicted:
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except FileNotFoundError:
+                pass
+        return entry
+
+    def _evict_locked(self, keep):
+        """Quita del manifiesto las entradas más antiguas por encima de max_entries; devuelve sus ficheros"""
+        excess = len(self._manifest) - self.max_entries
+        if excess <= 0:
+            return []
+        oldest = sorted((key for key in self._manifest if key != keep),
+                        key=lambda key: (self._manifest[key].get("created_at", ""), key))
+        evicted = [self._manifest.pop(key)["filename"] for key in oldest[:excess]]
+        self.evicted += len(evicted)
+        return evicted
+
+    def stats(self):
+        return {"entries": len(self._manifest), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "evicted": self.evicted}
+
+
+def init_pdf_cache(app):
+    """Crea la caché de PDF de la app (app.pdf_cache; None si está deshabilitada)"""
+    app.pdf_cache = None
+    if PDF_CACHE_CONFIG["enabled"]:
+        app.pdf_cache = PdfReportCache(
+            cache_dir=PDF_CACHE_CONFIG["cache_dir"],
+            manifest_path=PDF_CACHE_CONFIG["manifest_path"],
+            renderer_path=PDF_CACHE_CONFIG["renderer_path"],
+            max_entries=PDF_CACHE_CONFIG["max_entries"],
+        )
+    return app.pdf_cache
@@ -0,0 +1,708 @@
+"""
+Renderizado en proceso del informe de seguridad (Markdown -> PDF)
+
+El Markdown se procesa una sola vez en un documento intermedio (ReportDocument):
+texto sin emojis, HTML generado con `markdown` y, solo si hace falta, una lista de
+bloques (títulos, párrafos, listas, tablas, código) obtenida en una única pasada
+con HTMLParser. Cada motor de renderizado parte de ese documento y devuelve el PDF
+como bytes, sin ficheros temporales ni relecturas del origen:
+
+1. markdown + weasyprint (HTML con estilos)
+2. markdown + reportlab (bloques del documento intermedio)
+3. pandoc (Markdown por stdin, PDF por stdout)
+4. markdown2pdf (su API solo trabaja con rutas; se usa un directorio temporal)
+
+Los motores disponibles se detectan una vez por proceso (available_backends()).
+Lo usan scripts/generate_pdf_report.py y, en proceso, la ruta de generación de PDF
+(app/defectdojo_ops.py). Las dependencias se importan al renderizar, no al cargar
+el módulo.
+"""
+import io
+import re
+import subprocess
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from html import escape
+from html.parser import HTMLParser
+
+_EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"  # dingbats
+    "\U000024C2-\U0001F251"  # enclosed characters
+    "\U0001F900-\U0001F9FF"  # supplemental symbols and pictographs
+    "\U0001FA00-\U0001FA6F"  # chess symbols
+    "\U0001FA70-\U0001FAFF"  # symbols and pictographs extended-A
+    "\U00002600-\U000026FF"  # miscellaneous symbols
+    "\U00002700-\U000027BF"  # dingbats
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F900-\U0001F9FF"  # supplemental symbols
+    "\U0001FA00-\U0001FA6F"  # chess symbols
+    "\U0001FA70-\U0001FAFF"  # symbols extended-A
+    "\U00002139"  # information source (ℹ)
+    "\U00002122"  # trade mark sign (™)
+    "\U000021A9"  # leftwards arrow with hook (↩)
+    "\U0000231A"  # watch (⌚)
+    "\U000023E9"  # fast-forward button (⏩)
+    "\U000023EC"  # fast down button (⏬)
+    "\U000023F0"  # alarm clock (⏰)
+    "\U000023F3"  # hourglass done (⏳)
+    "\U000025FD"  # white medium-small square (◽)
+    "\U00002614"  # umbrella with rain drops (☔)
+    "\U00002615"  # hot beverage (☕)
+    "\U00002648"  # aries (♈)
+    "\U00002649"  # taurus (♉)
+    "\U0000264A"  # gemini (♊)
+    "\U0000264B"  # cancer (♋)
+    "\U0000264C"  # leo (♌)
+    "\U0000264D"  # virgo (♍)
+    "\U0000264E"  # libra (♎)
+    "\U0000264F"  # scorpius (♏)
+    "\U00002650"  # sagittarius (♐)
+    "\U00002651"  # capricorn (♑)
+    "\U00002652"  # aquarius (♒)
+    "\U00002653"  # pisces (♓)
+    "\U0000267F"  # wheelchair symbol (♿)
+    "\U00002693"  # anchor (⚓)
+    "\U000026A1"  # high voltage (⚡)
+    "\U000026AA"  # white circle (⚪)
+    "\U000026AB"  # black circle (⚫)
+    "\U000026B0"  # coffin (⚰)
+    "\U000026B1"  # funeral urn (⚱)
+    "\U000026C4"  # snowman without snow (⛄)
+    "\U000026C5"  # sun behind cloud (⛅)
+    "\U000026CE"  # ophiuchus (⛎)
+    "\U000026D4"  # no entry (⛔)
+    "\U000026EA"  # church (⛪)
+    "\U000026F2"  # fountain (⛲)
+    "\U000026F3"  # flag in hole (⛳)
+    "\U000026F5"  # sailboat (⛵)
+    "\U000026FA"  # tent (⛺)
+    "\U000026FD"  # fuel pump (⛽)
+    "\U00002705"  # check mark (✅)
+    "\U0000270A"  # raised fist (✊)
+    "\U0000270B"  # raised hand (✋)
+    "\U0000270C"  # victory hand (✌)
+    "\U0000270D"  # writing hand (✍)
+    "\U0000270F"  # pencil (✏)
+    "\U00002712"  # black nib (✒)
+    "\U00002714"  # heavy check mark (✔)
+    "\U00002716"  # heavy multiplication x (✖)
+    "\U0000271D"  # latin cross (✝)
+    "\U00002721"  # star of david (✡)
+    "\U00002728"  # sparkles (✨)
+    "\U00002733"  # eight-spoked asterisk (✳)
+    "\U00002734"  # eight-pointed star (✴)
+    "\U00002744"  # snowflake (❄)
+    "\U00002747"  # sparkle (❇)
+    "\U0000274C"  # cross mark (❌)
+    "\U0000274E"  # negative squared cross mark (❎)
+    "\U00002753"  # question mark ornament (❓)
+    "\U00002754"  # white question mark ornament (❔)
+    "\U00002755"  # white exclamation mark ornament (❕)
+    "\U00002757"  # heavy exclamation mark symbol (❗)
+    "\U0000275B"  # heavy left-pointing angle quotation mark ornament (❛)
+    "\U0000275C"  # heavy right-pointing angle quotation mark ornament (❜)
+    "\U0000275D"  # heavy left-pointing angle quotation mark ornament (❝)
+    "\U0000275E"  # heavy right-pointing angle quotation mark ornament (❞)
+    "\U00002761"  # heavy heart exclamation mark ornament (❡)
+    "\U00002763"  # heavy black heart (❣)
+    "\U00002764"  # black heart suit (❤)
+    "\U00002765"  # rotated heavy black heart bullet (❥)
+    "\U00002766"  # floral heart (❦)
+    "\U00002767"  # rotated floral heart bullet (❧)
+    "\U00002796"  # heavy minus sign (➖)
+    "\U00002797"  # heavy division sign (➗)
+    "\U000027A1"  # black rightwards arrow (➡)
+    "\U000027B0"  # curly loop (➰)
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F900-\U0001F9FF"  # supplemental symbols
+    "\U0001FA00-\U0001FA6F"  # chess symbols
+    "\U0001FA70-\U0001FAFF"  # symbols extended-A
+    "\U0000203C"  # double exclamation mark (‼)
+    "\U00002049"  # exclamation question mark (⁉)
+    "\U0000204A"  # tironian sign et (⁊)
+    "\U00002122"  # trade mark sign (™)
+    "\U00002139"  # information source (ℹ)
+    "\U000021A9"  # leftwards arrow with hook (↩)
+    "\U000021AA"  # rightwards arrow with hook (↪)
+    "\U0000231A"  # watch (⌚)
+    "\U0000231B"  # hourglass (⌛)
+    "\U000023E9"  # fast-forward button (⏩)
+    "\U000023EA"  # fast reverse button (⏪)
+    "\U000023EB"  # fast up button (⏫)
+    "\U000023EC"  # fast down button (⏬)
+    "\U000023ED"  # next track button (⏭)
+    "\U000023EE"  # last track button (⏮)
+    "\U000023EF"  # play or pause button (⏯)
+    "\U000023F0"  # alarm clock (⏰)
+    "\U000023F1"  # stopwatch (⏱)
+    "\U000023F2"  # timer clock (⏲)
+    "\U000023F3"  # hourglass done (⏳)
+    "\U000023F8"  # pause button (⏸)
+    "\U000023F9"  # stop button (⏹)
+    "\U000023FA"  # record button (⏺)
+    "\U000025FD"  # white medium-small square (◽)
+    "\U000025FE"  # black medium-small square (◾)
+    "\U00002614"  # umbrella with rain drops (☔)
+    "\U00002615"  # hot beverage (☕)
+    "\U00002648"  # aries (♈)
+    "\U00002649"  # taurus (♉)
+    "\U0000264A"  # gemini (♊)
+    "\U0000264B"  # cancer (♋)
+    "\U0000264C"  # leo (♌)
+    "\U0000264D"  # virgo (♍)
+    "\U0000264E"  # libra (♎)
+    "\U0000264F"  # scorpius (♏)
+    "\U00002650"  # sagittarius (♐)
+    "\U00002651"  # capricorn (♑)
+    "\U00002652"  # aquarius (♒)
+    "\U00002653"  # pisces (♓)
+    "\U0000267F"  # wheelchair symbol (♿)
+    "\U00002693"  # anchor (⚓)
+    "\U000026A1"  # high voltage (⚡)
+    "\U000026AA"  # white circle (⚪)
+    "\U000026AB"  # black circle (⚫)
+    "\U000026B0"  # coffin (⚰)
+    "\U000026B1"  # funeral urn (⚱)
+    "\U000026C4"  # snowman without snow (⛄)
+    "\U000026C5"  # sun behind cloud (⛅)
+    "\U000026CE"  # ophiuchus (⛎)
+    "\U000026D4"  # no entry (⛔)
+    "\U000026EA"  # church (⛪)
+    "\U000026F2"  # fountain (⛲)
+    "\U000026F3"  # flag in hole (⛳)
+    "\U000026F5"  # sailboat (⛵)
+    "\U000026FA"  # tent (⛺)
+    "\U000026FD"  # fuel pump (⛽)
+    "\U00002705"  # check mark (✅)
+    "\U0000270A"  # raised fist (✊)
+    "\U0000270B"  # raised hand (✋)
+    "\U0000270C"  # victory hand (✌)
+    "\U0000270D"  # writing hand (✍)
+    "\U0000270F"  # pencil (✏)
+    "\U00002712"  # black nib (✒)
+    "\U00002714"  # heavy check mark (✔)
+    "\U00002716"  # heavy multiplication x (✖)
+    "\U0000271D"  # latin cross (✝)
+    "\U00002721"  # star of david (✡)
+    "\U00002728"  # sparkles (✨)
+    "\U00002733"  # eight-spoked asterisk (✳)
+    "\U00002734"  # eight-pointed star (✴)
+    "\U00002744"  # snowflake (❄)
+    "\U00002747"  # sparkle (❇)
+    "\U0000274C"  # cross mark (❌)
+    "\U0000274E"  # negative squared cross mark (❎)
+    "\U00002753"  # question mark ornament (❓)
+    "\U00002754"  # white question mark ornament (❔)
+    "\U00002755"  # white exclamation mark ornament (❕)
+    "\U00002757"  # heavy exclamation mark symbol (❗)
+    "\U0000275B"  # heavy left-pointing angle quotation mark ornament (❛)
+    "\U0000275C"  # heavy right-pointing angle quotation mark ornament (❜)
+    "\U0000275D"  # heavy left-pointing angle quotation mark ornament (❝)
+    "\U0000275E"  # heavy right-pointing angle quotation mark ornament (❞)
+    "\U00002761"  # heavy heart exclamation mark ornament (❡)
+    "\U00002763"  # heavy black heart (❣)
+    "\U00002764"  # black heart suit (❤)
+    "\U00002765"  # rotated heavy black heart bullet (❥)
+    "\U00002766"  # floral heart (❦)
+    "\U00002767"  # rotated floral heart bullet (❧)
+    "\U00002796"  # heavy minus sign (➖)
+    "\U00002797"  # heavy division sign (➗)
+    "\U000027A1"  # black rightwards arrow (➡)
+    "\U000027B0"  # curly loop (➰)
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F900-\U0001F9FF"  # supplemental symbols
+    "\U0001FA00-\U0001FA6F"  # chess symbols
+    "\U0001FA70-\U0001FAFF"  # symbols extended-A
+    "\U0000203C"  # double exclamation mark (‼)
+    "\U00002049"  # exclamation question mark (⁉)
+    "\U0000204A"  # tironian sign et (⁊)
+    "\U00002122"  # trade mark sign (™)
+    "\U00002139"  # information source (ℹ)
+    "\U000021A9"  # leftwards arrow with hook (↩)
+    "\U000021AA"  # rightwards arrow with hook (↪)
+    "\U0000231A"  # watch (⌚)
+    "\U0000231B"  # hourglass (⌛)
+    "\U000023E9"  # fast-forward button (⏩)
+    "\U000023EA"  # fast reverse button (⏪)
+    "\U000023EB"  # fast up button (⏫)
+    "\U000023EC"  # fast down button (⏬)
+    "\U000023ED"  # next track button (⏭)
+    "\U000023EE"  # last track button (⏮)
+    "\U000023EF"  # play or pause button (⏯)
+    "\U000023F0"  # alarm clock (⏰)
+    "\U000023F1"  # stopwatch (⏱)
+    "\U000023F2"  # timer clock (⏲)
+    "\U000023F3"  # hourglass done (⏳)
+    "\U000023F8"  # pause button (⏸)
+    "\U000023F9"  # stop button (⏹)
+    "\U000023FA"  # record button (⏺)
+    "\U000025FD"  # white medium-small square (◽)
+    "\U000025FE"  # black medium-small square (◾)
+    "\U00002614"  # umbrella with rain drops (☔)
+    "\U00002615"  # hot beverage (☕)
+    "\U00002648"  # aries (♈)
+    "\U00002649"  # taurus (♉)
+    "\U0000264A"  # gemini (♊)
+    "\U0000264B"  # cancer (♋)
+    "\U0000264C"  # leo (♌)
+    "\U0000264D"  # virgo (♍)
+    "\U0000264E"  # libra (♎)
+    "\U0000264F"  # scorpius (♏)
+    "\U00002650"  # sagittarius (♐)
+    "\U00002651"  # capricorn (♑)
+    "\U00002652"  # aquarius (♒)
+    "\U00002653"  # pisces (♓)
+    "\U0000267F"  # wheelchair symbol (♿)
+    "\U00002693"  # anchor (⚓)
+    "\U000026A1"  # high voltage (⚡)
+    "\U000026AA"  # white circle (⚪)
+    "\U000026AB"  # black circle (⚫)
+    "\U000026B0"  # coffin (⚰)
+    "\U000026B1"  # funeral urn (⚱)
+    "\U000026C4"  # snowman without snow (⛄)
+    "\U000026C5"  # sun behind cloud (⛅)
+    "\U000026CE"  # ophiuchus (⛎)
+    "\U000026D4"  # no entry (⛔)
+    "\U000026EA"  # church (⛪)
+    "\U000026F2"  # fountain (⛲)
+    "\U000026F3"  # flag in hole (⛳)
+    "\U000026F5"  # sailboat (⛵)
+    "\U000026FA"  # tent (⛺)
+    "\U000026FD"  # fuel pump (⛽)
+    "\U00002705"  # check mark (✅)
+    "\U0000270A"  # raised fist (✊)
+    "\U0000270B"  # raised hand (✋)
+    "\U0000270C"  # victory hand (✌)
+    "\U0000270D"  # writing hand (✍)
+    "\U0000270F"  # pencil (✏)
+    "\U00002712"  # black nib (✒)
+    "\U00002714"  # heavy check mark (✔)
+    "\U00002716"  # heavy multiplication x (✖)
+    "\U0000271D"  # latin cross (✝)
+    "\U00002721"  # star of david (✡)
+    "\U00002728"  # sparkles (✨)
+    "\U00002733"  # eight-spoked asterisk (✳)
+    "\U00002734"  # eight-pointed star (✴)
+    "\U00002744"  # snowflake (❄)
+    "\U00002747"  # sparkle (❇)
+    "\U0000274C"  # cross mark (❌)
+    "\U0000274E"  # negative squared cross mark (❎)
+    "\U00002753"  # question mark ornament (❓)
+    "\U00002754"  # white question mark ornament (❔)
+    "\U00002755"  # white exclamation mark ornament (❕)
+    "\U00002757"  # heavy exclamation mark symbol (❗)
+    "\U0000275B"  # heavy left-pointing angle quotation mark ornament (❛)
+    "\U0000275C"  # heavy right-pointing angle quotation mark ornament (❜)
+    "\U0000275D"  # heavy left-pointing angle quotation mark ornament (❝)
+    "\U0000275E"  # heavy right-pointing angle quotation mark ornament (❞)
+    "\U00002761"  # heavy heart exclamation mark ornament (❡)
+    "\U00002763"  # heavy black heart (❣)
+    "\U00002764"  # black heart suit (❤)
+    "\U00002765"  # rotated heavy black heart bullet (❥)
+    "\U00002766"  # floral heart (❦)
+    "\U00002767"  # rotated floral heart bullet (❧)
+    "\U00002796"  # heavy minus sign (➖)
+    "\U00002797"  # heavy division sign (➗)
+    "\U000027A1"  # black rightwards arrow (➡)
+    "\U000027B0"  # curly loop (➰)
+    "]+", flags=re.UNICODE)
+
+
+def remove_emojis(text):
+    """Eliminar emojis del texto para el PDF"""
+    return _EMOJI_PATTERN.sub('', text)
+
+
+REPORT_CSS = """
+@page {
+    size: A4;
+    margin: 2cm;
+}
+body {
+    font-family: 'DejaVu Sans', Arial, sans-serif;
+    font-size: 10pt;
+    line-height: 1.6;
+    color: #333;
+}
+h1 {
+    color: #254F6D;
+    border-bottom: 3px solid #254F6D;
+    padding-bottom: 10px;
+    margin-top: 0;
+    page-break-after: avoid;
+}
+h2 {
+    color: #254F6D;
+    margin-top: 25px;
+    border-bottom: 2px solid #ccc;
+    padding-bottom: 5px;
+    page-break-after: avoid;
+}
+h3 {
+    color: #555;
+    margin-top: 20px;
+    page-break-after: avoid;
+}
+h4 {
+    color: #666;
+    margin-top: 15px;
+    page-break-after: avoid;
+}
+p {
+    margin: 8px 0;
+    text-align: justify;
+}
+code {
+    background-color: #f4f4f4;
+    padding: 2px 5px;
+    border-radius: 3px;
+    font-family: 'Courier New', monospace;
+    font-size: 9pt;
+}
+pre {
+    background-color: #f4f4f4;
+    padding: 10px;
+    border-radius: 5px;
+    border-left: 4px solid #254F6D;
+    overflow-x: auto;
+    page-break-inside: avoid;
+}
+pre code {
+    background-color: transparent;
+    padding: 0;
+}
+table {
+    border-collapse: collapse;
+    width: 100%;
+    margin: 15px 0;
+    page-break-inside: avoid;
+}
+th, td {
+    border: 1px solid #ddd;
+    padding: 8px;
+    text-align: left;
+}
+th {
+    background-color: #254F6D;
+    color: white;
+    font-weight: bold;
+}
+tr:nth-child(even) {
+    background-color: #f9f9f9;
+}
+ul, ol {
+    margin: 10px 0;
+    padding-left: 30px;
+}
+li {
+    margin: 5px 0;
+}
+strong {
+    color: #254F6D;
+}
+hr {
+    border: none;
+    border-top: 1px solid #ccc;
+    margin: 20px 0;
+}
+blockquote {
+    border-left: 4px solid #254F6D;
+    padding-left: 15px;
+    margin: 15px 0;
+    color: #555;
+    font-style: italic;
+}
+"""
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class RenderError(Exception):
+    """Ningún motor de renderizado pudo generar el PDF"""
+
+
+class _BlockParser(HTMLParser):
+    """Convierte el HTML del informe en bloques en una sola pasada"""
+
+    _HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._kind = None
+        self._text = []
+        self._table = None
+        self._row = None
+        self._cell = None
+
+    def _start(self, kind):
+        if self._kind is not None:
+            self._finish()
+        self._kind = kind
+        self._text = []
+
+    def _finish(self):
+        kind, text = self._kind, ''.join(self._text)
+        self._kind = None
+        if kind[0] != 'code':
+            text = _WHITESPACE.sub(' ', text).strip()
+        if text.strip():
+            self.blocks.append((*kind, text))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._HEADINGS:
+            self._start(('heading', self._HEADINGS[tag]))
+        elif tag == 'li':
+            self._start(('list_item',))
+        elif tag == 'pre':
+            self._start(('code',))
+        elif tag == 'p' and self._kind is None and self._table is None:
+            self._start(('paragraph',))
+        elif tag == 'table':
+            self._table = []
+        elif tag == 'tr' and self._table is not None:
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+        elif tag == 'br' and self._kind is not None:
+            self._text.append(' ')
+        elif tag == 'hr':
+            self.blocks.append(('rule',))
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(_WHITESPACE.sub(' ', ''.join(self._cell)).strip())
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._table.append(self._row)
+            self._row = None
+        elif tag == 'table' and self._table is not None:
+            if self._table:
+                self.blocks.append(('table', self._table))
+            self._table = None
+        elif self._kind is not None and (
+            tag in self._HEADINGS or tag in ('li', 'pre') or (tag == 'p' and self._kind == ('paragraph',))
+        ):
+            self._finish()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        elif self._kind is not None:
+            self._text.append(data)
+
+
+class ReportDocument:
+    """Documento intermedio: se construye una vez y lo comparten todos los motores"""
+
+    MARKDOWN_EXTENSIONS = ['extra', 'tables', 'codehilite']
+
+    def __init__(self, markdown_text):
+        self.markdown = remove_emojis(markdown_text)
+        self._html = None
+        self._blocks = None
+
+    @property
+    def html(self):
+        """Cuerpo HTML (requiere el paquete markdown)"""
+        if self._html is None:
+            import markdown
+            self._html = markdown.Markdown(extensions=self.MARKDOWN_EXTENSIONS).convert(self.markdown)
+        return self._html
+
+    @property
+    def html_document(self):
+        """Documento HTML completo con los estilos del informe"""
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n    <meta charset="UTF-8">\n'
+            f'    <style>{REPORT_CSS}</style>\n</head>\n<body>\n{self.html}\n</body>\n</html>'
+        )
+
+    @property
+    def blocks(self):
+        """Bloques del informe: ('heading', nivel, texto), ('paragraph', texto), ('list_item', texto),
+        ('code', texto), ('table', filas) y ('rule',)"""
+        if self._blocks is None:
+            parser = _BlockParser()
+            parser.feed(self.html)
+            parser.close()
+            self._blocks = parser.blocks
+        return self._blocks
+
+
+class RendererBackend(ABC):
+    """Motor de renderizado: `available()` comprueba dependencias y `render()` devuelve bytes"""
+
+    name = None
+
+    @abstractmethod
+    def available(self):
+        """True si las dependencias del motor están instaladas"""
+        pass
+
+    @abstractmethod
+    def render(self, document):
+        """PDF (bytes) del ReportDocument"""
+        pass
+
+
+class WeasyprintBackend(RendererBackend):
+    name = "weasyprint"
+
+    def available(self):
+        try:
+            import markdown  # noqa: F401
+            import weasyprint  # noqa: F401
+        except (ImportError, OSError):
+            # weasyprint lanza OSError si faltan las bibliotecas del sistema (pango/cairo)
+            return False
+        return True
+
+    def render(self, document):
+        from weasyprint import HTML
+        return HTML(string=document.html_document).write_pdf()
+
+
+class ReportlabBackend(RendererBackend):
+    name = "reportlab"
+
+    def available(self):
+        try:
+            import markdown  # noqa: F401
+            import reportlab  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def render(self, document):
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Preformatted, Spacer, Table, TableStyle
+
+        styles = getSampleStyleSheet()
+        heading_styles = {
+            1: ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=18,
+                              textColor=colors.HexColor('#254F6D'), spaceAfter=12, leading=22),
+            2: ParagraphStyle('CustomH2', parent=styles['Heading2'], fontSize=14,
+                              textColor=colors.HexColor('#254F6D'), spaceAfter=10, spaceBefore=12),
+            3: styles['Heading3'],
+        }
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#254F6D')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+        ])
+
+        story = []
+        for block in document.blocks:
+            kind = block[0]
+            if kind == 'heading':
+                story.append(Paragraph(escape(block[2]), heading_styles.get(block[1], styles['Heading4'])))
+            elif kind == 'paragraph':
+                story.append(Paragraph(escape(block[1]), styles['Normal']))
+                story.append(Spacer(1, 6))
+            elif kind == 'list_item':
+                story.append(Paragraph('• ' + escape(block[1]), styles['Normal']))
+            elif kind == 'code':
+                story.append(Preformatted(block[1], styles['Code']))
+            elif kind == 'table':
+                table = Table(block[1])
+                table.setStyle(table_style)
+                story.append(table)
+                story.append(Spacer(1, 12))
+            elif kind == 'rule':
+                story.append(Spacer(1, 12))
+
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
+                          topMargin=72, bottomMargin=72).build(story)
+        return buffer.getvalue()
+
+
+class PandocBackend(RendererBackend):
+    name = "pandoc"
+
+    def available(self):
+        import shutil
+        return shutil.which("pandoc") is not None
+
+    def render(self, document):
+        result = subprocess.run(
+            ['pandoc', '-f', 'markdown', '-o', '-', '-t', 'pdf', '--pdf-engine=xelatex'],
+            input=document.markdown.encode('utf-8'),
+            capture_output=True,
+            timeout=60,
+        )
+        if result.returncode != 0:
+            raise RenderError(result.stderr.decode('utf-8', 'replace'))
+        return result.stdout
+
+
+class Markdown2pdfBackend(RendererBackend):
+    name = "markdown2pdf"
+
+    def available(self):
+        try:
+            import markdown2pdf  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def render(self, document):
+        import os
+        import tempfile
+        from markdown2pdf import convert_md_to_pdf
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            md_path = os.path.join(tmp_dir, 'informe.md')
+            pdf_path = os.path.join(tmp_dir, 'informe.pdf')
+            with open(md_path, 'w', encoding='utf-8') as f:
+                f.write(document.markdown)
+            convert_md_to_pdf(md_path, pdf_path)
+            with open(pdf_path, 'rb') as f:
+                return f.read()
+
+
+BACKENDS = (WeasyprintBackend, ReportlabBackend, PandocBackend, Markdown2pdfBackend)
+
+
+@lru_cache(maxsize=1)
+def available_backends():
+    """Motores disponibles en este proceso, en orden de preferencia (se detectan una vez)"""
+    return tuple(backend() for backend in BACKENDS if backend().available())
+
+
+def render_pdf(markdown_text, backends=None, log=None):
+    """
+    Renderiza el Markdown a PDF y devuelve (bytes, nombre_del_motor).
+
+    Prueba los motores en orden; todos parten del mismo ReportDocument. Lanza
+    RenderError con los errores de cada motor si ninguno lo consigue.
+    """
+    document = ReportDocument(markdown_text)
+    backends = available_backends() if backends is None else backends
+    if not backends:
+        raise RenderError("No hay ningún motor de PDF disponible (weasyprint, reportlab, pandoc o markdown2pdf)")
+
+    errors = []
+    for backend in backends:
+        try:
+            pdf_bytes = backend.render(document)
+        except Exception as e:
+            errors.append(f"{backend.name}: {e}")
+            if log:
+                log(f"   ❌ Error con {backend.name}: {e}")
+            continue
+        return pdf_bytes, backend.name
+    raise RenderError("; ".join(errors))
@@ -0,0 +1,61 @@
+"""
+Payloads públicos precalculados (/api/config y /api/messages)
+
+La configuración de validación y la tabla de traducciones del frontend son
+inmutables durante la vida del proceso (dependen solo del despliegue y del
+idioma activo). Por eso se serializan una única vez al crear la aplicación:
+
+- El cuerpo JSON se guarda como bytes listos para enviar.
+- El ETag es un hash del contenido, de modo que cambia solo si cambia el payload.
+- La versión (ETag) se inyecta en la plantilla para que el frontend pida
+  /api/config?v=<version> y el navegador pueda cachear la respuesta indefinidamente.
+"""
+import hashlib
+
+from .config import VALIDATION_LIMITS, RECAPTCHA_SITE_KEY
+from .translations import get_frontend_messages
+
+# Respuesta versionada: la URL cambia en cada despliegue que altere el contenido
+VERSIONED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Respuesta sin versión: se puede cachear pero hay que revalidar con el ETag
+UNVERSIONED_CACHE_CONTROL = "public, no-cache"
+
+
+class PublicPayload:
+    """Cuerpo JSON serializado junto con su ETag (hash de contenido)"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+
+
+def build_config_payload() -> dict:
+    """Construye el diccionario de configuración pública del frontend"""
+    return {
+        "recaptcha_site_key": RECAPTCHA_SITE_KEY or "",
+        "validation_limits": {
+            "height_min": VALIDATION_LIMITS["height_min"],
+            "height_max": VALIDATION_LIMITS["height_max"],
+            "weight_min": VALIDATION_LIMITS["weight_min"],
+            "weight_max": VALIDATION_LIMITS["weight_max"],
+            # Convertir fecha a string ISO para JSON
+            "birth_date_min": VALIDATION_LIMITS["birth_date_min"].isoformat(),
+            "weight_variation_per_day": VALIDATION_LIMITS["weight_variation_per_day"],
+            "name_min_length": VALIDATION_LIMITS["name_min_length"],
+            "name_max_length": VALIDATION_LIMITS["name_max_length"]
+        }
+    }
+
+
+def build_public_payloads(app) -> dict:
+    """
+    Serializa los payloads públicos con el proveedor JSON de la aplicación
+    (mismo formato que jsonify) y devuelve {nombre: PublicPayload}.
+    """
+    def _serialize(obj) -> bytes:
+        return f"{app.json.dumps(obj)}\n".encode("utf-8")
+
+    return {
+        "config": PublicPayload(_serialize(build_config_payload())),
+        "messages": PublicPayload(_serialize(get_frontend_messages())),
+    }
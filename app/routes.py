@@ -22,7 +22,6 @@ from functools import wraps
 from datetime import datetime, date
 import math
 import os
-import shutil
 
 import jwt as pyjwt
 
@@ -39,7 +38,9 @@ from .helpers import (
     verify_recaptcha_v3,
 )
 from .jwt_utils import create_access_token, create_refresh_token, decode_token
-from .translations import get_error, get_message, get_text, get_days_text, get_frontend_messages
+from .translations import get_error, get_message, get_text, get_days_text
+from .public_payloads import VERSIONED_CACHE_CONTROL, UNVERSIONED_CACHE_CONTROL
+from . import defectdojo_ops
 from .config import VALIDATION_LIMITS, JWT_CONFIG, SESSION_CONFIG
 from . import limiter
 
@@ -50,25 +51,6 @@ COMPOSE_PROJECT_NAME = os.environ.get('COMPOSE_PROJECT_NAME', 'medical_register'
 api = Blueprint('api', __name__, url_prefix='/api')
 
 
-def _compose_cmd():
-    """Devuelve el comando de Docker Compose disponible."""
-    if shutil.which("docker"):
-        try:
-            import subprocess
-            subprocess.run(
-                ["docker", "compose", "version"],
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            return ["docker", "compose"]
-        except Exception:
-            pass
-    if shutil.which("docker-compose"):
-        return ["docker-compose"]
-    return ["docker", "compose"]
-
-
 def _set_refresh_cookie(response, refresh_token):
     """Establece la cookie HttpOnly con el refresh token."""
     response.set_cookie(
@@ -424,6 +406,14 @@ def update_user_role(target_user_id):
     }), 200
 
 
+@api.route('/admin/storage/stats', methods=['GET'])
+@require_auth
+@require_role("admin")
+def get_storage_stats():
+    """Métricas de escritura del almacenamiento (tamaño de lote y latencia del group commit)."""
+    return jsonify(current_app.storage.get_write_stats()), 200
+
+
 @api.route('/user', methods=['GET'])
 @require_auth
 def get_user():
@@ -673,33 +663,34 @@ def get_recent_weights():
     })
 
 
+def _public_payload_response(name):
+    """
+    Sirve un payload precalculado con ETag. Si la petición trae ?v=<etag> vigente
+    la respuesta es cacheable indefinidamente; si no, el cliente debe revalidar.
+    """
+    payload = current_app.public_payloads[name]
+    if request.if_none_match.contains(payload.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(payload.body, mimetype="application/json")
+    response.set_etag(payload.etag)
+    if request.args.get("v") == payload.etag:
+        response.headers["Cache-Control"] = VERSIONED_CACHE_CONTROL
+    else:
+        response.headers["Cache-Control"] = UNVERSIONED_CACHE_CONTROL
+    return response
+
+
 @api.route('/messages', methods=['GET'])
 def get_messages():
     """Endpoint que devuelve todos los mensajes para el frontend"""
-    return jsonify(get_frontend_messages())
+    return _public_payload_response("messages")
 
 
 @api.route('/config', methods=['GET'])
 def get_config():
     """Endpoint que devuelve las constantes de validación y configuración para el frontend"""
-    from .config import VALIDATION_LIMITS, RECAPTCHA_SITE_KEY
-
-    # Convertir fecha a string ISO para JSON
-    config = {
-        "recaptcha_site_key": RECAPTCHA_SITE_KEY or "",
-        "validation_limits": {
-            "height_min": VALIDATION_LIMITS["height_min"],
-            "height_max": VALIDATION_LIMITS["height_max"],
-            "weight_min": VALIDATION_LIMITS["weight_min"],
-            "weight_max": VALIDATION_LIMITS["weight_max"],
-            "birth_date_min": VALIDATION_LIMITS["birth_date_min"].isoformat(),
-            "weight_variation_per_day": VALIDATION_LIMITS["weight_variation_per_day"],
-            "name_min_length": VALIDATION_LIMITS["name_min_length"],
-            "name_max_length": VALIDATION_LIMITS["name_max_length"]
-        }
-    }
-    
-    return jsonify(config)
+    return _public_payload_response("config")
 
 
 @api.route('/defectdojo/export-dump', methods=['GET'])
@@ -709,59 +700,86 @@ def export_defectdojo_dump():
     """
     Exportar el dump de la base de datos de DefectDojo
     
-    Ejecuta el script export_defectdojo_db.sh para crear un dump SQL de la base de datos
-    de DefectDojo y lo devuelve como descarga. El dump incluye todos los datos:
+    Ejecuta pg_dump en el contenedor de DefectDojo para crear un dump SQL de la base de datos
+    y lo devuelve como descarga. El dump incluye todos los datos:
     - Usuarios, productos, engagements, tests
     - Findings (vulnerabilidades) con su estado actual
     - Configuraciones y metadatos
     
-    El dump se genera con fecha en el nombre: defectdojo_db_dump_YYYYMMDD_HHMMSS.sql
+    El SQL se envía sin comprimir según lo genera pg_dump (defectdojo_ops.stream_dump),
+    sin cargarlo en memoria ni escribirlo en disco. Para dumps grandes usar
+    POST /api/jobs/defectdojo/export-dump o /api/defectdojo/export-dump/stream.
     """
-    import subprocess
-    import os
-    from flask import send_file
-    
     try:
-        # Ruta del archivo de dump
-        dump_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'defectdojo_db_dump.sql')
-        dump_dir = os.path.dirname(dump_file)
-        
-        # Crear directorio si no existe
-        os.makedirs(dump_dir, exist_ok=True)
-        
-        # Exportar la base de datos usando docker-compose
-        compose_cmd = _compose_cmd()
-        result = subprocess.run(
-            compose_cmd + ['--profile', 'defectdojo', 'exec', '-T', 'defectdojo-db',
-                           'pg_dump', '-U', 'defectdojo', 'defectdojo'],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutos máximo
-        )
-        
-        if result.returncode != 0:
-            current_app.logger.error(f"Error al exportar dump: {result.stderr}")
-            return jsonify({"error": "Error al exportar la base de datos"}), 500
-        
-        # Guardar el dump en un archivo temporal
-        with open(dump_file, 'w', encoding='utf-8') as f:
-            f.write(result.stdout)
-        
-        # Enviar el archivo como descarga
-        return send_file(
-            dump_file,
-            as_attachment=True,
-            download_name='defectdojo_db_dump.sql',
-            mimetype='application/sql'
-        )
-        
-    except subprocess.TimeoutExpired:
-        current_app.logger.error("Timeout al exportar dump")
-        return jsonify({"error": "Timeout al exportar la base de datos"}), 500
+        stream = defectdojo_ops.stream_dump('none', logger=current_app.logger)
+        # El primer bloque se lee antes de responder: si pg_dump falla al arrancar
+        # (o se bloquea), el cliente recibe un error en lugar de un fichero vacío
+        first = next(stream, b'')
+    except defectdojo_ops.OperationError as e:
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         current_app.logger.error(f"Error inesperado al exportar dump: {str(e)}")
         return jsonify({"error": f"Error al exportar: {str(e)}"}), 500
 
+    def generate():
+        try:
+            yield first
+            yield from stream
+        finally:
+            stream.close()
+
+    response = current_app.response_class(generate(), mimetype='application/sql')
+    response.headers['Content-Disposition'] = 'attachment; filename="defectdojo_db_dump.sql"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api.route('/defectdojo/export-dump/stream', methods=['GET'])
+@require_auth
+@require_role("admin")
+def stream_defectdojo_dump():
+    """
+    Exportar el dump de DefectDojo en streaming, comprimido al vuelo
+
+    La salida de pg_dump se comprime (gzip por defecto, ?compression=zstd|none) y se
+    envía según se genera, sin cargar el dump en memoria ni escribirlo antes en disco.
+    Con ?save=1 también se guarda una copia en data/defectdojo_db_dump<ext> (la última
+    exportación completa sustituye a la anterior).
+    """
+    compression = request.args.get('compression', 'gzip')
+    save = request.args.get('save', '').lower() in ('1', 'true', 'yes')
+    extension, mimetype = defectdojo_ops.DUMP_COMPRESSIONS.get(compression, ('', ''))
+    tee_path = os.path.join(defectdojo_ops.PROJECT_ROOT, 'data', f'defectdojo_db_dump{extension}') if save else None
+    
+    try:
+        stream = defectdojo_ops.stream_dump(compression, tee_path=tee_path, logger=current_app.logger)
+    except defectdojo_ops.OperationError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    filename = f'defectdojo_db_dump{extension}'
+    response = current_app.response_class(stream, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Evitar que un proxy (nginx/WAF) acumule la respuesta entera antes de reenviarla
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _validate_dump_upload(extensions=('.sql',)):
+    """Valida el fichero 'file' de la petición. Devuelve (file, respuesta_error)."""
+    if 'file' not in request.files:
+        return None, (jsonify({"error": "No se envió ningún archivo"}), 400)
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return None, (jsonify({"error": "No se seleccionó ningún archivo"}), 400)
+    
+    if not file.filename.endswith(tuple(extensions)):
+        allowed = ', '.join(extensions)
+        return None, (jsonify({"error": f"El archivo debe ser un dump SQL ({allowed})"}), 400)
+    
+    return file, None
+
 
 @api.route('/defectdojo/import-dump', methods=['POST'])
 @require_auth
@@ -777,81 +795,34 @@ def import_defectdojo_dump():
     - Migrar findings y configuraciones
     
     Después de importar el dump, reinicia DefectDojo para aplicar los cambios.
-    El archivo debe tener extensión .sql y se valida antes de importar.
+    El archivo debe ser .sql, .sql.gz o .sql.zst; se descomprime y se envía a psql
+    por bloques (defectdojo_ops.stream_import), sin cargarlo en memoria.
+    Versión síncrona: para dumps grandes usar POST /api/jobs/defectdojo/import-dump.
     """
-    import subprocess
-    import os
+    import uuid
     from werkzeug.utils import secure_filename
     
+    file, error_response = _validate_dump_upload(defectdojo_ops.IMPORT_EXTENSIONS)
+    if error_response:
+        return error_response
+    
+    # Guardar el archivo temporalmente (nombre único: importaciones simultáneas no se pisan)
+    temp_dir = os.path.join(defectdojo_ops.PROJECT_ROOT, 'data', 'temp')
+    os.makedirs(temp_dir, exist_ok=True)
+    temp_file = os.path.join(temp_dir, f"{uuid.uuid4().hex}_{secure_filename(file.filename)}")
+    
     try:
-        # Verificar que se haya enviado un archivo
-        if 'file' not in request.files:
-            return jsonify({"error": "No se envió ningún archivo"}), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({"error": "No se seleccionó ningún archivo"}), 400
-        
-        # Validar extensión
-        if not file.filename.endswith('.sql'):
-            return jsonify({"error": "El archivo debe ser un dump SQL (.sql)"}), 400
-        
-        # Guardar el archivo temporalmente
-        temp_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'temp')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        filename = secure_filename(file.filename)
-        temp_file = os.path.join(temp_dir, filename)
         file.save(temp_file)
-        
-        try:
-            # Leer el contenido del archivo
-            with open(temp_file, 'r', encoding='utf-8') as f:
-                dump_content = f.read()
-            
-            # Cargar el dump en PostgreSQL
-            compose_cmd = _compose_cmd()
-            result = subprocess.run(
-                compose_cmd + ['--profile', 'defectdojo', 'exec', '-T', 'defectdojo-db',
-                               'psql', '-U', 'defectdojo', '-d', 'defectdojo'],
-                input=dump_content,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minutos máximo
-            )
-            
-            if result.returncode != 0:
-                current_app.logger.error(f"Error al importar dump: {result.stderr}")
-                return jsonify({"error": f"Error al importar: {result.stderr}"}), 500
-            
-            # Reiniciar DefectDojo para aplicar cambios
-            restart_result = subprocess.run(
-                compose_cmd + ['--profile', 'defectdojo', 'restart', 'defectdojo'],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if restart_result.returncode != 0:
-                current_app.logger.warning(f"Advertencia al reiniciar DefectDojo: {restart_result.stderr}")
-            
-            return jsonify({
-                "message": "Dump importado correctamente. DefectDojo se está reiniciando.",
-                "success": True
-            })
-            
-        finally:
-            # Eliminar archivo temporal
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-        
-    except subprocess.TimeoutExpired:
-        current_app.logger.error("Timeout al importar dump")
-        return jsonify({"error": "Timeout al importar la base de datos"}), 500
+        return jsonify(defectdojo_ops.stream_import(temp_file, logger=current_app.logger))
+    except defectdojo_ops.OperationError as e:
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         current_app.logger.error(f"Error inesperado al importar dump: {str(e)}")
         return jsonify({"error": f"Error al importar: {str(e)}"}), 500
+    finally:
+        # Eliminar archivo temporal
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
 
 
 @api.route('/defectdojo/generate-pdf', methods=['GET'])
@@ -868,85 +839,45 @@ def generate_pdf_report():
     y se descarga automáticamente al usuario.
     
     Usado por el botón "Generar PDF Informe" en la interfaz de usuario.
+    Con la caché de PDF activa (PDF_CACHE_ENABLED) el PDF solo se regenera si cambia
+    el Markdown o el renderizador; la respuesta lleva ETag y admite If-None-Match.
+    Versión síncrona: la versión en segundo plano es POST /api/jobs/defectdojo/generate-pdf.
     """
     import subprocess
-    import os
     from flask import send_file
-    from datetime import datetime
     
     try:
-        # Obtener el directorio del proyecto
-        project_root = os.path.dirname(os.path.dirname(__file__))
-        
-        # Verificar que el Markdown existe antes de generar el PDF
-        report_md = os.path.join(project_root, 'docs', 'INFORME_SEGURIDAD.md')
-        if not os.path.exists(report_md):
-            return jsonify({"error": "El archivo INFORME_SEGURIDAD.md no existe. Por favor, genera el informe Markdown primero."}), 500
-        
-        current_app.logger.info("Generando PDF a partir del Markdown existente...")
-        
-        # Generar el PDF a partir del Markdown existente
-        generate_pdf_script_path = os.path.join(project_root, 'scripts', 'generate_pdf_report.py')
-        if not os.path.exists(generate_pdf_script_path):
-            return jsonify({"error": "Script de generación de PDF no encontrado"}), 500
-        
-        current_app.logger.info("Ejecutando generate_pdf_report.py para generar PDF...")
-        
-        # Intentar ejecutar desde contenedor de DefectDojo si está disponible
-        result_pdf = None
-        try:
-            # Intentar ejecutar desde contenedor de DefectDojo
-            compose_cmd = _compose_cmd()
-            result_pdf = subprocess.run(
-                compose_cmd + ['--profile', 'defectdojo', 'exec', '-T', 'defectdojo', 'python', '/app/scripts/generate_pdf_report.py'],
-                capture_output=True,
-                text=True,
-                timeout=120,
-                cwd=project_root
-            )
-        except (FileNotFoundError, subprocess.SubprocessError):
-            # Si docker-compose no está disponible o el contenedor no está corriendo, ejecutar localmente
-            current_app.logger.warning("No se pudo ejecutar desde contenedor, ejecutando localmente...")
-            result_pdf = subprocess.run(
-                ['python3', generate_pdf_script_path],
-                capture_output=True,
-                text=True,
-                timeout=120,
-                cwd=project_root
+        cache = current_app.pdf_cache
+        if cache is not None:
+            # Caché por contenido: solo se renderiza si cambió el Markdown o el renderizador
+            entry, origin = defectdojo_ops.generate_pdf_cached(cache, logger=current_app.logger)
+            current_app.logger.info(f"PDF del informe ({origin}): {entry.key[:12]}")
+            response = send_file(
+                entry.path,
+                as_attachment=True,
+                download_name=entry.download_name,
+                mimetype='application/pdf',
+                etag=entry.etag,
+                conditional=True,
             )
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.headers['X-Cache'] = origin
+            return response
         
-        if result_pdf.returncode != 0:
-            current_app.logger.error(f"Error al generar PDF: {result_pdf.stderr}")
-            return jsonify({"error": f"Error al generar PDF: {result_pdf.stderr}"}), 500
+        current_app.logger.info("Generando PDF a partir del Markdown existente...")
+        pdf_path = defectdojo_ops.generate_pdf(logger=current_app.logger)
         current_app.logger.info("PDF generado correctamente.")
         
-        # Buscar el PDF más reciente generado
-        informes_dir = os.path.join(project_root, 'docs', 'informes')
-        
-        # Crear la carpeta si no existe
-        if not os.path.exists(informes_dir):
-            os.makedirs(informes_dir, exist_ok=True)
-        
-        pdf_files = [f for f in os.listdir(informes_dir) if f.startswith('INFORME_SEGURIDAD_') and f.endswith('.pdf')]
-        
-        if not pdf_files:
-            return jsonify({"error": "No se encontró el PDF generado"}), 500
-        
-        # Obtener el PDF más reciente
-        pdf_files_with_time = [(f, os.path.getmtime(os.path.join(informes_dir, f))) for f in pdf_files]
-        pdf_files_with_time.sort(key=lambda x: x[1], reverse=True)
-        latest_pdf = pdf_files_with_time[0][0]
-        
-        pdf_path = os.path.join(informes_dir, latest_pdf)
-        
         # Enviar el archivo como descarga
         return send_file(
             pdf_path,
             as_attachment=True,
-            download_name=latest_pdf,
+            download_name=os.path.basename(pdf_path),
             mimetype='application/pdf'
         )
         
+    except defectdojo_ops.OperationError as e:
+        return jsonify({"error": str(e)}), 500
     except subprocess.TimeoutExpired:
         current_app.logger.error("Timeout al generar PDF")
         return jsonify({"error": "Timeout al generar el PDF"}), 500
@@ -962,67 +893,46 @@ def wstg_sync():
     """
     Sincronizar estado desde WSTG Tracker hacia DefectDojo
     Endpoint automático llamado por el tracker cuando cambia un estado
-    Guarda la solicitud en un archivo para que el servicio de sincronización la procese
+    Se sincroniza al momento con el worker persistente del servicio wstg-sync; si no
+    está disponible (o falla), la solicitud se guarda en la cola para que el servicio
+    la procese en cuanto pueda. Un cambio inválido (wstg_id o status) responde 400 y
+    no se encola: reintentarlo fallaría siempre. Si se sincroniza al momento, los
+    cambios anteriores del mismo wstg_id que siguen en la cola se descartan (no deben
+    pisar el estado nuevo al reintentarse).
     """
-    import json as json_module
-    from pathlib import Path
+    from .wstg_sync import validate_tracker_update
+    from .wstg_sync_queue import enqueue, get_queue
     
     data = request.json
     if not data:
         return jsonify({"error": "No data provided"}), 400
+    error = validate_tracker_update(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
     
     try:
-        # Guardar solicitud en archivo compartido para procesamiento asíncrono
-        sync_queue_dir = Path('/app/data/wstg_sync_queue')
-        sync_queue_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Crear archivo con timestamp único
-        import time
-        filename = f"sync_{int(time.time() * 1000)}_{data.get('wstg_id', 'unknown')}.json"
-        filepath = sync_queue_dir / filename
-        
-        sync_request = {
-            'type': 'tracker->dd',
-            'data': data,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        with open(filepath, 'w') as f:
-            json_module.dump(sync_request, f)
-        
-        current_app.logger.info(f"Solicitud de sincronización guardada: {filename}")
-        
-        # Intentar procesar inmediatamente si DefectDojo está disponible
-        # (opcional, puede procesarse de forma asíncrona)
+        # Intentar procesar inmediatamente (worker por socket Unix; si no hay worker,
+        # docker compose exec en el contenedor de DefectDojo)
         try:
-            import subprocess
-            # Ejecutar en contenedor de DefectDojo usando docker-compose desde el host
-            # Nota: Esto requiere que docker-compose esté disponible en el host
-            # Como alternativa, el servicio de sincronización procesará estos archivos
-            compose_cmd = _compose_cmd()
-            result = subprocess.run(
-                compose_cmd + ['exec', '-T', 'defectdojo', 'python', '/app/scripts/wstg_sync_handler.py',
-                               'sync_from_tracker', json_module.dumps(data)],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                cwd='/app'  # Asegurar que estamos en el directorio correcto
-            )
-            
-            if result.returncode == 0:
-                try:
-                    result_data = json_module.loads(result.stdout.strip())
-                    # Eliminar archivo si se procesó correctamente
-                    if result_data.get('success') and filepath.exists():
-                        filepath.unlink()
-                    return jsonify(result_data), 200
-                except json_module.JSONDecodeError:
-                    # Si falla el procesamiento inmediato, el archivo quedará para procesamiento asíncrono
-                    pass
-        except (subprocess.TimeoutExpired, FileNotFoundError, Exception) as e:
+            queue = get_queue()
+            up_to = queue.last_id()
+            result_data = defectdojo_ops.sync_wstg_from_tracker(data, timeout=10)
+            if result_data.get('success'):
+                superseded = queue.supersede(data['wstg_id'], up_to)
+                if superseded:
+                    current_app.logger.info(f"{superseded} cambios en cola de {data['wstg_id']} sustituidos")
+                return jsonify(result_data), 200
+            # Datos ya validados: el fallo es de DefectDojo (BD, Django...) y se reintenta desde la cola
+            current_app.logger.warning(f"Sincronización inmediata fallida, se reintentará: {result_data.get('error')}")
+        except Exception as e:
             # Si no se puede procesar inmediatamente, se procesará de forma asíncrona
             current_app.logger.debug(f"No se pudo procesar inmediatamente, se procesará de forma asíncrona: {e}")
         
+        # Guardar solicitud en la cola compartida (SQLite; el servicio wstg-sync la
+        # recibe al instante por inotify y la reintenta con backoff si falla)
+        message_id = enqueue('tracker->dd', data)
+        current_app.logger.info(f"Solicitud de sincronización encolada: {message_id}")
+        
         # Retornar éxito - la sincronización se procesará de forma asíncrona
         return jsonify({
             "success": True,
@@ -1044,9 +954,8 @@ def wstg_webhook():
     Endpoint automático llamado por DefectDojo cuando se actualiza un finding
     Guarda la solicitud para procesamiento asíncrono
     """
-    import json as json_module
-    from pathlib import Path
     from .config import WSTG_WEBHOOK_KEY
+    from .wstg_sync_queue import enqueue
     import os
     
     data = request.json
@@ -1063,24 +972,10 @@ def wstg_webhook():
             return jsonify({"error": "Unauthorized"}), 401
     
     try:
-        # Guardar solicitud en archivo compartido
-        sync_queue_dir = Path('/app/data/wstg_sync_queue')
-        sync_queue_dir.mkdir(parents=True, exist_ok=True)
-        
-        import time
-        filename = f"webhook_{int(time.time() * 1000)}.json"
-        filepath = sync_queue_dir / filename
-        
-        webhook_request = {
-            'type': 'dd->tracker',
-            'data': data,
-            'timestamp': datetime.now().isoformat()
-        }
+        # Guardar solicitud en la cola compartida
+        message_id = enqueue('dd->tracker', data)
         
-        with open(filepath, 'w') as f:
-            json_module.dump(webhook_request, f)
-        
-        current_app.logger.info(f"Webhook guardado: {filename}")
+        current_app.logger.info(f"Webhook encolado: {message_id}")
         
         return jsonify({
             "success": True,
@@ -1100,54 +995,215 @@ def wstg_status():
     """
     Obtener estado de sincronización WSTG
     Útil para monitoreo y dashboard
-    Lee el estado desde el archivo JSON compartido
+    Lee el estado compartido de la sincronización (WstgStateStore, SQLite): unos
+    COUNT sobre índices, los conflictos se calculan al escribir cada item.
+    En "pipeline" añade el estado en vivo de la cola y las últimas métricas publicadas
+    por el servicio wstg-sync (lotes, latencias, consultas por pasada, errores);
+    "keeping_up" es null si no se pudo leer la cola
     """
-    from pathlib import Path
-    import json as json_module
+    from .wstg_sync_metrics import keeping_up, read_metrics
+    from .wstg_sync_queue import get_queue
+    from .wstg_sync_state import get_state_store
     
     try:
-        # Leer estado desde archivo compartido
-        state_file = Path('/app/data/wstg_sync_state.json')
-        if state_file.exists():
-            with open(state_file, 'r') as f:
-                state = json_module.load(f)
-            
-            items = state.get('items', {})
-            total_items = len(items)
-            synced_items = sum(1 for item in items.values() 
-                              if item.get('last_sync_timestamp'))
-            
-            conflicts = 0
-            for wstg_id, item_data in items.items():
-                wstg_status = item_data.get('wstg_status')
-                dd_status = item_data.get('defectdojo_status')
-                if wstg_status and dd_status:
-                    if (wstg_status == 'Done' and dd_status != 'verified') or \
-                       (wstg_status == 'In Progress' and dd_status != 'active'):
-                        conflicts += 1
-            
-            last_sync = None
-            if state.get('sync_log'):
-                last_sync = state['sync_log'][-1].get('timestamp')
-            
-            return jsonify({
-                "last_sync": last_sync or datetime.now().isoformat(),
-                "total_items": total_items,
-                "synced_items": synced_items,
-                "pending_items": total_items - synced_items,
-                "conflicts": conflicts
-            }), 200
-        else:
-            # Estado inicial si no existe archivo
-            return jsonify({
-                "last_sync": datetime.now().isoformat(),
-                "total_items": 0,
-                "synced_items": 0,
-                "pending_items": 0,
-                "conflicts": 0
-            }), 200
+        store = get_state_store()
+        counts = store.status_counts()
+        total_items = counts['total_items']
+        synced_items = counts['synced_items']
+        conflicts = counts['conflicts']
+        last_sync = store.last_sync()
+        
+        try:
+            queue_stats = get_queue().stats()
+        except Exception as e:
+            current_app.logger.warning(f"No se pudo leer la cola de sincronización WSTG: {e}")
+            queue_stats = None
+        
+        return jsonify({
+            "last_sync": last_sync or datetime.now().isoformat(),
+            "total_items": total_items,
+            "synced_items": synced_items,
+            "pending_items": total_items - synced_items,
+            "conflicts": conflicts,
+            "pipeline": {
+                "queue": queue_stats,
+                "keeping_up": keeping_up(queue_stats),
+                "service": read_metrics()
+            }
+        }), 200
             
     except Exception as e:
         current_app.logger.error(f"Error obteniendo estado WSTG: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+
+
+# ---------------------------------------------------------------------------
+# Trabajos en segundo plano (app/jobs.py)
+# Las operaciones largas de administración se encolan y responden 202 con el id
+# del trabajo; el estado se consulta en GET /api/jobs/<id> y, si la operación
+# genera un fichero, se descarga desde GET /api/jobs/<id>/download.
+# ---------------------------------------------------------------------------
+
+def _run_operation(operation, timeout_message, *args, **kwargs):
+    """Ejecuta una operación de DefectDojo traduciendo el timeout a OperationError"""
+    import subprocess
+    try:
+        return operation(*args, **kwargs)
+    except subprocess.TimeoutExpired:
+        raise defectdojo_ops.OperationError(timeout_message)
+
+
+def _export_dump_job(ctx, compression='gzip'):
+    from .jobs import JobResult
+    extension, mimetype = defectdojo_ops.DUMP_COMPRESSIONS[compression]
+    dump_file = ctx.artifact_path(f'defectdojo_db_dump{extension}')
+    defectdojo_ops.write_dump(dump_file, compression, progress=ctx.progress)
+    return JobResult(artifact_path=dump_file, artifact_mimetype=mimetype)
+
+
+def _import_dump_job(ctx, dump_path):
+    try:
+        return _run_operation(defectdojo_ops.stream_import, "Timeout al importar la base de datos",
+                              dump_path, progress=ctx.progress)
+    finally:
+        if os.path.exists(dump_path):
+            os.remove(dump_path)
+
+
+def _generate_pdf_job(ctx, cache=None):
+    from .jobs import JobResult
+    if cache is not None:
+        entry, origin = _run_operation(defectdojo_ops.generate_pdf_cached, "Timeout al generar el PDF",
+                                       cache, progress=ctx.progress)
+        return JobResult(data={"cache": origin, "etag": entry.etag}, artifact_path=entry.path,
+                         artifact_name=entry.download_name, artifact_mimetype='application/pdf')
+    pdf_path = _run_operation(defectdojo_ops.generate_pdf, "Timeout al generar el PDF",
+                              progress=ctx.progress)
+    return JobResult(artifact_path=pdf_path, artifact_mimetype='application/pdf')
+
+
+def _wstg_sync_job(ctx, data):
+    return _run_operation(defectdojo_ops.sync_wstg_from_tracker, "Timeout en la sincronización WSTG",
+                          data, timeout=60, progress=ctx.progress)
+
+
+def _job_accepted(job_id):
+    """Respuesta 202 con el id del trabajo y la URL de estado"""
+    from flask import url_for
+    status_url = url_for('api.get_job', job_id=job_id)
+    response = jsonify({"job_id": job_id, "status": "queued", "status_url": status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+
+@api.route('/jobs/defectdojo/export-dump', methods=['POST'])
+@require_auth
+@require_role("admin")
+def enqueue_export_dump():
+    """Encola la exportación del dump de DefectDojo (descarga al terminar; gzip por defecto)"""
+    compression = request.args.get('compression', 'gzip')
+    if compression not in defectdojo_ops.DUMP_COMPRESSIONS:
+        return jsonify({"error": f"Compresión no soportada: {compression}"}), 400
+    job_id = current_app.jobs.submit('defectdojo.export_dump', _export_dump_job, compression,
+                                     user_id=g.current_user_id)
+    return _job_accepted(job_id)
+
+
+@api.route('/jobs/defectdojo/import-dump', methods=['POST'])
+@require_auth
+@require_role("admin")
+def enqueue_import_dump():
+    """
+    Encola la importación de un dump SQL (.sql, .sql.gz o .sql.zst) en DefectDojo
+
+    El dump se descomprime y se envía a psql por bloques; el progreso en bytes
+    (details.bytes_processed / details.bytes_total) se consulta en GET /api/jobs/<id>.
+    """
+    import uuid
+    from werkzeug.utils import secure_filename
+
+    file, error_response = _validate_dump_upload(defectdojo_ops.IMPORT_EXTENSIONS)
+    if error_response:
+        return error_response
+
+    # El fichero se guarda antes de responder; el trabajo lo elimina al terminar
+    upload_dir = os.path.join(defectdojo_ops.PROJECT_ROOT, 'data', 'temp')
+    os.makedirs(upload_dir, exist_ok=True)
+    dump_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}_{secure_filename(file.filename)}")
+    file.save(dump_path)
+
+    job_id = current_app.jobs.submit('defectdojo.import_dump', _import_dump_job, dump_path,
+                                     user_id=g.current_user_id)
+    return _job_accepted(job_id)
+
+
+@api.route('/jobs/defectdojo/generate-pdf', methods=['POST'])
+@require_auth
+@require_role("admin")
+def enqueue_generate_pdf():
+    """Encola la generación del PDF del informe ASVS (descarga al terminar)"""
+    job_id = current_app.jobs.submit('defectdojo.generate_pdf', _generate_pdf_job, current_app.pdf_cache,
+                                     user_id=g.current_user_id)
+    return _job_accepted(job_id)
+
+
+@api.route('/jobs/wstg/sync', methods=['POST'])
+@require_auth
+@require_role("admin")
+def enqueue_wstg_sync():
+    """
+    Encola la sincronización de un cambio del WSTG Tracker hacia DefectDojo
+
+    Un cambio inválido (wstg_id o status) responde 400 y no se encola, como en
+    /api/wstg/sync: el trabajo fallaría siempre.
+    """
+    from .wstg_sync import validate_tracker_update
+
+    data = request.json
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    error = validate_tracker_update(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    job_id = current_app.jobs.submit('wstg.sync', _wstg_sync_job, data,
+                                     user_id=g.current_user_id)
+    return _job_accepted(job_id)
+
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+@require_auth
+@require_role("admin")
+def get_job(job_id):
+    """Estado y progreso de un trabajo en segundo plano"""
+    from flask import url_for
+    from .jobs import serialize_job
+
+    job = current_app.jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(serialize_job(job, download_url=url_for('api.download_job_artifact', job_id=job_id))), 200
+
+
+@api.route('/jobs/<job_id>/download', methods=['GET'])
+@require_auth
+@require_role("admin")
+def download_job_artifact(job_id):
+    """Descarga el fichero generado por un trabajo terminado"""
+    from flask import send_file
+    from .jobs import STATUS_SUCCEEDED
+
+    job = current_app.jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if job["status"] != STATUS_SUCCEEDED or not job["artifact_path"]:
+        return jsonify({"error": "El trabajo no tiene ningún fichero disponible", "status": job["status"]}), 409
+    if not os.path.exists(job["artifact_path"]):
+        return jsonify({"error": "El fichero del trabajo ya no está disponible"}), 410
+    return send_file(
+        job["artifact_path"],
+        as_attachment=True,
+        download_name=job["artifact_name"],
+        mimetype=job["artifact_mimetype"],
+    )
@@ -25,7 +25,11 @@ let RECAPTCHA_SITE_KEY = '';
  */
 async function loadConfigFromBackend() {
     try {
-        const response = await fetch('/api/config');
+        // La versión (hash del contenido) permite al navegador cachear la respuesta
+        // hasta que un despliegue cambie la configuración
+        const version = window.APP_CONFIG?.configVersion;
+        const url = version ? `/api/config?v=${encodeURIComponent(version)}` : '/api/config';
+        const response = await fetch(url);
         if (response.ok) {
             const config = await response.json();
             RECAPTCHA_SITE_KEY = config.recaptcha_site_key || '';
@@ -337,6 +337,65 @@ document.addEventListener('DOMContentLoaded', async () => {
     });
 
     // Funcionalidad de DefectDojo: Exportar e Importar Dump
+    // Las operaciones largas se encolan como trabajos en segundo plano (POST /api/jobs/...)
+    // y se consulta su estado en GET /api/jobs/<id> hasta que terminan.
+    const JOB_POLL_INTERVAL_MS = 1000;
+
+    async function runBackgroundJob(url, options = {}, onProgress = null) {
+        const response = await AuthManager.authenticatedFetch(url, { method: 'POST', ...options });
+        const accepted = await response.json();
+        if (!response.ok) {
+            throw new Error(accepted.error || 'Error al encolar el trabajo');
+        }
+
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+            const statusResponse = await AuthManager.authenticatedFetch(accepted.status_url);
+            const job = await statusResponse.json();
+            if (!statusResponse.ok) {
+                throw new Error(job.error || 'Error al consultar el trabajo');
+            }
+            if (job.status === 'succeeded') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'El trabajo ha fallado');
+            }
+            if (onProgress) {
+                onProgress(job);
+            }
+        }
+    }
+
+    async function downloadJobArtifact(job, defaultFilename) {
+        const response = await AuthManager.authenticatedFetch(job.download_url);
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Error al descargar el fichero');
+        }
+
+        const blob = await response.blob();
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+
+        // Obtener el nombre del archivo del header Content-Disposition o usar un nombre por defecto
+        const contentDisposition = response.headers.get('Content-Disposition');
+        let filename = defaultFilename;
+        if (contentDisposition) {
+            const filenameMatch = contentDisposition.match(/filename="?([^"]+)"?/);
+            if (filenameMatch) {
+                filename = filenameMatch[1];
+            }
+        }
+
+        a.download = filename;
+        document.body.appendChild(a);
+        a.click();
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+    }
+
     const exportDumpBtn = document.getElementById('export-dump-btn');
     const importDumpInput = document.getElementById('import-dump-input');
 
@@ -346,23 +405,10 @@ document.addEventListener('DOMContentLoaded', async () => {
                 exportDumpBtn.disabled = true;
                 exportDumpBtn.textContent = '⏳ Exportando...';
                 
-                const response = await fetch('/api/defectdojo/export-dump');
-                
-                if (!response.ok) {
-                    const error = await response.json();
-                    throw new Error(error.error || 'Error al exportar el dump');
-                }
-                
-                // Descargar el archivo
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = 'defectdojo_db_dump.sql';
-                document.body.appendChild(a);
-                a.click();
-                window.URL.revokeObjectURL(url);
-                document.body.removeChild(a);
+                const job = await runBackgroundJob('/api/jobs/defectdojo/export-dump', {}, (status) => {
+                    exportDumpBtn.textContent = `⏳ Exportando... ${status.progress}%`;
+                });
+                await downloadJobArtifact(job, 'defectdojo_db_dump.sql.gz');
                 
                 exportDumpBtn.textContent = '✅ Exportado';
                 setTimeout(() => {
@@ -383,9 +429,10 @@ document.addEventListener('DOMContentLoaded', async () => {
             const file = e.target.files[0];
             if (!file) return;
             
-            // Validar extensión
-            if (!file.name.endsWith('.sql')) {
-                alert('El archivo debe ser un dump SQL (.sql)');
+            // Validar extensión (las mismas que acepta el servidor)
+            const dumpExtensions = ['.sql', '.sql.gz', '.sql.zst'];
+            if (!dumpExtensions.some(ext => file.name.endsWith(ext))) {
+                alert('El archivo debe ser un dump SQL (.sql, .sql.gz o .sql.zst)');
                 importDumpInput.value = '';
                 return;
             }
@@ -404,18 +451,11 @@ document.addEventListener('DOMContentLoaded', async () => {
                 label.textContent = '⏳ Importando...';
                 label.style.pointerEvents = 'none';
                 
-                const response = await fetch('/api/defectdojo/import-dump', {
-                    method: 'POST',
-                    body: formData
+                const job = await runBackgroundJob('/api/jobs/defectdojo/import-dump', { body: formData }, (status) => {
+                    label.textContent = `⏳ Importando... ${status.progress}%`;
                 });
                 
-                const result = await response.json();
-                
-                if (!response.ok) {
-                    throw new Error(result.error || 'Error al importar el dump');
-                }
-                
-                alert(result.message || 'Dump importado correctamente. DefectDojo se está reiniciando.');
+                alert((job.result && job.result.message) || 'Dump importado correctamente. DefectDojo se está reiniciando.');
                 label.textContent = '✅ Importado';
                 
                 setTimeout(() => {
@@ -442,34 +482,10 @@ document.addEventListener('DOMContentLoaded', async () => {
                 generatePdfBtn.disabled = true;
                 generatePdfBtn.textContent = '⏳ Generando...';
                 
-                const response = await fetch('/api/defectdojo/generate-pdf');
-                
-                if (!response.ok) {
-                    const error = await response.json();
-                    throw new Error(error.error || 'Error al generar el PDF');
-                }
-                
-                // Descargar el archivo
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                
-                // Obtener el nombre del archivo del header Content-Disposition o usar un nombre por defecto
-                const contentDisposition = response.headers.get('Content-Disposition');
-                let filename = 'INFORME_SEGURIDAD.pdf';
-                if (contentDisposition) {
-                    const filenameMatch = contentDisposition.match(/filename="?([^"]+)"?/);
-                    if (filenameMatch) {
-                        filename = filenameMatch[1];
-                    }
-                }
-                
-                a.download = filename;
-                document.body.appendChild(a);
-                a.click();
-                window.URL.revokeObjectURL(url);
-                document.body.removeChild(a);
+                const job = await runBackgroundJob('/api/jobs/defectdojo/generate-pdf', {}, (status) => {
+                    generatePdfBtn.textContent = `⏳ Generando... ${status.progress}%`;
+                });
+                await downloadJobArtifact(job, 'INFORME_SEGURIDAD.pdf');
                 
                 generatePdfBtn.textContent = '✅ Generado';
                 setTimeout(() => {
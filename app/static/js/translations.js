@@ -26,7 +26,10 @@ async function loadTranslations(langCode = ACTIVE_LANGUAGE) {
     
     // Intentar cargar desde el backend primero
     try {
-        const response = await fetch('/api/messages');
+        // Versión (hash del contenido) para cachear hasta el siguiente despliegue
+        const version = window.APP_CONFIG?.messagesVersion;
+        const url = version ? `/api/messages?v=${encodeURIComponent(version)}` : '/api/messages';
+        const response = await fetch(url);
         if (response.ok) {
             const backendMessages = await response.json();
             // Fusionar mensajes del backend con funciones helper locales
@@ -20,11 +20,16 @@ El sistema está diseñado para ser extensible, permitiendo implementar almacena
 persistente (base de datos, archivos, etc.) sin cambiar el código que lo usa.
 """
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime, date
 from typing import Optional
+import atexit
 import os
+import queue
 import re
 import sqlite3
+import threading
+import time
 
 _DEVICE_FP_RE = re.compile(r"^[0-9a-f]{64}$")
 
@@ -44,6 +49,9 @@ except ImportError:
         "backend": os.environ.get("STORAGE_BACKEND", "sqlite"),
         "db_path": os.environ.get("SQLITE_DB_PATH", os.path.join(os.getcwd(), "data", "app.db")),
         "db_key": os.environ.get("SQLCIPHER_KEY", ""),
+        "group_commit": False,
+        "group_commit_max_delay_ms": 5.0,
+        "group_commit_max_batch": 64,
     }
 
 try:
@@ -240,6 +248,10 @@ class StorageInterface(ABC):
     def is_device_blocked(self, fingerprint: str) -> bool:
         """True si la huella está marcada como riesgosa (fingerprint ya normalizado o raw hex)."""
 
+    def get_write_stats(self) -> dict:
+        """Métricas de escritura (group commit). Por defecto, deshabilitado."""
+        return {"group_commit": {"enabled": False}}
+
 
 class MemoryStorage(StorageInterface):
     """Implementación de almacenamiento en memoria"""
@@ -400,10 +412,266 @@ class MemoryStorage(StorageInterface):
         return fp in self._device_risk
 
 
+class _Histogram:
+    """Histograma acumulativo con límites fijos (thread-safe)"""
+
+    def __init__(self, bounds):
+        self._bounds = list(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._total = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            index = len(self._bounds)
+            for i, bound in enumerate(self._bounds):
+                if value <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self._total += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound:g}": count for bound, count in zip(self._bounds, self._counts)}
+            buckets["le_inf"] = self._counts[-1]
+            return {
+                "count": self._total,
+                "sum": round(self._sum, 3),
+                "avg": round(self._sum / self._total, 3) if self._total else 0,
+                "buckets": buckets,
+            }
+
+
+class _PendingWrite:
+    """Escritura encolada: entrada, futuro de la petición e instante de encolado"""
+
+    def __init__(self, entry: WeightEntryData):
+        self.entry = entry
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Write-behind para altas de peso con group commit.
+
+    Las peticiones concurrentes encolan su entrada y esperan un Future. Un hilo
+    escritor agrupa lo encolado durante `max_delay_ms` (o hasta `max_batch`
+    entradas) y lo aplica en una sola transacción, con un único fsync. El Future
+    se resuelve después del commit, así que la respuesta HTTP solo se envía
+    cuando el dato es durable. Si el lote falla, se reintenta entrada a entrada
+    para que un registro erróneo no haga fallar al resto.
+
+    Si el hilo escritor cae (p. ej. no puede abrir la conexión), las entradas
+    pendientes fallan con ese error y la siguiente submit() arranca un hilo nuevo.
+    write() espera como mucho `timeout` segundos a que el escritor recoja la
+    entrada, así que una petición nunca se queda colgada aunque el escritor no
+    responda. Una entrada ya recogida se espera hasta el final: responder con
+    error cuando el commit sí se hace haría que el cliente la duplicase al reintentar.
+    """
+
+    BATCH_SIZE_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    LATENCY_MS_BOUNDS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self, connect, write_entry, max_delay_ms: float = 5.0, max_batch: int = 64,
+                 timeout: float = 30.0):
+        self._connect = connect
+        self._write_entry = write_entry
+        self._max_delay = max(0.0, max_delay_ms) / 1000.0
+        self._max_batch = max(1, int(max_batch))
+        self._timeout = max(0.001, float(timeout))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._atexit_registered = False
+        self.batch_sizes = _Histogram(self.BATCH_SIZE_BOUNDS)
+        self.commit_latency_ms = _Histogram(self.LATENCY_MS_BOUNDS)
+        self.batches_committed = 0
+        self.batches_failed = 0
+        self.writer_failures = 0
+
+    def submit(self, entry: WeightEntryData) -> Future:
+        """Encola una entrada y devuelve el Future que se resuelve tras el commit"""
+        pending = _PendingWrite(entry)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("El escritor de group commit está cerrado")
+            if self._thread is None:
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+                self._thread = threading.Thread(
+                    target=self._run, name="weight-group-commit", daemon=True
+                )
+                self._thread.start()
+            self._queue.put(pending)
+        return pending.future
+
+    def write(self, entry: WeightEntryData) -> WeightEntryData:
+        """Encola una entrada y espera su commit (TimeoutError si sigue en cola tras `timeout`)"""
+        future = self.submit(entry)
+        try:
+            return future.result(timeout=self._timeout)
+        except FutureTimeoutError:
+            # Solo se cancela si sigue en cola; si el escritor ya la recogió, se
+            # espera su resultado (el commit puede completarse)
+            if not future.cancel():
+                return future.result()
+            raise TimeoutError(
+                f"El group commit no confirmó la escritura en {self._timeout:g} s"
+            ) from None
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Vacía la cola pendiente y detiene el hilo escritor"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "max_delay_ms": self._max_delay * 1000.0,
+            "max_batch": self._max_batch,
+            "pending": self._queue.qsize(),
+            "batches_committed": self.batches_committed,
+            "batches_failed": self.batches_failed,
+            "writer_failures": self.writer_failures,
+            "batch_size": self.batch_sizes.snapshot(),
+            "commit_latency_ms": self.commit_latency_ms.snapshot(),
+        }
+
+    def _run(self):
+        batch = []
+        try:
+            conn = self._connect()
+        except Exception as exc:
+            self._abort(exc, batch)
+            return
+        try:
+            stop = False
+            while not stop:
+                batch = []
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                batch = [first]
+                deadline = time.monotonic() + self._max_delay
+                while len(batch) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            item = self._queue.get(timeout=remaining)
+                        else:
+                            item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._flush(conn, batch)
+        except Exception as exc:
+            self._abort(exc, batch)
+        finally:
+            conn.close()
+
+    def _abort(self, exc, batch):
+        """
+        El hilo escritor no puede seguir: falla el lote en curso y todo lo encolado
+        con `exc` y deja que la siguiente submit() arranque un hilo nuevo
+        """
+        self.writer_failures += 1
+        with self._lock:
+            self._thread = None
+            pending = list(batch)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    pending.append(item)
+        for item in pending:
+            if not item.future.done():
+                item.future.set_exception(exc)
+
+    def _flush(self, conn, batch):
+        # Las entradas cuya petición ya abandonó la espera (timeout) no se escriben
+        batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            with conn:
+                for pending in batch:
+                    self._write_entry(conn, pending.entry)
+        except Exception:
+            self.batches_failed += 1
+            # Reintento individual: cada petición recibe su propio resultado
+            for pending in batch:
+                try:
+                    with conn:
+                        self._write_entry(conn, pending.entry)
+                except Exception as exc:
+                    pending.future.set_exception(exc)
+                else:
+                    self._complete(pending)
+            return
+
+        self.batches_committed += 1
+        self.batch_sizes.observe(len(batch))
+        for pending in batch:
+            self._complete(pending)
+
+    def _complete(self, pending):
+        self.commit_latency_ms.observe((time.monotonic() - pending.enqueued_at) * 1000.0)
+        pending.future.set_result(pending.entry)
+
+
+def _write_weight_entry(conn, entry: WeightEntryData) -> None:
+    """DELETE de la entrada del mismo día + INSERT (dentro de la transacción de `conn`)"""
+    conn.execute(
+        "DELETE FROM weights WHERE user_id = ? AND date(recorded_date) = date(?)",
+        (entry.user_id, entry.recorded_date.isoformat()),
+    )
+    cursor = conn.execute(
+        "INSERT INTO weights (user_id, weight_kg, recorded_date) VALUES (?, ?, ?)",
+        (entry.user_id, entry.weight_kg, entry.recorded_date.isoformat()),
+    )
+    entry.entry_id = cursor.lastrowid
+
+
+def _build_group_commit_writer(connect, group_commit: Optional[bool]) -> Optional[GroupCommitWriter]:
+    """Crea el escritor de group commit si está habilitado (argumento o STORAGE_CONFIG)"""
+    enabled = STORAGE_CONFIG.get("group_commit", False) if group_commit is None else group_commit
+    if not enabled:
+        return None
+    return GroupCommitWriter(
+        connect,
+        _write_weight_entry,
+        max_delay_ms=STORAGE_CONFIG.get("group_commit_max_delay_ms", 5.0),
+        max_batch=STORAGE_CONFIG.get("group_commit_max_batch", 64),
+        timeout=STORAGE_CONFIG.get("group_commit_timeout_s", 30.0),
+    )
+
+
 class SQLCipherStorage(StorageInterface):
     """Almacenamiento persistente cifrado con SQLCipher"""
 
-    def __init__(self, db_path: Optional[str] = None, db_key: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, db_key: Optional[str] = None,
+                 group_commit: Optional[bool] = None):
         if sqlcipher is None:
             raise RuntimeError("SQLCipher no está disponible. Instala pysqlcipher3.")
         self._db_path = db_path or STORAGE_CONFIG["db_path"]
@@ -412,6 +680,7 @@ class SQLCipherStorage(StorageInterface):
             raise RuntimeError("SQLCIPHER_KEY no configurada.")
         os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
         self._init_db()
+        self._group_commit = _build_group_commit_writer(self._connect, group_commit)
 
     def _connect(self):
         conn = sqlcipher.connect(self._db_path)
@@ -676,16 +945,22 @@ class SQLCipherStorage(StorageInterface):
             )
 
     def add_weight_entry(self, entry: WeightEntryData) -> None:
+        if self._group_commit is not None:
+            # Espera al commit del lote: la respuesta solo sale con el dato ya durable
+            self._group_commit.write(entry)
+            return
         with self._connect() as conn:
-            conn.execute(
-                "DELETE FROM weights WHERE user_id = ? AND date(recorded_date) = date(?)",
-                (entry.user_id, entry.recorded_date.isoformat()),
-            )
-            cursor = conn.execute(
-                "INSERT INTO weights (user_id, weight_kg, recorded_date) VALUES (?, ?, ?)",
-                (entry.user_id, entry.weight_kg, entry.recorded_date.isoformat()),
-            )
-            entry.entry_id = cursor.lastrowid
+            _write_weight_entry(conn, entry)
+
+    def get_write_stats(self) -> dict:
+        if self._group_commit is None:
+            return super().get_write_stats()
+        return {"group_commit": self._group_commit.stats()}
+
+    def close(self) -> None:
+        """Vacía las escrituras pendientes del group commit"""
+        if self._group_commit is not None:
+            self._group_commit.close()
 
     def get_weight_count(self, user_id: int) -> int:
         with self._connect() as conn:
@@ -759,10 +1034,11 @@ class SQLCipherStorage(StorageInterface):
 class SQLiteStorage(StorageInterface):
     """Almacenamiento persistente con SQLite (sin cifrado)"""
 
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, group_commit: Optional[bool] = None):
         self._db_path = db_path or STORAGE_CONFIG["db_path"]
         os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
         self._init_db()
+        self._group_commit = _build_group_commit_writer(self._connect, group_commit)
 
     def _connect(self):
         conn = sqlite3.connect(self._db_path)
@@ -1024,16 +1300,22 @@ class SQLiteStorage(StorageInterface):
             )
 
     def add_weight_entry(self, entry: WeightEntryData) -> None:
+        if self._group_commit is not None:
+            # Espera al commit del lote: la respuesta solo sale con el dato ya durable
+            self._group_commit.write(entry)
+            return
         with self._connect() as conn:
-            conn.execute(
-                "DELETE FROM weights WHERE user_id = ? AND date(recorded_date) = date(?)",
-                (entry.user_id, entry.recorded_date.isoformat()),
-            )
-            cursor = conn.execute(
-                "INSERT INTO weights (user_id, weight_kg, recorded_date) VALUES (?, ?, ?)",
-                (entry.user_id, entry.weight_kg, entry.recorded_date.isoformat()),
-            )
-            entry.entry_id = cursor.lastrowid
+            _write_weight_entry(conn, entry)
+
+    def get_write_stats(self) -> dict:
+        if self._group_commit is None:
+            return super().get_write_stats()
+        return {"group_commit": self._group_commit.stats()}
+
+    def close(self) -> None:
+        """Vacía las escrituras pendientes del group commit"""
+        if self._group_commit is not None:
+            self._group_commit.close()
 
     def get_weight_count(self, user_id: int) -> int:
         with self._connect() as conn:
@@ -2,17 +2,18 @@
 Gestor de traducciones
 Proporciona funciones de acceso a las traducciones del idioma activo
 """
-from .languages import es
+from importlib import import_module
+
 from .config import ACTIVE_LANGUAGE, AVAILABLE_LANGUAGES
 
 # Mapeo de códigos de idioma a módulos de traducción
-# Se construye dinámicamente basado en AVAILABLE_LANGUAGES de config.py
+# Se guardan como rutas de módulo: solo se importa el idioma activo
 LANGUAGE_MODULES = {
-    'es': es,
+    'es': 'app.languages.es',
 }
 
 # Obtener el módulo de traducción del idioma activo
-_current_language = LANGUAGE_MODULES.get(ACTIVE_LANGUAGE, es)
+_current_language = import_module(LANGUAGE_MODULES.get(ACTIVE_LANGUAGE, LANGUAGE_MODULES['es']))
 
 # Importar todas las traducciones del idioma activo
 ERRORS = _current_language.ERRORS
@@ -3,7 +3,7 @@ Blueprint para las rutas de vistas (frontend)
 Maneja las páginas HTML y la interfaz de usuario
 """
 import os
-from flask import render_template, Blueprint, abort, Response
+from flask import render_template, Blueprint, abort, Response, current_app
 from .translations import HTML_TEXTS
 from .config import ACTIVE_LANGUAGE, AVAILABLE_LANGUAGES, STORAGE_CONFIG
 
@@ -21,6 +21,8 @@ def index():
         storage_backend=STORAGE_CONFIG["backend"],
         sqlcipher_requires_pepper=(STORAGE_CONFIG["backend"] == "sqlcipher"),
         supervisor_enabled=os.environ.get("APP_SUPERVISOR") == "1",
+        config_version=current_app.public_payloads["config"].etag,
+        messages_version=current_app.public_payloads["messages"].etag,
     )
 
 
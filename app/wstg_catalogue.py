@@ -0,0 +1,85 @@
+"""
+Catálogo del OWASP WSTG 4.2 (docs/wstg_4.2_catalogue.json) cargado una sola vez
+
+Índice inmutable (MappingProxyType) que comparten la sincronización WSTG
+(app/wstg_sync.py) y el informe (scripts/generate_asvs_report.py):
+
+- WSTG_TESTS: {WSTG ID: {'id', 'category', 'title', 'description', 'severity'}}
+- WSTG_CATEGORIES: {código (INFO, ATHN, ...): {'name', 'severity'}}
+- WSTG_ID_PATTERN: expresión precompilada para extraer el ID del título de un finding
+
+El JSON se lee al importar el módulo; las búsquedas no repiten ningún trabajo. Un ID
+que no está en el catálogo recibe una entrada genérica (como hacía antes
+get_wstg_info). La ruta se puede cambiar con WSTG_CATALOGUE_PATH.
+
+No depende de Django ni de Flask (se usa también en el contenedor de DefectDojo).
+"""
+import json
+import os
+import re
+from pathlib import Path
+from types import MappingProxyType
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+WSTG_CATALOGUE_PATH = Path(os.environ.get('WSTG_CATALOGUE_PATH', _PROJECT_ROOT / 'docs' / 'wstg_4.2_catalogue.json'))
+
+# ID WSTG en el título de un finding (p. ej. "WSTG-INPV-05: ...")
+WSTG_ID_PATTERN = re.compile(r'WSTG-\w+-\d+')
+# ID completo: categoría en mayúsculas y número de dos dígitos
+WSTG_ID_FORMAT = re.compile(r'^WSTG-([A-Z]+)-(\d{2})$')
+
+DEFAULT_SEVERITY = 'Medium'
+
+
+def _load_catalogue(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    categories = {
+        code: MappingProxyType({'name': category['name'], 'severity': category.get('severity', DEFAULT_SEVERITY)})
+        for code, category in raw['categories'].items()
+    }
+    tests = {}
+    for wstg_id, test in raw['tests'].items():
+        code = WSTG_ID_FORMAT.match(wstg_id).group(1)
+        category = categories[code]
+        tests[wstg_id] = MappingProxyType({
+            'id': wstg_id,
+            'category': code,
+            'title': test['title'],
+            'description': test.get('description') or f"OWASP WSTG {raw['version']} - {category['name']}: {test['title']}",
+            'severity': test.get('severity', category['severity']),
+        })
+    return raw['version'], MappingProxyType(categories), MappingProxyType(tests)
+
+
+WSTG_VERSION, WSTG_CATEGORIES, WSTG_TESTS = _load_catalogue(WSTG_CATALOGUE_PATH)
+
+
+def wstg_category(wstg_id):
+    """Código de categoría de un WSTG ID ('WSTG-INPV-05' → 'INPV'); None si no tiene formato WSTG"""
+    if not wstg_id or not wstg_id.startswith('WSTG-'):
+        return None
+    parts = wstg_id.split('-')
+    return parts[1] if len(parts) >= 3 else None
+
+
+def get_wstg_info(wstg_id):
+    """Entrada del catálogo de un WSTG ID (genérica si no está en el catálogo)"""
+    test = WSTG_TESTS.get(wstg_id)
+    if test is not None:
+        return test
+    return {
+        'id': wstg_id,
+        'category': wstg_category(wstg_id),
+        'title': f'{wstg_id} Test',
+        'description': f'Security test for {wstg_id}',
+        'severity': DEFAULT_SEVERITY,
+    }
+
+
+def find_wstg_id(text):
+    """Primer WSTG ID que aparece en un texto (título de un finding); None si no hay"""
+    if not text or 'WSTG-' not in text:
+        return None
+    match = WSTG_ID_PATTERN.search(text)
+    return match.group(0) if match else None
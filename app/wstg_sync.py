@@ -6,11 +6,15 @@ Implementación completa con logging, manejo de errores y resolución de conflic
 import os
 import sys
 import logging
+import threading
 import json
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+from app.wstg_catalogue import WSTG_ID_FORMAT, find_wstg_id, get_wstg_info
+from app.wstg_sync_state import get_state_store
+
 # Configurar logging
 logger = logging.getLogger('wstg_sync')
 logger.setLevel(logging.INFO)
@@ -27,6 +31,14 @@ _Tag = None
 _User = None
 _timezone = None
 
+# Ids de Test/Engagement WSTG ya resueltos en este proceso (get_wstg_test_and_engagement)
+_wstg_test_ids = {}
+_wstg_test_lock = threading.Lock()
+
+
+class SyncUnavailable(RuntimeError):
+    """DefectDojo no está disponible (Django, BD, Test/Engagement WSTG): el fallo no es del mensaje"""
+
 
 def _init_django():
     """Inicializar Django solo cuando sea necesario"""
@@ -81,8 +93,7 @@ DD_TO_WSTG_STATUS = {
     (False, False, False): 'Not Started'   # active=False, verified=False, false_p=False
 }
 
-# Archivo para almacenar estado de sincronización
-SYNC_STATE_FILE = Path('/app/data/wstg_sync_state.json')
+# Estado por item e historial de sincronizaciones: WstgStateStore (app/wstg_sync_state.py)
 SYNC_LOG_FILE = Path('/app/data/wstg_sync.log')
 
 
@@ -100,32 +111,18 @@ def init_logging():
     logger.addHandler(file_handler)
 
 
-def load_sync_state() -> Dict:
-    """Cargar estado de sincronización desde archivo JSON"""
-    if SYNC_STATE_FILE.exists():
-        try:
-            with open(SYNC_STATE_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error cargando estado de sincronización: {e}")
-    return {}
-
-
-def save_sync_state(state: Dict):
-    """Guardar estado de sincronización a archivo JSON"""
+def update_sync_item(wstg_id: str, **fields) -> Optional[str]:
+    """Actualizar el estado de un item (UPSERT); devuelve el wstg_status anterior"""
     try:
-        if not SYNC_STATE_FILE.parent.exists():
-            SYNC_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(SYNC_STATE_FILE, 'w') as f:
-            json.dump(state, f, indent=2, default=str)
+        return get_state_store().upsert_item(wstg_id, **fields)
     except Exception as e:
-        logger.error(f"Error guardando estado de sincronización: {e}")
+        logger.error(f"Error guardando estado de sincronización de {wstg_id}: {e}")
+    return None
 
 
-def log_sync(wstg_id: str, direction: str, old_status: Optional[str], 
-             new_status: str, success: bool, error_message: str = ''):
-    """Registrar sincronización en log"""
-    log_entry = {
+def _log_entry(wstg_id: str, direction: str, old_status: Optional[str],
+               new_status: str, success: bool, error_message: str = '') -> Dict:
+    return {
         'timestamp': datetime.now().isoformat(),
         'wstg_id': wstg_id,
         'direction': direction,
@@ -134,25 +131,46 @@ def log_sync(wstg_id: str, direction: str, old_status: Optional[str],
         'success': success,
         'error_message': error_message
     }
+
+
+def log_sync(wstg_id: str, direction: str, old_status: Optional[str], 
+             new_status: str, success: bool, error_message: str = ''):
+    """Registrar sincronización en log"""
+    log_entry = _log_entry(wstg_id, direction, old_status, new_status, success, error_message)
     logger.info(f"Sync: {json.dumps(log_entry)}")
     
-    # También guardar en estado
-    state = load_sync_state()
-    if 'sync_log' not in state:
-        state['sync_log'] = []
-    state['sync_log'].append(log_entry)
-    # Mantener solo últimos 1000 registros
-    if len(state['sync_log']) > 1000:
-        state['sync_log'] = state['sync_log'][-1000:]
-    save_sync_state(state)
+    # También guardar en el historial (tabla sync_log)
+    try:
+        get_state_store().log_sync(log_entry)
+    except Exception as e:
+        logger.error(f"Error guardando historial de sincronización: {e}")
 
 
 def get_wstg_test_and_engagement():
-    """Obtener o crear Test y Engagement para WSTG"""
+    """
+    Obtener o crear Test y Engagement para WSTG
+    
+    Los ids resueltos se guardan en el proceso: las llamadas siguientes son una
+    consulta por clave primaria en lugar de cinco get_or_create. Si el Test se borró,
+    se vuelve a crear.
+    """
     _init_django()
     if not _django_initialized:
         raise RuntimeError("Django no está disponible. Este módulo requiere acceso a DefectDojo.")
     
+    test_id = _wstg_test_ids.get('test_id')
+    if test_id is not None:
+        test = _Test.objects.select_related('engagement').filter(id=test_id).first()
+        if test is not None:
+            return test, test.engagement
+    
+    with _wstg_test_lock:
+        test, engagement = _get_or_create_wstg_test()
+        _wstg_test_ids.update(test_id=test.id, engagement_id=engagement.id)
+    return test, engagement
+
+
+def _get_or_create_wstg_test():
     try:
         admin_user = _User.objects.get(username='admin')
     except _User.DoesNotExist:
@@ -198,56 +216,54 @@ def get_wstg_test_and_engagement():
     return test, engagement
 
 
-def get_wstg_info(wstg_id: str) -> Dict:
-    """Obtener información de un item WSTG desde diccionario"""
-    # Diccionario básico de WSTG (puede expandirse)
-    wstg_dictionary = {
-        'WSTG-INFO-01': {
-            'title': 'Conduct OSINT reconnaissance',
-            'description': 'Gather information about the target through publicly available sources',
-            'severity': 'Info'
-        },
-        'WSTG-INFO-02': {
-            'title': 'Fingerprint Web Server',
-            'description': 'Identify the web server and version',
-            'severity': 'Info'
-        },
-        # Añadir más items según necesidad
-    }
-    
-    return wstg_dictionary.get(wstg_id, {
-        'title': f'{wstg_id} Test',
-        'description': f'Security test for {wstg_id}',
-        'severity': 'Medium'
-    })
+def _finding_field_names():
+    """Campos de Finding en esta versión de DefectDojo"""
+    return {field.name for field in _Finding._meta.get_fields()}
+
+
+def _matches_wstg_id(finding, wstg_id: str) -> bool:
+    tags = {tag.name for tag in finding.tags.all()}
+    return wstg_id in tags or ('WSTG' in tags and wstg_id in finding.title)
+
+
+def _indexed_finding_ids(wstg_ids) -> Dict:
+    """Índice wstg_id → finding_id del estado de sincronización (tabla items)"""
+    try:
+        items = get_state_store().get_items(wstg_ids)
+    except Exception as e:
+        logger.error(f"Error leyendo el índice de findings WSTG: {e}")
+        return {}
+    return {wstg_id: item['finding_id'] for wstg_id, item in items.items() if item.get('finding_id')}
 
 
 def find_finding_by_wstg_id(wstg_id: str, test) -> Optional:
-    """Buscar finding por WSTG ID en los tags o título"""
+    """
+    Buscar finding por WSTG ID: primero en el índice del estado de sincronización
+    (consulta por clave primaria), después por tag exacto y por último por tag WSTG
+    con el ID en el título (en la BD, sin recorrer los findings en Python)
+    """
     _init_django()
     if not _django_initialized:
         return None
     
-    # Buscar por tag exacto
-    findings = _Finding.objects.filter(
-        test=test,
-        tags__name=wstg_id
-    ).distinct()
+    finding_id = _indexed_finding_ids([wstg_id]).get(wstg_id)
+    if finding_id:
+        finding = _Finding.objects.filter(id=finding_id, test=test).first()
+        # El índice puede haber quedado obsoleto (finding borrado o retagueado)
+        if finding is not None and _matches_wstg_id(finding, wstg_id):
+            return finding
     
-    if findings.exists():
-        return findings.first()
+    # Buscar por tag exacto
+    finding = _Finding.objects.filter(test=test, tags__name=wstg_id).order_by('id').first()
+    if finding is not None:
+        return finding
     
-    # Buscar por tag WSTG y verificar título
-    findings = _Finding.objects.filter(
+    # Buscar por tag WSTG y ID en el título
+    return _Finding.objects.filter(
         test=test,
-        tags__name='WSTG'
-    ).distinct()
-    
-    for finding in findings:
-        if wstg_id in finding.title:
-            return finding
-    
-    return None
+        tags__name='WSTG',
+        title__contains=wstg_id
+    ).order_by('id').first()
 
 
 def create_finding_from_wstg(wstg_id: str, status: str, notes: str, test) -> Optional:
@@ -259,21 +275,11 @@ def create_finding_from_wstg(wstg_id: str, status: str, notes: str, test) -> Opt
     wstg_info = get_wstg_info(wstg_id)
     status_map = WSTG_TO_DD_STATUS.get(status, WSTG_TO_DD_STATUS['Not Started'])
     
-    # Mapear severidad
-    severity_map = {
-        'Info': 'Info',
-        'Low': 'Low',
-        'Medium': 'Medium',
-        'High': 'High',
-        'Critical': 'Critical'
-    }
-    severity = severity_map.get(wstg_info.get('severity', 'Medium'), 'Medium')
-    
     finding = _Finding.objects.create(
-        title=f"{wstg_id}: {wstg_info.get('title', 'WSTG Test')}",
-        description=wstg_info.get('description', ''),
+        title=f"{wstg_id}: {wstg_info['title']}",
+        description=wstg_info['description'],
         test=test,
-        severity=severity,
+        severity=wstg_info['severity'],
         active=status_map.get('active', True),
         verified=status_map.get('verified', False),
         false_p=status_map.get('false_p', False),
@@ -298,14 +304,8 @@ def extract_wstg_id(finding) -> Optional[str]:
         if tag.name.startswith('WSTG-'):
             return tag.name
     
-    # Buscar en título
-    if 'WSTG-' in finding.title:
-        import re
-        match = re.search(r'WSTG-\w+-\d+', finding.title)
-        if match:
-            return match.group(0)
-    
-    return None
+    # Buscar en título (expresión precompilada del catálogo)
+    return find_wstg_id(finding.title)
 
 
 def determine_wstg_status(finding) -> str:
@@ -316,6 +316,43 @@ def determine_wstg_status(finding) -> str:
     return DD_TO_WSTG_STATUS.get(key, 'Not Started')
 
 
+def _apply_tracker_status(finding, status: str, notes: str):
+    status_map = WSTG_TO_DD_STATUS.get(status, WSTG_TO_DD_STATUS['Not Started'])
+    finding.active = status_map.get('active', True)
+    finding.verified = status_map.get('verified', False)
+    finding.false_p = status_map.get('false_p', False)
+    if notes:
+        finding.mitigation = notes
+
+
+def validate_tracker_update(data: Dict) -> Optional[str]:
+    """
+    Error de validación de un cambio del tracker (None si es válido): wstg_id con
+    formato WSTG-XXXX-NN y status de WSTG_TO_DD_STATUS. Un cambio inválido falla
+    siempre, así que no se debe reintentar desde la cola.
+    """
+    wstg_id = data.get('wstg_id')
+    status = data.get('status')
+    if not wstg_id or not status:
+        return "wstg_id and status are required"
+    if not isinstance(wstg_id, str) or not WSTG_ID_FORMAT.match(wstg_id):
+        return f"Invalid wstg_id: {wstg_id}"
+    if status not in WSTG_TO_DD_STATUS:
+        return f"Invalid status: {status}. Valid values: {', '.join(WSTG_TO_DD_STATUS)}"
+    return None
+
+
+def webhook_finding_id(data: Dict) -> Optional[int]:
+    """Id del finding de un webhook de DefectDojo como entero (None si falta o no es numérico)"""
+    finding_id = (data.get('finding') or {}).get('id')
+    if isinstance(finding_id, bool):
+        return None
+    try:
+        return int(finding_id)
+    except (TypeError, ValueError):
+        return None
+
+
 def sync_from_tracker(data: Dict) -> Dict:
     """
     Sincronizar desde WSTG Tracker hacia DefectDojo
@@ -325,8 +362,8 @@ def sync_from_tracker(data: Dict) -> Dict:
     notes = data.get('notes', '')
     timestamp = data.get('timestamp', datetime.now().isoformat())
     
-    if not wstg_id or not status:
-        error_msg = "wstg_id and status are required"
+    error_msg = validate_tracker_update(data)
+    if error_msg:
         logger.error(error_msg)
         return {"success": False, "error": error_msg}
     
@@ -343,27 +380,19 @@ def sync_from_tracker(data: Dict) -> Dict:
             action = "created"
         else:
             # Actualizar finding existente
-            status_map = WSTG_TO_DD_STATUS.get(status, WSTG_TO_DD_STATUS['Not Started'])
-            finding.active = status_map.get('active', True)
-            finding.verified = status_map.get('verified', False)
-            finding.false_p = status_map.get('false_p', False)
-            if notes:
-                finding.mitigation = notes
+            _apply_tracker_status(finding, status, notes)
             finding.save()
             action = "updated"
         
-        # Actualizar estado de sincronización
-        state = load_sync_state()
-        if 'items' not in state:
-            state['items'] = {}
-        state['items'][wstg_id] = {
-            'finding_id': finding.id,
-            'wstg_status': status,
-            'defectdojo_status': 'verified' if finding.verified else 'active',
-            'last_sync_timestamp': timestamp,
-            'last_sync_direction': 'tracker->dd'
-        }
-        save_sync_state(state)
+        # Actualizar estado de sincronización (solo este item)
+        update_sync_item(
+            wstg_id,
+            finding_id=finding.id,
+            wstg_status=status,
+            defectdojo_status='verified' if finding.verified else 'active',
+            last_sync_timestamp=timestamp,
+            last_sync_direction='tracker->dd'
+        )
         
         # Registrar en log
         log_sync(wstg_id, 'tracker->dd', old_status, status, True)
@@ -411,22 +440,16 @@ def sync_from_defectdojo(data: Dict) -> Dict:
         # Determinar estado WSTG
         wstg_status = determine_wstg_status(finding)
         
-        # Actualizar estado de sincronización
-        state = load_sync_state()
-        if 'items' not in state:
-            state['items'] = {}
-        
-        old_wstg_status = state['items'].get(wstg_id, {}).get('wstg_status')
-        
-        state['items'][wstg_id] = {
-            'finding_id': finding.id,
-            'wstg_status': wstg_status,
-            'defectdojo_status': 'verified' if finding.verified else 'active',
-            'last_sync_timestamp': datetime.now().isoformat(),
-            'last_sync_direction': 'dd->tracker',
-            'event': event
-        }
-        save_sync_state(state)
+        # Actualizar estado de sincronización (solo este item)
+        old_wstg_status = update_sync_item(
+            wstg_id,
+            finding_id=finding.id,
+            wstg_status=wstg_status,
+            defectdojo_status='verified' if finding.verified else 'active',
+            last_sync_timestamp=datetime.now().isoformat(),
+            last_sync_direction='dd->tracker',
+            event=event
+        )
         
         # Registrar en log
         log_sync(wstg_id, 'dd->tracker', old_wstg_status, wstg_status, True)
@@ -448,30 +471,219 @@ def sync_from_defectdojo(data: Dict) -> Dict:
         return {"success": False, "error": error_msg}
 
 
+def find_findings_by_wstg_ids(wstg_ids, test) -> Dict:
+    """
+    Buscar los findings de varios WSTG ID con el mismo orden que find_finding_by_wstg_id
+    (índice, tag exacto, tag WSTG + título), una consulta por paso para todo el lote.
+    Devuelve {wstg_id: finding}
+    """
+    _init_django()
+    if not _django_initialized:
+        return {}
+    from django.db.models import Q
+    
+    wanted = list(dict.fromkeys(wstg_ids))
+    found = {}
+    
+    indexed = _indexed_finding_ids(wanted)
+    if indexed:
+        by_id = _Finding.objects.filter(test=test, id__in=set(indexed.values())).prefetch_related('tags').in_bulk()
+        for wstg_id, finding_id in indexed.items():
+            finding = by_id.get(finding_id)
+            if finding is not None and _matches_wstg_id(finding, wstg_id):
+                found[wstg_id] = finding
+    
+    missing = [wstg_id for wstg_id in wanted if wstg_id not in found]
+    if missing:
+        for finding in (_Finding.objects.filter(test=test, tags__name__in=missing)
+                        .distinct().order_by('id').prefetch_related('tags')):
+            for tag in finding.tags.all():
+                if tag.name in missing and tag.name not in found:
+                    found[tag.name] = finding
+    
+    missing = [wstg_id for wstg_id in wanted if wstg_id not in found]
+    if missing:
+        title_filter = Q()
+        for wstg_id in missing:
+            title_filter |= Q(title__contains=wstg_id)
+        for finding in (_Finding.objects.filter(title_filter, test=test, tags__name='WSTG')
+                        .distinct().order_by('id')):
+            for wstg_id in missing:
+                if wstg_id in finding.title and wstg_id not in found:
+                    found[wstg_id] = finding
+    return found
+
+
+def sync_batch_from_tracker(requests: List[Dict]) -> Dict:
+    """
+    Sincronizar un lote de cambios del tracker hacia DefectDojo
+    
+    - Los cambios del mismo wstg_id se agrupan: gana el último (el lote llega en orden de cola)
+    - Test/Engagement se resuelven una vez y los findings se buscan en una sola consulta
+    - Los findings existentes se actualizan con bulk_update dentro de una transacción
+      (como bulk_update no llama a Finding.save(), no se disparan sus señales; las
+      fechas `updated` y `last_status_update` se ponen a mano si el modelo las tiene)
+    - Un cambio inválido se marca con 'invalid': no se debe reintentar
+    - Estado por item e historial se escriben en una transacción de SQLite cada uno
+    
+    Devuelve {'results': {wstg_id: resultado como sync_from_tracker}, 'coalesced': n}.
+    Lanza SyncUnavailable si DefectDojo no está disponible (no es culpa de ningún cambio).
+    """
+    _init_django()
+    if not _django_initialized:
+        raise SyncUnavailable("Django no está disponible. Este módulo requiere acceso a DefectDojo.")
+    from django.db import transaction
+    
+    results = {}
+    latest = {}
+    valid = 0
+    for data in requests:
+        wstg_id = data.get('wstg_id')
+        error_msg = validate_tracker_update(data)
+        if error_msg:
+            results[wstg_id if isinstance(wstg_id, str) else ''] = {"success": False, "error": error_msg,
+                                                                    "invalid": True}
+            continue
+        valid += 1
+        latest.pop(wstg_id, None)  # conservar el orden del último cambio
+        latest[wstg_id] = data
+    coalesced = valid - len(latest)
+    if not latest:
+        return {'results': results, 'coalesced': coalesced}
+    
+    try:
+        test, _ = get_wstg_test_and_engagement()
+    except Exception as e:
+        raise SyncUnavailable(f"No se pudo obtener el Test/Engagement WSTG: {e}") from e
+    existing = find_findings_by_wstg_ids(latest, test)
+    old_statuses = {wstg_id: determine_wstg_status(finding) for wstg_id, finding in existing.items()}
+    
+    synced = {}
+    timestamp_fields = [name for name in ('last_status_update', 'updated') if name in _finding_field_names()]
+    changed_at = _timezone.now()
+    with transaction.atomic():
+        to_update = []
+        for wstg_id, data in latest.items():
+            finding = existing.get(wstg_id)
+            if finding is None:
+                finding = create_finding_from_wstg(wstg_id, data['status'], data.get('notes', ''), test)
+                action = "created"
+            else:
+                status_before = (finding.active, finding.verified, finding.false_p)
+                _apply_tracker_status(finding, data['status'], data.get('notes', ''))
+                # bulk_update no pasa por Finding.save(): las fechas que pondría save() se ponen aquí
+                if 'updated' in timestamp_fields:
+                    finding.updated = changed_at
+                if ('last_status_update' in timestamp_fields
+                        and status_before != (finding.active, finding.verified, finding.false_p)):
+                    finding.last_status_update = changed_at
+                if finding not in to_update:
+                    to_update.append(finding)
+                action = "updated"
+            synced[wstg_id] = (finding, action)
+        if to_update:
+            _Finding.objects.bulk_update(to_update, ['active', 'verified', 'false_p', 'mitigation'] + timestamp_fields)
+    
+    now = datetime.now().isoformat()
+    items = {}
+    entries = []
+    for wstg_id, (finding, action) in synced.items():
+        data = latest[wstg_id]
+        defectdojo_status = 'verified' if finding.verified else 'active'
+        items[wstg_id] = {
+            'finding_id': finding.id,
+            'wstg_status': data['status'],
+            'defectdojo_status': defectdojo_status,
+            'last_sync_timestamp': data.get('timestamp', now),
+            'last_sync_direction': 'tracker->dd'
+        }
+        entries.append(_log_entry(wstg_id, 'tracker->dd', old_statuses.get(wstg_id), data['status'], True))
+        results[wstg_id] = {
+            "success": True,
+            "finding_id": finding.id,
+            "action": action,
+            "defectdojo_status": defectdojo_status,
+            "message": f"Finding {action} correctamente"
+        }
+    store = get_state_store()
+    store.upsert_items(items)
+    store.log_syncs(entries)
+    logger.info(f"Lote tracker->dd: {len(synced)} items, {coalesced} cambios agrupados")
+    return {'results': results, 'coalesced': coalesced}
+
+
+def sync_batch_from_defectdojo(requests: List[Dict]) -> Dict:
+    """
+    Sincronizar un lote de webhooks de DefectDojo hacia el tracker: los findings se
+    leen en una consulta (con sus tags), el estado anterior de los items en otra y el
+    estado nuevo se escribe en una transacción.
+    
+    Devuelve {'results': {finding_id (int): resultado como sync_from_defectdojo}}; los
+    webhooks sin id numérico van en results[None] marcados con 'invalid'.
+    """
+    _init_django()
+    if not _django_initialized:
+        raise SyncUnavailable("Django no está disponible. Este módulo requiere acceso a DefectDojo.")
+    
+    results = {}
+    events = {}
+    for data in requests:
+        finding_id = webhook_finding_id(data)
+        if finding_id is None:
+            results[None] = {"success": False, "error": "finding id is required (numeric)", "invalid": True}
+            continue
+        events[finding_id] = data.get('event', 'finding_updated')
+    
+    findings = _Finding.objects.filter(id__in=list(events)).prefetch_related('tags').in_bulk()
+    found = {}
+    for finding_id in events:
+        finding = findings.get(finding_id)
+        if finding is None:
+            results[finding_id] = {"success": False, "error": f"Finding {finding_id} not found"}
+            continue
+        wstg_id = extract_wstg_id(finding)
+        if not wstg_id:
+            results[finding_id] = {"success": False, "error": "WSTG ID not found in finding"}
+            continue
+        found[finding_id] = (finding, wstg_id)
+    
+    store = get_state_store()
+    known = store.get_items({wstg_id for _, wstg_id in found.values()})
+    items = {}
+    entries = []
+    now = datetime.now().isoformat()
+    for finding_id, (finding, wstg_id) in found.items():
+        wstg_status = determine_wstg_status(finding)
+        items[wstg_id] = {
+            'finding_id': finding.id,
+            'wstg_status': wstg_status,
+            'defectdojo_status': 'verified' if finding.verified else 'active',
+            'last_sync_timestamp': now,
+            'last_sync_direction': 'dd->tracker',
+            'event': events[finding_id]
+        }
+        entries.append(_log_entry(wstg_id, 'dd->tracker', known.get(wstg_id, {}).get('wstg_status'),
+                                  wstg_status, True))
+        results[finding_id] = {
+            "success": True,
+            "wstg_id": wstg_id,
+            "wstg_status": wstg_status,
+            "message": "Estado sincronizado con tracker"
+        }
+    store.upsert_items(items)
+    store.log_syncs(entries)
+    return {'results': results}
+
+
 def get_sync_status() -> Dict:
     """Obtener estado de sincronización"""
-    state = load_sync_state()
-    items = state.get('items', {})
-    
-    total_items = len(items)
-    synced_items = sum(1 for item in items.values() 
-                      if item.get('last_sync_timestamp'))
-    
-    # Contar conflictos (items con diferentes estados)
-    conflicts = 0
-    for wstg_id, item_data in items.items():
-        wstg_status = item_data.get('wstg_status')
-        dd_status = item_data.get('defectdojo_status')
-        # Verificar si hay inconsistencia
-        # (lógica simplificada, puede mejorarse)
-        if wstg_status and dd_status:
-            if (wstg_status == 'Done' and dd_status != 'verified') or \
-               (wstg_status == 'In Progress' and dd_status != 'active'):
-                conflicts += 1
-    
-    last_sync = None
-    if state.get('sync_log'):
-        last_sync = state['sync_log'][-1].get('timestamp')
+    # COUNT sobre índices; los conflictos se calculan al escribir cada item
+    store = get_state_store()
+    counts = store.status_counts()
+    total_items = counts['total_items']
+    synced_items = counts['synced_items']
+    conflicts = counts['conflicts']
+    last_sync = store.last_sync()
     
     return {
         "last_sync": last_sync or datetime.now().isoformat(),
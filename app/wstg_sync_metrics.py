@@ -0,0 +1,220 @@
+"""
+Métricas del pipeline de sincronización WSTG (data/wstg_sync_metrics.json)
+
+El servicio wstg-sync acumula en un SyncMetrics, dentro del proceso:
+
+- lotes de la cola por dirección: número de lotes, tamaño (mensajes y agrupados),
+  éxitos, fallos, mensajes a dead-letter y consultas de Django por lote;
+- latencias, con media, máximo, p50 y p95 de las últimas LATENCY_WINDOW muestras:
+  de extremo a extremo por item (encolado → confirmado) y duración de cada lote
+  (los cambios de un lote se aplican juntos: no hay tiempo por item);
+- peticiones inmediatas del worker por comando (número, errores, latencia);
+- la última pasada de sincronización desde DefectDojo (tipo, duración, findings
+  leídos, actualizados, errores y consultas);
+- el estado de la cola (SyncQueue.stats: profundidad, esperando, en proceso,
+  reintentando, dead-letter y antigüedad del mensaje más antiguo que espera).
+
+y lo publica con write() (temporal + os.replace) cada vez que procesa algo y al
+menos cada METRICS_INTERVAL segundos. GET /api/wstg/status lo lee con read_metrics()
+(la web y el servicio comparten ./data) junto con el estado de la cola en vivo.
+
+No depende de Django ni de Flask. El fichero es WSTG_SYNC_METRICS_FILE
+(default: /app/data/wstg_sync_metrics.json).
+"""
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+METRICS_FILE = Path(os.environ.get('WSTG_SYNC_METRICS_FILE', '/app/data/wstg_sync_metrics.json'))
+
+# Cada cuánto se reescribe el fichero aunque no haya actividad (refresca el estado de la cola)
+METRICS_INTERVAL = 30
+# Muestras de latencia que se conservan para los percentiles
+LATENCY_WINDOW = 1000
+# La sincronización "va al día" si el mensaje más antiguo de la cola no supera esta edad (s)
+KEEPING_UP_MAX_AGE = 60
+
+
+class _Latency:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def percentile(fraction):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else None,
+            'max_ms': round(self.max * 1000, 2) if self.count else None,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+        }
+
+
+class SyncMetrics:
+    """Acumulador de métricas del servicio de sincronización (seguro entre hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now().isoformat()
+        self._batches = {}
+        self._latency = {'end_to_end': _Latency(), 'batch': _Latency()}
+        self._requests = {}
+        self._last_pass = None
+        self._passes = {'count': 0, 'errors': 0}
+        self._queue = None
+
+    def record_batch(self, direction, size, succeeded, failed, dead_lettered=0, coalesced=0,
+                     duration=0.0, queries=None, enqueued_at=()):
+        """
+        Lote de la cola: `size` mensajes procesados en `duration` segundos con `queries`
+        consultas; `enqueued_at` son los timestamps ISO de los mensajes confirmados.
+        """
+        now = datetime.now()
+        with self._lock:
+            batch = self._batches.setdefault(direction, {
+                'batches': 0, 'messages': 0, 'succeeded': 0, 'failed': 0, 'dead_lettered': 0,
+                'coalesced': 0, 'max_batch_size': 0, 'queries': 0, 'last_batch': None,
+            })
+            batch['batches'] += 1
+            batch['messages'] += size
+            batch['succeeded'] += succeeded
+            batch['failed'] += failed
+            batch['dead_lettered'] += dead_lettered
+            batch['coalesced'] += coalesced
+            batch['max_batch_size'] = max(batch['max_batch_size'], size)
+            batch['queries'] += queries or 0
+            batch['last_batch'] = {'at': now.isoformat(), 'size': size, 'succeeded': succeeded, 'failed': failed,
+                                   'duration_ms': round(duration * 1000, 2), 'queries': queries}
+            if size:
+                self._latency['batch'].add(duration)
+            for stamp in enqueued_at:
+                try:
+                    self._latency['end_to_end'].add(max(0.0, (now - datetime.fromisoformat(stamp)).total_seconds()))
+                except (TypeError, ValueError):
+                    continue
+
+    def record_request(self, command, duration, success):
+        """Petición inmediata atendida por el worker (socket Unix)"""
+        with self._lock:
+            entry = self._requests.get(command)
+            if entry is None:
+                entry = self._requests[command] = {'count': 0, 'errors': 0, 'latency': _Latency()}
+            entry['count'] += 1
+            entry['errors'] += 0 if success else 1
+            entry['latency'].add(duration)
+
+    def record_pass(self, kind, read, updated, errors, duration, queries=None):
+        """Pasada de sincronización desde DefectDojo (kind: 'full' o 'incremental')"""
+        with self._lock:
+            self._passes['count'] += 1
+            self._passes['errors'] += errors
+            self._last_pass = {'at': datetime.now().isoformat(), 'kind': kind, 'read': read, 'updated': updated,
+                               'errors': errors, 'duration_ms': round(duration * 1000, 2), 'queries': queries}
+
+    def set_queue(self, stats):
+        with self._lock:
+            self._queue = dict(stats)
+
+    def snapshot(self):
+        with self._lock:
+            batches = {}
+            for direction, batch in self._batches.items():
+                batches[direction] = dict(batch)
+                batches[direction]['error_rate'] = (round(batch['failed'] / batch['messages'], 4)
+                                                    if batch['messages'] else 0.0)
+                batches[direction]['avg_batch_size'] = round(batch['messages'] / batch['batches'], 2)
+            return {
+                'updated_at': datetime.now().isoformat(),
+                'started_at': self.started_at,
+                'pid': os.getpid(),
+                'queue': self._queue,
+                'batches': batches,
+                'latency': {name: latency.summary() for name, latency in self._latency.items()},
+                'requests': {command: {'count': entry['count'], 'errors': entry['errors'],
+                                       'latency': entry['latency'].summary()}
+                             for command, entry in self._requests.items()},
+                'passes': dict(self._passes, last=self._last_pass),
+            }
+
+    def write(self, path=None):
+        """Publica el snapshot (escritura atómica); devuelve el snapshot escrito"""
+        path = Path(path or METRICS_FILE)
+        snapshot = self.snapshot()
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return snapshot
+
+
+def read_metrics(path=None):
+    """Último snapshot publicado por el servicio (None si no hay), con su antigüedad en segundos"""
+    path = Path(path or METRICS_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(metrics, dict):
+        return None
+    try:
+        metrics['age_seconds'] = round((datetime.now() - datetime.fromisoformat(metrics['updated_at'])).total_seconds(), 1)
+    except (KeyError, TypeError, ValueError):
+        metrics['age_seconds'] = None
+    return metrics
+
+
+def keeping_up(queue_stats):
+    """
+    True si la cola no acumula retraso: no hay mensajes esperando a un consumidor
+    (los que esperan un reintento o están en proceso no cuentan) o el más antiguo es
+    reciente. None si no se pudo leer el estado de la cola.
+    """
+    if not queue_stats:
+        return None
+    waiting = queue_stats.get('waiting')
+    if waiting is None:
+        waiting = queue_stats.get('depth', 0) - queue_stats.get('retrying', 0) - queue_stats.get('in_flight', 0)
+    if waiting <= 0:
+        return True
+    age = queue_stats.get('oldest_age_seconds')
+    return age is not None and age <= KEEPING_UP_MAX_AGE
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """SyncMetrics compartido dentro del proceso"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = SyncMetrics()
+        return _metrics
@@ -0,0 +1,519 @@
+"""
+Cola de sincronización WSTG persistente en SQLite (data/wstg_sync_queue/queue.sqlite3)
+
+Las rutas /api/wstg/sync y /api/wstg/webhook de la aplicación web encolan las
+solicitudes y el servicio wstg-sync (contenedor de DefectDojo) las consume. Ambos
+comparten la BD a través de ./data (modo WAL, como el estado de la sincronización).
+
+- enqueue() inserta la solicitud (id autoincremental: no hay colisiones de nombre) y
+  toca el fichero .wakeup del directorio para despertar al consumidor.
+- SyncQueue.claim() reserva un lote de mensajes disponibles durante un tiempo de
+  visibilidad: varios consumidores pueden trabajar en paralelo sin repetir mensajes, y
+  si uno muere sus mensajes vuelven a estar disponibles al caducar la reserva.
+- ack() borra los mensajes procesados; fail() los reprograma con backoff exponencial
+  (BACKOFF_BASE * 2^(intentos-1), hasta BACKOFF_MAX) y, al llegar a MAX_ATTEMPTS, los
+  mueve a la tabla dead_letter con el último error. Un mensaje envenenado deja de
+  reintentarse en cada pasada. claim() también manda a dead_letter los mensajes que
+  agotaron los intentos sin liquidarse (el consumidor murió o se colgó con ellos).
+- release() devuelve mensajes sin contar el intento: es para fallos de infraestructura
+  (BD caída, DefectDojo no disponible), que no son culpa del mensaje.
+- Orden por WSTG ID: al confirmar un cambio del tracker se borran los mensajes
+  anteriores del mismo wstg_id (ack/supersede), así un reintento antiguo no pisa
+  un estado más reciente.
+- QueueWatcher espera a que llegue algo a la cola: con inotify (Linux, vía ctypes,
+  sin dependencias) el servicio se despierta en milisegundos; si inotify no está
+  disponible, comprueba el fichero .wakeup cada POLL_INTERVAL segundos.
+
+Al abrir la cola se importan los ficheros JSON de versiones anteriores (los de
+errors/ van a dead_letter).
+
+No depende de Django ni de Flask. El directorio es WSTG_SYNC_QUEUE_DIR
+(default: /app/data/wstg_sync_queue).
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import re
+import select
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+QUEUE_DIR = Path(os.environ.get('WSTG_SYNC_QUEUE_DIR', '/app/data/wstg_sync_queue'))
+QUEUE_DB_NAME = 'queue.sqlite3'
+WAKEUP_FILE_NAME = '.wakeup'
+
+# Intervalo de comprobación cuando no hay inotify
+POLL_INTERVAL = 0.5
+# Ventana para agrupar ráfagas: tras el primer evento se espera esto antes de procesar
+BATCH_WINDOW = 0.05
+
+# Reintentos: backoff exponencial (segundos) y dead-letter al agotar los intentos
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 5
+BACKOFF_MAX = 3600
+# Tiempo durante el que un mensaje reservado no es visible para otros consumidores
+VISIBILITY_TIMEOUT = 300
+
+QUEUE_TYPES = {'tracker->dd': 'sync', 'dd->tracker': 'webhook'}
+# Tipo cuyos mensajes quedan obsoletos al aplicarse un cambio posterior del mismo wstg_id
+SUPERSEDABLE_TYPE = 'tracker->dd'
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+
+# Ficheros de versiones anteriores: sync_<timestamp>_<wstg_id>.json / webhook_<timestamp>.json
+_LEGACY_TIMESTAMP = re.compile(r'^[a-z]+_(\d+)')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    wstg_id TEXT,
+    enqueued_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    locked_until REAL,
+    locked_by TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_queue_available ON queue (available_at);
+CREATE INDEX IF NOT EXISTS idx_queue_wstg_id ON queue (wstg_id);
+
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    wstg_id TEXT,
+    enqueued_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    failed_at TEXT NOT NULL,
+    last_error TEXT
+);
+"""
+
+
+def backoff_delay(attempts):
+    """Espera antes del siguiente intento tras `attempts` intentos fallidos"""
+    return min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+
+
+class SyncQueue:
+    """Cola de sincronización en SQLite (una conexión compartida protegida por lock)"""
+
+    def __init__(self, queue_dir=None):
+        self.queue_dir = Path(queue_dir or QUEUE_DIR)
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.queue_dir / QUEUE_DB_NAME), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL: la web encola mientras el servicio consume sin bloquearse
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+        self._migrate_legacy_files()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE: la reserva de mensajes es atómica entre procesos
+        return _Transaction(self._conn)
+
+    def put(self, request_type, data, enqueued_at=None):
+        """Añade una solicitud y devuelve su id"""
+        if request_type not in QUEUE_TYPES:
+            raise ValueError(f"Tipo de solicitud desconocido: {request_type}")
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                'INSERT INTO queue (type, payload, wstg_id, enqueued_at, available_at) VALUES (?, ?, ?, ?, ?)',
+                (request_type, json.dumps(data), (data or {}).get('wstg_id'),
+                 enqueued_at or datetime.now().isoformat(), time.time()),
+            )
+        return cursor.lastrowid
+
+    def claim(self, consumer, limit=100, visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=None):
+        """
+        Reserva hasta `limit` mensajes disponibles (en orden de llegada) para `consumer`
+        y suma un intento a cada uno. Devuelve una lista de dicts
+        {'id', 'type', 'data', 'attempts', 'enqueued_at'}.
+
+        Los que ya tienen `max_attempts` intentos no se entregan: se reservaron tantas
+        veces sin llegar a ack()/fail() (el consumidor murió o se colgó procesándolos)
+        y pasan a dead_letter.
+        """
+        max_attempts = max_attempts or MAX_ATTEMPTS
+        now = time.time()
+        claimed = []
+        with self._lock, self._transaction():
+            rows = self._conn.execute(
+                'SELECT * FROM queue WHERE available_at <= ? AND (locked_until IS NULL OR locked_until <= ?) '
+                'ORDER BY id LIMIT ?', (now, now, limit),
+            ).fetchall()
+            for row in rows:
+                if row['attempts'] >= max_attempts:
+                    self._dead_letter(row, row['last_error'] or 'Reservado sin confirmarse en ningún intento '
+                                                                 '(el consumidor murió o se bloqueó)')
+                else:
+                    claimed.append(row)
+            self._conn.executemany(
+                'UPDATE queue SET attempts = attempts + 1, locked_until = ?, locked_by = ? WHERE id = ?',
+                [(now + visibility_timeout, consumer, row['id']) for row in claimed],
+            )
+        return [{'id': row['id'], 'type': row['type'], 'data': json.loads(row['payload']),
+                 'attempts': row['attempts'] + 1, 'enqueued_at': row['enqueued_at']} for row in claimed]
+
+    def ack(self, message_ids):
+        """
+        Borra los mensajes procesados y, por cada cambio del tracker confirmado, los
+        mensajes anteriores del mismo wstg_id (ya no deben aplicarse)
+        """
+        message_ids = list(message_ids)
+        if not message_ids:
+            return
+        with self._lock, self._transaction():
+            acked = []
+            for chunk in _chunks(message_ids):
+                acked.extend(self._conn.execute(
+                    f'SELECT id, wstg_id FROM queue WHERE id IN ({", ".join("?" for _ in chunk)}) '
+                    'AND type = ? AND wstg_id IS NOT NULL', (*chunk, SUPERSEDABLE_TYPE),
+                ).fetchall())
+            self._conn.executemany('DELETE FROM queue WHERE id = ?', [(message_id,) for message_id in message_ids])
+            self._conn.executemany(
+                'DELETE FROM queue WHERE type = ? AND wstg_id = ? AND id < ?',
+                [(SUPERSEDABLE_TYPE, row['wstg_id'], row['id']) for row in acked],
+            )
+
+    def supersede(self, wstg_id, up_to_id):
+        """
+        Borra los cambios del tracker de `wstg_id` con id <= `up_to_id`: se llama tras
+        aplicar directamente (sin la cola) un cambio más reciente. Devuelve cuántos.
+        """
+        if not wstg_id or not up_to_id:
+            return 0
+        with self._lock, self._transaction():
+            cursor = self._conn.execute('DELETE FROM queue WHERE type = ? AND wstg_id = ? AND id <= ?',
+                                        (SUPERSEDABLE_TYPE, wstg_id, up_to_id))
+        return cursor.rowcount
+
+    def last_id(self):
+        """Id del último mensaje en la cola (0 si está vacía); cota para supersede()"""
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM queue').fetchone()[0]
+
+    def queued(self, message_ids):
+        """Ids de `message_ids` que siguen en la cola (los demás se confirmaron o se sustituyeron)"""
+        message_ids = list(message_ids)
+        found = set()
+        with self._lock:
+            for chunk in _chunks(message_ids):
+                rows = self._conn.execute(
+                    f'SELECT id FROM queue WHERE id IN ({", ".join("?" for _ in chunk)})', chunk).fetchall()
+                found.update(row['id'] for row in rows)
+        return found
+
+    def release(self, message_ids, delay=0.0, error=None):
+        """
+        Devuelve mensajes reservados a la cola sin contar el intento (fallo de
+        infraestructura, no del mensaje); vuelven a estar disponibles tras `delay` segundos
+        """
+        message_ids = list(message_ids)
+        if not message_ids:
+            return
+        available_at = time.time() + delay
+        with self._lock, self._transaction():
+            self._conn.executemany(
+                'UPDATE queue SET attempts = MAX(attempts - 1, 0), available_at = ?, locked_until = NULL, '
+                'locked_by = NULL, last_error = COALESCE(?, last_error) WHERE id = ?',
+                [(available_at, error, message_id) for message_id in message_ids],
+            )
+
+    def fail(self, message_id, error, max_attempts=None):
+        """
+        Registra un fallo: reprograma el mensaje con backoff o, si ya agotó los
+        intentos, lo mueve a dead_letter. Devuelve True si acabó en dead_letter.
+        """
+        max_attempts = max_attempts or MAX_ATTEMPTS
+        with self._lock, self._transaction():
+            row = self._conn.execute('SELECT * FROM queue WHERE id = ?', (message_id,)).fetchone()
+            if row is None:
+                return False
+            if row['attempts'] >= max_attempts:
+                self._dead_letter(row, error)
+                return True
+            self._conn.execute(
+                'UPDATE queue SET available_at = ?, locked_until = NULL, locked_by = NULL, last_error = ? '
+                'WHERE id = ?', (time.time() + backoff_delay(row['attempts']), str(error), message_id),
+            )
+            return False
+
+    def _dead_letter(self, row, error):
+        """Mueve un mensaje a dead_letter (dentro de la transacción en curso)"""
+        self._conn.execute(
+            'INSERT INTO dead_letter (message_id, type, payload, wstg_id, enqueued_at, attempts, '
+            'failed_at, last_error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (row['id'], row['type'], row['payload'], row['wstg_id'], row['enqueued_at'],
+             row['attempts'], datetime.now().isoformat(), str(error)),
+        )
+        self._conn.execute('DELETE FROM queue WHERE id = ?', (row['id'],))
+
+    def pending(self):
+        """Mensajes que siguen en la cola (disponibles, reservados o esperando reintento)"""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM queue ORDER BY id').fetchall()
+        return [{'id': row['id'], 'type': row['type'], 'data': json.loads(row['payload']),
+                 'attempts': row['attempts'], 'last_error': row['last_error']} for row in rows]
+
+    def next_available_in(self):
+        """Segundos hasta que haya un mensaje disponible (0 si ya lo hay, None si la cola está vacía)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MIN(MAX(available_at, COALESCE(locked_until, 0))) FROM queue').fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def stats(self):
+        """
+        Estado de la cola para las métricas: {'depth', 'waiting', 'in_flight', 'retrying',
+        'dead_letter', 'oldest_enqueued_at', 'oldest_age_seconds'}. La antigüedad es la
+        del mensaje más antiguo que espera a un consumidor (sin contar los reservados ni
+        los que esperan un reintento).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COUNT(*) AS depth, '
+                'COALESCE(SUM(locked_until > ?), 0) AS in_flight, '
+                'COALESCE(SUM(available_at > ? AND (locked_until IS NULL OR locked_until <= ?)), 0) AS retrying '
+                'FROM queue', (now, now, now),
+            ).fetchone()
+            oldest = self._conn.execute(
+                'SELECT enqueued_at FROM queue WHERE available_at <= ? AND (locked_until IS NULL OR locked_until <= ?) '
+                'ORDER BY id LIMIT 1', (now, now),
+            ).fetchone()
+            dead = self._conn.execute('SELECT COUNT(*) FROM dead_letter').fetchone()[0]
+        oldest_enqueued_at = oldest['enqueued_at'] if oldest else None
+        oldest_age = None
+        if oldest_enqueued_at:
+            try:
+                oldest_age = max(0.0, (datetime.now() - datetime.fromisoformat(oldest_enqueued_at)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+        return {'depth': row['depth'], 'waiting': row['depth'] - row['in_flight'] - row['retrying'],
+                'in_flight': row['in_flight'], 'retrying': row['retrying'], 'dead_letter': dead,
+                'oldest_enqueued_at': oldest_enqueued_at, 'oldest_age_seconds': oldest_age}
+
+    def dead_letters(self, limit=100):
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM dead_letter ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        return [{'id': row['id'], 'message_id': row['message_id'], 'type': row['type'],
+                 'data': json.loads(row['payload']), 'attempts': row['attempts'], 'failed_at': row['failed_at'],
+                 'last_error': row['last_error']} for row in rows]
+
+    def requeue_dead(self, dead_ids=None):
+        """
+        Devuelve a la cola (como mensajes nuevos, con los intentos a cero) las entradas
+        de dead_letter indicadas o todas; las de tipo desconocido se quedan. Devuelve cuántas.
+        """
+        with self._lock, self._transaction():
+            rows = self._conn.execute('SELECT * FROM dead_letter ORDER BY id').fetchall()
+            if dead_ids is not None:
+                dead_ids = set(dead_ids)
+                rows = [row for row in rows if row['id'] in dead_ids]
+            rows = [row for row in rows if row['type'] in QUEUE_TYPES]
+            now = time.time()
+            for row in rows:
+                self._conn.execute(
+                    'INSERT INTO queue (type, payload, wstg_id, enqueued_at, available_at) VALUES (?, ?, ?, ?, ?)',
+                    (row['type'], row['payload'], row['wstg_id'], row['enqueued_at'], now),
+                )
+                self._conn.execute('DELETE FROM dead_letter WHERE id = ?', (row['id'],))
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _migrate_legacy_files(self):
+        """Importa los ficheros JSON de la cola anterior (y errors/ a dead_letter)"""
+        legacy = sorted(self.queue_dir.glob('*.json'), key=_legacy_order_key)
+        error_dir = self.queue_dir / 'errors'
+        dead = sorted(error_dir.glob('*.json'), key=_legacy_order_key) if error_dir.is_dir() else []
+        for path in legacy + dead:
+            # Se renombra antes de importarlo: si otro proceso abre la cola a la vez, solo uno lo importa
+            claimed = path.with_name(f'.{path.name}.migrating')
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            try:
+                with open(claimed, 'r', encoding='utf-8') as f:
+                    request_data = json.load(f)
+                request_type = request_data.get('type')
+                data = request_data.get('data') or {}
+                enqueued_at = request_data.get('timestamp')
+            except (OSError, ValueError, AttributeError):
+                request_type, data, enqueued_at = None, {}, None
+            if path.parent == error_dir or request_type not in QUEUE_TYPES or not isinstance(data, dict):
+                with self._lock, self._transaction():
+                    self._conn.execute(
+                        'INSERT INTO dead_letter (type, payload, wstg_id, enqueued_at, attempts, failed_at, '
+                        'last_error) VALUES (?, ?, ?, ?, 0, ?, ?)',
+                        (str(request_type), json.dumps(data), data.get('wstg_id') if isinstance(data, dict) else None,
+                         enqueued_at or datetime.now().isoformat(), datetime.now().isoformat(),
+                         f'Migrado de la cola de ficheros ({path.name})'),
+                    )
+            else:
+                self.put(request_type, data, enqueued_at=enqueued_at)
+            claimed.unlink()
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def _chunks(items, size=500):
+    """Trocea una lista para no superar el límite de parámetros de SQLite"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _legacy_order_key(path):
+    match = _LEGACY_TIMESTAMP.match(path.name)
+    stamp = int(match.group(1)) if match else 0
+    # Nombres en milisegundos y en nanosegundos: se pasan a ns para ordenarlos juntos
+    if stamp and stamp < 10 ** 15:
+        stamp *= 1_000_000
+    return stamp, path.name
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(queue_dir=None):
+    """SyncQueue compartida dentro del proceso para cada directorio"""
+    queue_dir = str(Path(queue_dir or QUEUE_DIR))
+    with _queues_lock:
+        queue = _queues.get(queue_dir)
+        if queue is None:
+            queue = _queues[queue_dir] = SyncQueue(queue_dir)
+        return queue
+
+
+def _ring(queue_dir):
+    """Despierta a los consumidores: publica .wakeup con os.replace (IN_MOVED_TO)"""
+    wakeup = queue_dir / WAKEUP_FILE_NAME
+    tmp_path = queue_dir / f'{WAKEUP_FILE_NAME}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        tmp_path.write_text(str(time.time_ns()))
+        os.replace(tmp_path, wakeup)
+    except OSError:
+        # El consumidor también revisa la cola periódicamente
+        pass
+
+
+def enqueue(request_type, data, queue_dir=None):
+    """Encola una solicitud ('tracker->dd' o 'dd->tracker') y devuelve su id"""
+    queue = get_queue(queue_dir)
+    message_id = queue.put(request_type, data)
+    _ring(queue.queue_dir)
+    return message_id
+
+
+def pending(queue_dir=None):
+    """Mensajes que siguen en la cola, del más antiguo al más reciente"""
+    return get_queue(queue_dir).pending()
+
+
+class QueueWatcher:
+    """Espera la llegada de mensajes a la cola (inotify con fallback a polling)"""
+
+    def __init__(self, queue_dir=None, poll_interval=POLL_INTERVAL, use_inotify=True):
+        self.queue_dir = Path(queue_dir or QUEUE_DIR)
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self._fd = self._init_inotify() if use_inotify else None
+        # Polling: última versión vista de .wakeup
+        self._last_wakeup = self._wakeup_stamp()
+
+    @property
+    def mode(self):
+        return 'inotify' if self._fd is not None else 'polling'
+
+    def _init_inotify(self):
+        if not hasattr(os, 'O_NONBLOCK'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            wd = libc.inotify_add_watch(fd, os.fsencode(self.queue_dir), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+            if wd < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _wakeup_stamp(self):
+        try:
+            stat = os.stat(self.queue_dir / WAKEUP_FILE_NAME)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def wait(self, timeout):
+        """
+        Bloquea hasta que se encole algo o pasen `timeout` segundos. Devuelve True si
+        llegó algo. Tras el primer evento espera BATCH_WINDOW para que una ráfaga se
+        procese en una sola pasada.
+
+        Los eventos que llegan mientras se procesa la cola quedan en el descriptor de
+        inotify (o en la comparación de .wakeup del polling): no se pierden.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._fd is not None:
+                ready, _, _ = select.select([self._fd], [], [], remaining)
+                if ready:
+                    time.sleep(BATCH_WINDOW)
+                    self._drain()
+                    return True
+            else:
+                time.sleep(min(self.poll_interval, remaining))
+                stamp = self._wakeup_stamp()
+                if stamp != self._last_wakeup:
+                    self._last_wakeup = stamp
+                    return True
+
+    def _drain(self):
+        if self._fd is None:
+            return
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,316 @@
+"""
+Persistencia de la sincronización WSTG ↔ DefectDojo en SQLite
+
+WstgStateStore guarda en data/wstg_sync_state.sqlite3:
+
+- items: un registro por WSTG ID (finding, estado WSTG, estado en DefectDojo, última
+  sincronización). La columna `conflict` se calcula al escribir (is_conflict), de modo
+  que el estado de /api/wstg/status son unos COUNT sobre índices.
+- sync_log: historial de sincronizaciones (solo INSERT; se poda por encima de
+  SYNC_LOG_MAX_ROWS).
+- meta: valores JSON por clave (p. ej. la marca de agua de la sincronización
+  incremental desde DefectDojo).
+
+La aplicación web y el servicio de sincronización (contenedor de DefectDojo) comparten
+la BD a través de ./data: cada escritura es un UPSERT de los items afectados en su
+propia transacción (WAL + busy_timeout), así que un escritor ya no pisa los cambios
+del otro como ocurría al reescribir el JSON completo.
+
+Al abrir una BD vacía se importan los ficheros de versiones anteriores
+(wstg_sync_state.json con 'items'/'sync_log' y wstg_sync_journal.jsonl con sus
+copias rotadas .1/.2/.3, de la más antigua a la más reciente), que se renombran
+a *.migrated.
+
+No depende de Django ni de Flask. El directorio de datos es WSTG_SYNC_DATA_DIR
+(default: /app/data).
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+SYNC_DATA_DIR = Path(os.environ.get('WSTG_SYNC_DATA_DIR', '/app/data'))
+SYNC_STATE_DB = SYNC_DATA_DIR / 'wstg_sync_state.sqlite3'
+LEGACY_STATE_FILE = SYNC_DATA_DIR / 'wstg_sync_state.json'
+LEGACY_JOURNAL_FILE = SYNC_DATA_DIR / 'wstg_sync_journal.jsonl'
+
+SYNC_LOG_MAX_ROWS = 10000
+# La poda del historial se hace una vez cada SYNC_LOG_PRUNE_EVERY inserciones
+SYNC_LOG_PRUNE_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    wstg_id TEXT PRIMARY KEY,
+    finding_id INTEGER,
+    wstg_status TEXT,
+    defectdojo_status TEXT,
+    last_sync_timestamp TEXT,
+    last_sync_direction TEXT,
+    event TEXT,
+    conflict INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_items_wstg_status ON items (wstg_status);
+CREATE INDEX IF NOT EXISTS idx_items_direction ON items (last_sync_direction);
+CREATE INDEX IF NOT EXISTS idx_items_synced ON items (last_sync_timestamp);
+CREATE INDEX IF NOT EXISTS idx_items_conflict ON items (conflict);
+
+CREATE TABLE IF NOT EXISTS sync_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    wstg_id TEXT,
+    direction TEXT,
+    old_status TEXT,
+    new_status TEXT,
+    success INTEGER NOT NULL,
+    error_message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sync_log_direction ON sync_log (direction);
+CREATE INDEX IF NOT EXISTS idx_sync_log_wstg_id ON sync_log (wstg_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+ITEM_COLUMNS = ('finding_id', 'wstg_status', 'defectdojo_status', 'last_sync_timestamp',
+                'last_sync_direction', 'event')
+LOG_COLUMNS = ('timestamp', 'wstg_id', 'direction', 'old_status', 'new_status', 'success',
+               'error_message')
+
+
+def is_conflict(wstg_status, defectdojo_status):
+    """Estado del tracker incoherente con el del finding en DefectDojo"""
+    if not wstg_status or not defectdojo_status:
+        return False
+    return ((wstg_status == 'Done' and defectdojo_status != 'verified')
+            or (wstg_status == 'In Progress' and defectdojo_status != 'active'))
+
+
+class WstgStateStore:
+    """Estado de la sincronización WSTG en SQLite (una conexión compartida protegida por lock)"""
+
+    def __init__(self, db_path=None):
+        db_path = str(db_path or SYNC_STATE_DB)
+        self.db_path = db_path
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if db_path != ':memory:':
+                # WAL: los lectores (web) no bloquean al escritor (servicio) ni al revés
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        if db_path != ':memory:':
+            self._migrate_legacy_files(Path(db_path).parent)
+
+    # -- items ---------------------------------------------------------------
+
+    def upsert_item(self, wstg_id, **fields):
+        """
+        Crea o actualiza un item (solo las columnas indicadas) y recalcula `conflict`.
+        Devuelve el wstg_status anterior (None si el item no existía).
+        """
+        return self.upsert_items({wstg_id: fields})[wstg_id]
+
+    def upsert_items(self, items):
+        """UPSERT de {wstg_id: campos} en una transacción; devuelve {wstg_id: wstg_status anterior}"""
+        previous = {}
+        with self._lock, self._conn:
+            for wstg_id, fields in items.items():
+                unknown = set(fields) - set(ITEM_COLUMNS)
+                if unknown:
+                    raise ValueError(f"Columnas desconocidas: {sorted(unknown)}")
+                row = self._conn.execute(
+                    'SELECT wstg_status, defectdojo_status FROM items WHERE wstg_id = ?', (wstg_id,)
+                ).fetchone()
+                previous[wstg_id] = row['wstg_status'] if row else None
+                wstg_status = fields.get('wstg_status', row['wstg_status'] if row else None)
+                dd_status = fields.get('defectdojo_status', row['defectdojo_status'] if row else None)
+                values = dict(fields, conflict=int(is_conflict(wstg_status, dd_status)))
+                columns = ', '.join(values)
+                placeholders = ', '.join('?' for _ in values)
+                updates = ', '.join(f'{name} = excluded.{name}' for name in values)
+                self._conn.execute(
+                    f'INSERT INTO items (wstg_id, {columns}) VALUES (?, {placeholders}) '
+                    f'ON CONFLICT (wstg_id) DO UPDATE SET {updates}',
+                    (wstg_id, *values.values()),
+                )
+        return previous
+
+    def get_item(self, wstg_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM items WHERE wstg_id = ?', (wstg_id,)).fetchone()
+        return _item_dict(row) if row else None
+
+    def items(self):
+        """Todos los items {wstg_id: {...}}"""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM items ORDER BY wstg_id').fetchall()
+        return {row['wstg_id']: _item_dict(row) for row in rows}
+
+    def get_items(self, wstg_ids):
+        """Items de los WSTG ID indicados {wstg_id: {...}} (los que no existen no aparecen)"""
+        wstg_ids = list(dict.fromkeys(wstg_ids))
+        found = {}
+        with self._lock:
+            # Por bloques: SQLite limita el número de parámetros de una consulta
+            for start in range(0, len(wstg_ids), 500):
+                chunk = wstg_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f'SELECT * FROM items WHERE wstg_id IN ({", ".join("?" for _ in chunk)})', chunk
+                ).fetchall()
+                found.update((row['wstg_id'], _item_dict(row)) for row in rows)
+        return found
+
+    def conflicts(self):
+        """Items en conflicto (índice sobre `conflict`)"""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM items WHERE conflict = 1 ORDER BY wstg_id').fetchall()
+        return {row['wstg_id']: _item_dict(row) for row in rows}
+
+    def status_counts(self):
+        """{'total_items', 'synced_items', 'conflicts'} con COUNT sobre índices"""
+        with self._lock:
+            total = self._conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+            synced = self._conn.execute(
+                'SELECT COUNT(*) FROM items WHERE last_sync_timestamp IS NOT NULL').fetchone()[0]
+            conflicts = self._conn.execute('SELECT COUNT(*) FROM items WHERE conflict = 1').fetchone()[0]
+        return {'total_items': total, 'synced_items': synced, 'conflicts': conflicts}
+
+    # -- sync_log ------------------------------------------------------------
+
+    def log_sync(self, entry):
+        """Añade una entrada al historial (dict con las claves de LOG_COLUMNS)"""
+        self.log_syncs([entry])
+
+    def log_syncs(self, entries):
+        rows = [_log_row(entry) for entry in entries]
+        if not rows:
+            return
+        insert = (f'INSERT INTO sync_log ({", ".join(LOG_COLUMNS)}) '
+                  f'VALUES ({", ".join("?" for _ in LOG_COLUMNS)})')
+        with self._lock, self._conn:
+            before = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM sync_log').fetchone()[0]
+            self._conn.executemany(insert, rows)
+            last_id = before + len(rows)
+            if last_id // SYNC_LOG_PRUNE_EVERY != before // SYNC_LOG_PRUNE_EVERY:
+                self._conn.execute('DELETE FROM sync_log WHERE id <= ?', (last_id - SYNC_LOG_MAX_ROWS,))
+
+    def last_sync(self):
+        """Timestamp de la última sincronización registrada (None si no hay)"""
+        with self._lock:
+            row = self._conn.execute('SELECT timestamp FROM sync_log ORDER BY id DESC LIMIT 1').fetchone()
+        return row['timestamp'] if row else None
+
+    def recent_syncs(self, limit=10):
+        """Últimas `limit` entradas del historial (de la más antigua a la más reciente)"""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM sync_log ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        entries = []
+        for row in reversed(rows):
+            entry = {column: row[column] for column in LOG_COLUMNS}
+            entry['success'] = bool(entry['success'])
+            entries.append(entry)
+        return entries
+
+    # -- meta ----------------------------------------------------------------
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+                (key, json.dumps(value)),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -- migración -----------------------------------------------------------
+
+    def _migrate_legacy_files(self, data_dir):
+        """
+        Importa wstg_sync_state.json / wstg_sync_journal.jsonl (y sus copias rotadas)
+        si la BD está vacía
+        """
+        state_file = data_dir / LEGACY_STATE_FILE.name
+        # Copias rotadas (.N es más antigua cuanto mayor es N) y después el fichero vivo
+        journal_files = sorted(
+            (path for path in data_dir.glob(f'{LEGACY_JOURNAL_FILE.name}.*') if path.suffix[1:].isdigit()),
+            key=lambda path: int(path.suffix[1:]), reverse=True,
+        )
+        journal_files.append(data_dir / LEGACY_JOURNAL_FILE.name)
+        journal_files = [path for path in journal_files if path.exists()]
+        if not state_file.exists() and not journal_files:
+            return
+        with self._lock:
+            empty = self._conn.execute(
+                'SELECT NOT EXISTS (SELECT 1 FROM items) AND NOT EXISTS (SELECT 1 FROM sync_log)'
+            ).fetchone()[0]
+        if not empty:
+            return
+
+        state = {}
+        if state_file.exists():
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                pass
+        if not isinstance(state, dict):
+            state = {}
+        self.upsert_items({
+            wstg_id: {key: value for key, value in item.items() if key in ITEM_COLUMNS}
+            for wstg_id, item in state.get('items', {}).items()
+        })
+        entries = list(state.get('sync_log', []))
+        for journal_file in journal_files:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        self.log_syncs(entries[-SYNC_LOG_MAX_ROWS:])
+
+        for path in (state_file, *journal_files):
+            if path.exists():
+                os.replace(path, path.with_name(f'{path.name}.migrated'))
+
+
+def _item_dict(row):
+    item = {column: row[column] for column in ITEM_COLUMNS if row[column] is not None}
+    item['conflict'] = bool(row['conflict'])
+    return item
+
+
+def _log_row(entry):
+    values = dict(entry)
+    values.setdefault('timestamp', datetime.now().isoformat())
+    values['success'] = int(bool(values.get('success')))
+    return tuple(values.get(column) for column in LOG_COLUMNS)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(db_path=None):
+    """WstgStateStore compartido dentro del proceso para cada ruta de BD"""
+    db_path = str(db_path or SYNC_STATE_DB)
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = WstgStateStore(db_path)
+        return store
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Worker persistente de sincronización WSTG (socket Unix)
+
+Antes, cada cambio del tracker ejecutaba `docker compose exec defectdojo python
+wstg_sync_handler.py ...`: exec en el contenedor + django.setup() completo por
+petición (segundos). El servicio wstg-sync ya tiene Django inicializado, así que
+atiende además peticiones por un socket Unix en el directorio compartido ./data
+(WSTG_SYNC_SOCKET, default: /app/data/run/wstg_sync.sock) y cada sincronización
+cuesta una llamada local (milisegundos).
+
+Protocolo: una petición por conexión, una línea JSON en cada sentido.
+    → {"command": "sync_from_tracker", "data": {...}}
+    ← {"success": true, ...}
+
+Comandos: ping, sync_from_tracker, sync_from_defectdojo, status.
+
+La aplicación web usa call() (desde defectdojo_ops) y, si el socket no existe o
+no responde, recurre al subproceso de siempre.
+
+Worker de pruebas sin DefectDojo (respuestas sintéticas, mismo protocolo):
+    python app/wstg_sync_worker.py --stub --socket /tmp/wstg_sync.sock
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from datetime import datetime
+
+SOCKET_PATH = os.environ.get('WSTG_SYNC_SOCKET', '/app/data/run/wstg_sync.sock')
+
+# Tamaño máximo de una petición (los datos de un cambio del tracker ocupan unos cientos de bytes)
+MAX_REQUEST_BYTES = 1024 * 1024
+
+logger = logging.getLogger('wstg_sync_worker')
+
+
+class WorkerUnavailable(ConnectionError):
+    """No hay ningún worker escuchando en el socket"""
+
+
+class WorkerError(RuntimeError):
+    """El worker respondió con un error de protocolo"""
+
+
+def _read_line(sock, limit):
+    buffer = bytearray()
+    while b'\n' not in buffer:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > limit:
+            raise WorkerError('Mensaje demasiado grande')
+    return bytes(buffer).split(b'\n', 1)[0]
+
+
+def call(command, data=None, socket_path=None, timeout=10):
+    """
+    Envía una petición al worker y devuelve su respuesta (dict).
+
+    Lanza WorkerUnavailable si no hay worker, TimeoutError si no responde a tiempo
+    y WorkerError si la respuesta no es válida.
+    """
+    socket_path = socket_path or SOCKET_PATH
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise WorkerUnavailable(f"Worker de sincronización no disponible en {socket_path}: {e}") from e
+        sock.sendall(json.dumps({'command': command, 'data': data or {}}).encode('utf-8') + b'\n')
+        raw = _read_line(sock, MAX_REQUEST_BYTES)
+    if not raw:
+        raise WorkerError('El worker cerró la conexión sin responder')
+    try:
+        response = json.loads(raw)
+    except ValueError as e:
+        raise WorkerError('Respuesta no válida del worker de sincronización') from e
+    if not isinstance(response, dict):
+        raise WorkerError('Respuesta no válida del worker de sincronización')
+    return response
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.settimeout(self.server.request_timeout)
+        try:
+            request = json.loads(_read_line(self.request, MAX_REQUEST_BYTES))
+            command = request.get('command')
+            handler = self.server.handlers.get(command)
+            if handler is None:
+                response = {'success': False, 'error': f'Comando desconocido: {command}'}
+            else:
+                response = handler(request.get('data') or {})
+        except Exception as e:
+            logger.error(f"Error atendiendo petición del worker: {e}", exc_info=True)
+            response = {'success': False, 'error': str(e)}
+        finally:
+            if self.server.after_request:
+                self.server.after_request()
+        try:
+            self.request.sendall(json.dumps(response, default=str).encode('utf-8') + b'\n')
+        except OSError:
+            pass
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor del worker: un hilo por petición"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, handlers, after_request=None, request_timeout=30):
+        self.socket_path = socket_path
+        self.handlers = dict(handlers)
+        self.handlers.setdefault('ping', lambda data: {'success': True, 'pid': os.getpid()})
+        self.after_request = after_request
+        self.request_timeout = request_timeout
+        os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+        # Socket de una ejecución anterior que no se cerró limpiamente
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        super().__init__(socket_path, _RequestHandler)
+        # La web (UID 1000) y DefectDojo usan usuarios distintos; el acceso lo limita ./data
+        os.chmod(socket_path, 0o666)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def django_handlers():
+    """Comandos servidos con app/wstg_sync.py (requiere Django ya inicializado)"""
+    from app.wstg_sync import get_sync_status, sync_from_defectdojo, sync_from_tracker
+    return {
+        'sync_from_tracker': sync_from_tracker,
+        'sync_from_defectdojo': sync_from_defectdojo,
+        'status': lambda data: get_sync_status(),
+    }
+
+
+def django_after_request():
+    """Libera las conexiones de BD caducadas del hilo (como al final de una petición de Django)"""
+    from django.db import close_old_connections
+    close_old_connections()
+
+
+def stub_handlers():
+    """Respuestas sintéticas con el mismo formato, sin DefectDojo"""
+    from app.wstg_sync import validate_tracker_update
+    counter = {'finding_id': 0}
+    lock = threading.Lock()
+
+    def sync_from_tracker(data):
+        error = validate_tracker_update(data)
+        if error:
+            return {'success': False, 'error': error}
+        with lock:
+            counter['finding_id'] += 1
+            finding_id = counter['finding_id']
+        return {'success': True, 'finding_id': finding_id, 'action': 'updated',
+                'defectdojo_status': 'verified' if data['status'] == 'Done' else 'active',
+                'message': 'Finding updated correctamente (stub)'}
+
+    def sync_from_defectdojo(data):
+        finding = data.get('finding', {})
+        if not finding.get('id'):
+            return {'success': False, 'error': 'finding id is required'}
+        return {'success': True, 'wstg_id': finding.get('wstg_id', 'WSTG-STUB-01'),
+                'wstg_status': 'In Progress', 'message': 'Estado sincronizado con tracker (stub)'}
+
+    def status(data):
+        return {'last_sync': datetime.now().isoformat(), 'total_items': 0, 'synced_items': 0,
+                'pending_items': 0, 'conflicts': 0}
+
+    return {'sync_from_tracker': sync_from_tracker, 'sync_from_defectdojo': sync_from_defectdojo,
+            'status': status}
+
+
+def start_in_thread(server):
+    """Atiende peticiones en un hilo daemon (lo usa wstg_sync_service.py)"""
+    thread = threading.Thread(target=server.serve_forever, name='wstg-sync-worker', daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker persistente de sincronización WSTG')
+    parser.add_argument('--socket', default=SOCKET_PATH, help=f'Socket Unix (default: {SOCKET_PATH})')
+    parser.add_argument('--stub', action='store_true', help='Respuestas sintéticas, sin DefectDojo')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.stub:
+        handlers, after_request = stub_handlers(), None
+    else:
+        sys.path.insert(0, '/app')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dojo.settings.settings')
+        import django
+        django.setup()
+        handlers, after_request = django_handlers(), django_after_request
+
+    server = WorkerServer(args.socket, handlers, after_request=after_request)
+    # docker stop envía SIGTERM: cerrar el servidor y borrar el socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"Worker de sincronización WSTG escuchando en {args.socket}{' (stub)' if args.stub else ''}")
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -408,6 +408,7 @@ function Start-Update {
     if (Test-Path $scriptPath) {
         Write-Host "   Copiando script consolidado al contenedor..." -ForegroundColor Gray
         docker cp $scriptPath defectdojo:/tmp/manage_findings.py
+        docker cp (Join-Path $PSScriptRoot "scripts\findings_bulk.py") defectdojo:/tmp/findings_bulk.py
         
         Write-Host "   Ejecutando script consolidado en DefectDojo..." -ForegroundColor Gray
         Invoke-ProjectCompose --profile defectdojo exec -T defectdojo python3 /tmp/manage_findings.py
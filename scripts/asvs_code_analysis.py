@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análisis de código incremental para el informe ASVS (usado por generate_asvs_report.py)
+
+- Python se analiza con `ast`: funciones de validación/sanitización definidas o
+  llamadas, decoradores (rutas por blueprint, require_auth, require_role...),
+  cobertura de try/except por función, cabeceras HTTP de seguridad asignadas
+  (response.headers['X-Frame-Options'] = ...) y uso de CORS.
+- JavaScript se sigue analizando con heurísticas de texto (no hay parser en la
+  biblioteca estándar).
+- El resultado de cada fichero se guarda en una caché JSON indexada por ruta y
+  sha256 del contenido (data/cache/asvs_code_analysis.json): los ficheros sin
+  cambios no se vuelven a analizar. ANALYZER_VERSION invalida la caché cuando
+  cambian las reglas.
+- Los ficheros modificados se analizan en paralelo con un pool de procesos.
+
+Uso directo:
+    python scripts/asvs_code_analysis.py app scripts --jobs 4
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ANALYZER_VERSION = 1
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get('ASVS_CODE_ANALYSIS_CACHE', PROJECT_ROOT / 'data' / 'cache' / 'asvs_code_analysis.json')
+)
+
+SOURCE_SUFFIXES = ('.py', '.js')
+EXCLUDED_DIRS = {'__pycache__', 'node_modules', '.git', 'vendor', 'translations', 'languages'}
+
+# Por debajo de este número de ficheros pendientes no compensa arrancar el pool
+MIN_FILES_FOR_POOL = 4
+
+SECURITY_HEADERS = {
+    'x-frame-options',
+    'content-security-policy',
+    'x-content-type-options',
+    'x-xss-protection',
+    'strict-transport-security',
+    'referrer-policy',
+    'permissions-policy',
+    'access-control-allow-origin',
+}
+ROUTE_DECORATORS = {'route', 'get', 'post', 'put', 'patch', 'delete'}
+
+_JS_VALIDATION = re.compile(r'validate|parseFloat|parseInt', re.IGNORECASE)
+_JS_SANITIZATION = re.compile(r'sanitize|\btrim\b|\breplace\b', re.IGNORECASE)
+
+
+def _call_name(node):
+    """Nombre simple de una llamada o decorador (api.route(...) -> 'route')"""
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def _header_name(target):
+    """'X-Frame-Options' si target es algo.headers['X-Frame-Options']"""
+    if (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Attribute)
+            and target.value.attr == 'headers' and isinstance(target.slice, ast.Constant)
+            and isinstance(target.slice.value, str)):
+        return target.slice.value
+    return None
+
+
+def analyze_python_source(source, filename='<string>'):
+    """Hechos de seguridad de un módulo Python obtenidos con su AST"""
+    tree = ast.parse(source, filename=filename)
+    facts = {
+        'language': 'python',
+        'validation_functions': [],
+        'functions': 0,
+        'functions_with_try': 0,
+        'try_blocks': 0,
+        'routes': 0,
+        'decorators': {},
+        'security_headers': [],
+        'blueprint': False,
+        'cors': False,
+    }
+    validation = set()
+    headers = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            facts['functions'] += 1
+            if any(isinstance(child, ast.Try) and child.handlers for child in ast.walk(node)):
+                facts['functions_with_try'] += 1
+            if re.search(r'validat|sanitiz', node.name, re.IGNORECASE):
+                validation.add(node.name)
+            for decorator in node.decorator_list:
+                name = _call_name(decorator)
+                if name:
+                    facts['decorators'][name] = facts['decorators'].get(name, 0) + 1
+                    if name in ROUTE_DECORATORS and isinstance(decorator, ast.Call):
+                        facts['routes'] += 1
+        elif isinstance(node, ast.Try) and node.handlers:
+            facts['try_blocks'] += 1
+        elif isinstance(node, ast.Call):
+            name = _call_name(node)
+            if name and re.search(r'validat|sanitiz', name, re.IGNORECASE):
+                validation.add(name)
+            elif name == 'Blueprint':
+                facts['blueprint'] = True
+            elif name == 'CORS':
+                facts['cors'] = True
+            elif name in ('setdefault', 'set') and isinstance(node.func, ast.Attribute) \
+                    and isinstance(node.func.value, ast.Attribute) and node.func.value.attr == 'headers' \
+                    and node.args and isinstance(node.args[0], ast.Constant):
+                headers.add(str(node.args[0].value))
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                header = _header_name(target)
+                if header:
+                    headers.add(header)
+
+    facts['validation_functions'] = sorted(validation)
+    facts['security_headers'] = sorted(h for h in headers if h.lower() in SECURITY_HEADERS)
+    return facts
+
+
+def analyze_js_source(source, filename='<string>'):
+    """Heurísticas de validación y sanitización en el frontend"""
+    return {
+        'language': 'javascript',
+        'validation': bool(_JS_VALIDATION.search(source)),
+        'sanitization': bool(_JS_SANITIZATION.search(source)),
+    }
+
+
+def _analyze_file(path):
+    """Analiza un fichero (se ejecuta en los procesos del pool)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    if path.endswith('.py'):
+        return analyze_python_source(source, path)
+    return analyze_js_source(source, path)
+
+
+def iter_source_files(roots):
+    """Ficheros .py/.js bajo las raíces indicadas, en orden estable"""
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            yield root
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS and not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.endswith(SOURCE_SUFFIXES) and not filename.endswith('.min.js'):
+                    yield Path(dirpath) / filename
+
+
+class CodeAnalysisCache:
+    """Resultados por fichero indexados por sha256 del contenido (JSON en disco)"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        self.entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == ANALYZER_VERSION:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, key, digest):
+        entry = self.entries.get(key)
+        if entry and entry.get('sha256') == digest:
+            return entry['facts']
+        return None
+
+    def put(self, key, digest, facts):
+        self.entries[key] = {'sha256': digest, 'facts': facts}
+
+    def save(self, keep=None):
+        """Guarda la caché (atómico); `keep` descarta ficheros que ya no existen"""
+        if keep is not None:
+            self.entries = {key: value for key, value in self.entries.items() if key in keep}
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': ANALYZER_VERSION, 'files': self.entries}, f, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def analyze_tree(roots, base_dir=PROJECT_ROOT, cache_path=None, jobs=None):
+    """
+    Analiza los ficheros .py/.js de `roots` y devuelve (resultados, estadísticas).
+
+    resultados: {ruta relativa a base_dir: hechos del fichero (o {'error': ...})}
+    estadísticas: {'files', 'cached', 'analyzed', 'errors'}
+    """
+    cache = CodeAnalysisCache(cache_path)
+    base_dir = Path(base_dir)
+    results = {}
+    pending = {}
+    for path in iter_source_files(roots):
+        try:
+            key = path.resolve().relative_to(base_dir.resolve()).as_posix()
+        except ValueError:
+            key = path.as_posix()
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        facts = cache.get(key, digest)
+        if facts is not None:
+            results[key] = facts
+        else:
+            pending[key] = (str(path), digest)
+
+    stats = {'files': len(results) + len(pending), 'cached': len(results), 'analyzed': 0, 'errors': 0}
+    if pending:
+        keys = list(pending)
+        paths = [pending[key][0] for key in keys]
+        if len(paths) >= MIN_FILES_FOR_POOL and (jobs is None or jobs > 1):
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                outcomes = list(pool.map(_safe_analyze_file, paths, chunksize=4))
+        else:
+            outcomes = [_safe_analyze_file(path) for path in paths]
+        for key, (facts, error) in zip(keys, outcomes):
+            if error:
+                results[key] = {'error': error}
+                stats['errors'] += 1
+                continue
+            results[key] = facts
+            cache.put(key, pending[key][1], facts)
+            stats['analyzed'] += 1
+        cache.save(keep=set(results))
+    return results, stats
+
+
+def _safe_analyze_file(path):
+    try:
+        return _analyze_file(path), None
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def summarize(results):
+    """
+    Agrega los resultados por fichero en el formato de ASVSAnalyzer.code_analysis
+    (claves validation, error_handling, security_headers, api_rest... con la lista de
+    ficheros que las cumplen) más el detalle del análisis AST.
+    """
+    summary = {}
+    total_functions = functions_with_try = routes = 0
+    decorators = {}
+    headers = set()
+    for key, facts in sorted(results.items()):
+        filename = Path(key).name
+        language = facts.get('language')
+        if language == 'python':
+            if facts['validation_functions']:
+                summary.setdefault('validation', []).append(filename)
+            if facts['try_blocks']:
+                summary.setdefault('error_handling', []).append(filename)
+            if facts['security_headers'] or facts['cors']:
+                summary.setdefault('security_headers', []).append(filename)
+            if 'config' in filename.lower():
+                summary.setdefault('centralized_config', True)
+            total_functions += facts['functions']
+            functions_with_try += facts['functions_with_try']
+            routes += facts['routes']
+            headers.update(facts['security_headers'])
+            for name, count in facts['decorators'].items():
+                decorators[name] = decorators.get(name, 0) + count
+        elif language == 'javascript':
+            if facts['validation']:
+                summary.setdefault('frontend_validation', []).append(filename)
+            if facts['sanitization']:
+                summary.setdefault('frontend_sanitization', []).append(filename)
+
+    if routes:
+        summary['api_rest'] = True
+        summary['api_endpoints'] = routes
+    summary['ast'] = {
+        'functions': total_functions,
+        'functions_with_try': functions_with_try,
+        'try_coverage': round(functions_with_try / total_functions, 3) if total_functions else 0.0,
+        'security_headers': sorted(headers),
+        'decorators': dict(sorted(decorators.items())),
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Análisis de código para el informe ASVS')
+    parser.add_argument('roots', nargs='*', default=['app'], help='Directorios a analizar (default: app)')
+    parser.add_argument('--jobs', type=int, default=None, help='Procesos del pool (default: nº de CPU)')
+    parser.add_argument('--cache', default=None, help='Ruta de la caché (default: data/cache/asvs_code_analysis.json)')
+    args = parser.parse_args()
+
+    roots = [PROJECT_ROOT / root for root in args.roots]
+    results, stats = analyze_tree(roots, cache_path=args.cache, jobs=args.jobs)
+    print(json.dumps({'stats': stats, 'summary': summarize(results)}, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
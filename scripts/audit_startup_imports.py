@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Auditoría del tiempo de arranque de la aplicación (python -X importtime)
+
+Ejecuta `import app; app.create_app()` en un intérprete limpio con -X importtime,
+agrega el informe por módulo y muestra los imports más costosos. Sirve para
+vigilar que los módulos pesados y opcionales (Play Integrity, google-auth,
+requests, argon2, Swagger UI) solo se carguen en el primer uso.
+
+Uso:
+    python scripts/audit_startup_imports.py
+    python scripts/audit_startup_imports.py --top 30
+    python scripts/audit_startup_imports.py --budget-ms 1500 --forbid google.auth,requests
+    python scripts/audit_startup_imports.py --json
+
+Códigos de salida:
+    0 - dentro del presupuesto y sin módulos prohibidos
+    1 - presupuesto superado o se importó algún módulo prohibido
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+STARTUP_CODE = "import app; app.create_app()"
+
+# Módulos que no deben cargarse al arrancar con la configuración por defecto de tests
+DEFAULT_FORBIDDEN = [
+    "google.auth",
+    "google.oauth2",
+    "requests",
+    "argon2",
+    "app.play_integrity",
+    "app.api_docs",
+]
+
+
+def _run_importtime(code, env):
+    """Ejecuta `code` con -X importtime y devuelve [(profundidad, modulo, propio_us, acumulado_us)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(PROJECT_ROOT),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Error ejecutando el arranque: {result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # Formato: "import time: <propio> | <acumulado> | <sangría><módulo>"
+        self_part, cumulative_part, raw_name = line.split("|", 2)
+        # La sangría (2 espacios por nivel tras el separador) indica la profundidad
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        rows.append((depth, raw_name.strip(), int(self_part.split(":", 1)[1]), int(cumulative_part)))
+    return rows
+
+
+def measure_import_times(code=STARTUP_CODE, env=None):
+    """
+    Mide los imports que provoca `code` y devuelve (modulos, total_us).
+
+    modulos: {nombre: {"self_us": int, "cumulative_us": int}}
+    total_us: suma de los tiempos acumulados de los imports de primer nivel,
+              descontando los que hace el propio intérprete al arrancar (site, encodings...)
+    """
+    run_env = dict(os.environ)
+    run_env.setdefault("STORAGE_BACKEND", "memory")
+    run_env.setdefault("APP_TESTING", "1")
+    run_env.setdefault("API_DOCS_ENABLED", "0")
+    run_env.setdefault("FLASK_APP", "app")
+    if env:
+        run_env.update(env)
+
+    interpreter_modules = {name for _, name, _, _ in _run_importtime("pass", run_env)}
+
+    modules = {}
+    total_us = 0
+    for depth, name, self_us, cumulative_us in _run_importtime(code, run_env):
+        if name in interpreter_modules:
+            continue
+        modules[name] = {"self_us": self_us, "cumulative_us": cumulative_us}
+        if depth == 0:
+            total_us += cumulative_us
+    return modules, total_us
+
+
+def find_forbidden(modules, forbidden):
+    """Devuelve los módulos prohibidos (o submódulos suyos) que se importaron"""
+    loaded = []
+    for prefix in forbidden:
+        if any(name == prefix or name.startswith(prefix + ".") for name in modules):
+            loaded.append(prefix)
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoría de imports en el arranque de la app")
+    parser.add_argument("--top", type=int, default=20, help="Número de módulos a mostrar (default: 20)")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Presupuesto máximo de arranque en ms")
+    parser.add_argument(
+        "--forbid",
+        default=",".join(DEFAULT_FORBIDDEN),
+        help="Módulos que no deben importarse al arrancar (separados por comas)",
+    )
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    modules, total_us = measure_import_times()
+    forbidden = [m.strip() for m in args.forbid.split(",") if m.strip()]
+    loaded_forbidden = find_forbidden(modules, forbidden)
+    over_budget = args.budget_ms is not None and total_us / 1000 > args.budget_ms
+
+    if args.json:
+        print(json.dumps({
+            "total_ms": round(total_us / 1000, 1),
+            "budget_ms": args.budget_ms,
+            "forbidden_loaded": loaded_forbidden,
+            "modules": modules,
+        }))
+    else:
+        print(f"Tiempo total de imports en el arranque: {total_us / 1000:.1f} ms")
+        ranking = sorted(modules.items(), key=lambda item: item[1]["cumulative_us"], reverse=True)
+        print(f"\n{'acumulado (ms)':>15} {'propio (ms)':>12}  módulo")
+        for name, times in ranking[:args.top]:
+            print(f"{times['cumulative_us'] / 1000:>15.1f} {times['self_us'] / 1000:>12.1f}  {name}")
+        if loaded_forbidden:
+            print(f"\nMódulos que deberían cargarse de forma diferida: {', '.join(loaded_forbidden)}")
+        if over_budget:
+            print(f"\nPresupuesto superado: {total_us / 1000:.1f} ms > {args.budget_ms} ms")
+
+    return 1 if (loaded_forbidden or over_budget) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks del generador del informe ASVS (scripts/generate_asvs_report.py)
+
+queries: carga un conjunto sintético de findings en la BD de DefectDojo (dentro de
+una transacción que se deshace al terminar) y cuenta las consultas SQL que hace
+DefectDojoASVSConnector frente al patrón anterior (tags.all() y str(finding.test)
+por finding). Con el conector actual el número de consultas no depende del
+número de findings.
+
+Se ejecuta dentro del contenedor de DefectDojo:
+    docker compose --profile defectdojo exec defectdojo \\
+        python /app/scripts/benchmark_asvs_report.py queries --findings 10000
+
+Para una BD de pruebas local basta con DJANGO_SETTINGS_MODULE apuntando a unos
+settings de DefectDojo con SQLite o Postgres y las migraciones aplicadas.
+
+generator: mide ASVSReportGenerator sobre la estructura completa del ASVS 4.0.3
+(docs/OWASP Application Security Verification Standard 4.0.3-es.json) con findings
+sintéticos repartidos entre los CWE mapeados. No necesita DefectDojo:
+    python scripts/benchmark_asvs_report.py generator --findings 1000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_asvs_report import (ASVSAnalyzer, ASVSReportGenerator, DefectDojoASVSConnector,  # noqa: E402
+                                  ASVS_403_JSON_PATH, load_asvs_403_structure, load_asvs_structure)
+from app.wstg_catalogue import WSTG_ID_PATTERN  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+BENCHMARK_PRODUCT = 'ASVS Benchmark Product'
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción con los datos sintéticos"""
+
+
+def _legacy_findings_rows(queryset):
+    """Patrón anterior: tags y nombre del test resueltos fila a fila (N+1)"""
+    rows = []
+    for finding in queryset.select_related('test', 'test__engagement'):
+        tags = [tag.name for tag in finding.tags.all()]
+        wstg_id = next((tag.name for tag in finding.tags.all() if tag.name.startswith('WSTG-')), None)
+        if not wstg_id:
+            match = WSTG_ID_PATTERN.search(finding.title)
+            wstg_id = match.group(0) if match else None
+        rows.append((finding.id, str(finding.test), wstg_id, tags))
+    return rows
+
+
+def _create_findings(product_name, count):
+    """Crea producto, engagement WSTG, test y `count` findings con tags WSTG (bulk)"""
+    from dojo.models import (Development_Environment, Engagement, Finding, Product, Product_Type,
+                             Test, Test_Type, User)
+
+    user = User.objects.filter(is_superuser=True).first() or User.objects.create(username='asvs-benchmark')
+    product_type, _ = Product_Type.objects.get_or_create(name='ASVS Benchmark')
+    product = Product.objects.create(name=product_name, description='Benchmark', prod_type=product_type)
+    engagement = Engagement.objects.create(
+        name='WSTG Security Testing', product=product, target_start=date.today(),
+        target_end=date.today(), status='In Progress', lead=user,
+    )
+    test = Test.objects.create(
+        engagement=engagement,
+        test_type=Test_Type.objects.get_or_create(name='WSTG')[0],
+        environment=Development_Environment.objects.get_or_create(name='Development')[0],
+        target_start=date.today(), target_end=date.today(), lead=user,
+    )
+    findings = Finding.objects.bulk_create(
+        Finding(
+            title=f'WSTG-INPV-{i % 20:02d}: finding sintético {i}',
+            description='Benchmark', mitigation='N/A', severity='Low', active=True,
+            verified=bool(i % 2), test=test, reporter=user,
+        )
+        for i in range(count)
+    )
+
+    # Tags en bloque a través de la tabla intermedia del TagField
+    tags_field = Finding._meta.get_field('tags')
+    tag_model = tags_field.related_model
+    wstg_tag = tag_model.objects.get_or_create(name='WSTG')[0]
+    id_tags = {code: tag_model.objects.get_or_create(name=f'WSTG-INPV-{code:02d}')[0] for code in range(20)}
+    through = tags_field.remote_field.through
+    source, target = tags_field.m2m_field_name(), tags_field.m2m_reverse_field_name()
+    through.objects.bulk_create(
+        [through(**{source: finding, target: tag})
+         for i, finding in enumerate(findings) for tag in (wstg_tag, id_tags[i % 20])],
+        batch_size=5000,
+    )
+    return product
+
+
+def _count_queries(func):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as captured:
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+    return len(captured.captured_queries), elapsed, result
+
+
+def benchmark_queries(sizes):
+    """Devuelve [(findings, consultas_antes, s_antes, consultas_ahora, s_ahora)] por tamaño"""
+    from django.db import transaction
+    from dojo.models import Finding
+
+    connector = DefectDojoASVSConnector()
+    if not connector.django_initialized:
+        raise SystemExit('DefectDojo no disponible (DJANGO_SETTINGS_MODULE / BD)')
+
+    results = []
+    for size in sizes:
+        try:
+            with transaction.atomic():
+                product = _create_findings(f'{BENCHMARK_PRODUCT} {size}', size)
+                legacy_qs = Finding.objects.filter(test__engagement__product=product, active=True,
+                                                   tags__name='WSTG').distinct()
+                legacy_queries, legacy_s, _ = _count_queries(lambda: _legacy_findings_rows(legacy_qs))
+                queries, seconds, rows = _count_queries(lambda: connector.get_wstg_findings(product))
+                assert len(rows) == size, f'{len(rows)} findings != {size}'
+                results.append((size, legacy_queries, legacy_s, queries, seconds))
+                raise _Rollback()
+        except _Rollback:
+            pass
+    return results
+
+
+def benchmark_generator(findings, repeat):
+    """Devuelve (requisitos L2, s por informe completo, s de la sección 4) con la estructura 4.0.3"""
+    asvs_data, _ = load_asvs_403_structure()
+    if not asvs_data:
+        raise SystemExit('No se pudo cargar la estructura ASVS 4.0.3')
+    requirements = sum(1 for meta in load_asvs_structure(ASVS_403_JSON_PATH).requirements.values()
+                       if 'L2' in meta['levels'])
+
+    analyzer = ASVSAnalyzer(PROJECT_ROOT)
+    cwes = ['CWE-20', 'CWE-1287', 'CWE-843', 'CWE-1021', 'CWE-703', 'CWE-942']
+    analyzer.defectdojo_data['findings'] = [
+        {'id': i, 'title': f'Finding sintético {i}', 'severity': 'Low', 'cwe': cwes[i % len(cwes)],
+         'verified': i % 3 == 0, 'false_p': False, 'description': '', 'mitigation': ''}
+        for i in range(findings)
+    ]
+    analyzer.analyze_code()
+    analyzer.check_asvs_requirements()
+    generator = ASVSReportGenerator(analyzer, PROJECT_ROOT)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        generator.generate_report()
+    report_s = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        generator._generate_section4()
+    section4_s = (time.perf_counter() - start) / repeat
+    return requirements, report_s, section4_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del generador del informe ASVS')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    queries = subparsers.add_parser('queries', help='Consultas SQL del conector de DefectDojo')
+    queries.add_argument('--findings', type=int, default=10000,
+                         help='Número de findings sintéticos (default: 10000)')
+    generator = subparsers.add_parser('generator', help='Tiempo de generación con la estructura ASVS 4.0.3')
+    generator.add_argument('--findings', type=int, default=1000,
+                           help='Número de findings sintéticos (default: 1000)')
+    generator.add_argument('--repeat', type=int, default=20, help='Repeticiones (default: 20)')
+    args = parser.parse_args()
+
+    if args.command == 'queries':
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dojo.settings.settings')
+        sizes = sorted({min(100, args.findings), args.findings})
+        print(f"{'findings':>10} {'consultas antes':>16} {'s antes':>9} {'consultas ahora':>16} {'s ahora':>9}")
+        for size, legacy_queries, legacy_s, new_queries, new_s in benchmark_queries(sizes):
+            print(f'{size:>10} {legacy_queries:>16} {legacy_s:>9.2f} {new_queries:>16} {new_s:>9.2f}')
+    elif args.command == 'generator':
+        requirements, report_s, section4_s = benchmark_generator(args.findings, max(1, args.repeat))
+        print(f'Requisitos ASVS 4.0.3 Nivel 2: {requirements}')
+        print(f'Informe completo: {report_s * 1000:.2f} ms')
+        print(f'Sección 4 (requisitos): {section4_s * 1000:.2f} ms '
+              f'({section4_s * 1e6 / max(1, requirements):.1f} µs/requisito)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Upsert en bloque de los findings de CWE en DefectDojo
+
+Lo usan manage_findings.py e init_defectdojo_internal.py (dentro del contenedor de
+DefectDojo, con Django ya inicializado). En lugar de varias consultas por CWE
+(duplicados en cada test, filter, delete, first(), create, found_by.add):
+
+1. Carga en una consulta todos los findings existentes de los CWE indicados
+2. Calcula en memoria qué borrar (duplicados del test y, opcionalmente, los de
+   otros tests), qué actualizar y qué crear
+3. Aplica delete/bulk_create/bulk_update y reasigna found_by con la tabla intermedia,
+   todo en una única transacción
+
+El número de consultas es constante: no crece con el número de findings ni de tests.
+"""
+from datetime import date
+
+# Campos que se sobrescriben en los findings existentes
+UPDATE_FIELDS = ['title', 'description', 'severity', 'mitigation', 'impact', 'references',
+                 'file_path', 'line', 'reporter']
+
+
+def _prepare(finding):
+    """Campos que Finding.save() calcula y bulk_create/bulk_update no ejecutan"""
+    if hasattr(finding, 'get_numerical_severity'):
+        finding.numerical_severity = finding.get_numerical_severity(finding.severity)
+    if hasattr(finding, 'compute_hash_code'):
+        finding.hash_code = finding.compute_hash_code()
+
+
+def upsert_findings(test, reporter, findings_data, severity_map=None, remove_from_other_tests=False,
+                    keep_earliest_date=False):
+    """
+    Crea o actualiza un finding por CWE en `test` y devuelve {nombre_cwe: Finding}.
+
+    findings_data: {'CWE-20': {'title', 'description', 'severity', 'cwe', 'active', 'verified',
+                   'mitigation', 'impact', 'references', 'file_path', 'line', ['created_date']}}
+    remove_from_other_tests: borra los findings con esos CWE en cualquier otro test
+    keep_earliest_date: al actualizar, adelanta `date` a created_date si es anterior
+    """
+    from django.db import transaction
+    from dojo.models import Finding
+
+    severity_map = severity_map or {}
+    by_cwe = {data['cwe']: (cwe_name, data) for cwe_name, data in findings_data.items()}
+    test_type = test.test_type
+
+    with transaction.atomic():
+        # 1. Todos los findings existentes de esos CWE (de este test o de todos)
+        existing = Finding.objects.filter(cwe__in=list(by_cwe))
+        if not remove_from_other_tests:
+            existing = existing.filter(test=test)
+        existing = list(existing.order_by('-id'))
+
+        # 2. Conjuntos de borrado/actualización en memoria (se conserva el más reciente del test)
+        kept = {}
+        delete_ids = []
+        deleted_other = {}
+        deleted_same = {}
+        for finding in existing:
+            if finding.test_id != test.id:
+                delete_ids.append(finding.id)
+                deleted_other[finding.cwe] = deleted_other.get(finding.cwe, 0) + 1
+            elif finding.cwe in kept:
+                delete_ids.append(finding.id)
+                deleted_same[finding.cwe] = deleted_same.get(finding.cwe, 0) + 1
+            else:
+                kept[finding.cwe] = finding
+        if delete_ids:
+            Finding.objects.filter(id__in=delete_ids).delete()
+
+        to_create = []
+        to_update = []
+        update_fields = list(UPDATE_FIELDS)
+        for cwe, (cwe_name, data) in by_cwe.items():
+            severity = severity_map.get(data['severity'], 'Medium')
+            finding = kept.get(cwe)
+            if finding is None:
+                finding = Finding(
+                    title=data['title'],
+                    description=data['description'],
+                    severity=severity,
+                    cwe=cwe,
+                    active=data['active'],
+                    verified=data['verified'],
+                    test=test,
+                    reporter=reporter,
+                    mitigation=data['mitigation'],
+                    impact=data['impact'],
+                    references=data['references'],
+                    file_path=data['file_path'],
+                    line=data.get('line'),
+                    date=data.get('created_date', date.today()),
+                )
+                to_create.append(finding)
+            else:
+                for field, value in (('title', data['title']), ('description', data['description']),
+                                     ('severity', severity), ('mitigation', data['mitigation']),
+                                     ('impact', data['impact']), ('references', data['references']),
+                                     ('file_path', data['file_path']), ('line', data.get('line')),
+                                     ('reporter', reporter)):
+                    setattr(finding, field, value)
+                if keep_earliest_date and data.get('created_date') and finding.date \
+                        and finding.date > data['created_date']:
+                    finding.date = data['created_date']
+                to_update.append(finding)
+            _prepare(finding)
+
+        # 3. Escrituras en bloque
+        if keep_earliest_date:
+            update_fields.append('date')
+        if hasattr(Finding, 'get_numerical_severity'):
+            update_fields.append('numerical_severity')
+        if hasattr(Finding, 'compute_hash_code'):
+            update_fields.append('hash_code')
+        if to_create:
+            Finding.objects.bulk_create(to_create)
+        if to_update:
+            Finding.objects.bulk_update(to_update, update_fields)
+
+        # found_by = [test_type] para todos, con la tabla intermedia (2 consultas)
+        upserted = to_create + to_update
+        if test_type and upserted:
+            found_by = Finding._meta.get_field('found_by')
+            through = found_by.remote_field.through
+            source, target = found_by.m2m_field_name(), found_by.m2m_reverse_field_name()
+            finding_ids = [finding.id for finding in upserted]
+            through.objects.filter(**{f'{source}_id__in': finding_ids}).delete()
+            through.objects.bulk_create([
+                through(**{f'{source}_id': finding_id, f'{target}_id': test_type.id}) for finding_id in finding_ids
+            ])
+
+    created_ids = {finding.id for finding in to_create}
+    upserted_by_cwe = {finding.cwe: finding for finding in upserted}
+    result = {}
+    for cwe_name, data in findings_data.items():
+        finding = upserted_by_cwe[data['cwe']]
+        parts = []
+        if deleted_other.get(finding.cwe):
+            parts.append(f"{deleted_other[finding.cwe]} de otros tests")
+        if deleted_same.get(finding.cwe):
+            parts.append(f"{deleted_same[finding.cwe]} del mismo test")
+        if parts:
+            print(f"  🗑️  {cwe_name}: Eliminados {' y '.join(parts)} duplicados")
+        action = "creado" if finding.id in created_ids else "actualizado"
+        print(f"  {'✓' if action == 'creado' else '🔄'} {cwe_name} {action} (ID: {finding.id})")
+        result[cwe_name] = finding
+    return result
@@ -18,55 +18,54 @@ El script:
 2. Obtiene findings reales del producto
 3. Analiza el código fuente de la aplicación (complementario)
 4. Mapea findings a requisitos ASVS 4.0.3 Nivel 2
-5. Genera el informe Markdown automáticamente
+5. Genera el informe Markdown automáticamente: las secciones se renderizan en
+   paralelo y se escriben en orden; las que no cambian se reutilizan de la
+   ejecución anterior (data/cache/asvs_report_sections.json)
 6. El script generate_pdf_report.py luego lo convierte a PDF
+
+Uso:
+    python scripts/generate_asvs_report.py
+    python scripts/generate_asvs_report.py --sections asvs,wstg
+    python scripts/generate_asvs_report.py --no-section-cache
 """
 
+import argparse
+import hashlib
+import io
 import os
 import sys
-import ast
-import re
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional
 
-# Cargar estructura completa del ASVS 4.0.3 desde el JSON
-ASVS_403_JSON_PATH = Path(__file__).parent.parent / 'docs' / 'OWASP Application Security Verification Standard 4.0.3-es.json'
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.asvs_structure import load_asvs_structure  # noqa: E402
+from app.wstg_catalogue import WSTG_CATEGORIES, find_wstg_id, wstg_category  # noqa: E402
+from asvs_code_analysis import analyze_tree, summarize  # noqa: E402
+
+# Cargar estructura completa del ASVS 4.0.3 desde el JSON (precompilada en caché por app/asvs_structure.py)
+ASVS_403_JSON_PATH = PROJECT_ROOT / 'docs' / 'OWASP Application Security Verification Standard 4.0.3-es.json'
 ASVS_403_DATA = None
 ASVS_403_HIERARCHY = {}
+ASVS_403_STRUCTURE = None
 
 def load_asvs_403_structure():
-    """Cargar la estructura completa del ASVS 4.0.3 desde el JSON"""
-    global ASVS_403_DATA, ASVS_403_HIERARCHY
+    """Cargar la estructura completa del ASVS 4.0.3 (caché por hash del JSON)"""
+    global ASVS_403_DATA, ASVS_403_HIERARCHY, ASVS_403_STRUCTURE
     
     if ASVS_403_DATA is not None:
         return ASVS_403_DATA, ASVS_403_HIERARCHY
     
     try:
-        with open(ASVS_403_JSON_PATH, 'r', encoding='utf-8') as f:
-            ASVS_403_DATA = json.load(f)
-        
-        # Construir jerarquía desde el JSON
-        ASVS_403_HIERARCHY = {}
-        for category in ASVS_403_DATA.get('Requirements', []):
-            cat_code = category['Shortcode']
-            ASVS_403_HIERARCHY[cat_code] = {
-                'name': category.get('Name', category.get('ShortName', '')),
-                'subcategories': {}
-            }
-            
-            for subcat in category.get('Items', []):
-                subcat_code = subcat['Shortcode']
-                ASVS_403_HIERARCHY[cat_code]['subcategories'][subcat_code] = {
-                    'name': subcat.get('Name', ''),
-                    'requirements': []
-                }
-                
-                for req in subcat.get('Items', []):
-                    req_code = req['Shortcode']
-                    ASVS_403_HIERARCHY[cat_code]['subcategories'][subcat_code]['requirements'].append(req_code)
-        
+        ASVS_403_STRUCTURE = load_asvs_structure(ASVS_403_JSON_PATH)
+        ASVS_403_DATA = ASVS_403_STRUCTURE.data
+        ASVS_403_HIERARCHY = ASVS_403_STRUCTURE.hierarchy
         return ASVS_403_DATA, ASVS_403_HIERARCHY
     except Exception as e:
         print(f"⚠️  Error cargando estructura ASVS 4.0.3: {e}")
@@ -173,34 +172,52 @@ class DefectDojoASVSConnector:
         
         return None
     
+    # Campos de Finding que necesita el informe (proyección única, sin N+1 por fila)
+    FINDING_FIELDS = (
+        'id', 'title', 'severity', 'cwe', 'description', 'mitigation', 'verified', 'false_p',
+        'test__id', 'test__title', 'test__test_type__name',
+    )
+
+    @staticmethod
+    def _findings_queryset(queryset):
+        """Proyecta los campos del informe y precarga los tags en una sola consulta adicional"""
+        return (
+            queryset
+            .select_related('test__test_type')
+            .only(*DefectDojoASVSConnector.FINDING_FIELDS)
+            .prefetch_related('tags')
+        )
+
+    @staticmethod
+    def _test_name(finding):
+        """Nombre del test equivalente a str(Test) sin consultas adicionales"""
+        test = finding.test
+        if test is None:
+            return None
+        test_type = test.test_type.name if test.test_type else None
+        if test.title:
+            return f"{test.title} ({test_type})"
+        return test_type or (f"Test #{test.id}" if test.id else None)
+
     def get_findings_for_asvs(self, product):
         """Obtener findings relacionados con ASVS (excluyendo WSTG)"""
         if not self.django_initialized or not product:
             return []
         
         try:
-            from dojo.models import Finding, Test, Engagement
-            
-            # Obtener todos los engagements del producto EXCEPTO WSTG
-            engagements = Engagement.objects.filter(product=product).exclude(name='WSTG Security Testing')
-            tests = Test.objects.filter(engagement__in=engagements)
+            from dojo.models import Finding
             
-            # Obtener findings activos (excluyendo los que tienen tag WSTG)
-            findings = Finding.objects.filter(
-                test__in=tests,
-                active=True
-            ).exclude(tags__name='WSTG').select_related('test', 'test__engagement')
+            # Findings activos de todos los engagements del producto EXCEPTO WSTG
+            # (excluyendo los que tienen tag WSTG)
+            findings = self._findings_queryset(
+                Finding.objects.filter(
+                    test__engagement__product=product,
+                    active=True
+                ).exclude(test__engagement__name='WSTG Security Testing').exclude(tags__name='WSTG')
+            )
             
             findings_data = []
             for finding in findings:
-                # Obtener nombre del test de forma segura
-                test_name = None
-                if finding.test:
-                    try:
-                        test_name = str(finding.test)
-                    except:
-                        test_name = f"Test #{finding.test.id}" if finding.test.id else None
-                
                 findings_data.append({
                     'id': finding.id,
                     'title': finding.title,
@@ -211,7 +228,7 @@ class DefectDojoASVSConnector:
                     'verified': finding.verified,
                     'false_p': finding.false_p,
                     'tags': [tag.name for tag in finding.tags.all()],
-                    'test_name': test_name,
+                    'test_name': self._test_name(finding),
                 })
             
             return findings_data
@@ -226,48 +243,39 @@ class DefectDojoASVSConnector:
             return []
         
         try:
-            from dojo.models import Finding, Test, Engagement
+            from dojo.models import Finding
             
             # ESTRATEGIA: Buscar directamente el engagement que tenga findings con tag WSTG
-            # Esto es más robusto que buscar por nombre
-            findings_with_wstg = Finding.objects.filter(
+            # Esto es más robusto que buscar por nombre (una sola consulta, sin exists()+first())
+            wstg_engagement = Finding.objects.filter(
                 test__engagement__product=product,
                 active=True,
                 tags__name='WSTG'
-            ).select_related('test', 'test__engagement').distinct()
+            ).values('test__engagement__id', 'test__engagement__name').first()
             
-            if not findings_with_wstg.exists():
+            if not wstg_engagement:
                 print("   ⚠️  No se encontraron findings con tag WSTG en ningún engagement")
                 return []
             
-            # Obtener el engagement del primer finding (todos deberían ser del mismo engagement)
-            wstg_engagement = findings_with_wstg.first().test.engagement
-            print(f"   ✓ Engagement WSTG encontrado: '{wstg_engagement.name}' (ID: {wstg_engagement.id})")
+            # Todos los findings deberían ser del mismo engagement que el primero
+            print(f"   ✓ Engagement WSTG encontrado: '{wstg_engagement['test__engagement__name']}' "
+                  f"(ID: {wstg_engagement['test__engagement__id']})")
             
             # Obtener todos los findings activos con tag WSTG de este engagement
-            tests = Test.objects.filter(engagement=wstg_engagement)
-            findings = Finding.objects.filter(
-                test__in=tests,
-                active=True,
-                tags__name='WSTG'
-            ).select_related('test', 'test__engagement').distinct()
-            
-            print(f"   ✓ {findings.count()} findings WSTG encontrados en el engagement")
+            findings = self._findings_queryset(
+                Finding.objects.filter(
+                    test__engagement__id=wstg_engagement['test__engagement__id'],
+                    active=True,
+                    tags__name='WSTG'
+                ).distinct()
+            )
             
             wstg_findings_data = []
             for finding in findings:
-                # Extraer WSTG ID de tags o título
-                wstg_id = None
-                for tag in finding.tags.all():
-                    if tag.name.startswith('WSTG-'):
-                        wstg_id = tag.name
-                        break
+                tags = [tag.name for tag in finding.tags.all()]
                 
-                if not wstg_id and 'WSTG-' in finding.title:
-                    import re
-                    match = re.search(r'WSTG-\w+-\d+', finding.title)
-                    if match:
-                        wstg_id = match.group(0)
+                # Extraer WSTG ID de tags o título
+                wstg_id = next((tag for tag in tags if tag.startswith('WSTG-')), None) or find_wstg_id(finding.title)
                 
                 wstg_findings_data.append({
                     'id': finding.id,
@@ -279,9 +287,10 @@ class DefectDojoASVSConnector:
                     'verified': finding.verified,
                     'false_p': finding.false_p,
                     'status': 'Done' if finding.verified else ('Not Applicable' if finding.false_p else 'In Progress'),
-                    'tags': [tag.name for tag in finding.tags.all()],
+                    'tags': tags,
                 })
             
+            print(f"   ✓ {len(wstg_findings_data)} findings WSTG encontrados en el engagement")
             return wstg_findings_data
         except Exception as e:
             print(f"   ⚠️  Error obteniendo findings WSTG: {e}")
@@ -291,9 +300,12 @@ class DefectDojoASVSConnector:
 class ASVSAnalyzer:
     """Analizador de cumplimiento ASVS 4.0.3 integrado con DefectDojo"""
     
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path, code_roots: Optional[List[Path]] = None, jobs: Optional[int] = None):
         self.project_root = project_root
         self.app_dir = project_root / 'app'
+        # Árboles de código a analizar (por defecto todo app/) y procesos del pool
+        self.code_roots = code_roots or [self.app_dir]
+        self.jobs = jobs
         self.findings = {
             'compliant': [],
             'partial': [],
@@ -301,6 +313,12 @@ class ASVSAnalyzer:
             'missing': []
         }
         self.code_analysis = {}
+        # Índices derivados de self.findings (ver build_indexes)
+        self.compliant_categories = set()
+        self.partial_by_category = {}
+        self.partial_requirements = {}
+        self.non_applicable_by_category = {}
+        self.findings_by_cwe = {}
         self.defectdojo_data = {
             'benchmark': None,
             'findings': [],
@@ -350,87 +368,18 @@ class ASVSAnalyzer:
             print(f"   ℹ️  Continuando con análisis de código solamente")
     
     def analyze_code(self):
-        """Analizar el código fuente de la aplicación"""
+        """Analizar el código fuente de la aplicación (AST + caché por hash de contenido)"""
         print("🔍 Analizando código fuente...")
         
-        # Analizar archivos Python principales
-        python_files = [
-            self.app_dir / 'routes.py',
-            self.app_dir / 'helpers.py',
-            self.app_dir / 'storage.py',
-            self.app_dir / 'config.py',
-        ]
-        
-        for file_path in python_files:
-            if file_path.exists():
-                self._analyze_python_file(file_path)
-        
-        # Analizar archivos JavaScript
-        js_files = [
-            self.app_dir / 'static' / 'js' / 'main.js',
-            self.app_dir / 'static' / 'js' / 'storage.js',
-            self.app_dir / 'static' / 'js' / 'validation.js',
-        ]
-        
-        for file_path in js_files:
-            if file_path.exists():
-                self._analyze_js_file(file_path)
-        
-        print(f"   ✓ Análisis completado")
-        
-    def _analyze_python_file(self, file_path: Path):
-        """Analizar archivo Python"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            filename = file_path.name
-            
-            # Detectar validaciones
-            if 'validate' in content.lower() or 'sanitize' in content.lower():
-                self.code_analysis.setdefault('validation', []).append(filename)
-            
-            # Detectar manejo de errores
-            if 'try:' in content and 'except' in content:
-                self.code_analysis.setdefault('error_handling', []).append(filename)
-            
-            # Detectar headers de seguridad
-            if 'X-Frame-Options' in content or 'CSP' in content or 'CORS' in content:
-                self.code_analysis.setdefault('security_headers', []).append(filename)
-            
-            # Detectar configuración centralizada
-            if 'config' in filename.lower():
-                self.code_analysis.setdefault('centralized_config', True)
-            
-            # Detectar API REST
-            if '@api.route' in content or 'Blueprint' in content:
-                self.code_analysis.setdefault('api_rest', True)
-                # Contar endpoints
-                endpoints = len(re.findall(r'@api\.route|@.*\.route', content))
-                self.code_analysis.setdefault('api_endpoints', endpoints)
-                
-        except Exception as e:
-            print(f"   ⚠️  Error analizando {file_path}: {e}")
-    
-    def _analyze_js_file(self, file_path: Path):
-        """Analizar archivo JavaScript"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            filename = file_path.name
-            
-            # Detectar validaciones en frontend
-            if 'validate' in content.lower() or 'parseFloat' in content or 'parseInt' in content:
-                self.code_analysis.setdefault('frontend_validation', []).append(filename)
-            
-            # Detectar sanitización
-            if 'sanitize' in content.lower() or 'trim' in content or 'replace' in content:
-                self.code_analysis.setdefault('frontend_sanitization', []).append(filename)
-                
-        except Exception as e:
-            print(f"   ⚠️  Error analizando {file_path}: {e}")
-    
+        results, stats = analyze_tree(self.code_roots, base_dir=self.project_root, jobs=self.jobs)
+        for key, facts in results.items():
+            if 'error' in facts:
+                print(f"   ⚠️  Error analizando {key}: {facts['error']}")
+        self.code_analysis = summarize(results)
+        
+        print(f"   ✓ Análisis completado: {stats['files']} ficheros "
+              f"({stats['analyzed']} analizados, {stats['cached']} sin cambios)")
+        
     def check_asvs_requirements(self):
         """Verificar cumplimiento de requisitos ASVS 4.0.3 usando DefectDojo y análisis de código"""
         print("📋 Verificando requisitos ASVS 4.0.3 Nivel 2...")
@@ -498,8 +447,33 @@ class ASVSAnalyzer:
         # V14: Configuration
         self._check_v14()
         
+        self.build_indexes()
         print(f"   ✓ Verificación completada")
     
+    def build_indexes(self):
+        """
+        Construir índices por categoría sobre self.findings para que el generador
+        consulte el estado de cada requisito en O(1) en lugar de recorrer las listas
+        """
+        self.compliant_categories = set(self.findings['compliant'])
+        self.partial_by_category = {}
+        self.partial_requirements = {}
+        for item in self.findings['partial']:
+            if item['category'] not in self.partial_by_category:
+                self.partial_by_category[item['category']] = item
+                self.partial_requirements[item['category']] = (
+                    set(item.get('compliant', [])), set(item.get('partial', []))
+                )
+        self.non_applicable_by_category = {}
+        for item in self.findings['non_applicable']:
+            self.non_applicable_by_category.setdefault(item['category'], item)
+    
+    def findings_with_cwe(self, *cwes):
+        """Findings de DefectDojo con alguno de los CWE indicados (índice CWE → findings)"""
+        if len(cwes) == 1:
+            return self.findings_by_cwe.get(cwes[0], [])
+        return [f for cwe in cwes for f in self.findings_by_cwe.get(cwe, [])]
+    
     def _map_findings_to_asvs(self):
         """Mapear findings de DefectDojo a categorías ASVS"""
         findings = self.defectdojo_data.get('findings', [])
@@ -518,10 +492,13 @@ class ASVSAnalyzer:
             'CWE-942': 'V9',  # Overly Permissive Cross-domain Whitelist
         }
         
-        # Agrupar findings por categoría ASVS
+        # Índice CWE → findings y agrupación por categoría ASVS
+        self.findings_by_cwe = {}
         findings_by_category = {}
         for finding in findings:
             cwe = finding.get('cwe')
+            if cwe:
+                self.findings_by_cwe.setdefault(cwe, []).append(finding)
             if cwe and cwe in cwe_to_asvs:
                 category = cwe_to_asvs[cwe]
                 if category not in findings_by_category:
@@ -593,7 +570,7 @@ class ASVSAnalyzer:
             partial.append('V5.3')
         
         # V5.4: Validación de tipos numéricos (verificar findings CWE-1287, CWE-843)
-        v5_4_findings = [f for f in v5_findings if f.get('cwe') in ['CWE-1287', 'CWE-843']]
+        v5_4_findings = self.findings_with_cwe('CWE-1287', 'CWE-843')
         if not v5_4_findings or all(f.get('verified') for f in v5_4_findings):
             compliant.append('V5.4')
         else:
@@ -639,7 +616,7 @@ class ASVSAnalyzer:
             partial.append('V7.2')
         
         # V7.3: Logging (verificar finding CWE-703)
-        cwe_703 = [f for f in v7_findings if f.get('cwe') == 'CWE-703']
+        cwe_703 = self.findings_with_cwe('CWE-703')
         if cwe_703 and all(f.get('verified') for f in cwe_703):
             partial.append('V7.3 (mejorado)')
         else:
@@ -659,10 +636,8 @@ class ASVSAnalyzer:
         compliant = []
         findings_list = []
         
-        # Verificar findings de DefectDojo relacionados con V8
-        v8_findings = self.defectdojo_data.get('findings_by_category', {}).get('V8', [])
         # Verificar CWE-1021 (clickjacking) - debe estar resuelto
-        cwe_1021 = [f for f in v8_findings if f.get('cwe') == 'CWE-1021']
+        cwe_1021 = self.findings_with_cwe('CWE-1021')
         if cwe_1021 and all(f.get('verified') for f in cwe_1021):
             compliant.append('V8.3 (CWE-1021 resuelto)')
         elif cwe_1021:
@@ -677,8 +652,7 @@ class ASVSAnalyzer:
                 compliant.append('V8.3')
         
         # V8.4: CORS (verificar finding CWE-942)
-        v9_findings = self.defectdojo_data.get('findings_by_category', {}).get('V9', [])
-        cwe_942 = [f for f in v9_findings if f.get('cwe') == 'CWE-942']
+        cwe_942 = self.findings_with_cwe('CWE-942')
         if cwe_942 and not all(f.get('verified') for f in cwe_942):
             findings_list.extend([f for f in cwe_942 if not f.get('verified')])
         
@@ -699,10 +673,8 @@ class ASVSAnalyzer:
         partial = []
         findings_list = []
         
-        # Verificar findings de DefectDojo relacionados con V9
-        v9_findings = self.defectdojo_data.get('findings_by_category', {}).get('V9', [])
-        # Verificar CWE-942 (CORS permisivo)
-        cwe_942 = [f for f in v9_findings if f.get('cwe') == 'CWE-942']
+        # Verificar findings de DefectDojo relacionados con V9: CWE-942 (CORS permisivo)
+        cwe_942 = self.findings_with_cwe('CWE-942')
         if cwe_942 and not all(f.get('verified') for f in cwe_942):
             partial.append('V9.2 (CWE-942 pendiente)')
             partial.append('V9.3 (CWE-942 pendiente)')
@@ -793,6 +765,69 @@ class ASVSAnalyzer:
             self.findings['partial'].append({'category': 'V14', 'compliant': compliant})
 
 
+# Secciones del informe, en orden: (nombre para --sections, método, entradas de las que depende)
+# Las entradas forman la clave de la caché por sección junto con el hash de este script.
+REPORT_SECTIONS = (
+    ('header', '_generate_header', ('report_date',)),
+    ('description', '_generate_section1', ()),
+    ('analysis', '_generate_section2', ('benchmark',)),
+    ('weaknesses', '_generate_section3', ()),
+    ('asvs', '_generate_section4', ('assessment', 'asvs_structure')),
+    ('wstg', '_generate_section5_wstg', ('wstg_findings',)),
+    ('recommendations', '_generate_section6_recommendations', ()),
+    ('references', '_generate_references', ()),
+)
+REPORT_SECTION_NAMES = tuple(name for name, _, _ in REPORT_SECTIONS)
+
+# Separador que sigue a cada sección en el Markdown (el encabezado va seguido de una regla)
+SECTION_SEPARATORS = {'header': "\n\n---\n\n"}
+DEFAULT_SECTION_SEPARATOR = "\n\n"
+
+SECTION_CACHE_PATH = PROJECT_ROOT / 'data' / 'cache' / 'asvs_report_sections.json'
+
+
+class ReportSection:
+    """Sección renderizada: texto, tiempo de generación y si viene de la caché"""
+    
+    def __init__(self, name: str, text: str, seconds: float = 0.0, cached: bool = False):
+        self.name = name
+        self.text = text
+        self.seconds = seconds
+        self.cached = cached
+
+
+class ReportSectionCache:
+    """Texto de cada sección de la ejecución anterior, con la clave de sus entradas (JSON)"""
+    
+    def __init__(self, path: Path = SECTION_CACHE_PATH):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.sections = json.load(f).get('sections', {})
+        except (OSError, ValueError, AttributeError):
+            self.sections = {}
+    
+    def get(self, name: str, key: Optional[str] = None) -> Optional[str]:
+        """Texto cacheado de la sección (si se indica `key`, solo si coincide)"""
+        entry = self.sections.get(name)
+        if not entry or (key is not None and entry.get('key') != key):
+            return None
+        return entry.get('text')
+    
+    def put(self, name: str, key: str, text: str):
+        self.sections[name] = {'key': key, 'text': text}
+    
+    def save(self):
+        tmp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'sections': self.sections}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"   ⚠️  No se pudo guardar la caché de secciones: {e}")
+
+
 class ASVSReportGenerator:
     """Generador de informe ASVS 4.0.3"""
     
@@ -800,48 +835,101 @@ class ASVSReportGenerator:
         self.analyzer = analyzer
         self.project_root = project_root
         self.report_date = datetime.now().strftime("%Y-%m-%d")
+        self._script_hash = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
         
     def generate_report(self) -> str:
         """Generar el informe Markdown completo"""
         print("📝 Generando informe Markdown...")
         
-        report = []
-        
-        # Encabezado
-        report.append(self._generate_header())
-        report.append("")
-        report.append("---")
-        report.append("")
-        
-        # Sección 1: Descripción
-        report.append(self._generate_section1())
-        report.append("")
-        
-        # Sección 2: Análisis de seguridad
-        report.append(self._generate_section2())
-        report.append("")
-        
-        # Sección 3: Debilidades identificadas
-        report.append(self._generate_section3())
-        report.append("")
-        
-        # Sección 4: Nivel ASVS
-        report.append(self._generate_section4())
-        report.append("")
-        
-        # Sección 5: Análisis WSTG
-        report.append(self._generate_section5_wstg())
-        report.append("")
-        
-        # Sección 6: Recomendaciones
-        report.append(self._generate_section6_recommendations())
-        report.append("")
-        
-        # Referencias
-        report.append(self._generate_references())
+        report = io.StringIO()
+        self.write_sections(report)
         
         print(f"   ✓ Informe generado")
-        return "\n".join(report)
+        return report.getvalue()
+    
+    def _section_input(self, name: str):
+        """Valor de una entrada de las que dependen las secciones (ver REPORT_SECTIONS)"""
+        dd_data = self.analyzer.defectdojo_data
+        if name == 'report_date':
+            return self.report_date
+        if name == 'benchmark':
+            product = dd_data.get('product')
+            return [dd_data.get('benchmark'), product.name if product else None, len(dd_data.get('findings', []))]
+        if name == 'assessment':
+            return [self.analyzer.findings, self.analyzer.code_analysis, dd_data.get('findings_by_category', {})]
+        if name == 'asvs_structure':
+            load_asvs_403_structure()
+            return ASVS_403_STRUCTURE.source_sha256 if ASVS_403_STRUCTURE else None
+        if name == 'wstg_findings':
+            return dd_data.get('wstg_findings', [])
+        raise KeyError(name)
+    
+    def section_key(self, name: str) -> str:
+        """Clave de caché de una sección: hash del script + sus entradas"""
+        inputs = next(inputs for section, _, inputs in REPORT_SECTIONS if section == name)
+        payload = json.dumps([self._script_hash, name] + [self._section_input(i) for i in inputs],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _render_section(self, name: str, method: str) -> ReportSection:
+        start = time.perf_counter()
+        text = getattr(self, method)()
+        return ReportSection(name, text, time.perf_counter() - start)
+    
+    def write_sections(self, out, sections: Optional[Set[str]] = None,
+                       cache: Optional[ReportSectionCache] = None,
+                       max_workers: Optional[int] = None) -> List[ReportSection]:
+        """
+        Renderiza las secciones en paralelo y las escribe en `out` en orden, según terminan.
+        
+        - Sin caché, se renderizan todas.
+        - Con caché y sin `sections`, se reutilizan las secciones cuyas entradas no cambiaron.
+        - Con `sections`, solo se regeneran esas; el resto se toma de la caché tal cual
+          (o se renderiza si no está cacheada).
+        """
+        results = {}
+        pending = []
+        for name, method, _ in REPORT_SECTIONS:
+            key = self.section_key(name) if cache else None
+            if cache and not (sections and name in sections):
+                text = cache.get(name, None if sections else key)
+                if text is not None:
+                    results[name] = ReportSection(name, text, cached=True)
+                    continue
+            pending.append((name, method, key))
+        
+        with ThreadPoolExecutor(max_workers=max_workers or max(1, len(pending))) as pool:
+            futures = {name: pool.submit(self._render_section, name, method) for name, method, _ in pending}
+            keys = {name: key for name, _, key in pending}
+            rendered = []
+            for index, name in enumerate(REPORT_SECTION_NAMES):
+                section = results.get(name) or futures[name].result()
+                if name in futures:
+                    results[name] = section
+                    if cache:
+                        cache.put(name, keys[name], section.text)
+                out.write(section.text)
+                if index < len(REPORT_SECTION_NAMES) - 1:
+                    out.write(SECTION_SEPARATORS.get(name, DEFAULT_SECTION_SEPARATOR))
+                rendered.append(section)
+        if cache:
+            cache.save()
+        return rendered
+    
+    def write_report(self, path: Path, sections: Optional[Set[str]] = None,
+                     cache: Optional[ReportSectionCache] = None) -> List[ReportSection]:
+        """Escribe el informe en `path` (atómico) y devuelve las secciones con sus tiempos"""
+        print("📝 Generando informe Markdown...")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            rendered = self.write_sections(f, sections=sections, cache=cache)
+        os.replace(tmp_path, path)
+        
+        for section in rendered:
+            origin = "caché" if section.cached else f"{section.seconds * 1000:.1f} ms"
+            print(f"   ✓ {section.name}: {origin}")
+        return rendered
     
     def _generate_header(self) -> str:
         """Generar encabezado del informe"""
@@ -1000,7 +1088,7 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                 if cat_status == 'non_applicable':
                     lines.append("**Estado general**: ⚠️ **NO APLICABLE**")
                     lines.append("")
-                    na_item = next((f for f in self.analyzer.findings['non_applicable'] if f['category'] == cat_code), None)
+                    na_item = self.analyzer.non_applicable_by_category.get(cat_code)
                     if na_item:
                         lines.append(f"**Justificación**: {na_item.get('reason', 'No aplicable para esta aplicación')}")
                     lines.append("")
@@ -1054,7 +1142,7 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                 # Si no está en la jerarquía completa, usar el método anterior
                 else:
                     # Verificar estado de la categoría
-                    if cat_code in self.analyzer.findings['compliant']:
+                    if cat_code in self.analyzer.compliant_categories:
                         lines.append("**Estado de cumplimiento**: ✅ **CUMPLE**")
                         lines.append("")
                         explanation = self._get_detailed_explanation(cat_code, 'compliant')
@@ -1063,10 +1151,10 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                             lines.append("")
                             lines.append(explanation)
                             lines.append("")
-                    elif cat_code in [f['category'] for f in self.analyzer.findings['partial']]:
+                    elif cat_code in self.analyzer.partial_by_category:
                         lines.append("**Estado de cumplimiento**: ⚠️ **PARCIAL**")
                         lines.append("")
-                        partial_item = next((f for f in self.analyzer.findings['partial'] if f['category'] == cat_code), None)
+                        partial_item = self.analyzer.partial_by_category.get(cat_code)
                         explanation = self._get_detailed_explanation(cat_code, 'partial', partial_item)
                         if explanation:
                             lines.append("**Explicación detallada**:")
@@ -1084,11 +1172,11 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                             if len(findings) > 5:
                                 lines.append(f"- ... y {len(findings) - 5} findings más")
                             lines.append("")
-                    elif cat_code in [f['category'] for f in self.analyzer.findings['non_applicable']]:
+                    elif cat_code in self.analyzer.non_applicable_by_category:
                         lines.append("**Requerimientos ASVS Nivel 2 aplicables**:")
                         lines.append("- ⚠️ **No aplicable**")
                         lines.append("")
-                        na_item = next((f for f in self.analyzer.findings['non_applicable'] if f['category'] == cat_code), None)
+                        na_item = self.analyzer.non_applicable_by_category.get(cat_code)
                         if na_item:
                             lines.append(f"**Justificación**: {na_item.get('reason', 'No aplicable para esta aplicación')}")
                             lines.append("")
@@ -1107,7 +1195,7 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                 lines.append(f"#### **{code}: {name}**")
                 lines.append("")
                 
-                if code in self.analyzer.findings['compliant']:
+                if code in self.analyzer.compliant_categories:
                     lines.append("**Estado de cumplimiento**: ✅ **CUMPLE**")
                     lines.append("")
                     explanation = self._get_detailed_explanation(code, 'compliant')
@@ -1116,10 +1204,10 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                         lines.append("")
                         lines.append(explanation)
                         lines.append("")
-                elif code in [f['category'] for f in self.analyzer.findings['partial']]:
+                elif code in self.analyzer.partial_by_category:
                     lines.append("**Estado de cumplimiento**: ⚠️ **PARCIAL**")
                     lines.append("")
-                    partial_item = next((f for f in self.analyzer.findings['partial'] if f['category'] == code), None)
+                    partial_item = self.analyzer.partial_by_category.get(code)
                     explanation = self._get_detailed_explanation(code, 'partial', partial_item)
                     if explanation:
                         lines.append("**Explicación detallada**:")
@@ -1137,11 +1225,11 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                         if len(findings) > 5:
                             lines.append(f"- ... y {len(findings) - 5} findings más")
                         lines.append("")
-                elif code in [f['category'] for f in self.analyzer.findings['non_applicable']]:
+                elif code in self.analyzer.non_applicable_by_category:
                     lines.append("**Requerimientos ASVS Nivel 2 aplicables**:")
                     lines.append("- ⚠️ **No aplicable**")
                     lines.append("")
-                    na_item = next((f for f in self.analyzer.findings['non_applicable'] if f['category'] == code), None)
+                    na_item = self.analyzer.non_applicable_by_category.get(code)
                     if na_item:
                         lines.append(f"**Justificación**: {na_item.get('reason', 'No aplicable para esta aplicación')}")
                         lines.append("")
@@ -1159,40 +1247,43 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
     
     def _get_category_status(self, cat_code: str) -> str:
         """Determinar el estado general de una categoría"""
-        if cat_code in self.analyzer.findings['compliant']:
+        if cat_code in self.analyzer.compliant_categories:
             return 'compliant'
-        elif cat_code in [f['category'] for f in self.analyzer.findings['partial']]:
+        elif cat_code in self.analyzer.partial_by_category:
             return 'partial'
-        elif cat_code in [f['category'] for f in self.analyzer.findings['non_applicable']]:
+        elif cat_code in self.analyzer.non_applicable_by_category:
             return 'non_applicable'
         else:
             return 'missing'
     
+    def _get_partial_requirement_status(self, req_code: str, cat_code: str) -> Optional[str]:
+        """Estado de un requisito según el detalle de su categoría parcial (None si no figura)"""
+        requirement_sets = self.analyzer.partial_requirements.get(cat_code)
+        if not requirement_sets:
+            return None
+        
+        # Extraer subcategoría del requisito (ej: V5.1.1 -> V5.1)
+        req_parts = req_code.split('.')
+        if len(req_parts) < 2:
+            return None
+        subcat_code = f"{req_parts[0]}.{req_parts[1]}"
+        
+        compliant_reqs, partial_reqs = requirement_sets
+        if req_code in compliant_reqs or subcat_code in compliant_reqs:
+            return 'compliant'
+        elif req_code in partial_reqs or subcat_code in partial_reqs:
+            return 'partial'
+        return None
+    
     def _get_requirement_status(self, req_code: str, cat_code: str) -> str:
         """Determinar el estado de un requisito específico"""
         # Verificar si la categoría completa está en los findings
-        if cat_code in self.analyzer.findings['compliant']:
+        if cat_code in self.analyzer.compliant_categories:
             return 'compliant'
-        elif cat_code in [f['category'] for f in self.analyzer.findings['partial']]:
+        elif cat_code in self.analyzer.partial_by_category:
             # Para categorías parciales, verificar requisitos específicos
-            partial_item = next((f for f in self.analyzer.findings['partial'] if f['category'] == cat_code), None)
-            if partial_item:
-                compliant_reqs = partial_item.get('compliant', [])
-                partial_reqs = partial_item.get('partial', [])
-                
-                # Extraer subcategoría del requisito (ej: V5.1.1 -> V5.1)
-                req_parts = req_code.split('.')
-                if len(req_parts) >= 2:
-                    subcat_code = f"{req_parts[0]}.{req_parts[1]}"
-                    
-                    # Verificar si el requisito específico está en la lista de cumplidos
-                    if req_code in compliant_reqs or subcat_code in compliant_reqs:
-                        return 'compliant'
-                    elif req_code in partial_reqs or subcat_code in partial_reqs:
-                        return 'partial'
-            
-            return 'partial'
-        elif cat_code in [f['category'] for f in self.analyzer.findings['non_applicable']]:
+            return self._get_partial_requirement_status(req_code, cat_code) or 'partial'
+        elif cat_code in self.analyzer.non_applicable_by_category:
             return 'non_applicable'
         else:
             return 'missing'
@@ -1203,21 +1294,8 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
         if status == 'compliant':
             return f"El requisito {req_code} se cumple según el análisis realizado."
         elif status == 'partial':
-            partial_item = next((f for f in self.analyzer.findings['partial'] if f['category'] == cat_code), None)
-            if partial_item:
-                compliant_reqs = partial_item.get('compliant', [])
-                partial_reqs = partial_item.get('partial', [])
-                
-                # Extraer subcategoría del requisito
-                req_parts = req_code.split('.')
-                if len(req_parts) >= 2:
-                    subcat_code = f"{req_parts[0]}.{req_parts[1]}"
-                    
-                    if req_code in compliant_reqs or subcat_code in compliant_reqs:
-                        return f"El requisito {req_code} se cumple según el análisis realizado."
-                    elif req_code in partial_reqs or subcat_code in partial_reqs:
-                        return f"El requisito {req_code} se cumple parcialmente. Se requiere revisión adicional."
-            
+            if self._get_partial_requirement_status(req_code, cat_code) == 'compliant':
+                return f"El requisito {req_code} se cumple según el análisis realizado."
             return f"El requisito {req_code} se cumple parcialmente. Se requiere revisión adicional."
         elif status == 'non_applicable':
             return f"El requisito {req_code} no es aplicable para esta aplicación."
@@ -1439,8 +1517,7 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
                 
                 # V8.4: CORS
                 has_cors = 'security_headers' in self.analyzer.code_analysis  # CORS se detecta como security_headers
-                v9_findings = self.analyzer.defectdojo_data.get('findings_by_category', {}).get('V9', [])
-                cwe_942_findings = [f for f in v9_findings if f.get('cwe') == 'CWE-942' or f.get('cwe') == 942]
+                cwe_942_findings = self.analyzer.findings_with_cwe('CWE-942')
                 cwe_942_pending = any(not f.get('verified') for f in cwe_942_findings) if cwe_942_findings else False
                 
                 if 'V8.4' in compliant_reqs:
@@ -1586,29 +1663,12 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
             lines.append("")
             return "\n".join(lines)
         
-        # Agrupar findings por categoría WSTG
-        wstg_categories = {
-            'INFO': 'Information Gathering',
-            'CONF': 'Configuration and Deployment Management',
-            'IDENT': 'Identity Management',
-            'AUTH': 'Authentication',
-            'SESS': 'Session Management',
-            'AUTHZ': 'Authorization',
-            'DATA': 'Data Validation',
-            'ERR': 'Error Handling',
-            'CRYPTO': 'Cryptography',
-            'BUSINESS': 'Business Logic',
-            'CLIENT': 'Client-Side'
-        }
-        
+        # Agrupar findings por categoría WSTG (códigos del catálogo: INFO, ATHN, INPV...)
         findings_by_category = {}
         for finding in wstg_findings:
-            wstg_id = finding.get('wstg_id', 'Unknown')
-            if wstg_id.startswith('WSTG-'):
-                category = wstg_id.split('-')[1]  # INFO, AUTH, etc.
-                if category not in findings_by_category:
-                    findings_by_category[category] = []
-                findings_by_category[category].append(finding)
+            category = wstg_category(finding.get('wstg_id', 'Unknown'))
+            if category:
+                findings_by_category.setdefault(category, []).append(finding)
         
         lines.append("### 5.2. Resumen de Tests WSTG")
         lines.append("")
@@ -1633,7 +1693,8 @@ El análisis automático ha identificado áreas de mejora en la aplicación. Las
             lines.append("⚠️ No se pudieron agrupar los findings por categoría WSTG.")
             lines.append("")
         else:
-            for category_code, category_name in sorted(wstg_categories.items()):
+            for category_code, category in sorted(WSTG_CATEGORIES.items()):
+                category_name = category['name']
                 if category_code in findings_by_category:
                     category_findings = findings_by_category[category_code]
                     lines.append(f"#### 5.3.{category_code}. **{category_code}: {category_name}**")
@@ -1710,6 +1771,27 @@ Para alcanzar el cumplimiento completo del **ASVS Nivel 2**, se recomienda imple
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Generador del informe de seguridad ASVS 4.0.3')
+    parser.add_argument('--code-roots', default='app',
+                        help='Directorios a analizar, separados por comas (default: app; p. ej. app,scripts)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Procesos para el análisis de código (default: nº de CPU)')
+    parser.add_argument('--sections', default=None,
+                        help=f"Secciones a regenerar, separadas por comas ({', '.join(REPORT_SECTION_NAMES)}); "
+                             "el resto se reutiliza de la ejecución anterior")
+    parser.add_argument('--no-section-cache', action='store_true',
+                        help='Regenerar todas las secciones sin usar ni actualizar la caché')
+    args = parser.parse_args()
+    
+    sections = None
+    if args.sections:
+        sections = {name.strip() for name in args.sections.split(',') if name.strip()}
+        unknown = sections - set(REPORT_SECTION_NAMES)
+        if unknown:
+            parser.error(f"Secciones desconocidas: {', '.join(sorted(unknown))}")
+        if args.no_section_cache:
+            parser.error("--sections necesita la caché de secciones")
+    
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     docs_dir = project_root / "docs"
@@ -1721,7 +1803,8 @@ def main():
     print()
     
     # Crear analizador
-    analyzer = ASVSAnalyzer(project_root)
+    code_roots = [project_root / root.strip() for root in args.code_roots.split(',') if root.strip()]
+    analyzer = ASVSAnalyzer(project_root, code_roots=code_roots, jobs=args.jobs)
     
     # Obtener datos de DefectDojo (benchmarks ASVS y findings)
     analyzer.get_defectdojo_data()
@@ -1735,14 +1818,10 @@ def main():
     analyzer.check_asvs_requirements()
     print()
     
-    # Generar informe
+    # Generar informe (secciones en paralelo, escritas en orden en el fichero)
     generator = ASVSReportGenerator(analyzer, project_root)
-    report_content = generator.generate_report()
-    
-    # Guardar informe
-    report_md.parent.mkdir(parents=True, exist_ok=True)
-    with open(report_md, 'w', encoding='utf-8') as f:
-        f.write(report_content)
+    cache = None if args.no_section_cache else ReportSectionCache()
+    generator.write_report(report_md, sections=sections, cache=cache)
     
     print()
     print("=" * 60)
@@ -192,10 +192,6 @@ def setup_test_and_engagement():
 def create_findings(test, admin_user):
     """Crear o actualizar los findings de CWE en DefectDojo (evita duplicados)"""
     django.setup()
-    from dojo.models import Finding, Test_Type
-    
-    # Obtener el Test_Type para asignarlo a found_by
-    test_type = test.test_type if test else None
     
     if not test or not admin_user:
         print("⚠️  No se pueden crear findings: Test o usuario no disponibles")
@@ -292,91 +288,16 @@ def create_findings(test, admin_user):
         }
     }
     
-    created_findings = {}
-    
-    for cwe_name, data in findings_data.items():
-        try:
-            # PRIMERO: Eliminar cualquier finding con el mismo CWE en OTROS tests
-            # Esto elimina findings antiguos creados manualmente o por otras herramientas
-            from dojo.models import Test as TestModel
-            all_tests = TestModel.objects.exclude(id=test.id)
-            total_deleted_other_tests = 0
-            
-            for test_obj in all_tests:
-                old_findings = Finding.objects.filter(cwe=data['cwe'], test=test_obj)
-                if old_findings.exists():
-                    deleted_count = old_findings.count()
-                    old_findings.delete()
-                    total_deleted_other_tests += deleted_count
-            
-            # SEGUNDO: Eliminar duplicados dentro del test actual
-            duplicates = list(Finding.objects.filter(cwe=data['cwe'], test=test).order_by('-id'))
-            total_deleted_same_test = 0
-            if len(duplicates) > 1:
-                # Hay duplicados, eliminar todos excepto el más reciente
-                to_delete = duplicates[1:]
-                deleted_ids = [f.id for f in to_delete]
-                Finding.objects.filter(id__in=deleted_ids).delete()
-                total_deleted_same_test = len(to_delete)
-            
-            if total_deleted_other_tests > 0 or total_deleted_same_test > 0:
-                msg_parts = []
-                if total_deleted_other_tests > 0:
-                    msg_parts.append(f"{total_deleted_other_tests} de otros tests")
-                if total_deleted_same_test > 0:
-                    msg_parts.append(f"{total_deleted_same_test} del mismo test")
-                print(f"  🗑️  {cwe_name}: Eliminados {' y '.join(msg_parts)} duplicados")
-            
-            # TERCERO: Buscar el finding único en el test actual (o crear si no existe)
-            finding = Finding.objects.filter(cwe=data['cwe'], test=test).first()
-            
-            if not finding:
-                # No existe, crear nuevo
-                finding = Finding.objects.create(
-                    title=data['title'],
-                    description=data['description'],
-                    severity=severity_map.get(data['severity'], 'Medium'),
-                    cwe=data['cwe'],
-                    active=data['active'],
-                    verified=data['verified'],
-                    test=test,
-                    reporter=admin_user,
-                    mitigation=data['mitigation'],
-                    impact=data['impact'],
-                    references=data['references'],
-                    file_path=data['file_path'],
-                    line=data.get('line')
-                )
-                # Asignar found_by usando el test_type del test
-                if test_type:
-                    finding.found_by.add(test_type)
-                print(f"  ✓ {cwe_name} creado (ID: {finding.id})")
-            else:
-                # Ya existe, actualizar con los datos más recientes
-                finding.title = data['title']
-                finding.description = data['description']
-                finding.severity = severity_map.get(data['severity'], 'Medium')
-                finding.mitigation = data['mitigation']
-                finding.impact = data['impact']
-                finding.references = data['references']
-                finding.file_path = data['file_path']
-                finding.line = data.get('line')
-                finding.reporter = admin_user
-                # Actualizar found_by si es necesario
-                if test_type:
-                    # Limpiar found_by existente y asignar el correcto
-                    finding.found_by.clear()
-                    finding.found_by.add(test_type)
-                finding.save()
-                print(f"  🔄 {cwe_name} actualizado (ID: {finding.id})")
-            
-            created_findings[cwe_name] = finding
-        except Exception as e:
-            print(f"  ✗ Error procesando {cwe_name}: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    return created_findings
+    # Upsert en bloque: mismas reglas que antes (se eliminan los findings del mismo CWE en
+    # otros tests y los duplicados del test), con un número de consultas constante
+    try:
+        from findings_bulk import upsert_findings
+        return upsert_findings(test, admin_user, findings_data, severity_map, remove_from_other_tests=True)
+    except Exception as e:
+        print(f"  ✗ Error creando/actualizando findings: {e}")
+        import traceback
+        traceback.print_exc()
+        return {}
 
 def update_findings(findings):
     """Actualizar los findings con información detallada"""
@@ -30,6 +30,8 @@ django.setup()
 from dojo.models import Finding, Test, Engagement, Product, Product_Type, Test_Type, Development_Environment
 from django.contrib.auth.models import User
 
+from findings_bulk import upsert_findings
+
 def get_or_create_test_and_engagement():
     """Obtener o crear Test y Engagement necesarios"""
     try:
@@ -197,68 +199,14 @@ def create_all_findings(test, admin_user):
         }
     }
     
-    created_findings = {}
-    test_type = test.test_type if test else None
-    
-    for cwe_name, data in findings_data.items():
-        try:
-            # Eliminar duplicados
-            duplicates = list(Finding.objects.filter(cwe=data['cwe'], test=test).order_by('-id'))
-            if len(duplicates) > 1:
-                to_delete = duplicates[1:]
-                Finding.objects.filter(id__in=[f.id for f in to_delete]).delete()
-                print(f"  🗑️  {cwe_name}: Eliminados {len(to_delete)} duplicados")
-            
-            # Buscar o crear finding
-            finding = Finding.objects.filter(cwe=data['cwe'], test=test).first()
-            
-            if not finding:
-                finding = Finding.objects.create(
-                    title=data['title'],
-                    description=data['description'],
-                    severity=severity_map.get(data['severity'], 'Medium'),
-                    cwe=data['cwe'],
-                    active=data['active'],
-                    verified=data['verified'],
-                    test=test,
-                    reporter=admin_user,
-                    mitigation=data['mitigation'],
-                    impact=data['impact'],
-                    references=data['references'],
-                    file_path=data['file_path'],
-                    line=data.get('line'),
-                    date=data.get('created_date', date.today())
-                )
-                if test_type:
-                    finding.found_by.add(test_type)
-                print(f"  ✓ {cwe_name} creado (ID: {finding.id})")
-            else:
-                # Actualizar
-                finding.title = data['title']
-                finding.description = data['description']
-                finding.severity = severity_map.get(data['severity'], 'Medium')
-                finding.mitigation = data['mitigation']
-                finding.impact = data['impact']
-                finding.references = data['references']
-                finding.file_path = data['file_path']
-                finding.line = data.get('line')
-                finding.reporter = admin_user
-                if data.get('created_date') and finding.date:
-                    if finding.date > data['created_date']:
-                        finding.date = data['created_date']
-                if test_type:
-                    finding.found_by.clear()
-                    finding.found_by.add(test_type)
-                finding.save()
-                print(f"  🔄 {cwe_name} actualizado (ID: {finding.id})")
-            
-            created_findings[cwe_name] = finding
-        except Exception as e:
-            print(f"  ✗ Error procesando {cwe_name}: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    return created_findings
+    # Upsert en bloque (una transacción, número de consultas constante)
+    try:
+        return upsert_findings(test, admin_user, findings_data, severity_map, keep_earliest_date=True)
+    except Exception as e:
+        print(f"  ✗ Error creando/actualizando findings: {e}")
+        import traceback
+        traceback.print_exc()
+        return {}
 
 def mark_resolved_with_dates(findings):
     """Marcar findings resueltos con fechas históricas"""
@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 """
 Servicio de sincronización bidireccional WSTG ↔ DefectDojo
-Ejecuta polling periódico, detecta cambios y resuelve conflictos automáticamente
+Procesa la cola de solicitudes en cuanto llegan (inotify, con polling como fallback),
+y cada `--interval` minutos sincroniza los findings modificados desde la pasada
+anterior (marca de agua; `--once --full` relee todos) y resuelve conflictos
 """
 import os
+import socket
+import sqlite3
 import sys
 import django
+import threading
 import time
 import logging
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -15,15 +21,21 @@ sys.path.insert(0, '/app')
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dojo.settings.settings')
 django.setup()
 
+from django.db import InterfaceError, OperationalError, connection
+from django.db.models import Q
+from django.utils import timezone
 from dojo.models import Finding, Test, Test_Type
 from app.wstg_sync import (
+    SyncUnavailable,
     get_wstg_test_and_engagement, 
     extract_wstg_id, 
     determine_wstg_status,
-    load_sync_state,
-    save_sync_state,
     log_sync
 )
+from app.wstg_sync_state import get_state_store
+from app.wstg_sync_metrics import METRICS_INTERVAL, get_metrics
+from app.wstg_sync_queue import QUEUE_DIR, QueueWatcher, get_queue
+from app.wstg_sync_worker import SOCKET_PATH, WorkerServer, django_after_request, django_handlers, start_in_thread
 
 # Configurar logging
 logging.basicConfig(
@@ -36,58 +48,174 @@ logging.basicConfig(
 )
 logger = logging.getLogger('wstg_sync_service')
 
+# Mensajes de la cola que se aplican juntos (una transacción por lote)
+QUEUE_BATCH_SIZE = 200
+# Identificador de este consumidor en las reservas de la cola
+CONSUMER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Espera antes de volver a ofrecer un lote que falló por la infraestructura (no cuenta intento)
+INFRA_RETRY_DELAY = 30
 
-def process_sync_queue():
-    """Procesar archivos en la cola de sincronización"""
-    from pathlib import Path
-    import json
+# Serializa los cambios del tracker entre la cola y el worker: un mensaje antiguo no se
+# aplica después de un cambio más reciente del mismo WSTG ID
+_apply_lock = threading.Lock()
+
+# Sincronización incremental desde DefectDojo: campos de Finding que sirven de fecha de
+# modificación (por orden de preferencia), solape al releer desde la marca (transacciones
+# que confirmaron tarde) y cada cuánto se hace igualmente una pasada completa
+WATERMARK_KEY = 'dd_watermark'
+WATERMARK_FIELDS = ('updated', 'last_status_update')
+WATERMARK_OVERLAP = timedelta(minutes=1)
+FULL_SYNC_INTERVAL = timedelta(hours=24)
+
+
+@contextmanager
+def count_queries():
+    """Cuenta las consultas de Django que ejecuta este hilo dentro del bloque"""
+    counter = {'count': 0}
+    
+    def wrapper(execute, sql, params, many, context):
+        counter['count'] += 1
+        return execute(sql, params, many, context)
+    
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def _settle(queue, message, result):
+    """
+    Confirma el mensaje si su item se sincronizó; si no, fallo con backoff/dead-letter
+    (directo a dead-letter si el resultado lo marca como inválido).
+    Devuelve 'done', 'retry' o 'dead'.
+    """
+    if result.get('success'):
+        return 'done'
+    error = result.get('error') or 'Sin resultado para el mensaje'
+    # Un mensaje inválido fallaría siempre: a dead-letter sin reintentos
+    if queue.fail(message['id'], error, max_attempts=1 if result.get('invalid') else None):
+        logger.error(f"✗ Mensaje {message['id']} ({message['type']}) a dead-letter tras "
+                     f"{message['attempts']} intentos: {error}")
+        return 'dead'
+    logger.warning(f"✗ Error procesando mensaje {message['id']} (intento {message['attempts']}): {error}")
+    return 'retry'
+
+
+def _is_infrastructure_error(exc):
+    """Fallos que no son culpa de ningún mensaje: DefectDojo, su BD o el estado no disponibles"""
+    return isinstance(exc, (SyncUnavailable, OperationalError, InterfaceError, sqlite3.OperationalError))
+
+
+def _apply_isolated(direction, apply, messages, result_key):
+    """
+    Aplica los mensajes en un lote y devuelve (resultado de cada mensaje, agrupados).
     
-    queue_dir = Path('/app/data/wstg_sync_queue')
-    if not queue_dir.exists():
-        return 0, 0
+    Si el lote lanza una excepción se parte por la mitad y se reintenta cada parte hasta
+    aislar el mensaje que la provoca: solo ese cuenta el intento. Los fallos de
+    infraestructura se propagan (se reintenta el lote entero, sin contar intentos).
+    """
+    try:
+        outcome = apply([message['data'] for message in messages])
+    except Exception as e:
+        if _is_infrastructure_error(e):
+            raise
+        if len(messages) == 1:
+            logger.error(f"✗ Error procesando mensaje {messages[0]['id']} ({direction}): {e}", exc_info=True)
+            return [{'error': str(e)}], 0
+        logger.warning(f"✗ Error procesando lote {direction} ({len(messages)} mensajes), "
+                       f"se reintenta por partes: {e}")
+        middle = len(messages) // 2
+        first, first_coalesced = _apply_isolated(direction, apply, messages[:middle], result_key)
+        second, second_coalesced = _apply_isolated(direction, apply, messages[middle:], result_key)
+        return first + second, first_coalesced + second_coalesced
+    results = outcome['results']
+    return ([results.get(result_key(message['data']), {}) for message in messages],
+            outcome.get('coalesced', 0))
+
+
+def _process_batch(queue, direction, messages, apply, result_key):
+    """
+    Aplica un lote de una dirección, liquida cada mensaje y registra sus métricas; devuelve
+    los ids confirmados. Un fallo de infraestructura se propaga sin liquidar el lote.
+    """
+    started = time.perf_counter()
+    with count_queries() as queries:
+        results, coalesced = _apply_isolated(direction, apply, messages, result_key)
+    duration = time.perf_counter() - started
+    
+    settled = {'done': [], 'retry': [], 'dead': []}
+    for message, result in zip(messages, results):
+        settled[_settle(queue, message, result)].append(message)
     
+    failed = len(settled['retry']) + len(settled['dead'])
+    get_metrics().record_batch(
+        direction, len(messages), succeeded=len(settled['done']), failed=failed,
+        dead_lettered=len(settled['dead']), coalesced=coalesced, duration=duration,
+        queries=queries['count'], enqueued_at=[message['enqueued_at'] for message in settled['done']],
+    )
+    logger.info(f"Lote {direction}: {len(messages)} mensajes, {coalesced} agrupados, "
+                f"{failed} fallidos, {queries['count']} consultas, {duration * 1000:.0f} ms")
+    return [message['id'] for message in settled['done']]
+
+
+def process_sync_queue(batch_size=QUEUE_BATCH_SIZE):
+    """
+    Procesar la cola de sincronización por lotes (en orden de llegada)
+    
+    Cada lote se reserva con SyncQueue.claim (otros consumidores no lo ven durante
+    VISIBILITY_TIMEOUT) y se aplica con sync_batch_from_tracker / sync_batch_from_defectdojo:
+    una resolución de Test/Engagement, una consulta de findings y una transacción por
+    lote, y los cambios repetidos de un mismo WSTG ID se agrupan en el último.
+    Los mensajes sincronizados se confirman; los que fallan se reintentan con backoff
+    exponencial y, agotados los intentos, pasan a dead-letter. Si falla un lote, sus
+    mensajes se reintentan por partes para que solo el culpable cuente el intento.
+    Si DefectDojo o su BD no están disponibles, los mensajes vuelven a la cola sin
+    contar el intento y se deja de consumir hasta la siguiente vuelta.
+    """
+    from app.wstg_sync import sync_batch_from_defectdojo, sync_batch_from_tracker, webhook_finding_id
+    
+    queue = get_queue(QUEUE_DIR)
     processed = 0
     errors = 0
     
-    for filepath in queue_dir.glob('*.json'):
-        try:
-            with open(filepath, 'r') as f:
-                request_data = json.load(f)
-            
-            request_type = request_data.get('type')
-            data = request_data.get('data', {})
-            
-            if request_type == 'tracker->dd':
-                from app.wstg_sync import sync_from_tracker
-                result = sync_from_tracker(data)
-                if result.get('success'):
-                    processed += 1
-                    logger.info(f"✓ Procesado desde cola: {filepath.name}")
-                    filepath.unlink()  # Eliminar archivo procesado
-                else:
-                    errors += 1
-                    logger.error(f"✗ Error procesando {filepath.name}: {result.get('error')}")
-            elif request_type == 'dd->tracker':
-                from app.wstg_sync import sync_from_defectdojo
-                result = sync_from_defectdojo(data)
-                if result.get('success'):
-                    processed += 1
-                    logger.info(f"✓ Procesado webhook desde cola: {filepath.name}")
-                    filepath.unlink()
-                else:
-                    errors += 1
-                    logger.error(f"✗ Error procesando webhook {filepath.name}: {result.get('error')}")
-                    
-        except Exception as e:
-            errors += 1
-            logger.error(f"✗ Error procesando archivo {filepath.name}: {e}", exc_info=True)
-            # Mover archivo a carpeta de errores o renombrar
-            error_dir = queue_dir / 'errors'
-            error_dir.mkdir(exist_ok=True)
-            try:
-                filepath.rename(error_dir / filepath.name)
-            except:
-                pass
+    while True:
+        messages = queue.claim(CONSUMER_ID, batch_size)
+        if not messages:
+            break
+        done = []
+        unavailable = None
+        with _apply_lock:
+            # Los que ya no están en la cola los sustituyó un cambio posterior ya aplicado
+            queued = queue.queued(message['id'] for message in messages)
+            superseded = len(messages) - len(queued)
+            messages = [message for message in messages if message['id'] in queued]
+            batches = [
+                ('tracker->dd', [message for message in messages if message['type'] == 'tracker->dd'],
+                 sync_batch_from_tracker, lambda data: data.get('wstg_id') or ''),
+                ('dd->tracker', [message for message in messages if message['type'] == 'dd->tracker'],
+                 sync_batch_from_defectdojo, webhook_finding_id),
+            ]
+            for position, (direction, batch, apply, result_key) in enumerate(batches):
+                if not batch:
+                    continue
+                try:
+                    done += _process_batch(queue, direction, batch, apply, result_key)
+                except Exception as e:
+                    if not _is_infrastructure_error(e):
+                        raise
+                    unavailable = e
+                    unsettled = [message['id'] for _, rest, _, _ in batches[position:] for message in rest]
+                    queue.release(unsettled, INFRA_RETRY_DELAY, str(e))
+                    django_after_request()
+                    logger.error(f"✗ DefectDojo no disponible, {len(unsettled)} mensajes vuelven a la cola "
+                                 f"sin contar el intento: {e}")
+                    break
+        
+        queue.ack(done)
+        processed += len(done)
+        if superseded:
+            logger.info(f"{superseded} mensajes sustituidos por cambios posteriores")
+        if unavailable is not None:
+            break
+        errors += len(messages) - len(done)
     
     if processed > 0 or errors > 0:
         logger.info(f"Cola procesada: {processed} exitosos, {errors} errores")
@@ -95,63 +223,130 @@ def process_sync_queue():
     return processed, errors
 
 
-def sync_all_wstg_findings():
-    """Sincronizar todos los findings WSTG desde DefectDojo"""
+def _watermark_field():
+    """Primer campo de WATERMARK_FIELDS que existe en Finding en esta versión de DefectDojo"""
+    names = {field.name for field in Finding._meta.get_fields()}
+    return next((name for name in WATERMARK_FIELDS if name in names), None)
+
+
+def _needs_full_sync(watermark, field):
+    if not field or not watermark or watermark.get('field') != field or not watermark.get('modified'):
+        return True
+    full_sync_at = watermark.get('full_sync_at')
+    if not full_sync_at:
+        return True
+    return timezone.now() - datetime.fromisoformat(full_sync_at) >= FULL_SYNC_INTERVAL
+
+
+def sync_all_wstg_findings(full=False):
+    """
+    Sincronizar desde DefectDojo los findings WSTG modificados (ver _sync_findings_pass)
+    y registrar la pasada en las métricas (tipo, duración, findings leídos y consultas)
+    """
+    pass_info = {'kind': 'full' if full else 'incremental', 'read': 0}
+    started = time.perf_counter()
+    with count_queries() as queries:
+        synced, updated, errors = _sync_findings_pass(full, pass_info)
+    get_metrics().record_pass(pass_info['kind'], pass_info['read'], updated, errors,
+                              time.perf_counter() - started, queries=queries['count'])
+    return synced, updated, errors
+
+
+def _sync_findings_pass(full, pass_info):
+    """
+    Sincronizar desde DefectDojo los findings WSTG modificados desde la última pasada
+    
+    La marca de agua (meta 'dd_watermark' del estado) guarda el mayor id y la mayor
+    fecha de modificación vistos: solo se leen los findings nuevos o modificados desde
+    entonces (con un solape de WATERMARK_OVERLAP) y solo se escriben los items cuyo
+    estado cambió. Se hace una pasada completa la primera vez, con `full`, si
+    DefectDojo no tiene campo de modificación o cada FULL_SYNC_INTERVAL (cubre cambios
+    que no tocan ese campo, como añadir el tag WSTG a un finding existente).
+    """
     try:
         test, _ = get_wstg_test_and_engagement()
+        store = get_state_store()
+        field = _watermark_field()
+        watermark = store.get_meta(WATERMARK_KEY) or {}
+        started = timezone.now()
+        full = full or _needs_full_sync(watermark, field)
+        pass_info['kind'] = 'full' if full else 'incremental'
         
-        # Obtener todos los findings con tag WSTG
-        findings = Finding.objects.filter(
-            test=test,
-            tags__name='WSTG'
-        ).distinct()
+        findings = Finding.objects.filter(test=test, tags__name='WSTG')
+        if not full:
+            since = datetime.fromisoformat(watermark['modified']) - WATERMARK_OVERLAP
+            findings = findings.filter(Q(id__gt=watermark.get('max_id', 0)) | Q(**{f'{field}__gte': since}))
+        findings = list(findings.distinct().prefetch_related('tags'))
+        pass_info['read'] = len(findings)
         
         synced = 0
         errors = 0
         updated = 0
+        max_id = watermark.get('max_id', 0) if not full else 0
+        modified = datetime.fromisoformat(watermark['modified']) if not full else None
         
-        state = load_sync_state()
-        if 'items' not in state:
-            state['items'] = {}
-        
+        candidates = {}
         for finding in findings:
+            max_id = max(max_id, finding.id)
+            finding_modified = getattr(finding, field) if field else None
+            if finding_modified and (modified is None or finding_modified > modified):
+                modified = finding_modified
             try:
                 wstg_id = extract_wstg_id(finding)
-                if not wstg_id:
-                    continue
-                
+                if wstg_id:
+                    candidates[wstg_id] = finding
+            except Exception as e:
+                errors += 1
+                logger.error(f"✗ Error sincronizando finding {finding.id}: {e}", exc_info=True)
+        
+        known = store.get_items(candidates)
+        changes = {}
+        now = datetime.now().isoformat()
+        for wstg_id, finding in candidates.items():
+            try:
                 wstg_status = determine_wstg_status(finding)
-                
-                # Verificar si hay cambios
-                item_state = state['items'].get(wstg_id, {})
+                defectdojo_status = 'verified' if finding.verified else 'active'
+                item_state = known.get(wstg_id, {})
                 old_wstg_status = item_state.get('wstg_status')
-                last_sync = item_state.get('last_sync_timestamp')
+                synced += 1
+                
+                # Sin cambios: no se reescribe el item
+                if (item_state.get('finding_id') == finding.id and old_wstg_status == wstg_status
+                        and item_state.get('defectdojo_status') == defectdojo_status):
+                    logger.debug(f"  Sin cambios {wstg_id}: {wstg_status}")
+                    continue
                 
-                # Actualizar estado
-                state['items'][wstg_id] = {
+                changes[wstg_id] = {
                     'finding_id': finding.id,
                     'wstg_status': wstg_status,
-                    'defectdojo_status': 'verified' if finding.verified else 'active',
-                    'last_sync_timestamp': datetime.now().isoformat(),
+                    'defectdojo_status': defectdojo_status,
+                    'last_sync_timestamp': now,
                     'last_sync_direction': 'dd->tracker'
                 }
-                
                 if old_wstg_status != wstg_status:
                     updated += 1
                     logger.info(f"✓ Actualizado {wstg_id}: {old_wstg_status} → {wstg_status}")
                     log_sync(wstg_id, 'dd->tracker', old_wstg_status, wstg_status, True)
-                else:
-                    logger.debug(f"  Sin cambios {wstg_id}: {wstg_status}")
-                
-                synced += 1
                 
             except Exception as e:
                 errors += 1
                 logger.error(f"✗ Error sincronizando finding {finding.id}: {e}", exc_info=True)
         
-        save_sync_state(state)
+        # UPSERT solo de los items que cambiaron (una transacción)
+        if changes:
+            store.upsert_items(changes)
+        
+        new_watermark = {
+            'field': field,
+            'max_id': max_id,
+            'modified': modified.isoformat() if modified else None,
+            'full_sync_at': started.isoformat() if full else watermark.get('full_sync_at'),
+        }
+        if new_watermark != watermark:
+            store.set_meta(WATERMARK_KEY, new_watermark)
         
-        logger.info(f"Sincronización completada: {synced} items, {updated} actualizados, {errors} errores")
+        logger.info(f"Sincronización {'completa' if full else 'incremental'} completada: {len(findings)} leídos, "
+                    f"{synced} items, {updated} actualizados, {errors} errores")
         return synced, updated, errors
         
     except Exception as e:
@@ -161,27 +356,14 @@ def sync_all_wstg_findings():
 
 def resolve_conflicts():
     """Resolver conflictos entre tracker y DefectDojo"""
-    state = load_sync_state()
-    items = state.get('items', {})
     conflicts_resolved = 0
     
-    for wstg_id, item_data in items.items():
-        wstg_status = item_data.get('wstg_status')
-        dd_status = item_data.get('defectdojo_status')
-        last_direction = item_data.get('last_sync_direction')
-        
-        # Detectar conflictos
-        is_conflict = False
-        if wstg_status == 'Done' and dd_status != 'verified':
-            is_conflict = True
-        elif wstg_status == 'In Progress' and dd_status != 'active':
-            is_conflict = True
-        
-        if is_conflict:
-            # Estrategia: DefectDojo tiene prioridad
-            logger.info(f"Resolviendo conflicto para {wstg_id}: DefectDojo tiene prioridad")
-            # Aquí se podría actualizar el tracker si tuviera API
-            conflicts_resolved += 1
+    # Solo los items marcados como conflicto al escribirlos (índice sobre `conflict`)
+    for wstg_id in get_state_store().conflicts():
+        # Estrategia: DefectDojo tiene prioridad
+        logger.info(f"Resolviendo conflicto para {wstg_id}: DefectDojo tiene prioridad")
+        # Aquí se podría actualizar el tracker si tuviera API
+        conflicts_resolved += 1
     
     if conflicts_resolved > 0:
         logger.info(f"Conflictos resueltos: {conflicts_resolved}")
@@ -189,32 +371,122 @@ def resolve_conflicts():
     return conflicts_resolved
 
 
-def run_sync_service(interval_minutes=5):
-    """Ejecutar servicio de sincronización en loop"""
-    logger.info(f"🔄 Iniciando servicio de sincronización WSTG (intervalo: {interval_minutes} min)")
-    
-    while True:
+def _timed_handler(command, handler):
+    """Registra en las métricas la latencia y el resultado de cada petición del worker"""
+    def timed(data):
+        started = time.perf_counter()
+        success = False
         try:
-            logger.info(f"[{datetime.now()}] Iniciando sincronización...")
-            
-            # 1. Procesar cola de sincronizaciones pendientes
-            queue_processed, queue_errors = process_sync_queue()
-            
-            # 2. Sincronizar todos los findings WSTG desde DefectDojo
-            synced, updated, errors = sync_all_wstg_findings()
-            
-            # 3. Resolver conflictos
-            conflicts = resolve_conflicts()
+            result = handler(data)
+            success = bool(result.get('success', True)) if isinstance(result, dict) else True
+            return result
+        finally:
+            get_metrics().record_request(command, time.perf_counter() - started, success)
+    return timed
+
+
+def _ordered_sync_from_tracker(handler):
+    """
+    Cambio inmediato del tracker (worker): se aplica con _apply_lock y, si se sincroniza,
+    sustituye a los mensajes anteriores del mismo WSTG ID que esperan en la cola
+    """
+    def ordered(data):
+        queue = get_queue(QUEUE_DIR)
+        with _apply_lock:
+            up_to = queue.last_id()
+            result = handler(data)
+            if isinstance(result, dict) and result.get('success'):
+                queue.supersede(data.get('wstg_id'), up_to)
+        return result
+    return ordered
+
+
+def publish_metrics():
+    """Actualiza el estado de la cola en las métricas y publica el fichero (data/wstg_sync_metrics.json)"""
+    metrics = get_metrics()
+    try:
+        metrics.set_queue(get_queue(QUEUE_DIR).stats())
+        metrics.write()
+    except Exception as e:
+        logger.error(f"Error publicando métricas de sincronización: {e}")
+
+
+def start_worker(socket_path=SOCKET_PATH):
+    """Atender sincronizaciones de la web por socket Unix reutilizando este proceso Django"""
+    handlers = django_handlers()
+    handlers['sync_from_tracker'] = _ordered_sync_from_tracker(handlers['sync_from_tracker'])
+    handlers = {command: _timed_handler(command, handler) for command, handler in handlers.items()}
+    try:
+        server = WorkerServer(socket_path, handlers, after_request=django_after_request)
+    except OSError as e:
+        logger.warning(f"Worker de sincronización no disponible ({socket_path}): {e}")
+        return None
+    start_in_thread(server)
+    logger.info(f"Worker de sincronización escuchando en {socket_path}")
+    return server
+
+
+def run_sync_service(interval_minutes=5, worker=True):
+    """
+    Ejecutar servicio de sincronización en loop
+    
+    La cola se procesa en cuanto llega una solicitud (QueueWatcher) o vence el backoff
+    de un reintento; la sincronización de findings y la resolución de conflictos se
+    hacen cada `interval_minutes`. Las métricas se publican tras cada vuelta y al
+    menos cada METRICS_INTERVAL segundos.
+    Con `worker`, además atiende las sincronizaciones inmediatas de la web por socket Unix.
+    """
+    server = start_worker() if worker else None
+    watcher = QueueWatcher(QUEUE_DIR)
+    logger.info(f"🔄 Iniciando servicio de sincronización WSTG (cola: {watcher.mode}, "
+                f"sincronización completa cada {interval_minutes} min)")
+    
+    interval = interval_minutes * 60
+    next_full_sync = time.monotonic()
+    queue = get_queue(QUEUE_DIR)
+    
+    try:
+        while True:
+            try:
+                # 1. Procesar cola de sincronizaciones pendientes (una consulta si está vacía)
+                process_sync_queue()
+                
+                if time.monotonic() >= next_full_sync:
+                    next_full_sync = time.monotonic() + interval
+                    logger.info(f"[{datetime.now()}] Iniciando sincronización...")
+                    
+                    # 2. Sincronizar todos los findings WSTG desde DefectDojo
+                    synced, updated, errors = sync_all_wstg_findings()
+                    
+                    # 3. Resolver conflictos
+                    conflicts = resolve_conflicts()
+                    
+                    logger.info(f"[{datetime.now()}] Sincronización completada: {synced} items, {updated} actualizados, {errors} errores, {conflicts} conflictos")
+                
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error en servicio de sincronización: {e}", exc_info=True)
             
-            logger.info(f"[{datetime.now()}] Sincronización completada: {synced} items, {updated} actualizados, {queue_processed} de cola, {errors + queue_errors} errores, {conflicts} conflictos")
+            publish_metrics()
             
-        except KeyboardInterrupt:
-            logger.info("Servicio detenido por usuario")
-            break
-        except Exception as e:
-            logger.error(f"❌ Error en servicio de sincronización: {e}", exc_info=True)
-        
-        time.sleep(interval_minutes * 60)
+            # Esperar a la siguiente solicitud, al próximo reintento o a la próxima sincronización
+            timeout = max(0.0, next_full_sync - time.monotonic())
+            try:
+                retry_in = queue.next_available_in()
+            except Exception as e:
+                logger.error(f"❌ Error consultando la cola: {e}")
+                retry_in = None
+            if retry_in is not None:
+                timeout = min(timeout, max(retry_in, 1.0))
+            watcher.wait(min(timeout, METRICS_INTERVAL))
+    except KeyboardInterrupt:
+        logger.info("Servicio detenido por usuario")
+    finally:
+        watcher.close()
+        if server:
+            server.shutdown()
+            server.server_close()
 
 
 if __name__ == '__main__':
@@ -222,16 +494,25 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Servicio de sincronización WSTG')
     parser.add_argument('--interval', type=int, default=5, help='Intervalo en minutos (default: 5)')
     parser.add_argument('--once', action='store_true', help='Ejecutar una vez y salir')
+    parser.add_argument('--full', action='store_true',
+                        help='Con --once: releer todos los findings WSTG (ignora la marca de agua)')
+    parser.add_argument('--no-worker', action='store_true',
+                        help='No atender sincronizaciones inmediatas por socket Unix (WSTG_SYNC_SOCKET)')
+    parser.add_argument('--requeue-dead', action='store_true',
+                        help='Devolver a la cola los mensajes en dead-letter y salir')
     args = parser.parse_args()
     
-    if args.once:
+    if args.requeue_dead:
+        logger.info(f"Mensajes devueltos a la cola: {get_queue(QUEUE_DIR).requeue_dead()}")
+    elif args.once:
         # Procesar cola primero
         queue_processed, queue_errors = process_sync_queue()
         logger.info(f"Cola procesada: {queue_processed} exitosos, {queue_errors} errores")
         
         # Sincronizar findings
-        sync_all_wstg_findings()
+        sync_all_wstg_findings(full=args.full)
         resolve_conflicts()
+        publish_metrics()
     else:
-        run_sync_service(args.interval)
+        run_sync_service(args.interval, worker=not args.no_worker)
 
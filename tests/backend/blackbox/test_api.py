@@ -341,6 +341,43 @@ class TestAPIConfig:
         assert isinstance(limits['weight_variation_per_day'], (int, float))
 
 
+class TestAPIPublicPayloadCache:
+    """Tests de caja negra para la caché HTTP de /api/config y /api/messages"""
+
+    @pytest.mark.parametrize('url', ['/api/config', '/api/messages'])
+    def test_etag_and_revalidation(self, client, url):
+        """Sin versión se envía ETag y el cliente debe revalidar (304 si no cambió)"""
+        response = client.get(url)
+        assert_success(response)
+        etag = response.headers.get('ETag')
+        assert etag
+        assert 'no-cache' in response.headers['Cache-Control']
+
+        cached = client.get(url, headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.data == b''
+
+    @pytest.mark.parametrize('url', ['/api/config', '/api/messages'])
+    def test_versioned_url_is_immutable(self, client, url):
+        """Con ?v=<etag> vigente la respuesta se cachea a largo plazo"""
+        version = client.get(url).headers['ETag'].strip('"')
+        response = client.get(f'{url}?v={version}')
+        assert_success(response)
+        assert 'immutable' in response.headers['Cache-Control']
+        assert 'max-age=31536000' in response.headers['Cache-Control']
+
+        stale = client.get(f'{url}?v=obsoleta')
+        assert 'immutable' not in stale.headers['Cache-Control']
+
+    def test_index_exposes_payload_versions(self, client):
+        """La página principal inyecta las versiones para que el frontend las use"""
+        config_version = client.get('/api/config').headers['ETag'].strip('"')
+        messages_version = client.get('/api/messages').headers['ETag'].strip('"')
+        html = client.get('/').get_data(as_text=True)
+        assert config_version in html
+        assert messages_version in html
+
+
 class TestAPIIndex:
     """Tests de caja negra para endpoint raíz"""
     
@@ -7,7 +7,7 @@ import pytest
 import json
 import os
 import tempfile
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
 from tests.backend.conftest import assert_success, assert_bad_request, assert_forbidden, auth_headers
 
 
@@ -19,71 +19,46 @@ def _skip_if_defectdojo_missing(response):
 class TestDefectDojoExportDump:
     """Tests de caja negra para endpoint de exportación de dump"""
     
-    @patch('flask.send_file')
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('os.path.exists')
-    @patch('os.makedirs')
-    @patch('subprocess.run')
-    def test_export_dump_success(self, mock_subprocess, mock_makedirs, mock_exists, 
-                                  mock_file, mock_send_file, client, auth_session):
-        """Test POST /api/defectdojo/export-dump exporta correctamente"""
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "CREATE TABLE test;\nINSERT INTO test VALUES (1);"
-        mock_result.stderr = ""
-        mock_subprocess.return_value = mock_result
-        
-        mock_exists.return_value = True
-        
-        from flask import Response
-        mock_send_file.return_value = Response(status=200)
-        
-        response = client.get('/api/defectdojo/export-dump',
-                              headers=auth_headers(auth_session["access_token"]))
-        _skip_if_defectdojo_missing(response)
-        
-        assert mock_subprocess.call_count >= 1
-        call_args = mock_subprocess.call_args_list[-1]
-        cmd_repr = str(call_args)
-        assert (
-            'docker-compose' in cmd_repr
-            or 'pg_dump' in cmd_repr
-            or ('docker' in cmd_repr and 'compose' in cmd_repr)
-        )
-        
-        mock_makedirs.assert_called_once()
-        assert response.status_code in [200, 500]
+    def test_export_dump_success(self, client, auth_session):
+        """Test GET /api/defectdojo/export-dump envía el SQL de pg_dump en streaming"""
+        import sys
+        fake_pg_dump = [sys.executable, '-c', 'print("CREATE TABLE test;")']
+        with patch('app.defectdojo_ops.dump_command', return_value=fake_pg_dump):
+            response = client.get('/api/defectdojo/export-dump',
+                                  headers=auth_headers(auth_session["access_token"]))
+            _skip_if_defectdojo_missing(response)
+
+            assert response.status_code == 200
+            assert response.mimetype == 'application/sql'
+            assert 'defectdojo_db_dump.sql' in response.headers['Content-Disposition']
+            assert response.data == b"CREATE TABLE test;\n"
     
-    @patch('subprocess.run')
-    def test_export_dump_subprocess_error(self, mock_subprocess, client, auth_session):
-        """Test POST /api/defectdojo/export-dump maneja error de subprocess"""
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stderr = "Error: database connection failed"
-        mock_subprocess.return_value = mock_result
-        
-        response = client.get('/api/defectdojo/export-dump',
-                              headers=auth_headers(auth_session["access_token"]))
+    def test_export_dump_subprocess_error(self, client, auth_session):
+        """Test GET /api/defectdojo/export-dump maneja el error de pg_dump"""
+        import sys
+        failing_pg_dump = [sys.executable, '-c', 'import sys; sys.exit("database connection failed")']
+        with patch('app.defectdojo_ops.dump_command', return_value=failing_pg_dump):
+            response = client.get('/api/defectdojo/export-dump',
+                                  headers=auth_headers(auth_session["access_token"]))
         _skip_if_defectdojo_missing(response)
         
         assert response.status_code == 500
         data = json.loads(response.data)
         assert 'error' in data
     
-    @patch('subprocess.run')
-    def test_export_dump_timeout(self, mock_subprocess, client, auth_session):
-        """Test POST /api/defectdojo/export-dump maneja timeout"""
-        import subprocess
-        
-        mock_subprocess.side_effect = subprocess.TimeoutExpired(cmd='docker-compose', timeout=300)
-        
-        response = client.get('/api/defectdojo/export-dump',
-                              headers=auth_headers(auth_session["access_token"]))
+    def test_export_dump_timeout(self, client, auth_session):
+        """Test GET /api/defectdojo/export-dump maneja un pg_dump bloqueado"""
+        import sys
+        stalled_pg_dump = [sys.executable, '-c', 'import time; time.sleep(30)']
+        with patch('app.defectdojo_ops.dump_command', return_value=stalled_pg_dump), \
+                patch('app.defectdojo_ops.DUMP_TIMEOUT', 0.5):
+            response = client.get('/api/defectdojo/export-dump',
+                                  headers=auth_headers(auth_session["access_token"]))
         _skip_if_defectdojo_missing(response)
         
         assert response.status_code == 500
         data = json.loads(response.data)
-        assert 'error' in data
+        assert 'Timeout' in data['error']
 
     def test_export_dump_forbidden_for_regular_user(self, client, regular_user_session):
         """Un usuario con rol 'user' no puede exportar dumps"""
@@ -96,57 +71,35 @@ class TestDefectDojoExportDump:
 class TestDefectDojoImportDump:
     """Tests de caja negra para endpoint de importación de dump"""
     
-    @patch('builtins.open', new_callable=mock_open, read_data="CREATE TABLE test;")
-    @patch('os.remove')
-    @patch('os.path.exists')
-    @patch('os.makedirs')
-    @patch('subprocess.run')
-    def test_import_dump_success(self, mock_subprocess, mock_makedirs, mock_exists, 
-                                  mock_remove, mock_file, client, auth_session):
-        """Test POST /api/defectdojo/import-dump importa correctamente"""
-        mock_psql_result = MagicMock()
-        mock_psql_result.returncode = 0
-        mock_psql_result.stderr = ""
-        
-        mock_restart_result = MagicMock()
-        mock_restart_result.returncode = 0
-        mock_restart_result.stderr = ""
-        
-        def subprocess_side_effect(*args, **kwargs):
-            cmd = args[0] if args else kwargs.get('args', [])
-            if 'psql' in cmd:
-                return mock_psql_result
-            elif 'restart' in cmd:
-                return mock_restart_result
-            return mock_psql_result
-        
-        mock_subprocess.side_effect = subprocess_side_effect
-        mock_exists.return_value = True
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.sql', delete=False) as tmp_file:
-            tmp_file.write("CREATE TABLE test;")
-            tmp_file_path = tmp_file.name
-        
-        try:
-            from io import BytesIO
-            file_content = b"CREATE TABLE test;"
-            data = {
-                'file': (BytesIO(file_content), 'test_dump.sql')
-            }
+    @staticmethod
+    def _fake_psql(output_path):
+        """Proceso que guarda lo que recibe por stdin (simula psql)"""
+        import sys
+        code = f"import sys; open({str(output_path)!r}, 'wb').write(sys.stdin.buffer.read())"
+        return [sys.executable, '-c', code]
+
+    @pytest.mark.parametrize('filename', ['test_dump.sql', 'test_dump.sql.gz'])
+    @patch('app.defectdojo_ops._restart_defectdojo')
+    def test_import_dump_success(self, mock_restart, filename, client, auth_session, tmp_path):
+        """Test POST /api/defectdojo/import-dump envía el dump (descomprimido) a psql"""
+        import gzip
+        from io import BytesIO
+        content = b"CREATE TABLE test;"
+        upload = gzip.compress(content) if filename.endswith('.gz') else content
+        received = tmp_path / 'received.sql'
+        with patch('app.defectdojo_ops.import_command', return_value=self._fake_psql(received)):
             response = client.post(
                 '/api/defectdojo/import-dump',
-                data=data,
+                data={'file': (BytesIO(upload), filename)},
                 content_type='multipart/form-data',
                 headers=auth_headers(auth_session["access_token"]),
             )
-            _skip_if_defectdojo_missing(response)
-            
-            assert mock_subprocess.called
-            assert response.status_code in [200, 500]
-            
-        finally:
-            if os.path.exists(tmp_file_path):
-                os.remove(tmp_file_path)
+        _skip_if_defectdojo_missing(response)
+        
+        assert_success(response)
+        assert json.loads(response.data)['success'] is True
+        assert received.read_bytes() == content
+        assert mock_restart.called
     
     def test_import_dump_no_file(self, client, auth_session):
         """Test POST /api/defectdojo/import-dump sin archivo"""
@@ -185,35 +138,26 @@ class TestDefectDojoImportDump:
             if os.path.exists(tmp_file_path):
                 os.remove(tmp_file_path)
     
-    @patch('subprocess.run')
-    def test_import_dump_timeout(self, mock_subprocess, client, auth_session):
+    @patch('app.defectdojo_ops._restart_defectdojo')
+    def test_import_dump_timeout(self, mock_restart, client, auth_session):
         """Test POST /api/defectdojo/import-dump maneja timeout"""
-        import subprocess
-        
-        mock_subprocess.side_effect = subprocess.TimeoutExpired(cmd='docker-compose', timeout=300)
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.sql', delete=False) as tmp_file:
-            tmp_file.write("CREATE TABLE test;")
-            tmp_file_path = tmp_file.name
+        import sys
+        from io import BytesIO
+        stalled_psql = [sys.executable, '-c', 'import time; time.sleep(30)']
+        with patch('app.defectdojo_ops.import_command', return_value=stalled_psql), \
+                patch('app.defectdojo_ops.IMPORT_TIMEOUT', 0.5):
+            response = client.post(
+                '/api/defectdojo/import-dump',
+                data={'file': (BytesIO(b"CREATE TABLE test;"), 'test_dump.sql')},
+                content_type='multipart/form-data',
+                headers=auth_headers(auth_session["access_token"]),
+            )
+        _skip_if_defectdojo_missing(response)
         
-        try:
-            with open(tmp_file_path, 'rb') as f:
-                data = {'file': (f, 'test_dump.sql')}
-                response = client.post(
-                    '/api/defectdojo/import-dump',
-                    data=data,
-                    content_type='multipart/form-data',
-                    headers=auth_headers(auth_session["access_token"]),
-                )
-            _skip_if_defectdojo_missing(response)
-            
-            assert response.status_code == 500
-            data = json.loads(response.data)
-            assert 'error' in data
-            
-        finally:
-            if os.path.exists(tmp_file_path):
-                os.remove(tmp_file_path)
+        assert response.status_code == 500
+        data = json.loads(response.data)
+        assert 'Timeout' in data['error']
+        assert not mock_restart.called
 
     def test_import_dump_forbidden_for_regular_user(self, client, regular_user_session):
         """Un usuario con rol 'user' no puede importar dumps"""
@@ -345,3 +289,164 @@ class TestDefectDojoGeneratePDF:
                               headers=auth_headers(regular_user_session["access_token"]))
         _skip_if_defectdojo_missing(response)
         assert_forbidden(response)
+
+
+class TestDefectDojoPdfCache:
+    """Tests de caja negra para la caché de PDF con ETag"""
+
+    def test_pdf_served_from_cache_with_etag(self, app, client, auth_session, tmp_path, monkeypatch):
+        from app import defectdojo_ops
+        from app.pdf_cache import PdfReportCache
+
+        markdown = tmp_path / "INFORME_SEGURIDAD.md"
+        markdown.write_text("# Informe\n")
+        monkeypatch.setattr(defectdojo_ops, 'REPORT_MARKDOWN', str(markdown))
+        app.pdf_cache = PdfReportCache(str(tmp_path / "cache"), str(tmp_path / "manifest.json"),
+                                       str(tmp_path / "renderer.py"))
+        rendered = tmp_path / "INFORME_SEGURIDAD_20250101.pdf"
+        rendered.write_bytes(b"%PDF-1.4 informe")
+        headers = auth_headers(auth_session["access_token"])
+
+        with patch('app.defectdojo_ops.generate_pdf', return_value=str(rendered)) as mock_render:
+            first = client.get('/api/defectdojo/generate-pdf', headers=headers)
+            second = client.get('/api/defectdojo/generate-pdf', headers=headers)
+            revalidated = client.get('/api/defectdojo/generate-pdf',
+                                     headers={**headers, 'If-None-Match': first.headers['ETag']})
+
+        assert mock_render.call_count == 1
+        assert first.status_code == 200
+        assert first.headers['X-Cache'] == 'miss'
+        assert first.data == b"%PDF-1.4 informe"
+        assert 'INFORME_SEGURIDAD_20250101.pdf' in first.headers['Content-Disposition']
+        assert second.headers['X-Cache'] == 'hit'
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert revalidated.status_code == 304
+
+
+class TestDefectDojoStreamExport:
+    """Tests de caja negra para la exportación en streaming"""
+
+    def test_stream_export_is_gzip(self, client, auth_session):
+        import gzip
+        import sys
+        fake_pg_dump = [sys.executable, '-c', 'print("CREATE TABLE test;")']
+        with patch('app.defectdojo_ops.dump_command', return_value=fake_pg_dump):
+            response = client.get('/api/defectdojo/export-dump/stream',
+                                  headers=auth_headers(auth_session["access_token"]))
+            assert response.status_code == 200
+            assert response.mimetype == 'application/gzip'
+            assert 'defectdojo_db_dump.sql.gz' in response.headers['Content-Disposition']
+            assert gzip.decompress(response.data) == b"CREATE TABLE test;\n"
+
+    def test_stream_export_rejects_unknown_compression(self, client, auth_session):
+        response = client.get('/api/defectdojo/export-dump/stream?compression=rar',
+                              headers=auth_headers(auth_session["access_token"]))
+        assert_bad_request(response)
+
+    def test_stream_export_forbidden_for_regular_user(self, client, regular_user_session):
+        response = client.get('/api/defectdojo/export-dump/stream',
+                              headers=auth_headers(regular_user_session["access_token"]))
+        assert_forbidden(response)
+
+
+class TestBackgroundJobs:
+    """Tests de caja negra para los trabajos en segundo plano (/api/jobs/...)"""
+
+    def test_export_dump_job_downloads_artifact(self, app, client, auth_session, tmp_path):
+        """POST encola (202), GET devuelve el estado y la descarga sirve el dump comprimido"""
+        import gzip
+        import sys
+        app.jobs.artifacts_dir = str(tmp_path)
+        headers = auth_headers(auth_session["access_token"])
+        fake_pg_dump = [sys.executable, '-c', 'print("CREATE TABLE test;")']
+
+        with patch('app.defectdojo_ops.dump_command', return_value=fake_pg_dump):
+            response = client.post('/api/jobs/defectdojo/export-dump', headers=headers)
+            assert response.status_code == 202
+            body = json.loads(response.data)
+            assert response.headers['Location'] == body['status_url']
+            app.jobs.wait(body['job_id'], timeout=10)
+
+        status = json.loads(client.get(body['status_url'], headers=headers).data)
+        assert status['status'] == 'succeeded'
+        assert status['progress'] == 100
+
+        download = client.get(status['download_url'], headers=headers)
+        assert download.status_code == 200
+        assert 'defectdojo_db_dump.sql.gz' in download.headers['Content-Disposition']
+        assert gzip.decompress(download.data) == b"CREATE TABLE test;\n"
+
+    def test_failed_job_reports_error(self, app, client, auth_session, tmp_path):
+        """Un trabajo fallido expone el error y no ofrece descarga"""
+        import sys
+        app.jobs.artifacts_dir = str(tmp_path)
+        headers = auth_headers(auth_session["access_token"])
+        failing_pg_dump = [sys.executable, '-c', 'import sys; sys.exit("database connection failed")']
+
+        with patch('app.defectdojo_ops.dump_command', return_value=failing_pg_dump):
+            job_id = json.loads(client.post('/api/jobs/defectdojo/export-dump', headers=headers).data)['job_id']
+            app.jobs.wait(job_id, timeout=10)
+
+        status = json.loads(client.get(f'/api/jobs/{job_id}', headers=headers).data)
+        assert status['status'] == 'failed'
+        assert 'error' in status
+        assert 'download_url' not in status
+        assert client.get(f'/api/jobs/{job_id}/download', headers=headers).status_code == 409
+
+    def test_import_dump_job_accepts_gzip_and_reports_bytes(self, app, client, auth_session, tmp_path):
+        """La importación en segundo plano acepta .sql.gz e informa bytes procesados"""
+        import gzip
+        import sys
+        from io import BytesIO
+        headers = auth_headers(auth_session["access_token"])
+        fake_psql = [sys.executable, '-c', 'import sys; sys.stdin.buffer.read()']
+        payload = gzip.compress(b"CREATE TABLE test;\n" * 1000)
+
+        with patch('app.defectdojo_ops.import_command', return_value=fake_psql), \
+                patch('app.defectdojo_ops._restart_defectdojo') as mock_restart:
+            response = client.post(
+                '/api/jobs/defectdojo/import-dump',
+                data={'file': (BytesIO(payload), 'dump.sql.gz')},
+                content_type='multipart/form-data',
+                headers=headers,
+            )
+            assert response.status_code == 202
+            job_id = json.loads(response.data)['job_id']
+            app.jobs.wait(job_id, timeout=10)
+            assert mock_restart.called
+
+        status = json.loads(client.get(f'/api/jobs/{job_id}', headers=headers).data)
+        assert status['status'] == 'succeeded'
+        assert status['details']['bytes_processed'] == status['details']['bytes_total'] == len(payload)
+        assert status['result']['success'] is True
+
+    def test_import_dump_job_validates_extension(self, client, auth_session):
+        """La validación del fichero se hace antes de encolar"""
+        from io import BytesIO
+        response = client.post(
+            '/api/jobs/defectdojo/import-dump',
+            data={'file': (BytesIO(b"test"), 'dump.txt')},
+            content_type='multipart/form-data',
+            headers=auth_headers(auth_session["access_token"]),
+        )
+        assert_bad_request(response)
+
+    def test_wstg_sync_job_rejects_invalid_update(self, app, client, auth_session):
+        """Un cambio inválido del tracker responde 400 y no se encola"""
+        headers = auth_headers(auth_session["access_token"])
+        with patch.object(app.jobs, 'submit') as mock_submit:
+            for data in ({'wstg_id': 'INPV-01', 'status': 'Done'},
+                         {'wstg_id': 'WSTG-INPV-01', 'status': 'Terminado'}):
+                response = client.post('/api/jobs/wstg/sync', json=data, headers=headers)
+                assert_bad_request(response)
+                assert json.loads(response.data)['success'] is False
+            assert not mock_submit.called
+
+    def test_unknown_job_returns_404(self, client, auth_session):
+        response = client.get('/api/jobs/no-existe', headers=auth_headers(auth_session["access_token"]))
+        assert response.status_code == 404
+
+    def test_jobs_forbidden_for_regular_user(self, client, regular_user_session):
+        response = client.post('/api/jobs/defectdojo/export-dump',
+                               headers=auth_headers(regular_user_session["access_token"]))
+        assert_forbidden(response)
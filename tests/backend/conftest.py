@@ -9,6 +9,10 @@ os.environ["RECAPTCHA_SECRET_KEY"] = ""
 os.environ["RECAPTCHA_SITE_KEY"] = ""
 # Secreto JWT fijo para tests (reproducibilidad)
 os.environ.setdefault("JWT_SECRET_KEY", "test-jwt-secret-key-for-testing-only")
+# Sin caché de PDF por defecto: los tests no deben leer ni escribir docs/informes/
+os.environ.setdefault("PDF_CACHE_ENABLED", "0")
+# Los tests de generación de PDF simulan el subproceso del script de renderizado
+os.environ.setdefault("PDF_RENDER_IN_PROCESS", "0")
 
 import pytest
 from datetime import datetime, date
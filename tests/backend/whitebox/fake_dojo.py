@@ -0,0 +1,292 @@
+"""
+ORM mínimo en memoria que sustituye a Django y a los modelos de DefectDojo en los
+tests de la sincronización WSTG (app/wstg_sync.py, scripts/wstg_sync_service.py).
+
+Django y DefectDojo solo están instalados en su contenedor: install() registra en
+sys.modules módulos django.* y dojo.models falsos y apunta app.wstg_sync a estos
+modelos. Cada evaluación de un queryset cuenta como una consulta (Manager.queries).
+"""
+import contextlib
+import sys
+import types
+from datetime import datetime
+
+from app import wstg_sync
+
+
+class DoesNotExist(Exception):
+    pass
+
+
+class Q:
+    """Q de Django reducido a OR de grupos de lookups (AND dentro de cada grupo)"""
+
+    def __init__(self, **lookups):
+        self.groups = [lookups] if lookups else []
+
+    def __or__(self, other):
+        combined = Q()
+        combined.groups = self.groups + other.groups
+        return combined
+
+    def matches(self, obj):
+        return not self.groups or any(all(_lookup(obj, key, value) for key, value in group.items())
+                                      for group in self.groups)
+
+
+def _lookup(obj, key, value):
+    if key.startswith('tags__name'):
+        names = {tag.name for tag in obj.tags.all()}
+        return value in names if key == 'tags__name' else bool(names & set(value))
+    field, _, op = key.partition('__')
+    actual = getattr(obj, field, None)
+    if op == '':
+        return actual == value
+    if op == 'in':
+        return actual in value
+    if op == 'contains':
+        return actual is not None and value in actual
+    if actual is None:
+        return False
+    if op == 'gt':
+        return actual > value
+    if op == 'gte':
+        return actual >= value
+    raise AssertionError(f'Lookup no soportado: {key}')
+
+
+class QuerySet:
+    def __init__(self, manager, rows):
+        self._manager = manager
+        self._rows = list(rows)
+
+    def filter(self, *conditions, **lookups):
+        rows = [row for row in self._rows
+                if all(condition.matches(row) for condition in conditions)
+                and all(_lookup(row, key, value) for key, value in lookups.items())]
+        self._manager.filters.append((conditions, lookups))
+        return QuerySet(self._manager, rows)
+
+    def distinct(self):
+        return QuerySet(self._manager, list(dict.fromkeys(self._rows)))
+
+    def order_by(self, field):
+        name = field.lstrip('-')
+        return QuerySet(self._manager, sorted(self._rows, key=lambda row: getattr(row, name),
+                                              reverse=field.startswith('-')))
+
+    def prefetch_related(self, *names):
+        return self
+
+    def select_related(self, *names):
+        return self
+
+    def _evaluate(self):
+        self._manager.queries += 1
+        return list(self._rows)
+
+    def first(self):
+        rows = self._evaluate()
+        return rows[0] if rows else None
+
+    def in_bulk(self):
+        return {row.id: row for row in self._evaluate()}
+
+    def __iter__(self):
+        return iter(self._evaluate())
+
+
+class Manager:
+    def __init__(self, model):
+        self.model = model
+        self.rows = []
+        self.queries = 0
+        self.filters = []
+        self.created = []
+        self.bulk_updates = []
+        self._last_id = 100
+
+    def all(self):
+        return QuerySet(self, self.rows)
+
+    def filter(self, *conditions, **lookups):
+        return self.all().filter(*conditions, **lookups)
+
+    def select_related(self, *names):
+        return self.all()
+
+    def get(self, **lookups):
+        row = self.filter(**lookups).first()
+        if row is None:
+            raise self.model.DoesNotExist()
+        return row
+
+    def create(self, **fields):
+        # Como una secuencia de la BD: los ids de filas borradas no se reutilizan
+        self._last_id = max([self._last_id] + [row.id for row in self.rows]) + 1
+        row = self.model(id=self._last_id, **fields)
+        self.rows.append(row)
+        self.created.append(row)
+        return row
+
+    def get_or_create(self, defaults=None, **lookups):
+        row = self.filter(**lookups).first()
+        if row is not None:
+            return row, False
+        return self.create(**lookups, **(defaults or {})), True
+
+    def bulk_update(self, rows, fields):
+        self.bulk_updates.append({'rows': list(rows), 'fields': list(fields),
+                                  'in_transaction': Transaction.depth > 0})
+
+    def delete(self, row):
+        self.rows.remove(row)
+
+
+class Tags:
+    def __init__(self, names=()):
+        self.names = list(names)
+
+    def all(self):
+        return [types.SimpleNamespace(name=name) for name in self.names]
+
+    def add(self, *names):
+        self.names.extend(name for name in names if name not in self.names)
+
+
+class _Meta:
+    def __init__(self, names):
+        self._fields = [types.SimpleNamespace(name=name) for name in names]
+
+    def get_fields(self):
+        return self._fields
+
+
+class Model:
+    DoesNotExist = DoesNotExist
+    objects = None
+
+    def __init__(self, id=None, **fields):
+        self.id = id
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}>'
+
+
+class Finding(Model):
+    _meta = _Meta(['id', 'test', 'title', 'active', 'verified', 'false_p', 'mitigation',
+                   'updated', 'last_status_update'])
+
+    def __init__(self, id=None, tags=(), **fields):
+        fields.setdefault('title', '')
+        fields.setdefault('active', True)
+        fields.setdefault('verified', False)
+        fields.setdefault('false_p', False)
+        fields.setdefault('mitigation', '')
+        fields.setdefault('updated', None)
+        fields.setdefault('last_status_update', None)
+        super().__init__(id=id, **fields)
+        self.tags = Tags(tags)
+
+
+class Test(Model):
+    pass
+
+
+class Engagement(Model):
+    pass
+
+
+class Product(Model):
+    pass
+
+
+class Product_Type(Model):
+    pass
+
+
+class Test_Type(Model):
+    pass
+
+
+class User(Model):
+    pass
+
+
+class Transaction:
+    depth = 0
+    committed = 0
+
+    @classmethod
+    @contextlib.contextmanager
+    def atomic(cls):
+        cls.depth += 1
+        try:
+            yield
+        finally:
+            cls.depth -= 1
+        cls.committed += 1
+
+
+class OperationalError(Exception):
+    pass
+
+
+class InterfaceError(Exception):
+    pass
+
+
+class Timezone:
+    """django.utils.timezone con la hora fijable"""
+    current = None
+
+    @classmethod
+    def now(cls):
+        return cls.current or datetime.now()
+
+
+def install(monkeypatch):
+    """
+    Registra django.* y dojo.models falsos, crea managers vacíos y conecta app.wstg_sync
+    con ellos. Devuelve un namespace con los modelos.
+    """
+    for model in (Finding, Test, Engagement, Product, Product_Type, Test_Type, User):
+        monkeypatch.setattr(model, 'objects', Manager(model))
+    monkeypatch.setattr(Transaction, 'depth', 0)
+    monkeypatch.setattr(Transaction, 'committed', 0)
+    monkeypatch.setattr(Timezone, 'current', None)
+
+    django = types.ModuleType('django')
+    django.setup = lambda: None
+    django_db = types.ModuleType('django.db')
+    django_db.transaction = Transaction
+    django_db.connection = types.SimpleNamespace(
+        execute_wrapper=lambda wrapper: contextlib.nullcontext())
+    django_db.OperationalError = OperationalError
+    django_db.InterfaceError = InterfaceError
+    django_db.close_old_connections = lambda: None
+    django_models = types.ModuleType('django.db.models')
+    django_models.Q = Q
+    django_db.models = django_models
+    django_utils = types.ModuleType('django.utils')
+    django_utils.timezone = Timezone
+    dojo_models = types.ModuleType('dojo.models')
+    for model in (Finding, Test, Engagement, Product, Product_Type, Test_Type):
+        setattr(dojo_models, model.__name__, model)
+    for name, module in (('django', django), ('django.db', django_db), ('django.db.models', django_models),
+                         ('django.utils', django_utils), ('django.utils.timezone', Timezone),
+                         ('dojo', types.ModuleType('dojo')), ('dojo.models', dojo_models)):
+        monkeypatch.setitem(sys.modules, name, module)
+
+    monkeypatch.setattr(wstg_sync, '_django_initialized', True)
+    for name, model in (('_Finding', Finding), ('_Test', Test), ('_Engagement', Engagement),
+                        ('_Product', Product), ('_Product_Type', Product_Type), ('_Test_Type', Test_Type),
+                        ('_User', User)):
+        monkeypatch.setattr(wstg_sync, name, model)
+    monkeypatch.setattr(wstg_sync, '_timezone', Timezone)
+    monkeypatch.setattr(wstg_sync, '_wstg_test_ids', {})
+    return types.SimpleNamespace(Finding=Finding, Test=Test, Engagement=Engagement, Product=Product,
+                                 Product_Type=Product_Type, Test_Type=Test_Type, User=User,
+                                 Transaction=Transaction, Timezone=Timezone, Q=Q)
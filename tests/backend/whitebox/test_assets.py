@@ -0,0 +1,66 @@
+"""
+Tests de caja blanca para el manifiesto de recursos estáticos (app/assets.py)
+"""
+import gzip
+
+import app.assets as assets_mod
+from app.assets import AssetManifest
+
+
+def test_manifest_hashes_every_static_file(app):
+    manifest = app.asset_manifest
+    assert manifest.version("js/main.js")
+    assert manifest.version("css/style.css")
+    assert manifest.version("js/translations/es.js")
+    assert manifest.version("js/no_existe.js") is None
+
+
+def test_manifest_digest_changes_with_content(tmp_path):
+    (tmp_path / "app.js").write_text("console.log(1);")
+    first = AssetManifest(str(tmp_path)).version("app.js")
+    (tmp_path / "app.js").write_text("console.log(2);")
+    second = AssetManifest(str(tmp_path)).version("app.js")
+    assert first and second and first != second
+
+
+def test_url_for_static_adds_fingerprint(app):
+    from flask import url_for
+    with app.test_request_context():
+        url = url_for("static", filename="js/main.js")
+    assert url == f"/static/js/main.js?v={app.asset_manifest.version('js/main.js')}"
+
+
+def test_index_uses_fingerprinted_urls(client, app):
+    html = client.get("/").get_data(as_text=True)
+    assert f"/static/js/main.js?v={app.asset_manifest.version('js/main.js')}" in html
+    assert 'src="/static/js/main.js"' not in html
+
+
+def test_fingerprinted_asset_is_immutable(client, app):
+    version = app.asset_manifest.version("js/config.js")
+    response = client.get(f"/static/js/config.js?v={version}")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+
+def test_stale_fingerprint_is_not_immutable(client):
+    response = client.get("/static/js/config.js?v=obsoleta")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers.get("Cache-Control", "")
+
+
+def test_precompressed_asset_served_as_gzip(monkeypatch):
+    monkeypatch.setitem(assets_mod.ASSETS_CONFIG, "precompress", True)
+    import app as app_module
+    flask_app = app_module.create_app()
+    client = flask_app.test_client()
+
+    version = flask_app.asset_manifest.version("js/main.js")
+    response = client.get(f"/static/js/main.js?v={version}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    plain = client.get(f"/static/js/main.js?v={version}")
+    assert gzip.decompress(response.data) == plain.data
+    assert "Content-Encoding" not in plain.headers
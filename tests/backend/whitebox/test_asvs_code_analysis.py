@@ -0,0 +1,146 @@
+"""
+Tests de caja blanca para el análisis de código del informe ASVS (scripts/asvs_code_analysis.py)
+"""
+import json
+
+from scripts import asvs_code_analysis
+from scripts.asvs_code_analysis import (ANALYZER_VERSION, CodeAnalysisCache, analyze_js_source,
+                                        analyze_python_source, analyze_tree, summarize)
+
+ROUTES_SOURCE = '''
+from flask import Blueprint
+from flask_cors import CORS
+
+api = Blueprint('api', __name__)
+CORS(api)
+
+
+def validate_weight(value):
+    return 0 < value < 500
+
+
+@api.route('/weights', methods=['POST'])
+@require_auth
+@require_role('admin')
+def add_weight():
+    try:
+        validate_weight(1)
+    except ValueError:
+        return 'error', 400
+    return 'ok'
+
+
+@api.get('/health')
+def health():
+    return 'ok'
+
+
+@property
+def helper():
+    return sanitize_input('x')
+
+
+def add_headers(response):
+    response.headers['X-Frame-Options'] = 'DENY'
+    response.headers.setdefault('Content-Security-Policy', "default-src 'self'")
+    response.headers['X-Custom'] = '1'
+    try:
+        pass
+    finally:
+        pass
+    return response
+'''
+
+
+def test_python_facts_from_ast():
+    facts = analyze_python_source(ROUTES_SOURCE)
+
+    assert facts['functions'] == 5 and facts['functions_with_try'] == 1 and facts['try_blocks'] == 1
+    # Solo los decoradores de ruta con llamada cuentan como rutas
+    assert facts['routes'] == 2
+    assert facts['decorators'] == {'route': 1, 'require_auth': 1, 'require_role': 1, 'get': 1, 'property': 1}
+    assert facts['validation_functions'] == ['sanitize_input', 'validate_weight']
+    # Cabeceras de seguridad asignadas o con setdefault; las demás se ignoran
+    assert facts['security_headers'] == ['Content-Security-Policy', 'X-Frame-Options']
+    assert facts['blueprint'] is True and facts['cors'] is True
+
+
+def test_js_heuristics():
+    assert analyze_js_source('const v = parseFloat(x.trim());') == {
+        'language': 'javascript', 'validation': True, 'sanitization': True}
+    assert analyze_js_source('console.log(1);')['validation'] is False
+
+
+def _write_tree(root, files):
+    for name, source in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source, encoding='utf-8')
+
+
+def test_cache_hits_misses_and_invalidation(tmp_path):
+    src = tmp_path / 'src'
+    cache_path = tmp_path / 'cache.json'
+    _write_tree(src, {'app/routes.py': ROUTES_SOURCE, 'app/config.py': 'X = 1\n',
+                      'static/main.js': 'validate(x)', 'app/__pycache__/skip.py': 'x = ('})
+
+    results, stats = analyze_tree([src], base_dir=tmp_path, cache_path=cache_path, jobs=1)
+    assert stats == {'files': 3, 'cached': 0, 'analyzed': 3, 'errors': 0}
+    assert sorted(results) == ['src/app/config.py', 'src/app/routes.py', 'src/static/main.js']
+
+    # Sin cambios: todo sale de la caché
+    again, stats = analyze_tree([src], base_dir=tmp_path, cache_path=cache_path, jobs=1)
+    assert stats == {'files': 3, 'cached': 3, 'analyzed': 0, 'errors': 0} and again == results
+
+    # Un fichero modificado se vuelve a analizar; uno borrado sale de la caché
+    (src / 'app' / 'config.py').write_text('def validate_config():\n    pass\n', encoding='utf-8')
+    (src / 'static' / 'main.js').unlink()
+    changed, stats = analyze_tree([src], base_dir=tmp_path, cache_path=cache_path, jobs=1)
+    assert stats == {'files': 2, 'cached': 1, 'analyzed': 1, 'errors': 0}
+    assert changed['src/app/config.py']['validation_functions'] == ['validate_config']
+    assert sorted(json.loads(cache_path.read_text())['files']) == ['src/app/config.py', 'src/app/routes.py']
+
+    # Otra versión del analizador invalida toda la caché
+    data = json.loads(cache_path.read_text())
+    cache_path.write_text(json.dumps(dict(data, version=ANALYZER_VERSION + 1)))
+    assert CodeAnalysisCache(cache_path).entries == {}
+
+
+def test_syntax_errors_are_reported_and_not_cached(tmp_path):
+    _write_tree(tmp_path, {'bad.py': 'def broken(:\n'})
+    results, stats = analyze_tree([tmp_path], base_dir=tmp_path, cache_path=tmp_path / 'cache.json', jobs=1)
+    assert stats['errors'] == 1 and results['bad.py']['error'].startswith('SyntaxError')
+    assert CodeAnalysisCache(tmp_path / 'cache.json').entries == {}
+
+
+def test_process_pool_gives_the_same_results(tmp_path, monkeypatch):
+    files = {f'mod{n}.py': f'def validate_{n}():\n    try:\n        pass\n    except Exception:\n        pass\n'
+             for n in range(asvs_code_analysis.MIN_FILES_FOR_POOL + 2)}
+    _write_tree(tmp_path / 'src', files)
+    pools = []
+
+    class RecordingPool(asvs_code_analysis.ProcessPoolExecutor):
+        def __init__(self, max_workers=None):
+            pools.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(asvs_code_analysis, 'ProcessPoolExecutor', RecordingPool)
+
+    pooled, stats = analyze_tree([tmp_path / 'src'], base_dir=tmp_path, cache_path=tmp_path / 'pool.json', jobs=2)
+    serial, _ = analyze_tree([tmp_path / 'src'], base_dir=tmp_path, cache_path=tmp_path / 'serial.json', jobs=1)
+    assert pools == [2]
+    assert stats['analyzed'] == len(files) and pooled == serial
+
+
+def test_summarize_aggregates_files():
+    results = {
+        'app/routes.py': analyze_python_source(ROUTES_SOURCE),
+        'app/config.py': analyze_python_source('X = 1\n'),
+        'static/main.js': analyze_js_source('sanitize(x)'),
+    }
+    summary = summarize(results)
+    assert summary['validation'] == ['routes.py'] and summary['error_handling'] == ['routes.py']
+    assert summary['security_headers'] == ['routes.py'] and summary['centralized_config'] is True
+    assert summary['api_rest'] is True and summary['api_endpoints'] == 2
+    assert summary['frontend_sanitization'] == ['main.js'] and 'frontend_validation' not in summary
+    assert summary['ast']['functions'] == 5 and summary['ast']['try_coverage'] == 0.2
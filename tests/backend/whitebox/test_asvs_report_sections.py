@@ -0,0 +1,129 @@
+"""
+Tests de caja blanca para las secciones del informe ASVS (scripts/generate_asvs_report.py):
+escritura en orden, caché por sección y --sections
+"""
+import io
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+# generate_asvs_report importa asvs_code_analysis como módulo de nivel superior (scripts/ en sys.path)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'scripts'))
+
+from scripts import generate_asvs_report  # noqa: E402
+from scripts.generate_asvs_report import (REPORT_SECTION_NAMES, REPORT_SECTIONS, ASVSReportGenerator,  # noqa: E402
+                                          ReportSectionCache)
+
+
+class FakeGenerator(ASVSReportGenerator):
+    """Secciones sintéticas: el texto incluye sus entradas; cuenta cuántas veces se renderiza cada una"""
+
+    def __init__(self, inputs=None, delays=None):
+        super().__init__(types.SimpleNamespace(defectdojo_data={}), Path('.'))
+        self.inputs = dict(inputs or {})
+        self.delays = delays or {}
+        self.renders = {}
+        self.finished = []
+        self._lock = threading.Lock()
+        for name, method, _ in REPORT_SECTIONS:
+            setattr(self, method, lambda name=name: self._fake_section(name))
+
+    def _section_input(self, name):
+        return self.inputs.get(name)
+
+    def _fake_section(self, name):
+        time.sleep(self.delays.get(name, 0))
+        with self._lock:
+            self.renders[name] = self.renders.get(name, 0) + 1
+            self.finished.append(name)
+        inputs = next(inputs for section, _, inputs in REPORT_SECTIONS if section == name)
+        return f"{name}:{[self.inputs.get(i) for i in inputs]}"
+
+
+def _write(generator, **kwargs):
+    out = io.StringIO()
+    rendered = generator.write_sections(out, **kwargs)
+    return out.getvalue(), rendered
+
+
+def test_sections_are_written_in_order_when_they_finish_out_of_order():
+    generator = FakeGenerator(delays={'header': 0.2, 'description': 0.1})
+
+    text, rendered = _write(generator)
+
+    assert generator.finished[-1] == 'header'
+    assert [section.name for section in rendered] == list(REPORT_SECTION_NAMES)
+    positions = [text.index(f'{name}:') for name in REPORT_SECTION_NAMES]
+    assert positions == sorted(positions)
+    assert text.startswith('header:') and '\n\n---\n\ndescription:' in text
+
+
+def test_unchanged_sections_are_reused_and_changes_invalidate_only_their_own(tmp_path):
+    inputs = {'report_date': '2026-01-01', 'benchmark': [1], 'assessment': ['a'], 'asvs_structure': 'sha',
+              'wstg_findings': []}
+    first = FakeGenerator(inputs)
+    first_text, _ = _write(first, cache=ReportSectionCache(tmp_path / 'sections.json'))
+    assert all(count == 1 for count in first.renders.values())
+
+    # Mismas entradas: todo sale de la caché (también tras recargarla del disco)
+    second = FakeGenerator(inputs)
+    second_text, rendered = _write(second, cache=ReportSectionCache(tmp_path / 'sections.json'))
+    assert second.renders == {} and second_text == first_text
+    assert all(section.cached for section in rendered)
+
+    # Cambian los findings WSTG: solo se regenera la sección wstg
+    third = FakeGenerator(dict(inputs, wstg_findings=[{'id': 1}]))
+    third_text, rendered = _write(third, cache=ReportSectionCache(tmp_path / 'sections.json'))
+    assert third.renders == {'wstg': 1}
+    assert [section.name for section in rendered if not section.cached] == ['wstg']
+    assert "wstg:[[{'id': 1}]]" in third_text
+
+
+def test_named_sections_are_regenerated_and_the_rest_reused(tmp_path):
+    cache_path = tmp_path / 'sections.json'
+    _write(FakeGenerator({'report_date': 'antes'}), cache=ReportSectionCache(cache_path))
+
+    generator = FakeGenerator({'report_date': 'despues', 'assessment': ['nuevo']})
+    text, _ = _write(generator, sections={'asvs'}, cache=ReportSectionCache(cache_path))
+
+    # Solo asvs se renderiza; header se toma de la caché aunque su entrada haya cambiado
+    assert generator.renders == {'asvs': 1}
+    assert "asvs:[['nuevo'], None]" in text and "header:['antes']" in text
+    assert "asvs:[['nuevo'], None]" in ReportSectionCache(cache_path).get('asvs')
+
+
+def test_sections_option(monkeypatch, tmp_path):
+    calls = []
+
+    class FakeAnalyzer:
+        def __init__(self, project_root, code_roots=None, jobs=None):
+            self.defectdojo_data = {}
+
+        def get_defectdojo_data(self):
+            pass
+
+        def analyze_code(self):
+            pass
+
+        def check_asvs_requirements(self):
+            pass
+
+    monkeypatch.setattr(generate_asvs_report, 'ASVSAnalyzer', FakeAnalyzer)
+    monkeypatch.setattr(ReportSectionCache.__init__, '__defaults__', (tmp_path / 'sections.json',))
+    monkeypatch.setattr(ASVSReportGenerator, 'write_report',
+                        lambda self, path, sections=None, cache=None: calls.append((sections, cache)))
+
+    monkeypatch.setattr(sys, 'argv', ['generate_asvs_report.py', '--sections', 'asvs, wstg'])
+    assert generate_asvs_report.main() == 0
+    [(sections, cache)] = calls
+    assert sections == {'asvs', 'wstg'} and isinstance(cache, ReportSectionCache)
+
+    for argv in (['--sections', 'asvs,otra'], ['--sections', 'asvs', '--no-section-cache']):
+        monkeypatch.setattr(sys, 'argv', ['generate_asvs_report.py'] + argv)
+        with pytest.raises(SystemExit):
+            generate_asvs_report.main()
+    assert len(calls) == 1
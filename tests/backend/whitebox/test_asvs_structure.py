@@ -0,0 +1,86 @@
+"""
+Tests de caja blanca para la caché de la estructura ASVS 4.0.3 (app/asvs_structure.py)
+"""
+import json
+
+import pytest
+
+from app import asvs_structure
+from app.asvs_structure import DEFAULT_SOURCE_PATH, load_asvs_structure
+
+SAMPLE_ASVS = {
+    "ShortName": "ASVS",
+    "Version": "4.0.3",
+    "Requirements": [
+        {"Shortcode": "V5", "Name": "Validación", "Items": [
+            {"Shortcode": "V5.1", "Name": "Entrada", "Items": [
+                {"Shortcode": "V5.1.1", "Description": "Validar entrada", "CWE": [20],
+                 "L1": {"Required": True}, "L2": {"Required": True}, "L3": {"Required": True}},
+                {"Shortcode": "V5.1.3", "Description": "Listas permitidas", "CWE": [20, 843],
+                 "L1": {"Required": False}, "L2": {"Required": True}, "L3": {"Required": True}},
+            ]},
+        ]},
+    ],
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "asvs.json"
+    path.write_text(json.dumps(SAMPLE_ASVS), encoding="utf-8")
+    return path
+
+
+@pytest.fixture(autouse=True)
+def _clear_memo():
+    asvs_structure._memo.clear()
+    yield
+    asvs_structure._memo.clear()
+
+
+def test_indexes_by_requirement_and_cwe(source, tmp_path):
+    structure = load_asvs_structure(source, tmp_path / "cache.marshal")
+    assert structure.hierarchy["V5"]["subcategories"]["V5.1"]["requirements"] == ["V5.1.1", "V5.1.3"]
+    assert structure.requirement("V5.1.3")["levels"] == ["L2", "L3"]
+    assert structure.requirement("V5.1.3")["subcategory"] == "V5.1"
+    assert structure.requirements_for_cwe(20) == ["V5.1.1", "V5.1.3"]
+    assert structure.requirements_for_cwe("CWE-843") == ["V5.1.3"]
+    assert structure.requirements_for_cwe("desconocido") == []
+
+
+def test_second_load_uses_disk_cache(source, tmp_path, monkeypatch):
+    cache_path = tmp_path / "cache" / "asvs.marshal"
+    first = load_asvs_structure(source, cache_path)
+    assert cache_path.exists()
+
+    asvs_structure._memo.clear()
+    monkeypatch.setattr(asvs_structure, "build_structure", lambda *a, **k: pytest.fail("no debe reconstruir"))
+    second = load_asvs_structure(source, cache_path)
+    assert second.requirements == first.requirements
+    assert second.source_sha256 == first.source_sha256
+
+
+def test_source_change_invalidates_cache(source, tmp_path):
+    cache_path = tmp_path / "cache.marshal"
+    load_asvs_structure(source, cache_path)
+
+    changed = json.loads(json.dumps(SAMPLE_ASVS))
+    changed["Requirements"][0]["Items"][0]["Items"][0]["CWE"] = [79]
+    source.write_text(json.dumps(changed), encoding="utf-8")
+    asvs_structure._memo.clear()
+    structure = load_asvs_structure(source, cache_path)
+    assert structure.requirements_for_cwe(79) == ["V5.1.1"]
+
+
+def test_corrupt_cache_is_rebuilt(source, tmp_path):
+    cache_path = tmp_path / "cache.marshal"
+    cache_path.write_bytes(b"no es marshal")
+    structure = load_asvs_structure(source, cache_path)
+    assert "V5.1.1" in structure.requirements
+
+
+def test_official_structure(tmp_path):
+    structure = load_asvs_structure(DEFAULT_SOURCE_PATH, tmp_path / "cache.marshal")
+    assert len(structure.hierarchy) == 14
+    level2 = [code for code, meta in structure.requirements.items() if "L2" in meta["levels"]]
+    assert len(level2) == 259
@@ -0,0 +1,176 @@
+"""
+Tests de caja blanca para las operaciones de DefectDojo (app/defectdojo_ops.py)
+Usan un proceso local que simula pg_dump en lugar de Docker.
+"""
+import os
+import sys
+import time
+import tracemalloc
+import zlib
+
+import pytest
+
+from app import defectdojo_ops
+from app.defectdojo_ops import OperationError, stream_dump
+
+# Tamaño del dump simulado para la prueba de memoria (subir a varios GB en local)
+STREAM_TEST_MB = int(os.environ.get("DUMP_STREAM_TEST_MB", "64"))
+
+
+def _fake_pg_dump(megabytes):
+    """Proceso que escribe `megabytes` MB de SQL por stdout"""
+    code = (
+        "import sys\n"
+        "block = b''.join(b'INSERT INTO t VALUES (%d);\\n' % i for i in range(40000))[:1048576]\n"
+        f"for _ in range({megabytes}):\n"
+        "    sys.stdout.buffer.write(block)\n"
+    )
+    return [sys.executable, "-c", code]
+
+
+def test_stream_dump_memory_is_bounded():
+    """El pico de memoria no crece con el tamaño del dump"""
+    decompressor = zlib.decompressobj(31)
+    raw_bytes = 0
+    tracemalloc.start()
+    try:
+        for chunk in stream_dump("gzip", command=_fake_pg_dump(STREAM_TEST_MB)):
+            raw_bytes += len(decompressor.decompress(chunk))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert raw_bytes == STREAM_TEST_MB * 1024 * 1024
+    assert peak < 8 * 1024 * 1024
+
+
+def test_stream_dump_tee_writes_file_atomically(tmp_path):
+    tee_path = str(tmp_path / "dump.sql.gz")
+    body = b"".join(stream_dump("gzip", tee_path=tee_path, command=_fake_pg_dump(1)))
+    with open(tee_path, "rb") as f:
+        assert f.read() == body
+    assert os.listdir(tmp_path) == ["dump.sql.gz"]
+
+
+def test_stream_dump_concurrent_tees_do_not_collide(tmp_path):
+    tee_path = str(tmp_path / "dump.sql")
+    first = stream_dump("none", tee_path=tee_path, command=[sys.executable, "-c", "print('uno')"])
+    second = stream_dump("none", tee_path=tee_path, command=[sys.executable, "-c", "print('dos')"])
+    assert next(first) == b"uno\n" and next(second) == b"dos\n"
+    assert len(os.listdir(tmp_path)) == 2
+    assert b"".join(second) == b"" and b"".join(first) == b""
+    with open(tee_path, "rb") as f:
+        assert f.read() == b"uno\n"
+    assert os.listdir(tmp_path) == ["dump.sql"]
+
+
+def test_stream_dump_times_out_when_pg_dump_stalls():
+    command = [sys.executable, "-c", "import time; time.sleep(30)"]
+    started = time.monotonic()
+    with pytest.raises(OperationError, match="Timeout"):
+        b"".join(stream_dump("gzip", timeout=0.5, command=command))
+    assert time.monotonic() - started < 10
+
+
+def test_stream_dump_failure_discards_tee(tmp_path):
+    tee_path = str(tmp_path / "dump.sql.gz")
+    command = [sys.executable, "-c", "import sys; print('parcial'); sys.exit(1)"]
+    with pytest.raises(OperationError):
+        b"".join(stream_dump("gzip", tee_path=tee_path, command=command))
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_dump_rejects_unknown_compression():
+    with pytest.raises(OperationError):
+        stream_dump("rar")
+
+
+def test_stream_dump_uncompressed_passthrough():
+    command = [sys.executable, "-c", "print('SELECT 1;')"]
+    assert b"".join(stream_dump("none", command=command)) == b"SELECT 1;\n"
+    assert defectdojo_ops.DUMP_COMPRESSIONS["none"] == (".sql", "application/sql")
+
+
+def _fake_psql(output_path):
+    """Proceso que consume stdin y guarda el nº de bytes recibidos"""
+    code = (
+        "import sys\n"
+        "total = 0\n"
+        "while True:\n"
+        "    chunk = sys.stdin.buffer.read(65536)\n"
+        "    if not chunk:\n"
+        "        break\n"
+        "    total += len(chunk)\n"
+        f"open({str(output_path)!r}, 'w').write(str(total))\n"
+    )
+    return [sys.executable, "-c", code]
+
+
+def _write_gzip_dump(path, megabytes):
+    import gzip
+    block = b"INSERT INTO t VALUES (1);\n" * 40330
+    block = block[:1024 * 1024]
+    with gzip.open(path, "wb") as f:
+        for _ in range(megabytes):
+            f.write(block)
+
+
+def test_stream_import_gzip_memory_is_bounded(tmp_path):
+    """La importación descomprime y envía por bloques sin cargar el dump en memoria"""
+    dump_path = str(tmp_path / "dump.sql.gz")
+    received = tmp_path / "received.txt"
+    _write_gzip_dump(dump_path, STREAM_TEST_MB)
+    updates = []
+
+    tracemalloc.start()
+    try:
+        result = defectdojo_ops.stream_import(
+            dump_path, command=_fake_psql(received), restart=False,
+            progress=lambda percent, message=None, **details: updates.append(details),
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result["success"] is True
+    assert int(received.read_text()) == STREAM_TEST_MB * 1024 * 1024
+    assert peak < 8 * 1024 * 1024
+    last = [details for details in updates if details][-1]
+    assert last["bytes_processed"] == last["bytes_total"] == os.path.getsize(dump_path)
+    assert last["bytes_decompressed"] == STREAM_TEST_MB * 1024 * 1024
+
+
+def test_stream_import_reports_psql_error(tmp_path):
+    dump_path = tmp_path / "dump.sql"
+    dump_path.write_text("CREATE TABLE t;")
+    command = [sys.executable, "-c", "import sys; sys.stdin.read(); sys.exit('ERROR: syntax error')"]
+    with pytest.raises(OperationError) as excinfo:
+        defectdojo_ops.stream_import(str(dump_path), command=command, restart=False)
+    assert "syntax error" in str(excinfo.value)
+
+
+def test_stream_import_times_out_when_psql_stops_reading(tmp_path):
+    """psql que empieza a leer y se queda parado: el timeout se cumple aunque la escritura esté bloqueada"""
+    dump_path = tmp_path / "dump.sql"
+    dump_path.write_bytes(b"INSERT INTO t VALUES (1);\n" * (4 * 1024 * 1024 // 26))
+    command = [sys.executable, "-c", "import sys, time; sys.stdin.buffer.read(1024); time.sleep(20)"]
+    started = time.monotonic()
+    with pytest.raises(OperationError, match="Timeout"):
+        defectdojo_ops.stream_import(str(dump_path), command=command, timeout=1, restart=False)
+    assert time.monotonic() - started < 10
+
+
+def test_stream_import_fails_when_psql_closes_input_early(tmp_path):
+    """psql que sale con código 0 sin leer todo el dump: la importación está incompleta"""
+    dump_path = tmp_path / "dump.sql"
+    dump_path.write_bytes(b"INSERT INTO t VALUES (1);\n" * (4 * 1024 * 1024 // 26))
+    command = [sys.executable, "-c", "import sys; sys.stdin.buffer.read(1024)"]
+    with pytest.raises(OperationError, match="incompleta"):
+        defectdojo_ops.stream_import(str(dump_path), command=command, timeout=30, restart=False)
+
+
+def test_stream_import_rejects_unknown_extension(tmp_path):
+    dump_path = tmp_path / "dump.txt"
+    dump_path.write_text("x")
+    with pytest.raises(OperationError):
+        defectdojo_ops.stream_import(str(dump_path), restart=False)
@@ -0,0 +1,153 @@
+"""
+Tests de caja blanca para el upsert en bloque de findings (scripts/findings_bulk.py)
+
+Django y DefectDojo no están instalados fuera de su contenedor: se sustituyen
+django.db.transaction y dojo.models.Finding por un ORM mínimo en memoria que
+registra los borrados y las escrituras en bloque.
+"""
+import contextlib
+import sys
+import types
+from datetime import date
+
+import pytest
+
+from scripts.findings_bulk import upsert_findings
+
+
+class _QuerySet:
+    def __init__(self, manager, rows):
+        self._manager = manager
+        self._rows = rows
+
+    def filter(self, **lookups):
+        rows = self._rows
+        for lookup, value in lookups.items():
+            if lookup == 'cwe__in':
+                rows = [row for row in rows if row.cwe in value]
+            elif lookup == 'id__in':
+                rows = [row for row in rows if row.id in value]
+            elif lookup == 'test':
+                rows = [row for row in rows if row.test_id == value.id]
+            else:
+                raise AssertionError(f'Lookup no soportado: {lookup}')
+        return _QuerySet(self._manager, rows)
+
+    def order_by(self, field):
+        assert field == '-id'
+        return _QuerySet(self._manager, sorted(self._rows, key=lambda row: row.id, reverse=True))
+
+    def delete(self):
+        self._manager.deleted.extend(row.id for row in self._rows)
+        self._manager.rows = [row for row in self._manager.rows if row not in self._rows]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _Manager:
+    def __init__(self):
+        self.rows = []
+        self.deleted = []
+        self.created = []
+        self.updated = []
+        self.update_fields = None
+
+    def filter(self, **lookups):
+        return _QuerySet(self, self.rows).filter(**lookups)
+
+    def bulk_create(self, findings):
+        next_id = max([row.id for row in self.rows] + [100]) + 1
+        for offset, finding in enumerate(findings):
+            finding.id = next_id + offset
+        self.rows.extend(findings)
+        self.created.extend(findings)
+
+    def bulk_update(self, findings, fields):
+        self.updated.extend(findings)
+        self.update_fields = fields
+
+
+class _Finding:
+    objects = None
+
+    def __init__(self, id=None, test=None, **fields):
+        self.id = id
+        self.test = test
+        self.test_id = test.id if test is not None else None
+        self.date = None
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+@pytest.fixture
+def orm(monkeypatch):
+    """Instala el ORM falso como django.db.transaction y dojo.models.Finding"""
+    manager = _Manager()
+    monkeypatch.setattr(_Finding, 'objects', manager)
+    django_db = types.ModuleType('django.db')
+    django_db.transaction = types.SimpleNamespace(atomic=contextlib.nullcontext)
+    dojo_models = types.ModuleType('dojo.models')
+    dojo_models.Finding = _Finding
+    monkeypatch.setitem(sys.modules, 'django', types.ModuleType('django'))
+    monkeypatch.setitem(sys.modules, 'django.db', django_db)
+    monkeypatch.setitem(sys.modules, 'dojo', types.ModuleType('dojo'))
+    monkeypatch.setitem(sys.modules, 'dojo.models', dojo_models)
+    return manager
+
+
+def _data(cwe, title, severity='high', created_date=None):
+    data = {'title': title, 'description': f'Descripción {title}', 'severity': severity, 'cwe': cwe,
+            'active': True, 'verified': False, 'mitigation': 'm', 'impact': 'i', 'references': 'r',
+            'file_path': 'app/routes.py', 'line': 10}
+    if created_date:
+        data['created_date'] = created_date
+    return data
+
+
+def _existing(orm, finding_id, cwe, test, finding_date=None):
+    finding = _Finding(id=finding_id, test=test, cwe=cwe, title='antiguo')
+    finding.date = finding_date
+    orm.rows.append(finding)
+    return finding
+
+
+def test_partitions_into_delete_create_and_update(orm):
+    test = types.SimpleNamespace(id=1, test_type=None)
+    other_test = types.SimpleNamespace(id=2, test_type=None)
+    _existing(orm, 10, 20, test)
+    newest = _existing(orm, 11, 20, test)
+    _existing(orm, 12, 79, other_test)
+    untouched = _existing(orm, 13, 89, test)
+
+    result = upsert_findings(
+        test, 'reporter', {'CWE-20': _data(20, 'Validación'), 'CWE-79': _data(79, 'XSS'),
+                           'CWE-352': _data(352, 'CSRF', severity='low')},
+        severity_map={'high': 'High', 'low': 'Low'}, remove_from_other_tests=True,
+    )
+
+    # El duplicado más antiguo del test y el del otro test se borran en una sola operación
+    assert sorted(orm.deleted) == [10, 12]
+    assert orm.updated == [newest]
+    assert newest.title == 'Validación' and newest.severity == 'High' and newest.reporter == 'reporter'
+    assert sorted(finding.cwe for finding in orm.created) == [79, 352]
+    assert all(finding.test is test for finding in orm.created)
+    assert result['CWE-20'] is newest and result['CWE-352'].severity == 'Low'
+    assert result['CWE-79'].id in {finding.id for finding in orm.created}
+    assert untouched in orm.rows and untouched.title == 'antiguo'
+    assert 'date' not in orm.update_fields
+
+
+def test_keeps_other_tests_and_earliest_date(orm):
+    test = types.SimpleNamespace(id=1, test_type=None)
+    other_test = types.SimpleNamespace(id=2, test_type=None)
+    existing = _existing(orm, 10, 20, test, finding_date=date(2024, 5, 1))
+    foreign = _existing(orm, 11, 20, other_test)
+
+    upsert_findings(test, 'reporter', {'CWE-20': _data(20, 'Validación', created_date=date(2024, 1, 1))},
+                    keep_earliest_date=True)
+
+    assert orm.deleted == [] and foreign in orm.rows
+    assert orm.created == [] and orm.updated == [existing]
+    assert existing.date == date(2024, 1, 1)
+    assert 'date' in orm.update_fields
@@ -0,0 +1,108 @@
+"""
+Tests de caja blanca para el subsistema de trabajos en segundo plano (app/jobs.py)
+"""
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from app.jobs import JobManager, JobResult, JobStore, STATUS_FAILED, STATUS_QUEUED, STATUS_SUCCEEDED
+
+
+def test_job_reports_progress_and_result(tmp_path):
+    manager = JobManager(JobStore(":memory:"), artifacts_dir=str(tmp_path))
+
+    def task(ctx, value):
+        ctx.progress(50, "A mitad")
+        path = ctx.artifact_path("salida.txt")
+        with open(path, "w") as f:
+            f.write(value)
+        return JobResult(data={"value": value}, artifact_path=path, artifact_mimetype="text/plain")
+
+    job = manager.wait(manager.submit("test.task", task, "hola"), timeout=5)
+    assert job["status"] == STATUS_SUCCEEDED
+    assert job["progress"] == 100
+    assert job["result"] == {"value": "hola"}
+    assert job["artifact_name"] == "salida.txt"
+    assert job["finished_at"]
+    manager.shutdown()
+
+
+def test_job_exception_marks_failed(tmp_path):
+    manager = JobManager(JobStore(":memory:"), artifacts_dir=str(tmp_path))
+
+    def task(ctx):
+        raise RuntimeError("fallo controlado")
+
+    job = manager.wait(manager.submit("test.fail", task), timeout=5)
+    assert job["status"] == STATUS_FAILED
+    assert job["error"] == "fallo controlado"
+    manager.shutdown()
+
+
+def test_only_stale_jobs_fail_after_restart(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path)
+    orphan_id = store.create("test.orphan")
+    live_id = store.create("test.live")
+    store.update(orphan_id, heartbeat_at=(datetime.now() - timedelta(minutes=10)).isoformat())
+
+    # Otro worker arranca: solo falla el trabajo sin latido reciente
+    manager = JobManager(JobStore(db_path), artifacts_dir=str(tmp_path / "jobs"), stale_after=300)
+    manager.maintain()
+    orphan = manager.get(orphan_id)
+    assert orphan["status"] == STATUS_FAILED
+    assert "dejó de responder" in orphan["error"]
+    assert manager.get(live_id)["status"] == STATUS_QUEUED
+
+
+def test_migrates_jobs_table_without_new_columns(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+        "progress INTEGER NOT NULL DEFAULT 0, message TEXT, error TEXT, result TEXT, artifact_path TEXT, "
+        "artifact_name TEXT, artifact_mimetype TEXT, user_id INTEGER, created_at TEXT NOT NULL, "
+        "updated_at TEXT NOT NULL, finished_at TEXT)"
+    )
+    conn.commit()
+    conn.close()
+
+    store = JobStore(db_path)
+    JobStore(db_path)
+    job = store.get(store.create("test.migrated"))
+    assert job["details"] is None and job["heartbeat_at"]
+
+
+def test_cleanup_removes_expired_jobs_and_artifacts(tmp_path):
+    artifacts_dir = tmp_path / "jobs"
+    manager = JobManager(JobStore(":memory:"), artifacts_dir=str(artifacts_dir), retention_hours=1)
+
+    def task(ctx):
+        path = ctx.artifact_path("salida.txt")
+        with open(path, "w") as f:
+            f.write("x")
+        return JobResult(artifact_path=path)
+
+    def failing(ctx):
+        ctx.artifact_path("parcial.txt")
+        raise RuntimeError("fallo")
+
+    job_id = manager.submit("test.task", task)
+    failed_id = manager.submit("test.fail", failing)
+    manager.wait(job_id, timeout=5)
+    manager.wait(failed_id, timeout=5)
+    assert (artifacts_dir / job_id / "salida.txt").exists()
+    assert not (artifacts_dir / failed_id).exists()
+    (artifacts_dir / "huerfano").mkdir()
+    old = time.time() - 7200
+    os.utime(artifacts_dir / "huerfano", (old, old))
+
+    assert manager.cleanup() == 1
+    assert not (artifacts_dir / "huerfano").exists()
+    assert manager.get(job_id) is not None
+
+    assert manager.cleanup(now=datetime.now() + timedelta(hours=2)) == 2
+    assert manager.get(job_id) is None and manager.get(failed_id) is None
+    assert not (artifacts_dir / job_id).exists()
+    manager.shutdown()
@@ -0,0 +1,108 @@
+"""
+Tests de caja blanca para la caché de PDF del informe (app/pdf_cache.py)
+"""
+import os
+import threading
+import time
+
+from app.pdf_cache import PdfReportCache
+
+
+def _make_cache(tmp_path):
+    renderer = tmp_path / "generate_pdf_report.py"
+    renderer.write_text("# renderizador v1\n")
+    markdown = tmp_path / "INFORME_SEGURIDAD.md"
+    markdown.write_text("# Informe\n")
+    cache = PdfReportCache(
+        cache_dir=str(tmp_path / "informes" / "cache"),
+        manifest_path=str(tmp_path / "informes" / "manifest.json"),
+        renderer_path=str(renderer),
+    )
+    return cache, markdown, renderer
+
+
+def _renderer(tmp_path, calls, delay=0.0):
+    def render():
+        calls.append(1)
+        time.sleep(delay)
+        pdf = tmp_path / "INFORME_SEGURIDAD_20250101.pdf"
+        pdf.write_bytes(b"%PDF-1.4 informe")
+        return str(pdf)
+    return render
+
+
+def test_second_request_is_served_from_cache(tmp_path):
+    cache, markdown, _ = _make_cache(tmp_path)
+    calls = []
+
+    first, origin = cache.get_or_render(str(markdown), _renderer(tmp_path, calls))
+    assert origin == "miss"
+    second, origin = cache.get_or_render(str(markdown), _renderer(tmp_path, calls))
+    assert origin == "hit"
+    assert len(calls) == 1
+    assert second.etag == first.etag
+    assert second.download_name == "INFORME_SEGURIDAD_20250101.pdf"
+
+
+def test_key_changes_with_markdown_and_renderer(tmp_path):
+    cache, markdown, renderer = _make_cache(tmp_path)
+    original = cache.cache_key(str(markdown))
+
+    markdown.write_text("# Informe actualizado\n")
+    after_markdown = cache.cache_key(str(markdown))
+    assert after_markdown != original
+
+    renderer.write_text("# renderizador v2 (cambio de estilos)\n")
+    os.utime(renderer, (time.time() + 10, time.time() + 10))
+    assert cache.cache_key(str(markdown)) != after_markdown
+
+
+def test_manifest_survives_restart(tmp_path):
+    cache, markdown, _ = _make_cache(tmp_path)
+    entry, _ = cache.get_or_render(str(markdown), _renderer(tmp_path, []))
+
+    reloaded = PdfReportCache(cache.cache_dir, cache.manifest_path, cache.renderer_path)
+    calls = []
+    again, origin = reloaded.get_or_render(str(markdown), _renderer(tmp_path, calls))
+    assert origin == "hit"
+    assert calls == []
+    assert again.path == entry.path
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    cache, markdown, _ = _make_cache(tmp_path)
+    calls = []
+    render = _renderer(tmp_path, calls, delay=0.2)
+    origins = []
+
+    def request():
+        origins.append(cache.get_or_render(str(markdown), render)[1])
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert origins.count("miss") == 1
+    assert set(origins) <= {"miss", "coalesced", "hit"}
+
+
+def test_old_entries_are_evicted_with_their_files(tmp_path):
+    cache, markdown, _ = _make_cache(tmp_path)
+    cache.max_entries = 2
+    entries = []
+    for version in range(3):
+        markdown.write_text(f"# Informe v{version}\n")
+        entries.append(cache.get_or_render(str(markdown), _renderer(tmp_path, []))[0])
+
+    # La entrada más antigua sale del manifiesto y del disco; las dos últimas siguen
+    assert not os.path.exists(entries[0].path)
+    assert cache.lookup(entries[0].key) is None
+    assert all(os.path.exists(entry.path) for entry in entries[1:])
+    assert sorted(os.listdir(cache.cache_dir)) == sorted(f"{entry.key}.pdf" for entry in entries[1:])
+    assert cache.stats()["entries"] == 2 and cache.stats()["evicted"] == 1
+
+    reloaded = PdfReportCache(cache.cache_dir, cache.manifest_path, cache.renderer_path)
+    assert set(reloaded._manifest) == {entry.key for entry in entries[1:]}
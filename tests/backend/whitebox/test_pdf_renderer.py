@@ -0,0 +1,105 @@
+"""
+Tests de caja blanca para el renderizado en proceso del informe (app/pdf_renderer.py)
+"""
+import pytest
+
+from app import pdf_renderer
+from app.pdf_renderer import RenderError, RendererBackend, ReportDocument, remove_emojis, render_pdf
+
+pytest.importorskip("markdown")
+
+SAMPLE_MARKDOWN = """# Informe 🔒
+
+Texto con **negrita** & símbolos.
+
+| Requisito | Estado |
+|-----------|--------|
+| V2.1.1 | Cumple |
+
+- Primer punto
+- Segundo punto
+
+```
+codigo()
+```
+"""
+
+
+class _FakeBackend(RendererBackend):
+    def __init__(self, name, result=None, error=None):
+        self.name = name
+        self.result = result
+        self.error = error
+        self.documents = []
+
+    def available(self):
+        return True
+
+    def render(self, document):
+        self.documents.append(document)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_backend_without_render_fails_on_creation():
+    class _Incomplete(RendererBackend):
+        def available(self):
+            return True
+
+    with pytest.raises(TypeError):
+        _Incomplete()
+
+
+def test_remove_emojis():
+    assert remove_emojis("Informe 🔒 ✅ listo") == "Informe   listo"
+
+
+def test_document_blocks_single_pass():
+    blocks = ReportDocument(SAMPLE_MARKDOWN).blocks
+    assert blocks[0] == ("heading", 1, "Informe")
+    assert ("paragraph", "Texto con negrita & símbolos.") in blocks
+    assert ("table", [["Requisito", "Estado"], ["V2.1.1", "Cumple"]]) in blocks
+    assert ("list_item", "Primer punto") in blocks
+    assert any(block[0] == "code" and "codigo()" in block[1] for block in blocks)
+
+
+def test_backends_share_one_document_and_fall_back():
+    failing = _FakeBackend("primero", error=RuntimeError("sin fuentes"))
+    working = _FakeBackend("segundo", result=b"%PDF-1.4")
+
+    pdf_bytes, backend_name = render_pdf(SAMPLE_MARKDOWN, backends=(failing, working))
+    assert (pdf_bytes, backend_name) == (b"%PDF-1.4", "segundo")
+    assert failing.documents[0] is working.documents[0]
+
+
+def test_all_backends_failing_raises():
+    with pytest.raises(RenderError) as excinfo:
+        render_pdf(SAMPLE_MARKDOWN, backends=(_FakeBackend("unico", error=RuntimeError("roto")),))
+    assert "unico: roto" in str(excinfo.value)
+    with pytest.raises(RenderError):
+        render_pdf(SAMPLE_MARKDOWN, backends=())
+
+
+def test_reportlab_renders_to_bytes():
+    pytest.importorskip("reportlab")
+    pdf_bytes, backend_name = render_pdf(SAMPLE_MARKDOWN, backends=(pdf_renderer.ReportlabBackend(),))
+    assert backend_name == "reportlab"
+    assert pdf_bytes.startswith(b"%PDF")
+
+
+def test_generate_pdf_in_process_writes_exact_path(tmp_path, monkeypatch):
+    from app import config, defectdojo_ops
+
+    markdown = tmp_path / "docs" / "INFORME_SEGURIDAD.md"
+    markdown.parent.mkdir()
+    markdown.write_text(SAMPLE_MARKDOWN, encoding="utf-8")
+    monkeypatch.setattr(config, "PDF_RENDER_IN_PROCESS", True)
+    monkeypatch.setattr(defectdojo_ops, "PROJECT_ROOT", str(tmp_path))
+    monkeypatch.setattr(defectdojo_ops, "REPORT_MARKDOWN", str(markdown))
+    monkeypatch.setattr(pdf_renderer, "available_backends", lambda: (_FakeBackend("falso", result=b"%PDF-1.4"),))
+
+    pdf_path = defectdojo_ops.generate_pdf()
+    assert pdf_path.startswith(str(tmp_path / "docs" / "informes" / "INFORME_SEGURIDAD_"))
+    with open(pdf_path, "rb") as f:
+        assert f.read() == b"%PDF-1.4"
@@ -0,0 +1,50 @@
+"""
+Tests de caja blanca para el coste de arranque de create_app()
+Usan scripts/audit_startup_imports.py (python -X importtime) en un intérprete limpio.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+AUDIT_SCRIPT = PROJECT_ROOT / "scripts" / "audit_startup_imports.py"
+
+# Presupuesto holgado para CI; ajustable con STARTUP_IMPORT_BUDGET_MS
+STARTUP_IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", "2000"))
+
+
+def _run_audit(*extra_args):
+    result = subprocess.run(
+        [sys.executable, str(AUDIT_SCRIPT), "--json", *extra_args],
+        cwd=str(PROJECT_ROOT),
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    return result.returncode, json.loads(result.stdout)
+
+
+def test_optional_modules_not_imported_at_startup():
+    """Play Integrity, google-auth, requests, argon2 y Swagger UI se cargan en el primer uso"""
+    _, report = _run_audit()
+    assert report["forbidden_loaded"] == []
+    assert "app" in report["modules"]
+    assert "app.routes" in report["modules"]
+
+
+def test_create_app_cold_start_budget():
+    """El arranque en frío de create_app() se mantiene dentro del presupuesto"""
+    returncode, report = _run_audit("--budget-ms", str(STARTUP_IMPORT_BUDGET_MS))
+    assert returncode == 0, f"Arranque {report['total_ms']} ms > {STARTUP_IMPORT_BUDGET_MS} ms"
+
+
+def test_password_hashing_loads_argon2_on_demand():
+    """argon2 se importa al primer uso y el hash sigue verificando correctamente"""
+    from app import helpers
+    password_hash = helpers.hash_password("clave_segura_123")
+    assert password_hash.startswith("$argon2id$")
+    assert "argon2" in sys.modules
+    assert helpers.verify_password("clave_segura_123", password_hash) is True
+    assert helpers.verify_password("otra_clave_123", password_hash) is False
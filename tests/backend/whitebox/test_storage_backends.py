@@ -2,6 +2,8 @@
 Tests de caja blanca para backends de almacenamiento (sqlite/sqlcipher)
 """
 from datetime import datetime, date, timedelta
+import sqlite3
+
 import pytest
 
 import app.storage as storage_mod
@@ -91,3 +93,120 @@ def test_sqlcipher_storage_with_simulated_pepper(tmp_path):
     last = storage.get_last_weight_entry(auth_user.user_id)
     assert last is not None
     assert last.weight_kg == entries[-1].weight_kg
+
+
+def test_sqlite_group_commit_batches_concurrent_writes(tmp_path):
+    import threading
+
+    storage = SQLiteStorage(db_path=str(tmp_path / "app.db"), group_commit=True)
+    storage._group_commit._max_delay = 0.05
+    auth_user = storage.create_auth_user("usuario_gc", "hash_dummy")
+
+    base = datetime(2024, 1, 1, 8, 0)
+    entries = [
+        WeightEntryData(entry_id=0, user_id=auth_user.user_id, weight_kg=70.0 + i, recorded_date=base + timedelta(days=i))
+        for i in range(8)
+    ]
+    threads = [threading.Thread(target=storage.add_weight_entry, args=(entry,)) for entry in entries]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(entry.entry_id for entry in entries)
+    assert storage.get_weight_count(auth_user.user_id) == 8
+
+    stats = storage.get_write_stats()["group_commit"]
+    assert stats["enabled"] is True
+    assert stats["batch_size"]["sum"] == 8
+    assert stats["batches_committed"] < 8
+    assert stats["commit_latency_ms"]["count"] == 8
+    storage.close()
+
+
+def test_sqlite_group_commit_replaces_same_day_entry(tmp_path):
+    storage = SQLiteStorage(db_path=str(tmp_path / "app.db"), group_commit=True)
+    auth_user = storage.create_auth_user("usuario_gc", "hash_dummy")
+    now = datetime.now()
+    storage.add_weight_entry(WeightEntryData(entry_id=0, user_id=auth_user.user_id, weight_kg=70.0, recorded_date=now))
+    storage.add_weight_entry(WeightEntryData(entry_id=0, user_id=auth_user.user_id, weight_kg=72.0, recorded_date=now))
+
+    assert storage.get_weight_count(auth_user.user_id) == 1
+    assert storage.get_last_weight_entry(auth_user.user_id).weight_kg == 72.0
+    storage.close()
+
+
+def test_sqlite_without_group_commit_reports_disabled(tmp_path):
+    storage = SQLiteStorage(db_path=str(tmp_path / "app.db"), group_commit=False)
+    assert storage.get_write_stats() == {"group_commit": {"enabled": False}}
+
+
+def test_group_commit_writer_fails_pending_and_restarts_when_connect_fails(tmp_path):
+    storage = SQLiteStorage(db_path=str(tmp_path / "app.db"), group_commit=False)
+    auth_user = storage.create_auth_user("usuario_gc", "hash_dummy")
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return storage._connect()
+
+    writer = storage_mod.GroupCommitWriter(connect, storage_mod._write_weight_entry, timeout=5)
+    entry = WeightEntryData(entry_id=0, user_id=auth_user.user_id, weight_kg=70.0, recorded_date=datetime.now())
+    with pytest.raises(sqlite3.OperationalError):
+        writer.write(entry)
+    assert writer.stats()["writer_failures"] == 1
+
+    # El siguiente alta arranca un hilo escritor nuevo
+    writer.write(entry)
+    assert entry.entry_id and storage.get_weight_count(auth_user.user_id) == 1
+    writer.close()
+
+
+def test_group_commit_write_times_out(tmp_path):
+    import threading
+
+    release = threading.Event()
+    storage = SQLiteStorage(db_path=str(tmp_path / "app.db"), group_commit=False)
+
+    def stuck_connect():
+        release.wait(5)
+        return storage._connect()
+
+    writer = storage_mod.GroupCommitWriter(stuck_connect, lambda conn, entry: None, timeout=0.05)
+    entry = WeightEntryData(entry_id=0, user_id=1, weight_kg=70.0, recorded_date=datetime.now())
+    with pytest.raises(TimeoutError):
+        writer.write(entry)
+    release.set()
+    writer.close()
+
+
+def test_group_commit_write_waits_for_entry_in_flight(tmp_path):
+    import threading
+
+    storage = SQLiteStorage(db_path=str(tmp_path / "app.db"), group_commit=False)
+    auth_user = storage.create_auth_user("usuario_gc", "hash_dummy")
+    picked_up = threading.Event()
+    release = threading.Event()
+
+    def slow_write(conn, entry):
+        picked_up.set()
+        release.wait(5)
+        storage_mod._write_weight_entry(conn, entry)
+
+    writer = storage_mod.GroupCommitWriter(storage._connect, slow_write, timeout=0.05)
+    entry = WeightEntryData(entry_id=0, user_id=auth_user.user_id, weight_kg=70.0, recorded_date=datetime.now())
+    outcome = []
+    request = threading.Thread(target=lambda: outcome.append(writer.write(entry)))
+    request.start()
+    assert picked_up.wait(5)
+    request.join(0.2)
+    # Superado el timeout con la entrada ya recogida: la petición sigue esperando el commit
+    assert request.is_alive()
+    release.set()
+    request.join(5)
+
+    assert outcome == [entry] and entry.entry_id
+    assert storage.get_weight_count(auth_user.user_id) == 1
+    writer.close()
@@ -0,0 +1,42 @@
+"""
+Tests de caja blanca para el catálogo WSTG (app/wstg_catalogue.py)
+"""
+import pytest
+
+from app.wstg_catalogue import (WSTG_CATEGORIES, WSTG_ID_FORMAT, WSTG_TESTS, find_wstg_id, get_wstg_info,
+                                wstg_category)
+
+
+def test_catalogue_is_complete_and_consistent():
+    assert len(WSTG_TESTS) == 97
+    assert set(WSTG_CATEGORIES) == {'INFO', 'CONF', 'IDNT', 'ATHN', 'ATHZ', 'SESS', 'INPV', 'ERRH', 'CRYP',
+                                    'BUSL', 'CLNT', 'APIT'}
+    for wstg_id, test in WSTG_TESTS.items():
+        assert WSTG_ID_FORMAT.match(wstg_id)
+        assert test['category'] == wstg_category(wstg_id)
+        assert test['title'] and test['severity'] in ('Info', 'Low', 'Medium', 'High', 'Critical')
+
+    assert WSTG_TESTS['WSTG-INPV-05']['title'] == 'Testing for SQL Injection'
+    assert WSTG_TESTS['WSTG-INFO-02']['severity'] == 'Info'
+
+
+def test_catalogue_is_immutable():
+    with pytest.raises(TypeError):
+        WSTG_TESTS['WSTG-NEW-01'] = {}
+    with pytest.raises(TypeError):
+        WSTG_TESTS['WSTG-INPV-05']['title'] = 'x'
+
+
+def test_get_wstg_info_falls_back_for_unknown_ids():
+    assert get_wstg_info('WSTG-ATHN-03') is WSTG_TESTS['WSTG-ATHN-03']
+    info = get_wstg_info('WSTG-XXXX-99')
+    assert info['title'] == 'WSTG-XXXX-99 Test' and info['severity'] == 'Medium'
+    assert info['category'] == 'XXXX'
+
+
+def test_find_wstg_id_in_titles():
+    assert find_wstg_id('WSTG-INPV-05: Testing for SQL Injection') == 'WSTG-INPV-05'
+    assert find_wstg_id('Revisión de WSTG-SESS-02 en login') == 'WSTG-SESS-02'
+    assert find_wstg_id('Sin identificador') is None
+    assert find_wstg_id('') is None
+    assert wstg_category('Unknown') is None
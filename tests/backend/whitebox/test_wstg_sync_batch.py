@@ -0,0 +1,171 @@
+"""
+Tests de caja blanca para la sincronización WSTG con DefectDojo (app/wstg_sync.py):
+lotes, Test/Engagement en caché y búsqueda de findings por el índice del estado
+
+Django y DefectDojo se sustituyen por el ORM en memoria de fake_dojo.py.
+"""
+from datetime import datetime
+
+import pytest
+
+from app import wstg_sync
+from app.wstg_sync import (SyncUnavailable, find_finding_by_wstg_id, find_findings_by_wstg_ids,
+                            get_wstg_test_and_engagement, sync_batch_from_defectdojo, sync_batch_from_tracker)
+from app.wstg_sync_state import get_state_store
+from tests.backend.whitebox import fake_dojo
+
+
+@pytest.fixture
+def dojo(monkeypatch, tmp_path):
+    monkeypatch.setattr('app.wstg_sync_state.SYNC_STATE_DB', tmp_path / 'wstg_sync_state.sqlite3')
+    return fake_dojo.install(monkeypatch)
+
+
+@pytest.fixture
+def wstg_test(dojo, monkeypatch):
+    """Test WSTG ya resuelto; cuenta las llamadas a get_wstg_test_and_engagement"""
+    test = dojo.Test(id=1, lead='admin')
+    calls = []
+
+    def resolve():
+        calls.append(1)
+        return test, None
+
+    monkeypatch.setattr(wstg_sync, 'get_wstg_test_and_engagement', resolve)
+    test.calls = calls
+    return test
+
+
+def _finding(dojo, finding_id, test, tags, **fields):
+    finding = dojo.Finding(id=finding_id, test=test, tags=tags, **fields)
+    dojo.Finding.objects.rows.append(finding)
+    return finding
+
+
+def test_batch_from_tracker_coalesces_and_updates_in_one_transaction(dojo, wstg_test):
+    existing = _finding(dojo, 10, wstg_test, ['WSTG', 'WSTG-INPV-01'], title='WSTG-INPV-01: SQLi')
+    dojo.Timezone.current = datetime(2026, 1, 2, 3, 4, 5)
+
+    outcome = sync_batch_from_tracker([
+        {'wstg_id': 'WSTG-INPV-01', 'status': 'In Progress'},
+        {'wstg_id': 'WSTG-INPV-02', 'status': 'Done'},
+        {'wstg_id': 'WSTG-INPV-01', 'status': 'Done', 'notes': 'corregido'},
+        {'wstg_id': 'WSTG-INPV-03', 'status': 'Terminado'},
+    ])
+
+    # Los dos cambios de INPV-01 se agrupan en el último
+    assert outcome['coalesced'] == 1
+    results = outcome['results']
+    assert results['WSTG-INPV-01']['action'] == 'updated' and results['WSTG-INPV-01']['finding_id'] == 10
+    assert results['WSTG-INPV-02']['action'] == 'created'
+    assert results['WSTG-INPV-03']['success'] is False and results['WSTG-INPV-03']['invalid'] is True
+
+    # Un Test/Engagement y una escritura en bloque dentro de la transacción
+    assert len(wstg_test.calls) == 1
+    [update] = dojo.Finding.objects.bulk_updates
+    assert update['rows'] == [existing] and update['in_transaction']
+    assert {'last_status_update', 'updated'} <= set(update['fields'])
+    assert (existing.active, existing.verified, existing.mitigation) == (False, True, 'corregido')
+    assert existing.last_status_update == existing.updated == dojo.Timezone.current
+
+    [created] = dojo.Finding.objects.created
+    assert {tag.name for tag in created.tags.all()} == {'WSTG', 'WSTG-INPV-02'}
+    items = get_state_store().get_items(['WSTG-INPV-01', 'WSTG-INPV-02'])
+    assert items['WSTG-INPV-01']['wstg_status'] == 'Done' and items['WSTG-INPV-02']['finding_id'] == created.id
+
+
+def test_batch_from_tracker_keeps_status_date_when_status_does_not_change(dojo, wstg_test):
+    existing = _finding(dojo, 10, wstg_test, ['WSTG', 'WSTG-INPV-01'], active=False, verified=True)
+
+    sync_batch_from_tracker([{'wstg_id': 'WSTG-INPV-01', 'status': 'Done', 'notes': 'nota'}])
+
+    assert existing.last_status_update is None and existing.updated is not None
+
+
+def test_batch_from_tracker_reports_unavailable_defectdojo(dojo, monkeypatch):
+    def broken():
+        raise RuntimeError('connection refused')
+
+    monkeypatch.setattr(wstg_sync, 'get_wstg_test_and_engagement', broken)
+    with pytest.raises(SyncUnavailable):
+        sync_batch_from_tracker([{'wstg_id': 'WSTG-INPV-01', 'status': 'Done'}])
+
+    # Un lote solo con cambios inválidos no necesita DefectDojo
+    outcome = sync_batch_from_tracker([{'wstg_id': 'INPV-01', 'status': 'Done'}])
+    assert outcome['results']['INPV-01']['invalid'] is True
+
+
+def test_batch_from_defectdojo_converts_ids_and_reads_state_once(dojo, monkeypatch):
+    test = dojo.Test(id=1)
+    _finding(dojo, 42, test, ['WSTG', 'WSTG-ATHN-01'], active=False, verified=True)
+    _finding(dojo, 43, test, ['WSTG', 'WSTG-ATHN-02'])
+    store = get_state_store()
+    store.upsert_item('WSTG-ATHN-01', wstg_status='In Progress')
+    reads = []
+    real_get_items = store.get_items
+    monkeypatch.setattr(store, 'get_items', lambda ids: reads.append(set(ids)) or real_get_items(ids))
+    monkeypatch.setattr(store, 'get_item', lambda wstg_id: pytest.fail('get_item por item (N+1)'))
+
+    outcome = sync_batch_from_defectdojo([
+        {'finding': {'id': '42'}, 'event': 'finding_closed'},
+        {'finding': {'id': 43}},
+        {'finding': {'id': 'abc'}},
+        {'finding': {'id': 7}},
+    ])
+
+    results = outcome['results']
+    assert results[42]['wstg_status'] == 'Done' and results[43]['success'] is True
+    assert results[None]['invalid'] is True
+    assert results[7] == {'success': False, 'error': 'Finding 7 not found'}
+    assert reads == [{'WSTG-ATHN-01', 'WSTG-ATHN-02'}]
+    item = real_get_items(['WSTG-ATHN-01'])['WSTG-ATHN-01']
+    assert item['wstg_status'] == 'Done' and item['event'] == 'finding_closed'
+
+
+def test_wstg_test_and_engagement_are_cached(dojo):
+    dojo.User.objects.rows.append(dojo.User(id=1, username='admin'))
+
+    test, engagement = get_wstg_test_and_engagement()
+    assert test.engagement is engagement and wstg_sync._wstg_test_ids['test_id'] == test.id
+    assert len(dojo.Test.objects.created) == 1
+
+    # Acierto: una consulta por clave primaria, sin get_or_create
+    lookups = {model: model.objects.queries for model in (dojo.Test, dojo.Engagement, dojo.Product)}
+    assert get_wstg_test_and_engagement() == (test, engagement)
+    assert dojo.Test.objects.queries == lookups[dojo.Test] + 1
+    assert dojo.Engagement.objects.queries == lookups[dojo.Engagement]
+    assert dojo.Product.objects.queries == lookups[dojo.Product]
+
+    # El Test en caché se borró: se vuelve a crear y se actualiza la caché
+    dojo.Test.objects.delete(test)
+    recreated, same_engagement = get_wstg_test_and_engagement()
+    assert recreated.id != test.id and same_engagement is engagement
+    assert wstg_sync._wstg_test_ids['test_id'] == recreated.id
+
+
+def test_find_finding_uses_index_and_falls_back_when_stale(dojo):
+    test = dojo.Test(id=1)
+    indexed = _finding(dojo, 10, test, ['WSTG', 'WSTG-SESS-01'])
+    by_tag = _finding(dojo, 11, test, ['WSTG', 'WSTG-SESS-02'])
+    by_title = _finding(dojo, 12, test, ['WSTG'], title='WSTG-SESS-03: Cookies')
+    retagged = _finding(dojo, 13, test, ['WSTG', 'WSTG-SESS-09'])
+    store = get_state_store()
+    store.upsert_items({'WSTG-SESS-01': {'finding_id': 10}, 'WSTG-SESS-02': {'finding_id': 13},
+                        'WSTG-SESS-03': {'finding_id': 99}})
+
+    # Índice vigente: una consulta por clave primaria
+    dojo.Finding.objects.queries = 0
+    assert find_finding_by_wstg_id('WSTG-SESS-01', test) is indexed
+    assert dojo.Finding.objects.queries == 1
+
+    # Índice obsoleto (finding retagueado o borrado): tag exacto y después título
+    assert find_finding_by_wstg_id('WSTG-SESS-02', test) is by_tag
+    assert find_finding_by_wstg_id('WSTG-SESS-03', test) is by_title
+    assert find_finding_by_wstg_id('WSTG-SESS-04', test) is None
+
+    # El lote sigue el mismo orden con una consulta por paso
+    dojo.Finding.objects.queries = 0
+    found = find_findings_by_wstg_ids(['WSTG-SESS-01', 'WSTG-SESS-02', 'WSTG-SESS-03', 'WSTG-SESS-09'], test)
+    assert found == {'WSTG-SESS-01': indexed, 'WSTG-SESS-02': by_tag, 'WSTG-SESS-03': by_title,
+                     'WSTG-SESS-09': retagged}
+    assert dojo.Finding.objects.queries == 3
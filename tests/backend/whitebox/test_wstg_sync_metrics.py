@@ -0,0 +1,123 @@
+"""
+Tests de caja blanca para las métricas del pipeline de sincronización WSTG (app/wstg_sync_metrics.py)
+"""
+import json
+from datetime import datetime, timedelta
+
+from app import wstg_sync_metrics
+from app.wstg_sync_metrics import SyncMetrics, keeping_up, read_metrics
+from app.wstg_sync_queue import SyncQueue
+from tests.backend.conftest import assert_success, auth_headers
+
+
+def test_batches_latency_and_error_rate():
+    metrics = SyncMetrics()
+    enqueued = (datetime.now() - timedelta(seconds=2)).isoformat()
+    metrics.record_batch('tracker->dd', 4, succeeded=3, failed=1, dead_lettered=1, coalesced=1,
+                         duration=0.4, queries=6, enqueued_at=[enqueued] * 3)
+    metrics.record_batch('tracker->dd', 2, succeeded=2, failed=0, duration=0.1, queries=4)
+
+    snapshot = metrics.snapshot()
+    batch = snapshot['batches']['tracker->dd']
+    assert (batch['batches'], batch['messages'], batch['failed'], batch['dead_lettered']) == (2, 6, 1, 1)
+    assert batch['max_batch_size'] == 4 and batch['avg_batch_size'] == 3
+    assert batch['queries'] == 10 and batch['last_batch']['queries'] == 4
+    assert batch['error_rate'] == round(1 / 6, 4)
+
+    # Una muestra por lote: su duración real, no repartida entre los mensajes
+    batch_latency = snapshot['latency']['batch']
+    assert batch_latency['count'] == 2 and batch_latency['max_ms'] == 400.0 and batch_latency['p50_ms'] == 400.0
+    end_to_end = snapshot['latency']['end_to_end']
+    assert end_to_end['count'] == 3 and end_to_end['p95_ms'] >= 2000
+
+
+def test_requests_and_passes():
+    metrics = SyncMetrics()
+    metrics.record_request('sync_from_tracker', 0.002, True)
+    metrics.record_request('sync_from_tracker', 0.004, False)
+    metrics.record_pass('incremental', read=3, updated=1, errors=0, duration=0.05, queries=7)
+
+    snapshot = metrics.snapshot()
+    request = snapshot['requests']['sync_from_tracker']
+    assert (request['count'], request['errors'], request['latency']['max_ms']) == (2, 1, 4.0)
+    assert snapshot['passes']['count'] == 1
+    assert snapshot['passes']['last']['kind'] == 'incremental' and snapshot['passes']['last']['queries'] == 7
+
+
+def test_write_and_read_metrics(tmp_path):
+    path = tmp_path / 'metrics.json'
+    assert read_metrics(path) is None
+
+    metrics = SyncMetrics()
+    metrics.set_queue({'depth': 0})
+    metrics.write(path)
+    assert [p.name for p in tmp_path.iterdir()] == ['metrics.json']
+    loaded = read_metrics(path)
+    assert loaded['queue'] == {'depth': 0} and loaded['age_seconds'] >= 0
+
+    path.write_text('{')
+    assert read_metrics(path) is None
+
+
+def test_queue_stats_and_keeping_up(tmp_path):
+    queue = SyncQueue(tmp_path)
+    try:
+        assert queue.stats()['depth'] == 0
+        assert keeping_up(queue.stats()) is True
+        # Sin estado de la cola no se sabe si va al día
+        assert keeping_up(None) is None
+
+        old = (datetime.now() - timedelta(minutes=5)).isoformat()
+        first = queue.put('tracker->dd', {'wstg_id': 'A'}, enqueued_at=old)
+        queue.put('dd->tracker', {'finding': {'id': 1}})
+        stats = queue.stats()
+        assert stats['depth'] == 2 and stats['oldest_enqueued_at'] == old
+        assert stats['oldest_age_seconds'] >= 299
+        assert not keeping_up(stats)
+
+        # Los que esperan reintento o están en proceso no cuentan como retraso
+        queue.claim('c1')
+        queue.fail(first, 'boom')
+        stats = queue.stats()
+        assert (stats['waiting'], stats['retrying'], stats['in_flight']) == (0, 1, 1)
+        assert stats['oldest_enqueued_at'] is None and stats['oldest_age_seconds'] is None
+        assert keeping_up(stats)
+
+        # La antigüedad es la del más antiguo que espera, no la del que espera reintento
+        waiting = (datetime.now() - timedelta(seconds=10)).isoformat()
+        queue.put('tracker->dd', {'wstg_id': 'B'}, enqueued_at=waiting)
+        stats = queue.stats()
+        assert stats['waiting'] == 1 and stats['oldest_enqueued_at'] == waiting
+        assert 10 <= stats['oldest_age_seconds'] < 60
+    finally:
+        queue.close()
+
+
+def test_wstg_status_endpoint_exposes_pipeline(auth_session, tmp_path, monkeypatch):
+    monkeypatch.setattr('app.wstg_sync_queue.QUEUE_DIR', tmp_path / 'queue')
+    monkeypatch.setattr('app.wstg_sync_state.SYNC_STATE_DB', tmp_path / 'wstg_sync_state.sqlite3')
+    monkeypatch.setattr(wstg_sync_metrics, 'METRICS_FILE', tmp_path / 'metrics.json')
+    metrics = SyncMetrics()
+    metrics.record_pass('full', read=10, updated=2, errors=0, duration=0.2, queries=5)
+    metrics.write()
+
+    resp = auth_session["client"].get('/api/wstg/status', headers=auth_headers(auth_session["access_token"]))
+    assert_success(resp)
+    pipeline = resp.get_json()['pipeline']
+    assert pipeline['queue']['depth'] == 0 and pipeline['keeping_up'] is True
+    assert pipeline['service']['passes']['last']['read'] == 10
+    assert json.loads((tmp_path / 'metrics.json').read_text())['pid'] == pipeline['service']['pid']
+
+
+def test_wstg_status_endpoint_reports_unknown_pipeline(auth_session, tmp_path, monkeypatch):
+    monkeypatch.setattr('app.wstg_sync_state.SYNC_STATE_DB', tmp_path / 'wstg_sync_state.sqlite3')
+    monkeypatch.setattr(wstg_sync_metrics, 'METRICS_FILE', tmp_path / 'metrics.json')
+
+    def unavailable(queue_dir=None):
+        raise OSError('queue.sqlite3 no disponible')
+
+    monkeypatch.setattr('app.wstg_sync_queue.get_queue', unavailable)
+    resp = auth_session["client"].get('/api/wstg/status', headers=auth_headers(auth_session["access_token"]))
+    assert_success(resp)
+    pipeline = resp.get_json()['pipeline']
+    assert pipeline['queue'] is None and pipeline['keeping_up'] is None
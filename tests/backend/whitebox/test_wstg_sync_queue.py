@@ -0,0 +1,218 @@
+"""
+Tests de caja blanca para la cola de sincronización WSTG (app/wstg_sync_queue.py)
+"""
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from app import wstg_sync_queue
+from app.wstg_sync_queue import QueueWatcher, SyncQueue, backoff_delay, enqueue, pending
+from tests.backend.conftest import auth_headers
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SyncQueue(tmp_path)
+    yield queue
+    queue.close()
+
+
+def test_put_assigns_unique_ids_in_order(queue):
+    ids = [queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'Done'}) for _ in range(50)]
+    assert len(set(ids)) == 50 and ids == sorted(ids)
+    assert [message['id'] for message in queue.pending()] == ids
+
+    with pytest.raises(ValueError):
+        queue.put('other', {})
+
+
+def test_claim_hides_messages_until_visibility_timeout(queue, monkeypatch):
+    first = queue.put('tracker->dd', {'wstg_id': 'A'})
+    second = queue.put('dd->tracker', {'finding': {'id': 1}})
+
+    claimed = queue.claim('c1', limit=1, visibility_timeout=60)
+    assert [(m['id'], m['attempts'], m['data']) for m in claimed] == [(first, 1, {'wstg_id': 'A'})]
+    # Otro consumidor no ve el mensaje reservado
+    assert [m['id'] for m in queue.claim('c2', visibility_timeout=60)] == [second]
+    assert queue.claim('c3') == []
+
+    # Consumidor caído: al caducar la reserva el mensaje vuelve a estar disponible
+    now = time.time()
+    monkeypatch.setattr(wstg_sync_queue.time, 'time', lambda: now + 61)
+    assert [(m['id'], m['attempts']) for m in queue.claim('c3')] == [(first, 2), (second, 2)]
+
+
+def test_fail_backs_off_and_dead_letters(queue, monkeypatch):
+    message_id = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01'})
+    now = [time.time()]
+    monkeypatch.setattr(wstg_sync_queue.time, 'time', lambda: now[0])
+
+    for attempt in range(1, 4):
+        assert queue.claim('c1')[0]['attempts'] == attempt
+        assert queue.fail(message_id, 'boom', max_attempts=3) is (attempt == 3)
+        if attempt < 3:
+            # No se reintenta hasta que vence el backoff
+            assert queue.claim('c1') == []
+            assert queue.next_available_in() == pytest.approx(backoff_delay(attempt))
+            now[0] += backoff_delay(attempt)
+
+    assert queue.pending() == [] and queue.next_available_in() is None
+    dead = queue.dead_letters()
+    assert [(d['message_id'], d['attempts'], d['last_error']) for d in dead] == [(message_id, 3, 'boom')]
+
+    assert queue.requeue_dead() == 1
+    assert queue.dead_letters() == []
+    assert [m['attempts'] for m in queue.claim('c1')] == [1]
+
+
+def test_ack_removes_messages(queue):
+    ids = [queue.put('dd->tracker', {'finding': {'id': i}}) for i in range(3)]
+    queue.claim('c1')
+    queue.ack(ids[:2])
+    assert [m['id'] for m in queue.pending()] == ids[2:]
+
+
+def test_claim_dead_letters_messages_never_settled(queue, monkeypatch):
+    message_id = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01'})
+    now = [time.time()]
+    monkeypatch.setattr(wstg_sync_queue.time, 'time', lambda: now[0])
+
+    # El consumidor se cuelga o muere con el mensaje: nunca llega a ack() ni a fail()
+    for attempt in range(1, 4):
+        assert [m['attempts'] for m in queue.claim('c1', visibility_timeout=10, max_attempts=3)] == [attempt]
+        now[0] += 11
+
+    assert queue.claim('c1', visibility_timeout=10, max_attempts=3) == []
+    assert queue.pending() == []
+    assert [(d['message_id'], d['attempts']) for d in queue.dead_letters()] == [(message_id, 3)]
+
+
+def test_release_does_not_count_the_attempt(queue, monkeypatch):
+    message_id = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01'})
+    now = [time.time()]
+    monkeypatch.setattr(wstg_sync_queue.time, 'time', lambda: now[0])
+
+    for _ in range(3):
+        assert [m['attempts'] for m in queue.claim('c1')] == [1]
+        queue.release([message_id], delay=30, error='database is down')
+        assert queue.claim('c1') == []
+        now[0] += 30
+    assert queue.pending()[0]['last_error'] == 'database is down'
+
+
+def test_ack_supersedes_older_changes_of_the_same_item(queue):
+    old = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'In Progress'})
+    other = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-02', 'status': 'Done'})
+    webhook = queue.put('dd->tracker', {'finding': {'id': 1}})
+    queue.claim('c1', limit=2)
+    # El antiguo falló y espera su reintento cuando llega (y se confirma) uno nuevo
+    queue.fail(old, 'boom')
+    new = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'Done'})
+    newer = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'Not Started'})
+    queue.ack([new])
+
+    assert [m['id'] for m in queue.pending()] == [other, webhook, newer]
+    assert queue.queued([old, other, new, newer]) == {other, newer}
+
+
+def test_supersede_up_to_a_bound(queue):
+    first = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'In Progress'})
+    other = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-02', 'status': 'Done'})
+    up_to = queue.last_id()
+    later = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'Done'})
+
+    assert up_to == other
+    assert queue.supersede('WSTG-INPV-01', up_to) == 1
+    assert queue.supersede('WSTG-INPV-01', 0) == 0
+    assert [m['id'] for m in queue.pending()] == [other, later]
+    assert first not in queue.queued([first])
+
+
+def test_backoff_is_exponential_and_capped():
+    assert [backoff_delay(n) for n in (1, 2, 3)] == [5, 10, 20]
+    assert backoff_delay(50) == wstg_sync_queue.BACKOFF_MAX
+
+
+def test_concurrent_consumers_never_share_messages(tmp_path):
+    producer = SyncQueue(tmp_path)
+    for i in range(200):
+        producer.put('dd->tracker', {'finding': {'id': i}})
+    consumers = [SyncQueue(tmp_path) for _ in range(4)]
+    claimed = [[] for _ in consumers]
+
+    def consume(index):
+        while True:
+            messages = consumers[index].claim(f'c{index}', limit=7)
+            if not messages:
+                return
+            claimed[index].extend(m['id'] for m in messages)
+
+    threads = [threading.Thread(target=consume, args=(i,)) for i in range(len(consumers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = [message_id for ids in claimed for message_id in ids]
+    assert len(ids) == len(set(ids)) == 200
+    for queue in consumers + [producer]:
+        queue.close()
+
+
+def test_migrates_legacy_queue_files(tmp_path):
+    (tmp_path / 'webhook_1700000000000.json').write_text(
+        json.dumps({'type': 'dd->tracker', 'data': {'finding': {'id': 1}}, 'timestamp': '2023-11-14T00:00:00'}))
+    (tmp_path / 'sync_1700000000000000001_WSTG-INPV-01.json').write_text(
+        json.dumps({'type': 'tracker->dd', 'data': {'wstg_id': 'WSTG-INPV-01'}}))
+    (tmp_path / 'sync_1700000000000000002_X.json').write_text('{')
+    (tmp_path / 'errors').mkdir()
+    (tmp_path / 'errors' / 'sync_1.json').write_text(json.dumps({'type': 'tracker->dd', 'data': {'wstg_id': 'B'}}))
+
+    queue = SyncQueue(tmp_path)
+    try:
+        assert [m['data'] for m in queue.pending()] == [{'finding': {'id': 1}}, {'wstg_id': 'WSTG-INPV-01'}]
+        assert len(queue.dead_letters()) == 2
+        assert list(tmp_path.glob('*.json')) == [] and list((tmp_path / 'errors').glob('*.json')) == []
+        # La entrada ilegible (tipo desconocido) no se devuelve a la cola
+        assert queue.requeue_dead() == 1
+    finally:
+        queue.close()
+
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_watcher_wakes_up_on_enqueue(tmp_path, use_inotify):
+    if use_inotify and not sys.platform.startswith('linux'):
+        pytest.skip('inotify solo en Linux')
+    watcher = QueueWatcher(tmp_path, poll_interval=0.05, use_inotify=use_inotify)
+    try:
+        assert watcher.wait(0.1) is False
+
+        timer = threading.Timer(0.05, enqueue, args=('tracker->dd', {'wstg_id': 'A'}, tmp_path))
+        start = time.monotonic()
+        timer.start()
+        assert watcher.wait(5) is True
+        assert time.monotonic() - start < 1
+        timer.join()
+    finally:
+        watcher.close()
+
+
+def test_watcher_keeps_events_received_while_busy(tmp_path):
+    watcher = QueueWatcher(tmp_path, poll_interval=0.05)
+    try:
+        # Llega mientras el consumidor "procesa" (no está en wait)
+        enqueue('dd->tracker', {'finding': {'id': 1}}, tmp_path)
+        assert watcher.wait(1) is True
+    finally:
+        watcher.close()
+
+
+def test_wstg_webhook_route_enqueues(auth_session, tmp_path, monkeypatch):
+    monkeypatch.setattr('app.wstg_sync_queue.QUEUE_DIR', tmp_path)
+    resp = auth_session["client"].post('/api/wstg/webhook', json={'finding': {'id': 5}},
+                                       headers=auth_headers(auth_session["access_token"]))
+    assert resp.status_code == 202
+    messages = pending(tmp_path)
+    assert [(m['type'], m['data']) for m in messages] == [('dd->tracker', {'finding': {'id': 5}})]
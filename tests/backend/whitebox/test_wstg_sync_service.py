@@ -0,0 +1,216 @@
+"""
+Tests de caja blanca para el servicio de sincronización WSTG (scripts/wstg_sync_service.py)
+
+El servicio hace django.setup() al importarse: se importa con el ORM en memoria de
+fake_dojo.py y con una cola real en tmp_path.
+"""
+import importlib
+import logging
+import sys
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import wstg_sync
+from app.wstg_sync import SyncUnavailable
+from app.wstg_sync_metrics import SyncMetrics
+from app.wstg_sync_state import get_state_store
+from tests.backend.whitebox import fake_dojo
+
+
+@pytest.fixture
+def dojo(monkeypatch, tmp_path):
+    monkeypatch.setattr('app.wstg_sync_state.SYNC_STATE_DB', tmp_path / 'wstg_sync_state.sqlite3')
+    return fake_dojo.install(monkeypatch)
+
+
+@pytest.fixture
+def service(dojo, monkeypatch, tmp_path):
+    # El log del servicio va a /app/data, que solo existe en el contenedor
+    monkeypatch.setattr(logging, 'FileHandler', lambda *args, **kwargs: logging.NullHandler())
+    sys.modules.pop('scripts.wstg_sync_service', None)
+    module = importlib.import_module('scripts.wstg_sync_service')
+    monkeypatch.setattr(module, 'QUEUE_DIR', tmp_path / 'queue')
+    monkeypatch.setattr(module, 'get_metrics', lambda metrics=SyncMetrics(): metrics)
+    yield module
+    sys.modules.pop('scripts.wstg_sync_service', None)
+
+
+@pytest.fixture
+def queue(service):
+    return service.get_queue(service.QUEUE_DIR)
+
+
+def _tracker(queue, *statuses):
+    return [queue.put('tracker->dd', {'wstg_id': f'WSTG-INPV-{n:02d}', 'status': status})
+            for n, status in enumerate(statuses, start=1)]
+
+
+def test_failing_batch_charges_only_the_bad_message(service, queue, monkeypatch):
+    calls = []
+
+    def apply(requests):
+        calls.append(len(requests))
+        if any(data['status'] == 'Boom' for data in requests):
+            raise ValueError('fallo al aplicar el cambio')
+        return {'results': {data['wstg_id']: {'success': True} for data in requests}, 'coalesced': 0}
+
+    monkeypatch.setattr(wstg_sync, 'sync_batch_from_tracker', apply)
+    ids = _tracker(queue, 'Done', 'Done', 'Boom', 'Done', 'Done', 'Done')
+
+    assert service.process_sync_queue() == (5, 1)
+
+    # Se parte por la mitad hasta aislar el mensaje: el resto se confirma
+    assert calls[0] == 6 and len(calls) < 2 * len(ids)
+    [left] = queue.pending()
+    assert left['id'] == ids[2] and left['attempts'] == 1 and 'fallo al aplicar' in left['last_error']
+    assert queue.dead_letters() == []
+
+
+def test_unavailable_defectdojo_releases_the_batch_without_attempts(service, queue, monkeypatch):
+    def apply(requests):
+        raise SyncUnavailable('No se pudo obtener el Test/Engagement WSTG')
+
+    monkeypatch.setattr(wstg_sync, 'sync_batch_from_tracker', apply)
+    ids = _tracker(queue, 'Done', 'In Progress', 'Done')
+    webhook = queue.put('dd->tracker', {'finding': {'id': 1}})
+
+    assert service.process_sync_queue() == (0, 0)
+
+    pending = queue.pending()
+    assert [m['id'] for m in pending] == ids + [webhook]
+    assert all(m['attempts'] == 0 and 'Test/Engagement' in m['last_error'] for m in pending)
+    # Vuelven a la cola tras INFRA_RETRY_DELAY, no en la misma vuelta
+    assert queue.claim('c1') == []
+    assert queue.next_available_in() > service.INFRA_RETRY_DELAY - 5
+
+
+def test_invalid_messages_go_to_dead_letter_at_once(service, queue, dojo):
+    test = dojo.Test(id=1)
+    dojo.Finding.objects.rows.append(dojo.Finding(id=42, test=test, tags=['WSTG', 'WSTG-ATHN-01']))
+    queue.put('dd->tracker', {'finding': {'id': '42'}})
+    invalid = queue.put('dd->tracker', {'finding': {'id': 'abc'}})
+
+    assert service.process_sync_queue() == (1, 1)
+
+    assert queue.pending() == []
+    [dead] = queue.dead_letters()
+    assert dead['message_id'] == invalid and dead['attempts'] == 1
+
+
+def test_claimed_messages_superseded_meanwhile_are_skipped(service, queue, monkeypatch):
+    applied = []
+    monkeypatch.setattr(wstg_sync, 'sync_batch_from_tracker', lambda requests: applied.extend(requests) or {
+        'results': {data['wstg_id']: {'success': True} for data in requests}})
+    old = queue.put('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'In Progress'})
+    real_claim = queue.claim
+
+    def claim_then_supersede(*args, **kwargs):
+        messages = real_claim(*args, **kwargs)
+        # Un cambio inmediato del worker sustituye al mensaje ya reservado
+        queue.supersede('WSTG-INPV-01', old)
+        return messages
+
+    monkeypatch.setattr(queue, 'claim', claim_then_supersede)
+    assert service.process_sync_queue() == (0, 0)
+    assert applied == []
+
+
+T0 = datetime(2026, 3, 1, 12, 0, 0)
+
+
+def test_needs_full_sync(service, dojo):
+    now = T0
+    dojo.Timezone.current = now
+    recent = {'field': 'updated', 'max_id': 5, 'modified': T0.isoformat(),
+              'full_sync_at': (now - timedelta(hours=1)).isoformat()}
+
+    assert service._needs_full_sync(recent, 'updated') is False
+    # Primera vez, sin campo de modificación o con otro campo: pasada completa
+    assert service._needs_full_sync(None, 'updated')
+    assert service._needs_full_sync({}, 'updated')
+    assert service._needs_full_sync(recent, None)
+    assert service._needs_full_sync(recent, 'last_status_update')
+    assert service._needs_full_sync(dict(recent, modified=None), 'updated')
+    assert service._needs_full_sync(dict(recent, full_sync_at=None), 'updated')
+    # Cada FULL_SYNC_INTERVAL se relee todo
+    expired = (now - service.FULL_SYNC_INTERVAL).isoformat()
+    assert service._needs_full_sync(dict(recent, full_sync_at=expired), 'updated')
+
+
+@pytest.fixture
+def watermark_pass(service, dojo, monkeypatch):
+    """Findings WSTG de un Test y espía de set_meta sobre el estado real (tmp_path)"""
+    test = dojo.Test(id=1)
+    monkeypatch.setattr(service, 'get_wstg_test_and_engagement', lambda: (test, None))
+    store = get_state_store()
+    meta_writes = []
+    real_set_meta = store.set_meta
+    monkeypatch.setattr(store, 'set_meta', lambda key, value: meta_writes.append(value) or real_set_meta(key, value))
+
+    def add(finding_id, wstg_id, updated, **fields):
+        finding = dojo.Finding(id=finding_id, test=test, tags=['WSTG', wstg_id], updated=updated, **fields)
+        dojo.Finding.objects.rows.append(finding)
+        return finding
+
+    def run(full=False):
+        pass_info = {'kind': 'full' if full else 'incremental', 'read': 0}
+        result = service._sync_findings_pass(full, pass_info)
+        return pass_info, result
+
+    return types.SimpleNamespace(add=add, run=run, store=store, meta_writes=meta_writes, dojo=dojo)
+
+
+def test_watermark_first_pass_is_full_then_incremental(service, watermark_pass):
+    dojo = watermark_pass.dojo
+    dojo.Timezone.current = T0
+    watermark_pass.add(4, 'WSTG-INFO-01', T0 - timedelta(hours=2))
+    changed = watermark_pass.add(5, 'WSTG-INFO-02', T0)
+    watermark_pass.add(6, 'WSTG-INFO-03', T0)
+
+    pass_info, (synced, updated, errors) = watermark_pass.run()
+    assert pass_info == {'kind': 'full', 'read': 3} and (synced, updated, errors) == (3, 3, 0)
+    assert watermark_pass.meta_writes == [{'field': 'updated', 'max_id': 6, 'modified': T0.isoformat(),
+                                           'full_sync_at': T0.isoformat()}]
+    written_at = watermark_pass.store.get_item('WSTG-INFO-03')['last_sync_timestamp']
+
+    # Sin cambios: lee solo lo nuevo o modificado (con solape), no reescribe items ni la marca
+    dojo.Timezone.current = T0 + timedelta(minutes=5)
+    dojo.Finding.objects.filters.clear()
+    pass_info, (synced, updated, errors) = watermark_pass.run()
+    assert pass_info == {'kind': 'incremental', 'read': 2} and updated == 0
+    [condition] = [conditions[0] for conditions, _ in dojo.Finding.objects.filters if conditions]
+    assert condition.groups == [{'id__gt': 6}, {'updated__gte': T0 - service.WATERMARK_OVERLAP}]
+    assert watermark_pass.store.get_item('WSTG-INFO-03')['last_sync_timestamp'] == written_at
+    assert len(watermark_pass.meta_writes) == 1
+
+    # Un finding nuevo (por id) y uno modificado (por fecha) avanzan la marca
+    watermark_pass.add(7, 'WSTG-INFO-04', T0 - timedelta(days=1))
+    changed.active, changed.verified, changed.updated = False, True, T0 + timedelta(minutes=10)
+    pass_info, (synced, updated, errors) = watermark_pass.run()
+    assert pass_info == {'kind': 'incremental', 'read': 3} and updated == 2
+    assert watermark_pass.store.get_item('WSTG-INFO-02')['wstg_status'] == 'Done'
+    assert watermark_pass.meta_writes[-1] == {'field': 'updated', 'max_id': 7,
+                                              'modified': (T0 + timedelta(minutes=10)).isoformat(),
+                                              'full_sync_at': T0.isoformat()}
+
+
+def test_watermark_forces_full_pass_after_interval_or_field_change(service, watermark_pass):
+    dojo = watermark_pass.dojo
+    dojo.Timezone.current = T0
+    watermark_pass.add(4, 'WSTG-INFO-01', T0 - timedelta(hours=2))
+    watermark_pass.add(5, 'WSTG-INFO-02', T0)
+    watermark_pass.run()
+
+    dojo.Timezone.current = T0 + service.FULL_SYNC_INTERVAL
+    pass_info, _ = watermark_pass.run()
+    assert pass_info == {'kind': 'full', 'read': 2}
+    assert watermark_pass.meta_writes[-1]['full_sync_at'] == dojo.Timezone.current.isoformat()
+
+    # Marca guardada con otro campo de modificación (otra versión de DefectDojo)
+    watermark = dict(watermark_pass.meta_writes[-1], field='last_status_update')
+    watermark_pass.store.set_meta(service.WATERMARK_KEY, watermark)
+    dojo.Timezone.current += timedelta(minutes=1)
+    pass_info, _ = watermark_pass.run()
+    assert pass_info['kind'] == 'full' and watermark_pass.meta_writes[-1]['field'] == 'updated'
@@ -0,0 +1,170 @@
+"""
+Tests de caja blanca para el estado de la sincronización WSTG (app/wstg_sync_state.py)
+"""
+import json
+import threading
+
+import pytest
+
+from app import wstg_sync_state
+from app.wstg_sync_state import WstgStateStore, is_conflict
+from tests.backend.conftest import assert_success, auth_headers
+
+
+def _entry(i, direction='dd->tracker'):
+    return {'timestamp': f'2026-01-01T00:00:{i:02d}', 'wstg_id': f'WSTG-INPV-{i:02d}',
+            'direction': direction, 'old_status': None, 'new_status': 'Done', 'success': True,
+            'error_message': ''}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WstgStateStore(tmp_path / 'wstg_sync_state.sqlite3')
+    yield store
+    store.close()
+
+
+def test_is_conflict():
+    assert is_conflict('Done', 'active')
+    assert is_conflict('In Progress', 'verified')
+    assert not is_conflict('Done', 'verified')
+    assert not is_conflict('Not Applicable', 'active')
+    assert not is_conflict(None, 'active')
+
+
+def test_upsert_precomputes_conflict_and_returns_previous_status(store):
+    assert store.upsert_item('WSTG-INPV-01', wstg_status='Done', defectdojo_status='active',
+                             last_sync_timestamp='2026-01-01T00:00:00') is None
+    assert store.get_item('WSTG-INPV-01')['conflict'] is True
+
+    # Actualización parcial: el conflicto se recalcula con el valor ya guardado
+    assert store.upsert_item('WSTG-INPV-01', defectdojo_status='verified') == 'Done'
+    item = store.get_item('WSTG-INPV-01')
+    assert item['conflict'] is False
+    assert item['last_sync_timestamp'] == '2026-01-01T00:00:00'
+
+    with pytest.raises(ValueError):
+        store.upsert_item('WSTG-INPV-01', unknown='x')
+
+
+def test_status_counts_and_conflicts(store):
+    store.upsert_items({
+        'WSTG-INPV-01': {'wstg_status': 'Done', 'defectdojo_status': 'active',
+                         'last_sync_timestamp': '2026-01-01T00:00:00'},
+        'WSTG-INPV-02': {'wstg_status': 'Done', 'defectdojo_status': 'verified',
+                         'last_sync_timestamp': '2026-01-01T00:00:00'},
+        'WSTG-INPV-03': {'wstg_status': 'Not Started'},
+    })
+    assert store.status_counts() == {'total_items': 3, 'synced_items': 2, 'conflicts': 1}
+    assert list(store.conflicts()) == ['WSTG-INPV-01']
+
+
+def test_status_counts_use_indexes(store):
+    plan = store._conn.execute(
+        'EXPLAIN QUERY PLAN SELECT COUNT(*) FROM items WHERE conflict = 1').fetchall()
+    assert any('idx_items_conflict' in row['detail'] for row in plan)
+
+
+def test_get_items_returns_only_requested(store):
+    store.upsert_items({f'WSTG-INPV-{i:02d}': {'wstg_status': 'Done'} for i in range(3)})
+    items = store.get_items(['WSTG-INPV-02', 'WSTG-INPV-00', 'WSTG-MISS-01', 'WSTG-INPV-02'])
+    assert sorted(items) == ['WSTG-INPV-00', 'WSTG-INPV-02']
+    assert store.get_items([]) == {}
+
+
+def test_meta_roundtrip(store):
+    assert store.get_meta('dd_watermark') is None
+    store.set_meta('dd_watermark', {'max_id': 5, 'modified': '2026-01-01T00:00:00+00:00'})
+    store.set_meta('dd_watermark', {'max_id': 7, 'modified': '2026-01-02T00:00:00+00:00'})
+    assert store.get_meta('dd_watermark') == {'max_id': 7, 'modified': '2026-01-02T00:00:00+00:00'}
+
+
+def test_sync_log_last_and_recent(store):
+    assert store.last_sync() is None
+    store.log_syncs([_entry(i) for i in range(5)])
+    store.log_sync(_entry(9, direction='tracker->dd'))
+
+    assert store.last_sync() == '2026-01-01T00:00:09'
+    recent = store.recent_syncs(2)
+    assert [e['wstg_id'] for e in recent] == ['WSTG-INPV-04', 'WSTG-INPV-09']
+    assert recent[-1]['success'] is True
+
+
+def test_sync_log_is_pruned(store, monkeypatch):
+    monkeypatch.setattr(wstg_sync_state, 'SYNC_LOG_MAX_ROWS', 10)
+    monkeypatch.setattr(wstg_sync_state, 'SYNC_LOG_PRUNE_EVERY', 5)
+    for i in range(30):
+        store.log_sync(_entry(i % 60))
+
+    count = store._conn.execute('SELECT COUNT(*) FROM sync_log').fetchone()[0]
+    assert count <= 10 + 5
+    assert store.recent_syncs(1)[0]['wstg_id'] == 'WSTG-INPV-29'
+
+
+def test_concurrent_writers_do_not_clobber_each_other(tmp_path):
+    db_path = tmp_path / 'wstg_sync_state.sqlite3'
+    stores = [WstgStateStore(db_path), WstgStateStore(db_path)]
+
+    def write(store, prefix):
+        for i in range(50):
+            store.upsert_item(f'{prefix}-{i:02d}', wstg_status='In Progress', defectdojo_status='active')
+
+    threads = [threading.Thread(target=write, args=(store, prefix))
+               for store, prefix in zip(stores, ('WSTG-INPV', 'WSTG-ATHN'))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stores[0].status_counts()['total_items'] == 100
+    for store in stores:
+        store.close()
+
+
+def test_migrates_legacy_json_and_journal(tmp_path):
+    (tmp_path / 'wstg_sync_state.json').write_text(json.dumps({
+        'items': {'WSTG-INPV-01': {'finding_id': 7, 'wstg_status': 'Done', 'defectdojo_status': 'active'}},
+        'sync_log': [_entry(1)],
+    }), encoding='utf-8')
+    (tmp_path / 'wstg_sync_journal.jsonl').write_text(json.dumps(_entry(2)) + '\n', encoding='utf-8')
+
+    store = WstgStateStore(tmp_path / 'wstg_sync_state.sqlite3')
+    assert store.get_item('WSTG-INPV-01') == {'finding_id': 7, 'wstg_status': 'Done',
+                                              'defectdojo_status': 'active', 'conflict': True}
+    assert [e['wstg_id'] for e in store.recent_syncs(5)] == ['WSTG-INPV-01', 'WSTG-INPV-02']
+    assert (tmp_path / 'wstg_sync_state.json.migrated').exists()
+    assert not (tmp_path / 'wstg_sync_journal.jsonl').exists()
+    store.close()
+
+
+def test_migrates_rotated_journal_backups_oldest_first(tmp_path):
+    for name, number in (('wstg_sync_journal.jsonl.2', 1), ('wstg_sync_journal.jsonl.1', 2),
+                         ('wstg_sync_journal.jsonl', 3)):
+        (tmp_path / name).write_text(json.dumps(_entry(number)) + '\n', encoding='utf-8')
+
+    store = WstgStateStore(tmp_path / 'wstg_sync_state.sqlite3')
+    assert [e['wstg_id'] for e in store.recent_syncs(5)] == ['WSTG-INPV-01', 'WSTG-INPV-02', 'WSTG-INPV-03']
+    assert sorted(p.name for p in tmp_path.glob('wstg_sync_journal*')) == [
+        'wstg_sync_journal.jsonl.1.migrated', 'wstg_sync_journal.jsonl.2.migrated',
+        'wstg_sync_journal.jsonl.migrated',
+    ]
+    store.close()
+
+
+def test_wstg_status_endpoint_reads_store(auth_session, tmp_path, monkeypatch):
+    monkeypatch.setattr('app.wstg_sync_queue.QUEUE_DIR', tmp_path / 'queue')
+    monkeypatch.setattr(wstg_sync_state, 'SYNC_STATE_DB', tmp_path / 'wstg_sync_state.sqlite3')
+    monkeypatch.setattr(wstg_sync_state, '_stores', {})
+    store = wstg_sync_state.get_state_store()
+    store.upsert_item('WSTG-INPV-01', wstg_status='Done', defectdojo_status='active',
+                      last_sync_timestamp='2026-01-01T00:00:00')
+    store.upsert_item('WSTG-INPV-02', wstg_status='Not Started')
+    store.log_sync(_entry(3))
+
+    resp = auth_session["client"].get('/api/wstg/status', headers=auth_headers(auth_session["access_token"]))
+    assert_success(resp)
+    body = resp.get_json()
+    body.pop('pipeline')
+    assert body == {'last_sync': '2026-01-01T00:00:03', 'total_items': 2, 'synced_items': 1,
+                    'pending_items': 1, 'conflicts': 1}
+    store.close()
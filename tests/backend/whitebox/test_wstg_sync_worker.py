@@ -0,0 +1,125 @@
+"""
+Tests de caja blanca para el worker persistente de sincronización WSTG (app/wstg_sync_worker.py)
+con el worker stub (sin DefectDojo)
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+from app import defectdojo_ops
+from app.wstg_sync_queue import enqueue, pending
+from app.wstg_sync_worker import WorkerServer, WorkerUnavailable, call, start_in_thread, stub_handlers
+from tests.backend.conftest import auth_headers
+
+
+@pytest.fixture
+def socket_path():
+    # Ruta corta: los sockets Unix admiten ~108 caracteres
+    directory = tempfile.mkdtemp(prefix='wstg')
+    yield str(Path(directory) / 'sync.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def stub_worker(socket_path):
+    server = WorkerServer(socket_path, stub_handlers())
+    start_in_thread(server)
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+def test_stub_worker_answers_commands(stub_worker):
+    assert call('ping', socket_path=stub_worker)['success'] is True
+
+    result = call('sync_from_tracker', {'wstg_id': 'WSTG-INPV-01', 'status': 'Done'}, socket_path=stub_worker)
+    assert result['success'] is True
+    assert result['defectdojo_status'] == 'verified'
+
+    assert call('sync_from_tracker', {}, socket_path=stub_worker)['success'] is False
+    assert 'desconocido' in call('nope', socket_path=stub_worker)['error']
+
+
+def test_worker_call_is_fast(stub_worker):
+    call('ping', socket_path=stub_worker)
+    start = time.perf_counter()
+    for _ in range(20):
+        call('sync_from_tracker', {'wstg_id': 'WSTG-INPV-01', 'status': 'In Progress'}, socket_path=stub_worker)
+    assert (time.perf_counter() - start) / 20 < 0.1
+
+
+def test_handler_errors_are_returned_as_json(socket_path):
+    def boom(data):
+        raise RuntimeError('fallo')
+
+    calls = []
+    server = WorkerServer(socket_path, {'boom': boom}, after_request=lambda: calls.append(1))
+    start_in_thread(server)
+    try:
+        assert call('boom', socket_path=socket_path) == {'success': False, 'error': 'fallo'}
+        assert calls == [1]
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not Path(socket_path).exists()
+
+
+def test_call_without_worker_raises_unavailable(socket_path):
+    with pytest.raises(WorkerUnavailable):
+        call('ping', socket_path=socket_path)
+
+
+def test_defectdojo_ops_uses_worker_before_subprocess(stub_worker, monkeypatch):
+    monkeypatch.setattr('app.config.WSTG_SYNC_SOCKET', stub_worker)
+
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError('no debe ejecutar docker compose exec')
+
+    monkeypatch.setattr(defectdojo_ops.subprocess, 'run', no_subprocess)
+    result = defectdojo_ops.sync_wstg_from_tracker({'wstg_id': 'WSTG-INPV-01', 'status': 'Done'})
+    assert result['success'] is True
+
+
+def test_wstg_sync_route_uses_worker_without_queueing(auth_session, stub_worker, tmp_path, monkeypatch):
+    monkeypatch.setattr('app.config.WSTG_SYNC_SOCKET', stub_worker)
+    monkeypatch.setattr('app.wstg_sync_queue.QUEUE_DIR', tmp_path)
+
+    # Cambios anteriores en cola: los del mismo wstg_id quedan sustituidos
+    enqueue('tracker->dd', {'wstg_id': 'WSTG-INPV-01', 'status': 'In Progress'}, tmp_path)
+    other = enqueue('tracker->dd', {'wstg_id': 'WSTG-INPV-03', 'status': 'Done'}, tmp_path)
+
+    client = auth_session["client"]
+    headers = auth_headers(auth_session["access_token"])
+    resp = client.post('/api/wstg/sync', json={'wstg_id': 'WSTG-INPV-01', 'status': 'Done'}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()['success'] is True
+    assert [message['id'] for message in pending(tmp_path)] == [other]
+
+    # Datos inválidos: 400 sin llegar al worker ni a la cola
+    for data in ({'wstg_id': 'WSTG-INPV-02'}, {'wstg_id': 'INPV-02', 'status': 'Done'},
+                 {'wstg_id': 'WSTG-INPV-02', 'status': 'Terminado'}):
+        resp = client.post('/api/wstg/sync', json=data, headers=headers)
+        assert resp.status_code == 400
+        assert resp.get_json()['success'] is False
+    assert [message['id'] for message in pending(tmp_path)] == [other]
+
+
+def test_wstg_sync_route_queues_worker_failures(auth_session, socket_path, tmp_path, monkeypatch):
+    server = WorkerServer(socket_path, {'sync_from_tracker': lambda data: {'success': False,
+                                                                           'error': 'database is down'}})
+    start_in_thread(server)
+    monkeypatch.setattr('app.config.WSTG_SYNC_SOCKET', socket_path)
+    monkeypatch.setattr('app.wstg_sync_queue.QUEUE_DIR', tmp_path)
+    try:
+        resp = auth_session["client"].post('/api/wstg/sync', json={'wstg_id': 'WSTG-INPV-02', 'status': 'Done'},
+                                           headers=auth_headers(auth_session["access_token"]))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Fallo de DefectDojo con datos válidos: se reintenta desde la cola
+    assert resp.status_code == 202 and resp.get_json()['queued'] is True
+    assert len(pending(tmp_path)) == 1